@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Guarda contra regressões N+1 nas chamadas ao Azure
+
+assert_max_calls() verifica o número de chamadas feitas dentro de um bloco (ou
+de uma operação específica) usando a contabilização de src/utils/call_accounting.
+Executado como script, sobe o ARM falso com o tamanho de tenant informado e
+confere cada endpoint contra um limite calculado a partir desse tamanho: um
+endpoint que passa a fazer uma chamada por recurso/resource group estoura o limite
+assim que o fixture cresce.
+
+Uso:
+    python benchmarks/call_budget.py --resources 5000 --resource-groups 200 --subscriptions 3
+"""
+
+import sys
+import math
+import argparse
+import tempfile
+import shutil
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from fake_arm import FakeArmServer, FakeArmConfig
+from run_benchmarks import prepare_app_tree, load_app, seed_database, TEST_USER
+
+
+class CallBudgetExceeded(AssertionError):
+    """Mais chamadas ao Azure do que o limite do endpoint"""
+
+
+@contextmanager
+def assert_max_calls(max_calls, operation=None, name=None):
+    """
+    Falha se o bloco fizer mais que max_calls chamadas ao Azure
+    operation restringe a contagem a um prefixo de operação, ex.: 'GET /subscriptions/{}/resourcegroups'
+    """
+    from src.utils.call_accounting import track_calls
+
+    with track_calls(name) as ledger:
+        yield ledger
+    actual = ledger.count(operation)
+    if actual > max_calls:
+        raise CallBudgetExceeded(
+            f"{name or 'bloco'}: {actual} chamadas (limite {max_calls})\n{ledger.log_line()}"
+        )
+
+
+def pages(total, page_size):
+    return max(1, math.ceil(total / page_size))
+
+
+def endpoint_budgets(config):
+    """Limite de chamadas por endpoint para o tamanho de fixture informado"""
+    inventory = pages(config.resource_groups, config.page_size) + pages(config.resources, config.page_size)
+    return [
+        ('overview', 'GET', '/api/dashboard/overview', None, inventory),
+        ('resources', 'GET', '/api/azure/resources?limit=100', None, inventory),
+        ('list_locks', 'GET', '/api/azure-actions/list-locks', None, pages(config.locks, config.page_size)),
+        ('credentials', 'GET', '/api/azure/credentials', None, 0),
+        ('budget_alerts', 'GET', '/api/azure-budget/alerts', None, 0),
+        ('tenant_inventory', 'GET', '/api/azure/tenant/inventory', None, 1 + config.subscriptions * inventory),
+        ('tenant_locks', 'GET', '/api/azure/tenant/locks', None,
+         1 + config.subscriptions * pages(config.locks, config.page_size)),
+        ('tenant_costs', 'GET', '/api/azure/tenant/costs', None, 1 + config.subscriptions),
+        ('batch', 'POST', '/api/batch', {'requests': [
+            {'id': 'overview', 'path': '/api/dashboard/overview'},
+            {'id': 'resources', 'path': '/api/azure/resources?limit=100'},
+            {'id': 'alerts', 'path': '/api/azure-budget/alerts'}
+        ]}, inventory)
+    ]
+
+
+def check_endpoints(app_module, config, user_id):
+    """Executa cada endpoint com caches frios e compara com o limite; retorna os resultados"""
+    client = app_module.app.test_client()
+    client.post('/api/auth/login', json=TEST_USER)
+
+    results = []
+    for name, method, path, body, budget in endpoint_budgets(config):
+        app_module.inventory_service.invalidate(user_id)
+        app_module.subscription_fanout.cache.invalidate_user(user_id)
+        try:
+            with assert_max_calls(budget, name=name) as ledger:
+                response = client.open(path, method=method, json=body)
+            results.append({'endpoint': name, 'status': response.status_code, 'calls': ledger.calls,
+                            'budget': budget, 'ok': True})
+        except CallBudgetExceeded as e:
+            results.append({'endpoint': name, 'calls': None, 'budget': budget, 'ok': False, 'error': str(e)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Limites de chamadas Azure por endpoint')
+    parser.add_argument('--subscriptions', type=int, default=2)
+    parser.add_argument('--resources', type=int, default=3000)
+    parser.add_argument('--resource-groups', type=int, default=120)
+    parser.add_argument('--locks', type=int, default=40)
+    parser.add_argument('--page-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    config = FakeArmConfig(
+        subscriptions=args.subscriptions,
+        resources=args.resources,
+        resource_groups=args.resource_groups,
+        locks=args.locks,
+        page_size=args.page_size,
+        latency_ms=0,
+        latency_jitter_ms=0
+    )
+    fake_server = FakeArmServer(config).start()
+    workdir = tempfile.mkdtemp(prefix='bolt-call-budget-')
+    try:
+        prepare_app_tree(workdir)
+        app_module = load_app(workdir, fake_server, SimpleNamespace(inventory_max_age=None))
+        user_id = seed_database(app_module, SimpleNamespace(seed_rows=10), fake_server.state.subscription_ids[0])
+        results = check_endpoints(app_module, config, user_id)
+    finally:
+        fake_server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for result in results:
+        status = 'ok' if result['ok'] else 'EXCEDIDO'
+        print(f"{result['endpoint']:18s} limite {result['budget']:4d}  "
+              f"chamadas {result['calls'] if result['calls'] is not None else '-':>4}  {status}")
+        if not result['ok']:
+            print(result['error'], file=sys.stderr)
+    return 0 if all(result['ok'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""
+Servidor local que imita o Azure Resource Manager / Cost Management
+Serve resource groups, recursos, locks, consultas de custo, usage details e
+subscriptions com paginação por nextLink, latência configurável e injeção de 429,
+para que o backend seja exercitado sem tocar o Azure real
+
+Os SDKs só enviam bearer token por HTTPS: o servidor usa um certificado
+autoassinado gerado com openssl, indicado aos clientes via REQUESTS_CA_BUNDLE
+"""
+
+import os
+import ssl
+import json
+import time
+import random
+import tempfile
+import threading
+import subprocess
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+RESOURCE_TYPES = (
+    'Microsoft.Compute/virtualMachines',
+    'Microsoft.Storage/storageAccounts',
+    'Microsoft.Network/virtualNetworks',
+    'Microsoft.Network/networkInterfaces',
+    'Microsoft.Compute/disks',
+    'Microsoft.Web/sites',
+    'Microsoft.Sql/servers',
+    'Microsoft.KeyVault/vaults'
+)
+LOCATIONS = ('eastus', 'westeurope', 'brazilsouth', 'eastus2')
+
+
+@dataclass
+class FakeArmConfig:
+    """Tamanho do tenant simulado e comportamento do servidor"""
+    subscriptions: int = 1
+    resource_groups: int = 50
+    resources: int = 2000
+    locks: int = 20
+    cost_days: int = 30
+    usage_details: int = 500
+    page_size: int = 1000
+    latency_ms: float = 20.0
+    latency_jitter_ms: float = 10.0
+    throttle_rate: float = 0.0
+    retry_after_seconds: int = 1
+    seed: int = 42
+
+
+class FakeArmState:
+    """Dados gerados uma vez e contadores de requisições"""
+
+    def __init__(self, config: FakeArmConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.subscription_ids = [f'00000000-0000-0000-0000-{index:012d}' for index in range(config.subscriptions)]
+        self.resource_groups = {}
+        self.resources = {}
+        self.locks = {}
+        for subscription_id in self.subscription_ids:
+            groups = [self._resource_group(subscription_id, index) for index in range(config.resource_groups)]
+            self.resource_groups[subscription_id] = groups
+            self.resources[subscription_id] = [
+                self._resource(subscription_id, groups[index % len(groups)]['name'], index)
+                for index in range(config.resources)
+            ]
+            self.locks[subscription_id] = [self._lock(subscription_id, index) for index in range(config.locks)]
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.by_route = {}
+
+    def _resource_group(self, subscription_id, index):
+        name = f'rg-bench-{index:04d}'
+        return {
+            'id': f'/subscriptions/{subscription_id}/resourceGroups/{name}',
+            'name': name,
+            'type': 'Microsoft.Resources/resourceGroups',
+            'location': LOCATIONS[index % len(LOCATIONS)],
+            'tags': {'env': ('dev', 'prod', 'test')[index % 3]},
+            'properties': {'provisioningState': 'Succeeded'}
+        }
+
+    def _resource(self, subscription_id, group, index):
+        resource_type = RESOURCE_TYPES[index % len(RESOURCE_TYPES)]
+        name = f"{resource_type.split('/')[-1].lower()}-{index:06d}"
+        tags = {'owner': f'team-{index % 7}'}
+        if index % 5:
+            tags['env'] = ('dev', 'prod', 'test')[index % 3]
+        return {
+            'id': f'/subscriptions/{subscription_id}/resourceGroups/{group}/providers/{resource_type}/{name}',
+            'name': name,
+            'type': resource_type,
+            'location': LOCATIONS[index % len(LOCATIONS)],
+            'tags': tags
+        }
+
+    def _lock(self, subscription_id, index):
+        name = f'lock-{index:03d}'
+        return {
+            'id': f'/subscriptions/{subscription_id}/providers/Microsoft.Authorization/locks/{name}',
+            'name': name,
+            'type': 'Microsoft.Authorization/locks',
+            'properties': {'level': ('CanNotDelete', 'ReadOnly')[index % 2], 'notes': 'benchmark'}
+        }
+
+    def count(self, route, throttled=False):
+        with self._lock:
+            self.requests += 1
+            self.by_route[route] = self.by_route.get(route, 0) + 1
+            if throttled:
+                self.throttled += 1
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'throttled': self.throttled, 'by_route': dict(self.by_route)}
+
+
+class FakeArmHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None  # FakeArmState, definido por FakeArmServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        self._handle('POST')
+
+    def _handle(self, method):
+        config = self.state.config
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+        route = self._route_name(method, parts)
+
+        delay = config.latency_ms + random.uniform(0, config.latency_jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        if config.throttle_rate and random.random() < config.throttle_rate:
+            self.state.count(route, throttled=True)
+            return self._send(429, {'error': {'code': 'TooManyRequests', 'message': 'Fake ARM throttling'}},
+                              {'Retry-After': str(config.retry_after_seconds)})
+        self.state.count(route)
+
+        handler = getattr(self, f'_route_{route}', None)
+        if handler is None:
+            return self._send(404, {'error': {'code': 'NotFound', 'message': f'{method} {url.path}'}})
+        return handler(parts, query)
+
+    @staticmethod
+    def _route_name(method, parts):
+        lowered = [part.lower() for part in parts]
+        if lowered == ['subscriptions']:
+            return 'subscriptions'
+        if len(lowered) == 3 and lowered[2] == 'resourcegroups':
+            return 'resource_groups'
+        if len(lowered) == 3 and lowered[2] == 'resources':
+            return 'resources'
+        if lowered[-2:] == ['microsoft.authorization', 'locks']:
+            return 'locks'
+        if method == 'POST' and lowered[-2:] == ['microsoft.costmanagement', 'query']:
+            return 'cost_query'
+        if lowered[-2:] == ['microsoft.consumption', 'usagedetails']:
+            return 'usage_details'
+        return 'unknown'
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('x-ms-ratelimit-remaining-subscription-reads', '11999')
+        self.send_header('x-ms-request-id', f'{random.getrandbits(64):016x}')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _page(self, items, query):
+        """Fatia items conforme $skiptoken e monta o nextLink absoluto"""
+        page_size = self.state.config.page_size
+        start = int(query.get('$skiptoken', ['0'])[0])
+        payload = {'value': items[start:start + page_size]}
+        if start + page_size < len(items):
+            base = urlparse(self.path)
+            other = [f'{key}={value[0]}' for key, value in parse_qs(base.query).items() if key != '$skiptoken']
+            payload['nextLink'] = (f"https://{self.headers['Host']}{base.path}?"
+                                   + '&'.join(other + [f'$skiptoken={start + page_size}']))
+        return payload
+
+    def _subscription(self, parts):
+        return next((sid for sid in self.state.subscription_ids if sid == parts[1]), self.state.subscription_ids[0])
+
+    def _route_subscriptions(self, parts, query):
+        self._send(200, {'value': [{
+            'id': f'/subscriptions/{subscription_id}',
+            'subscriptionId': subscription_id,
+            'tenantId': '11111111-1111-1111-1111-111111111111',
+            'displayName': f'Benchmark {index}',
+            'state': 'Enabled'
+        } for index, subscription_id in enumerate(self.state.subscription_ids)]})
+
+    def _route_resource_groups(self, parts, query):
+        self._send(200, self._page(self.state.resource_groups[self._subscription(parts)], query))
+
+    def _route_resources(self, parts, query):
+        self._send(200, self._page(self.state.resources[self._subscription(parts)], query))
+
+    def _route_locks(self, parts, query):
+        self._send(200, self._page(self.state.locks[self._subscription(parts)], query))
+
+    def _route_cost_query(self, parts, query):
+        config = self.state.config
+        today = date.today()
+        rng = random.Random(parts[1])
+        rows = [
+            [round(rng.uniform(50, 150), 4), int((today - timedelta(days=offset)).strftime('%Y%m%d')), 'USD']
+            for offset in range(min(config.cost_days, today.day))
+        ]
+        self._send(200, {
+            'id': f'/subscriptions/{parts[1]}/providers/Microsoft.CostManagement/query/bench',
+            'name': 'bench',
+            'type': 'Microsoft.CostManagement/query',
+            'properties': {
+                'nextLink': None,
+                'columns': [
+                    {'name': 'PreTaxCost', 'type': 'Number'},
+                    {'name': 'UsageDate', 'type': 'Number'},
+                    {'name': 'Currency', 'type': 'String'}
+                ],
+                'rows': rows
+            }
+        })
+
+    def _route_usage_details(self, parts, query):
+        config = self.state.config
+        subscription_id = self._subscription(parts)
+        resources = self.state.resources[subscription_id]
+        today = date.today()
+        details = [{
+            'id': f'/subscriptions/{subscription_id}/providers/Microsoft.Consumption/usageDetails/{index}',
+            'name': str(index),
+            'type': 'Microsoft.Consumption/usageDetails',
+            'kind': 'legacy',
+            'properties': {
+                'date': (today - timedelta(days=index % max(config.cost_days, 1))).isoformat() + 'T00:00:00Z',
+                'cost': round(1 + (index % 97) / 10.0, 4),
+                'billingCurrency': 'USD',
+                'resourceGroup': resources[index % len(resources)]['id'].split('/')[4] if resources else None,
+                'instanceName': resources[index % len(resources)]['id'] if resources else None,
+                'meterCategory': 'Virtual Machines'
+            }
+        } for index in range(config.usage_details)]
+        self._send(200, self._page(details, query))
+
+
+def generate_certificate(directory):
+    """Certificado autoassinado para localhost/127.0.0.1 (usado também como CA bundle)"""
+    cert_path = os.path.join(directory, 'fake-arm.pem')
+    key_path = os.path.join(directory, 'fake-arm.key')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-keyout', key_path, '-out', cert_path, '-subj', '/CN=localhost',
+        '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1'
+    ], check=True, capture_output=True)
+    return cert_path, key_path
+
+
+class FakeArmServer:
+    """Sobe o servidor HTTPS falso em uma thread; endpoint e cert_path ficam disponíveis após start()"""
+
+    def __init__(self, config: FakeArmConfig = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or FakeArmConfig()
+        self.state = FakeArmState(self.config)
+        self.host = host
+        self.port = port
+        self.cert_path = None
+        self._server = None
+        self._thread = None
+        self._tempdir = None
+
+    @property
+    def endpoint(self):
+        return f'https://{self.host}:{self.port}'
+
+    def start(self):
+        self._tempdir = tempfile.TemporaryDirectory(prefix='fake-arm-')
+        self.cert_path, key_path = generate_certificate(self._tempdir.name)
+
+        handler = type('BoundFakeArmHandler', (FakeArmHandler,), {'state': self.state})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert_path, key_path)
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self.port = self._server.server_address[1]
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-arm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._tempdir:
+            self._tempdir.cleanup()
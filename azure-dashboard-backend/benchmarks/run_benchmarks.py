@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga dos endpoints principais do backend
+
+Sobe o servidor ARM falso (fake_arm.py), inicia o app Flask de src/main.py a partir
+de uma cópia temporária de src/ (bancos SQLite isolados), autentica usuários
+virtuais e dispara requisições concorrentes durante o tempo configurado.
+Resultado em JSON: latência p50/p95/p99 por endpoint, vazão, códigos de status,
+pico de RSS do processo e contadores do servidor falso.
+
+Uso:
+    python benchmarks/run_benchmarks.py --users 20 --duration 30 --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --max-regression 0.25
+
+Com --baseline, o processo termina com código 1 se o p95 de algum endpoint piorar
+além da tolerância, para uso em pipeline.
+"""
+
+import os
+import sys
+import math
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import resource
+import tempfile
+import threading
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_arm import FakeArmServer, FakeArmConfig  # noqa: E402
+
+BATCH_BODY = {'requests': [
+    {'id': 'auth', 'path': '/api/auth/status'},
+    {'id': 'credentials', 'path': '/api/azure/credentials-status'},
+    {'id': 'overview', 'path': '/api/dashboard/overview'},
+    {'id': 'resources', 'path': '/api/azure/resources?limit=100'},
+    {'id': 'budget', 'path': '/api/azure-budget/status'},
+    {'id': 'alerts', 'path': '/api/azure-budget/alerts'},
+    {'id': 'schedules', 'path': '/api/schedules'}
+]}
+
+ENDPOINTS = {
+    'overview': ('GET', '/api/dashboard/overview', None),
+    'resources': ('GET', '/api/azure/resources?limit=100', None),
+    'credentials': ('GET', '/api/azure/credentials', None),
+    'budget_configs': ('GET', '/api/budget/configs', None),
+    'budget_alerts': ('GET', '/api/azure-budget/alerts', None),
+    'schedules': ('GET', '/api/schedules', None),
+    'tenant_inventory': ('GET', '/api/azure/tenant/inventory', None),
+    'tenant_costs': ('GET', '/api/azure/tenant/costs', None),
+    'batch': ('POST', '/api/batch', BATCH_BODY)
+}
+
+TEST_USER = {'email': 'test@test.com', 'password': '123456'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark de carga do backend com ARM falso')
+    parser.add_argument('--users', type=int, default=10, help='usuários virtuais concorrentes')
+    parser.add_argument('--duration', type=float, default=20, help='duração da medição em segundos')
+    parser.add_argument('--warmup', type=float, default=3, help='aquecimento antes da medição')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='lista separada por vírgula')
+    parser.add_argument('--subscriptions', type=int, default=1)
+    parser.add_argument('--resources', type=int, default=2000, help='recursos por subscription')
+    parser.add_argument('--resource-groups', type=int, default=50)
+    parser.add_argument('--page-size', type=int, default=1000, help='itens por página do ARM falso')
+    parser.add_argument('--latency-ms', type=float, default=20, help='latência base do ARM falso')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fração de respostas 429')
+    parser.add_argument('--inventory-max-age', type=float, default=None,
+                        help='INVENTORY_MAX_AGE_SECONDS do app (0 força listagem a cada requisição)')
+    parser.add_argument('--seed-rows', type=int, default=500, help='linhas de budgets/agendamentos semeadas')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    parser.add_argument('--baseline', help='resultado anterior para comparação')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='piora tolerada no p95 (fração)')
+    return parser.parse_args()
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por posição mais próxima (valores já ordenados)"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def peak_rss_bytes():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KiB, macOS em bytes
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def prepare_app_tree(workdir):
+    """Copia src/ sem bancos de dados para que o benchmark não toque os dados locais"""
+    shutil.copytree(
+        os.path.join(BACKEND_DIR, 'src'), os.path.join(workdir, 'src'),
+        ignore=shutil.ignore_patterns('*.db', '*.db-journal', '__pycache__', 'msal_token_cache.json')
+    )
+
+
+def load_app(workdir, fake_server, args):
+    os.environ['AZURE_MANAGEMENT_ENDPOINT'] = fake_server.endpoint
+    os.environ['REQUESTS_CA_BUNDLE'] = fake_server.cert_path
+    os.environ['ACTIVITY_LOG_INGESTION'] = 'false'
+    os.environ['COST_SYNC'] = 'false'
+    os.environ['METRICS_COLLECTION'] = 'false'
+    if args.inventory_max_age is not None:
+        os.environ['INVENTORY_MAX_AGE_SECONDS'] = str(args.inventory_max_age)
+    sys.path.insert(0, workdir)
+    # O app vem sempre da cópia em workdir, mesmo que src já tenha sido importado do
+    # backend (ex.: testes de unidade na mesma sessão do pytest)
+    for name in [name for name in sys.modules if name == 'src' or name.startswith('src.')]:
+        del sys.modules[name]
+
+    from azure.core.credentials import AccessToken
+    import src.main as main
+
+    class StaticTokenCredential:
+        """Credencial sem Azure AD: o ARM falso aceita qualquer bearer token"""
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def get_token(self, *scopes, **kwargs):
+            return AccessToken('benchmark-token', int(time.time()) + 3600)
+
+    # azure.identity é carregado sob demanda: o patch vai no módulo real, usado por todas as rotas
+    main.azure_identity.ClientSecretCredential = StaticTokenCredential
+    # Importar o app não cria as tabelas nem inicia as threads (etapas de src/utils/startup)
+    main.startup.run()
+    return main
+
+
+def seed_database(main, args, subscription_id):
+    conn = sqlite3.connect(main.DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM users WHERE email = ?', (TEST_USER['email'],))
+    user_id = cursor.fetchone()[0]
+    cursor.execute('''
+        INSERT INTO azure_credentials (user_id, tenant_id, client_id, client_secret, subscription_id)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (user_id, '11111111-1111-1111-1111-111111111111', 'benchmark-client', 'benchmark-secret', subscription_id))
+    cursor.executemany('''
+        INSERT INTO budget_configs (user_id, budget_name, amount, webhook_url) VALUES (?, ?, ?, NULL)
+    ''', [(user_id, f'budget-{index}', 1000 + index) for index in range(args.seed_rows)])
+    cursor.executemany('''
+        INSERT INTO schedules (user_id, schedule_name, schedule_type, cron_expression, action_type, action_config)
+        VALUES (?, ?, 'cron', '0 3 * * *', 'cleanup', '{}')
+    ''', [(user_id, f'schedule-{index}') for index in range(args.seed_rows)])
+    conn.commit()
+    conn.close()
+    return user_id
+
+
+def start_app_server(app):
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='bench-app', daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def virtual_user(base_url, endpoints, deadline, measure_from, samples, errors):
+    import requests
+
+    session = requests.Session()
+    response = session.post(f'{base_url}/api/auth/login', json=TEST_USER, timeout=30)
+    response.raise_for_status()
+
+    index = 0
+    while time.time() < deadline:
+        name = endpoints[index % len(endpoints)]
+        index += 1
+        method, path, body = ENDPOINTS[name]
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=body, timeout=120)
+            status = response.status_code
+        except Exception as e:
+            status = 0
+            errors.append(f'{name}: {str(e)}')
+        elapsed = time.perf_counter() - started
+        if time.time() >= measure_from:
+            samples.append((name, elapsed, status))
+
+
+def summarize(samples, duration):
+    by_endpoint = {}
+    for name, elapsed, status in samples:
+        entry = by_endpoint.setdefault(name, {'latencies': [], 'status_codes': {}})
+        entry['latencies'].append(elapsed * 1000.0)
+        entry['status_codes'][str(status)] = entry['status_codes'].get(str(status), 0) + 1
+
+    def describe(latencies, status_codes):
+        latencies.sort()
+        count = len(latencies)
+        errors = sum(total for code, total in status_codes.items() if code == '0' or int(code) >= 500)
+        return {
+            'requests': count,
+            'errors': errors,
+            'status_codes': status_codes,
+            'throughput_rps': round(count / duration, 2),
+            'mean_ms': round(sum(latencies) / count, 2) if count else None,
+            'p50_ms': round(percentile(latencies, 0.50), 2) if count else None,
+            'p95_ms': round(percentile(latencies, 0.95), 2) if count else None,
+            'p99_ms': round(percentile(latencies, 0.99), 2) if count else None,
+            'max_ms': round(latencies[-1], 2) if count else None
+        }
+
+    endpoints = {name: describe(entry['latencies'], entry['status_codes']) for name, entry in by_endpoint.items()}
+    all_latencies = [elapsed * 1000.0 for _, elapsed, _ in samples]
+    all_codes = {}
+    for _, _, status in samples:
+        all_codes[str(status)] = all_codes.get(str(status), 0) + 1
+    return endpoints, describe(all_latencies, all_codes)
+
+
+def compare_with_baseline(result, baseline_path, tolerance):
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    regressions = []
+    for name, current in result['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous or not previous.get('p95_ms') or current.get('p95_ms') is None:
+            continue
+        ratio = current['p95_ms'] / previous['p95_ms']
+        if ratio > 1 + tolerance:
+            regressions.append({
+                'endpoint': name,
+                'baseline_p95_ms': previous['p95_ms'],
+                'current_p95_ms': current['p95_ms'],
+                'ratio': round(ratio, 3)
+            })
+    return regressions
+
+
+def main():
+    args = parse_args()
+    endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        sys.exit(f'Endpoints desconhecidos: {", ".join(unknown)}')
+
+    fake_config = FakeArmConfig(
+        subscriptions=args.subscriptions,
+        resources=args.resources,
+        resource_groups=args.resource_groups,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        throttle_rate=args.throttle_rate
+    )
+    fake_server = FakeArmServer(fake_config).start()
+    workdir = tempfile.mkdtemp(prefix='bolt-bench-')
+    try:
+        prepare_app_tree(workdir)
+        app_module = load_app(workdir, fake_server, args)
+        seed_database(app_module, args, fake_server.state.subscription_ids[0])
+        app_server, base_url = start_app_server(app_module.app)
+
+        started = time.time()
+        measure_from = started + args.warmup
+        deadline = measure_from + args.duration
+        samples, errors = [], []
+        threads = [
+            threading.Thread(target=virtual_user, args=(base_url, endpoints[i:] + endpoints[:i], deadline,
+                                                        measure_from, samples, errors), daemon=True)
+            for i in range(args.users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        app_server.shutdown()
+
+        endpoint_stats, overall = summarize(samples, args.duration)
+        result = {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'config': {
+                'users': args.users,
+                'duration_seconds': args.duration,
+                'warmup_seconds': args.warmup,
+                'endpoints': endpoints,
+                'fake_arm': vars(fake_config),
+                'inventory_max_age': args.inventory_max_age,
+                'seed_rows': args.seed_rows
+            },
+            'endpoints': endpoint_stats,
+            'overall': overall,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'fake_arm_stats': fake_server.state.stats(),
+            'arm_governor': app_module.arm_governor.status(),
+            'client_errors': errors[:20]
+        }
+
+        exit_code = 0
+        if args.baseline:
+            result['regressions'] = compare_with_baseline(result, args.baseline, args.max_regression)
+            exit_code = 1 if result['regressions'] else 0
+
+        output = json.dumps(result, indent=2, default=str)
+        if args.output:
+            with open(args.output, 'w') as handle:
+                handle.write(output)
+        else:
+            print(output)
+
+        for name, stats in sorted(endpoint_stats.items()):
+            print(f"{name:18s} {stats['requests']:6d} req  p50 {stats['p50_ms']:8.1f} ms  "
+                  f"p95 {stats['p95_ms']:8.1f} ms  p99 {stats['p99_ms']:8.1f} ms  "
+                  f"{stats['throughput_rps']:7.1f} req/s  erros {stats['errors']}", file=sys.stderr)
+        return exit_code
+    finally:
+        fake_server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Configuração do gunicorn para produção (modo pré-fork)
+
+    gunicorn -c gunicorn.conf.py src.main:app
+
+O app é carregado uma vez no master (preload_app) e os workers são criados por
+fork, compartilhando as páginas do interpretador e dos módulos. Os caches de
+inventário ficam no diretório SHARED_CACHE_DIR, lido por todos os workers: um
+worker lista o ARM e os demais servem o snapshot publicado. As threads de
+background (custos, Activity Log, webhooks) rodam em um único worker eleito
+"""
+
+import os
+import multiprocessing
+
+_backend_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Lidos por src/main.py e src/services/shared_cache.py na importação do app
+os.environ.setdefault('BOLT_PREFORK', 'true')
+os.environ.setdefault('SHARED_CACHE_DIR', os.path.join(_backend_dir, 'data', 'shared-cache'))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Threads por worker: as rotas esperam I/O do Azure e cada conexão SSE (/api/stream)
+# ocupa uma thread até fechar. Para que dashboards abertos não bloqueiem as demais
+# rotas, o worker aceita no máximo SSE_MAX_CONNECTIONS streams (padrão: metade das
+# threads) e responde 503 com Retry-After aos excedentes, que seguem com polling.
+# Capacidade total de streams = workers * SSE_MAX_CONNECTIONS
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+os.environ.setdefault('SSE_MAX_CONNECTIONS', str(max(1, threads // 2)))
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+# Recicla workers periodicamente (o líder é reeleito entre os restantes; as operações
+# de um worker reciclado perdem o heartbeat e são retomadas ou encerradas pelo líder)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = 500
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """No master, após o preload: executa a inicialização única antes do fork dos workers"""
+    from src.utils.startup import startup
+
+    startup.run()
+
+
+def post_fork(server, worker):
+    """Após o fork: replica eventos entre workers e disputa a liderança dos serviços de background"""
+    from src.main import start_background_services
+    from src.services.event_bus import event_bus
+    from src.services.shared_cache import shared_cache
+
+    # Custos, alertas e operações são publicados no líder; os streams SSE estão em todos os workers
+    if shared_cache.enabled:
+        event_bus.enable_relay(os.path.join(shared_cache.directory, 'events.db'))
+    shared_cache.elect_leader(start_background_services)
@@ -1,15 +1,47 @@
 import os
 import sys
 import os
-from flask import Flask, send_from_directory, jsonify, request, session, make_response
+# Primeiro módulo do app: a importação de src.main é medida a partir daqui (record_module)
+from src.utils.startup import startup
+from flask import Flask, send_from_directory, jsonify, request, session, make_response, Response, stream_with_context
 from flask_cors import CORS
 import sqlite3
 from datetime import datetime
 import json
 import requests
-from azure.identity import ClientSecretCredential
-from azure.mgmt.resource import ResourceManagementClient
-from azure.mgmt.consumption import ConsumptionManagementClient
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from src.services.operation_tracker import operation_tracker
+from src.services.event_bus import event_bus, sse_stream, StreamLimitReached, RECONNECT_MILLISECONDS
+from src.services.inventory_service import inventory_service
+from src.services.activity_log_service import activity_log_service
+from src.services.cost_store import cost_store
+from src.services.budget_alert_service import budget_alert_service
+from src.services.webhook_delivery import webhook_queue
+from src.services.subscription_fanout import subscription_fanout
+from src.services.metrics_collector import metrics_collector
+from src.services.rightsizing_engine import rightsizing_engine
+from src.services.bulk_locks import (
+    BULK_DEFAULT_CONCURRENCY, validate_bulk_lock_request, run_bulk_lock_operation, bulk_lock_response
+)
+from src.utils.arm_governor import arm_governor, ArmThrottledError
+from src.utils.azure_clients import azure_client_options
+from src.utils.request_memo import request_memo, memoized
+from src.utils.arm_ids import parse_arm_id
+from src.utils.inventory_index import filter_from_args, InvalidFilterError
+from src.utils.search_index import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+from src.utils.call_accounting import start_tracking, stop_tracking, log_ledger
+from src.utils.json_provider import FastJSONProvider
+from src.utils.payload_cache import payload_cache, payload_response
+from src.utils.credential_cache import credential_cache
+from src.utils.pagination import (
+    sqlite_page, sequence_page, estimate_total, parse_limit, optional_limit, wants_total, InvalidCursorError
+)
+
+# SDKs do Azure carregados no primeiro uso, fora da importação do app
+azure_identity = startup.lazy_import('azure.identity')
+azure_mgmt_resource = startup.lazy_import('azure.mgmt.resource')
+azure_mgmt_consumption = startup.lazy_import('azure.mgmt.consumption')
 
 # Configurar path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,6 +49,7 @@ static_dir = os.path.join(os.path.dirname(current_dir), 'static')
 
 # Criar app Flask
 app = Flask(__name__, static_folder=static_dir, static_url_path='')
+app.json = FastJSONProvider(app)
 
 # Configurações de sessão
 app.config['SECRET_KEY'] = 'bolt-dashboard-secret-key-2024'
@@ -32,6 +65,39 @@ CORS(app,
      allow_headers=['Content-Type', 'Authorization'],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
 
+# Inicialização única (banco, threads de background) antes da primeira requisição,
+# caso o servidor não a tenha executado explicitamente
+@app.before_request
+def ensure_initialized():
+    startup.ensure()
+
+# Contabilização das chamadas Azure por requisição (header X-Azure-Calls e log)
+AZURE_CALLS_HEADER = os.environ.get('AZURE_CALLS_HEADER', 'true').lower() == 'true'
+
+@app.before_request
+def start_azure_call_tracking():
+    # Guardado no environ (e não em g): sub-requisições de /api/batch compartilham o app context
+    request.environ['bolt.azure_calls'], request.environ['bolt.azure_calls_token'] = start_tracking(request.path)
+
+@app.after_request
+def report_azure_calls(response):
+    ledger = request.environ.get('bolt.azure_calls')
+    if ledger is not None and ledger.calls:
+        if AZURE_CALLS_HEADER:
+            response.headers['X-Azure-Calls'] = ledger.header_value()
+            response.headers['Server-Timing'] = f'azure;dur={ledger.elapsed * 1000:.1f};desc="{ledger.calls} calls"'
+        log_ledger(ledger)
+    return response
+
+@app.teardown_request
+def stop_azure_call_tracking(exc):
+    token = request.environ.pop('bolt.azure_calls_token', None)
+    if token is not None:
+        try:
+            stop_tracking(token)
+        except ValueError:
+            pass  # resposta em streaming finalizada em outro contexto
+
 # Banco de dados
 DB_PATH = os.path.join(current_dir, 'bolt_dashboard.db')
 
@@ -103,6 +169,13 @@ def init_db():
         )
     ''')
     
+    # Índices da paginação por cursor (user_id, created_at, id)
+    for table in ('azure_credentials', 'budget_configs', 'schedules'):
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_{table}_user_created
+            ON {table} (user_id, created_at, id)
+        ''')
+    
     # Inserir usuário teste se não existir
     cursor.execute('SELECT COUNT(*) FROM users WHERE email = ?', ('test@test.com',))
     if cursor.fetchone()[0] == 0:
@@ -114,8 +187,11 @@ def init_db():
     conn.commit()
     conn.close()
 
-def get_azure_client(user_id):
-    """Obter cliente Azure para o usuário"""
+def get_azure_credential(user_id):
+    """Obter credencial Azure e subscription do usuário (uma vez por requisição em lote)"""
+    return memoized(('azure_credential', user_id), lambda: _load_azure_credential(user_id))
+
+def _load_azure_credential(user_id):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute('''
@@ -130,22 +206,81 @@ def get_azure_client(user_id):
     if not creds:
         return None, None
     
+    credential = azure_identity.ClientSecretCredential(
+        tenant_id=creds[0],
+        client_id=creds[1],
+        client_secret=creds[2]
+    )
+    return credential, creds[3]
+
+def get_azure_client(user_id):
+    """Obter cliente Azure para o usuário"""
+    return memoized(('azure_clients', user_id), lambda: _create_azure_clients(user_id))
+
+def _create_azure_clients(user_id):
     try:
-        credential = ClientSecretCredential(
-            tenant_id=creds[0],
-            client_id=creds[1],
-            client_secret=creds[2]
-        )
+        credential, subscription_id = get_azure_credential(user_id)
+        if not credential:
+            return None, None
         
-        resource_client = ResourceManagementClient(credential, creds[3])
-        consumption_client = ConsumptionManagementClient(credential, creds[3])
+        resource_client = azure_mgmt_resource.ResourceManagementClient(credential, subscription_id, **azure_client_options())
+        consumption_client = azure_mgmt_consumption.ConsumptionManagementClient(credential, subscription_id, **azure_client_options())
         
         return resource_client, consumption_client
     except Exception as e:
         print(f"Erro ao criar cliente Azure: {e}")
         return None, None
 
-init_db()
+def forget_azure_caches(user_id):
+    """Descarta tudo o que foi derivado das credenciais anteriores (inventário, fan-out, respostas)"""
+    credential_cache.invalidate(user_id)
+    inventory_service.forget(user_id)
+    subscription_fanout.cache.invalidate_user(user_id)
+    payload_cache.invalidate(lambda key: key[0] == user_id)
+
+def get_users_with_credentials():
+    """IDs de usuários com credenciais Azure ativas"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('SELECT DISTINCT user_id FROM azure_credentials WHERE is_active = TRUE')
+    user_ids = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return user_ids
+
+startup.on_init('database', init_db)
+
+# Na partida (no master, antes do fork) nenhuma thread de submit_task sobreviveu ao processo anterior
+startup.on_init('interrupted_operations', operation_tracker.fail_interrupted)
+
+def operation_pipeline_client(user_id, kind):
+    """Cliente de pipeline para retomar o polling de uma LRO (resource_group.delete)"""
+    resource_client, _ = get_azure_client(user_id)
+    if not resource_client:
+        raise ValueError('Credenciais Azure não configuradas')
+    return resource_client.resource_groups._client
+
+def start_background_services():
+    """Workers de background; com vários processos apenas o líder eleito os executa"""
+    # Ingestão incremental do Activity Log em background
+    if os.environ.get('ACTIVITY_LOG_INGESTION', 'true').lower() == 'true':
+        activity_log_service.start(get_azure_credential, get_users_with_credentials)
+    
+    # Sincronização de custos diários (dispara a avaliação de alertas de budget)
+    if os.environ.get('COST_SYNC', 'true').lower() == 'true':
+        cost_store.start(get_azure_credential, get_users_with_credentials)
+    
+    # Coleta em lote de métricas do Azure Monitor (utilização de VMs, storage e SQL)
+    if os.environ.get('METRICS_COLLECTION', 'true').lower() == 'true':
+        metrics_collector.start(get_azure_credential, get_users_with_credentials)
+    webhook_queue.start()
+    
+    # Operações de processos encerrados (reinício, worker reciclado): retoma LROs pelo
+    # continuation token e encerra as chamadas síncronas; verificado periodicamente
+    operation_tracker.start_recovery(operation_pipeline_client)
+
+# No modo pré-fork (gunicorn.conf.py) as threads são iniciadas depois do fork, em um único worker
+if os.environ.get('BOLT_PREFORK', 'false').lower() != 'true':
+    startup.on_init('background_services', start_background_services)
 
 # APIs
 @app.route('/api/health')
@@ -156,6 +291,13 @@ def health():
         'version': '1.0.0'
     })
 
+@app.route('/api/startup/profile')
+def startup_profile():
+    """Tempos de importação, módulos carregados sob demanda e etapas de inicialização"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    return jsonify(startup.report())
+
 @app.route('/debug')
 def debug():
     return f'''
@@ -342,16 +484,19 @@ def get_azure_credentials():
         return jsonify({'error': 'Não autenticado'}), 401
     
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT id, tenant_id, client_id, subscription_id, is_active, created_at
-        FROM azure_credentials 
-        WHERE user_id = ? 
-        ORDER BY created_at DESC
-    ''', (session['user_id'],))
+    where, params = ['user_id = ?'], [session['user_id']]
+    try:
+        rows, next_cursor = sqlite_page(
+            conn, 'azure_credentials', 'id, tenant_id, client_id, subscription_id, is_active, created_at',
+            where, params, ['created_at', 'id'],
+            optional_limit(request.args), request.args.get('cursor')
+        )
+    except InvalidCursorError as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 400
     
     credentials = []
-    for row in cursor.fetchall():
+    for row in rows:
         credentials.append({
             'id': row[0],
             'tenant_id': row[1],
@@ -361,8 +506,11 @@ def get_azure_credentials():
             'created_at': row[5]
         })
     
+    response = {'credentials': credentials, 'next_cursor': next_cursor}
+    if wants_total(request.args.get('include_total')):
+        response['total'], response['total_exact'] = estimate_total(conn, 'azure_credentials', where, params)
     conn.close()
-    return jsonify({'credentials': credentials})
+    return jsonify(response)
 
 @app.route('/api/azure/credentials', methods=['POST'])
 def save_azure_credentials():
@@ -380,8 +528,8 @@ def save_azure_credentials():
     
     # Testar credenciais
     try:
-        credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-        resource_client = ResourceManagementClient(credential, subscription_id)
+        credential = azure_identity.ClientSecretCredential(tenant_id, client_id, client_secret)
+        resource_client = azure_mgmt_resource.ResourceManagementClient(credential, subscription_id, **azure_client_options())
         # Teste simples - listar resource groups
         list(resource_client.resource_groups.list())
         
@@ -405,6 +553,7 @@ def save_azure_credentials():
         
         conn.commit()
         conn.close()
+        forget_azure_caches(session['user_id'])
         
         return jsonify({'message': 'Credenciais Azure salvas com sucesso'})
         
@@ -474,29 +623,29 @@ def list_locks():
     if 'user_id' not in session:
         return jsonify({'error': 'Não autenticado'}), 401
     
-    resource_client, _ = get_azure_client(session['user_id'])
+    credential, subscription_id = get_azure_credential(session['user_id'])
     
-    if not resource_client:
+    if not credential:
         return jsonify({'error': 'Credenciais Azure não configuradas'}), 400
     
     try:
-        # Listar locks de todos os resource groups
+        from azure.mgmt.resource import ManagementLockClient
+        
+        # Uma listagem paginada na subscription em vez de uma chamada por resource group
+        lock_client = ManagementLockClient(credential, subscription_id, **azure_client_options())
         locks = []
-        for rg in resource_client.resource_groups.list():
-            try:
-                rg_locks = list(resource_client.management_locks.list_by_resource_group(rg.name))
-                for lock in rg_locks:
-                    locks.append({
-                        'name': lock.name,
-                        'level': lock.level,
-                        'resource_group': rg.name,
-                        'id': lock.id,
-                        'notes': lock.notes or ''
-                    })
-            except:
-                continue
+        for lock in lock_client.management_locks.list_at_subscription_level():
+            locks.append({
+                'name': lock.name,
+                'level': lock.level,
+                'resource_group': parse_arm_id(lock.id).resource_group,
+                'id': lock.id,
+                'notes': lock.notes or ''
+            })
         
         return jsonify({'locks': locks})
+    except ArmThrottledError as e:
+        return jsonify({'error': str(e)}), 429
     except Exception as e:
         return jsonify({'error': f'Erro ao listar locks: {str(e)}'}), 500
 
@@ -548,16 +697,63 @@ def budget_alerts():
     if 'user_id' not in session:
         return jsonify({'error': 'Não autenticado'}), 401
     
-    # Mock data
-    return jsonify({'alerts': []})
+    limit = parse_limit(request.args.get('limit'), default=50, maximum=500)
+    return jsonify({
+        'alerts': budget_alert_service.list_alerts(session['user_id'], limit),
+        'period_total': cost_store.get_period_total(session['user_id'])
+    })
+
+@app.route('/api/azure-budget/sync', methods=['POST'])
+def budget_sync():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    try:
+        result = cost_store.sync_user(session['user_id'])
+    except ArmThrottledError as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'error': f'Erro ao sincronizar custos: {str(e)}'}), 500
+    
+    if not result.get('success'):
+        return jsonify(result), 400
+    return jsonify(result)
 
 @app.route('/api/azure-budget/recommendations')
 def budget_recommendations():
     if 'user_id' not in session:
         return jsonify({'error': 'Não autenticado'}), 401
     
-    # Mock data
-    return jsonify({'recommendations': []})
+    try:
+        # Redimensionamento calculado pelo motor de rightsizing sobre as métricas coletadas
+        recommendations = []
+        rightsizing = rightsizing_engine.vm_rightsizing_recommendation(session['user_id'])
+        if rightsizing:
+            recommendations.append({
+                'id': 'rec_vm_rightsizing',
+                'type': 'vm_rightsizing',
+                'priority': 'high' if rightsizing['potential_savings'] >= 100 else 'medium',
+                'potential_savings': rightsizing['potential_savings'],
+                'title': rightsizing['title'],
+                'description': rightsizing['description'],
+                'action': 'Reduzir as VMs para o tamanho recomendado da mesma família',
+                'resources': rightsizing['resources'],
+                'candidates': rightsizing['candidates'],
+                'effort': 'low'
+            })
+        
+        return jsonify({
+            'recommendations': recommendations,
+            'total_potential_savings': sum(rec['potential_savings'] for rec in recommendations),
+            'currency': 'USD',
+            'summary': {
+                'high_priority': len([rec for rec in recommendations if rec['priority'] == 'high']),
+                'medium_priority': len([rec for rec in recommendations if rec['priority'] == 'medium']),
+                'low_priority': len([rec for rec in recommendations if rec['priority'] == 'low'])
+            }
+        })
+    except Exception as e:
+        return jsonify({'error': f'Erro ao obter recomendações: {str(e)}'}), 500
 
 @app.route('/api/dashboard/overview')
 def dashboard():
@@ -577,16 +773,16 @@ def dashboard():
         })
     
     try:
-        # Dados reais do Azure
-        resource_groups = list(resource_client.resource_groups.list())
-        resources = list(resource_client.resources.list())
+        # Dados reais do Azure servidos do snapshot de inventário (listagem no ARM só quando vencido)
+        snapshot = inventory_service.get_snapshot(session['user_id'], resource_client)
         
         return jsonify({
-            'total_resources': len(resources),
+            'total_resources': len(snapshot.resources),
             'total_cost': 0.0,  # Implementar com Consumption API
             'active_alerts': 0,
-            'resource_groups': len(resource_groups),
+            'resource_groups': len(snapshot.resource_groups),
             'azure_connected': True,
+            'inventory_version': snapshot.version,
             'message': 'Dados carregados do Azure'
         })
     except Exception as e:
@@ -613,27 +809,404 @@ def get_azure_resources():
         })
     
     try:
-        resources = []
-        for resource in resource_client.resources.list():
-            resources.append({
-                'id': resource.id,
-                'name': resource.name,
-                'type': resource.type,
-                'location': resource.location,
-                'resource_group': resource.id.split('/')[4],
-                'tags': resource.tags or {}
-            })
+        snapshot = inventory_service.get_snapshot(session['user_id'], resource_client)
+        limit = optional_limit(request.args)
+        cursor = request.args.get('cursor')
+        # Filtros por tag/tipo/região/RG avaliados no índice invertido do snapshot
+        node, filter_key = filter_from_args(request.args)
+        
+        def build_page():
+            matched = snapshot.select(node)
+            ids, next_cursor = sequence_page(matched, limit, cursor)
+            return {
+                'resources': [snapshot.resources[resource_id] for resource_id in ids],
+                'count': len(matched),
+                'next_cursor': next_cursor,
+                'inventory_version': snapshot.version
+            }
         
+        # Página serializada uma vez por versão do inventário
+        payload = payload_cache.get_or_encode(
+            (session['user_id'], 'resources', snapshot.subscription_id, snapshot.version, limit, cursor, filter_key),
+            build_page
+        )
+        return payload_response(payload)
+    except (InvalidCursorError, InvalidFilterError) as e:
+        return jsonify({'resources': [], 'message': str(e)}), 400
+    except ArmThrottledError as e:
         return jsonify({
-            'resources': resources,
-            'count': len(resources)
-        })
+            'resources': [],
+            'message': str(e)
+        }), 429
     except Exception as e:
         return jsonify({
             'resources': [],
             'message': f'Erro ao buscar recursos: {str(e)}'
         })
 
+@app.route('/api/azure/resources/tag-compliance')
+def tag_compliance():
+    """Recursos sem as tags obrigatórias (?required=Environment,Owner), por tag e no total"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+
+    resource_client, _ = get_azure_client(session['user_id'])
+
+    if not resource_client:
+        return jsonify({'error': 'Credenciais Azure não configuradas'}), 400
+
+    required = [tag.strip() for tag in request.args.get('required', 'Environment,Owner,Project').split(',') if tag.strip()]
+
+    try:
+        snapshot = inventory_service.get_snapshot(session['user_id'], resource_client)
+        # Os demais filtros (type, location, resource_group, filter...) restringem o escopo avaliado
+        node, _ = filter_from_args(request.args)
+        index = snapshot.index()
+        scope = index.evaluate(node) if node is not None else index.all_bits
+
+        by_tag = {}
+        compliant = scope
+        for tag in required:
+            tagged = index.evaluate(('tag', tag.lower(), None))
+            by_tag[tag] = {'missing': (scope & ~tagged).bit_count()}
+            compliant &= tagged
+
+        total = scope.bit_count()
+        return jsonify({
+            'required_tags': required,
+            'total_resources': total,
+            'compliant': compliant.bit_count(),
+            'non_compliant': total - compliant.bit_count(),
+            'by_tag': by_tag,
+            'inventory_version': snapshot.version
+        })
+    except InvalidFilterError as e:
+        return jsonify({'error': str(e)}), 400
+    except ArmThrottledError as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'error': f'Erro ao avaliar tags: {str(e)}'}), 500
+
+@app.route('/api/azure/utilization')
+def get_azure_utilization():
+    """Utilização de VMs, storage accounts e bancos SQL lida das métricas coletadas localmente"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+
+    try:
+        days = min(max(int(request.args.get('days', 30)), 1), 90)
+    except ValueError:
+        return jsonify({'error': 'days deve ser um número inteiro'}), 400
+
+    try:
+        return jsonify(metrics_collector.utilization(session['user_id'], days))
+    except Exception as e:
+        return jsonify({'error': f'Erro ao ler utilização: {str(e)}'}), 500
+
+@app.route('/api/azure/rightsizing')
+def get_rightsizing_recommendations():
+    """Candidatos de redução/aumento de VMs (P95 de CPU e memória em 30 dias) com economia estimada"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+
+    action = request.args.get('action')
+    if action not in (None, 'downsize', 'upsize', 'upsize_blocked'):
+        return jsonify({'error': 'action deve ser downsize, upsize ou upsize_blocked'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': 'limit deve ser um número inteiro'}), 400
+
+    try:
+        return jsonify(rightsizing_engine.recommendations(session['user_id'], limit, action))
+    except Exception as e:
+        return jsonify({'error': f'Erro ao calcular recomendações: {str(e)}'}), 500
+
+@app.route('/api/azure/utilization/collect', methods=['POST'])
+def collect_azure_utilization():
+    """Dispara a coleta de métricas do usuário sem esperar o próximo ciclo"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+
+    credential, subscription_id = get_azure_credential(session['user_id'])
+    if not credential:
+        return jsonify({'error': 'Credenciais Azure não configuradas'}), 400
+
+    try:
+        return jsonify(metrics_collector.collect(session['user_id'], credential, subscription_id))
+    except ArmThrottledError as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'error': f'Erro ao coletar métricas: {str(e)}'}), 500
+
+# Activity Log (ingestão incremental em background; consulta paginada por cursor)
+@app.route('/api/monitoring/activity')
+def list_activity():
+    """Atividades mais recentes primeiro, com paginação por cursor e filtros"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        page = activity_log_service.query(
+            session['user_id'],
+            limit=parse_limit(request.args.get('limit')),
+            cursor=request.args.get('cursor'),
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None,
+            resource_id=request.args.get('resource_id'),
+            operation=request.args.get('operation'),
+            status=request.args.get('status'),
+            source=request.args.get('source')
+        )
+        return jsonify(page)
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro ao consultar atividades: {str(e)}'}), 500
+
+@app.route('/api/monitoring/activity/sync', methods=['POST'])
+def sync_activity():
+    """Dispara a ingestão incremental do Activity Log do usuário sem esperar o próximo ciclo"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    credential, subscription_id = get_azure_credential(session['user_id'])
+    if not credential:
+        return jsonify({'error': 'Credenciais Azure não configuradas'}), 400
+    
+    try:
+        result = activity_log_service.ingest(session['user_id'], credential, subscription_id)
+        return jsonify(result), 200 if result.get('success') else 400
+    except ArmThrottledError as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'error': f'Erro ao sincronizar o Activity Log: {str(e)}'}), 500
+
+@app.route('/api/azure/resources/search')
+def search_azure_resources():
+    """Typeahead: recursos cujo nome, resource group ou valor de tag contém ?q= (ranqueados)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+
+    resource_client, _ = get_azure_client(session['user_id'])
+
+    if not resource_client:
+        return jsonify({'results': [], 'message': 'Configure suas credenciais Azure'})
+
+    query = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'results': [], 'message': 'limit deve ser um número inteiro'}), 400
+
+    if not query:
+        return jsonify({'query': query, 'results': []})
+
+    try:
+        snapshot = inventory_service.get_snapshot(session['user_id'], resource_client)
+        results = []
+        for resource_id, score, field, term in snapshot.search_index().search(query, limit):
+            resource = snapshot.resources.get(resource_id)
+            if resource is None:
+                continue
+            results.append({
+                'id': resource['id'],
+                'name': resource['name'],
+                'type': resource['type'],
+                'resource_group': resource['resource_group'],
+                'location': resource['location'],
+                'matched_field': field,
+                'matched_value': term,
+                'score': score
+            })
+        return jsonify({'query': query, 'results': results, 'inventory_version': snapshot.version})
+    except ArmThrottledError as e:
+        return jsonify({'results': [], 'message': str(e)}), 429
+    except Exception as e:
+        return jsonify({'results': [], 'message': f'Erro ao buscar recursos: {str(e)}'}), 500
+
+# APIs multi-subscription (visões do tenant)
+@app.route('/api/azure/subscriptions', methods=['GET'])
+def list_azure_subscriptions():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    credential, _ = get_azure_credential(session['user_id'])
+    if not credential:
+        return jsonify({'subscriptions': [], 'message': 'Configure suas credenciais Azure'})
+    
+    try:
+        force = request.args.get('refresh') == 'true'
+        return jsonify({'subscriptions': subscription_fanout.discover(session['user_id'], credential, force)})
+    except ArmThrottledError as e:
+        return jsonify({'subscriptions': [], 'message': str(e)}), 429
+    except Exception as e:
+        return jsonify({'subscriptions': [], 'message': f'Erro ao listar subscriptions: {str(e)}'}), 500
+
+@app.route('/api/azure/subscriptions/selection', methods=['PUT'])
+def select_azure_subscriptions():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    data = request.get_json() or {}
+    subscription_ids = data.get('subscription_ids')
+    if not isinstance(subscription_ids, list):
+        return jsonify({'error': 'subscription_ids deve ser uma lista'}), 400
+    
+    subscriptions = subscription_fanout.set_selection(session['user_id'], subscription_ids)
+    subscription_fanout.cache.invalidate_user(session['user_id'])
+    return jsonify({'subscriptions': subscriptions})
+
+@app.route('/api/azure/tenant/<view>')
+def tenant_view(view):
+    """Inventário, locks ou custos agregados de todas as subscriptions selecionadas"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    views = {
+        'inventory': subscription_fanout.tenant_inventory,
+        'locks': subscription_fanout.tenant_locks,
+        'costs': subscription_fanout.tenant_costs
+    }
+    if view not in views:
+        return jsonify({'error': 'Visão não encontrada'}), 404
+    
+    credential, _ = get_azure_credential(session['user_id'])
+    if not credential:
+        return jsonify({'error': 'Configure suas credenciais Azure'}), 400
+    
+    try:
+        result = views[view](session['user_id'], credential, refresh=request.args.get('refresh') == 'true')
+        # Todas as subscriptions falharam: não há visão parcial a mostrar
+        if result['subscription_count'] and not result['succeeded']:
+            return jsonify(result), 502
+        return jsonify(result)
+    except ArmThrottledError as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'error': f'Erro ao consultar subscriptions: {str(e)}'}), 500
+
+# Requisições em lote
+BATCH_MAX_REQUESTS = 20
+BATCH_TIMEOUT_SECONDS = 30
+BATCH_EXCLUDED_PATHS = ('/api/batch', '/api/stream')
+batch_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='api-batch')
+
+def _run_batch_item(item, session_data):
+    """Executa uma sub-requisição GET no processo, com a sessão já carregada do lote"""
+    path, _, query_string = item['path'].partition('?')
+    with app.test_request_context(path, method='GET', query_string=query_string) as ctx:
+        ctx.session = app.session_interface.session_class(session_data)
+        response = app.full_dispatch_request()
+        body = response.get_json(silent=True)
+        return {
+            'id': item.get('id', item['path']),
+            'status': response.status_code,
+            'body': body if body is not None else response.get_data(as_text=True)
+        }
+
+@app.route('/api/batch', methods=['POST'])
+def batch_requests():
+    """
+    Resolve várias chamadas GET do dashboard em uma única ida e volta
+    As sub-requisições rodam em paralelo e compartilham credencial, clientes Azure e
+    snapshot de inventário; o tempo total fica próximo da mais lenta
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    data = request.get_json() or {}
+    items = data.get('requests')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Informe a lista requests'}), 400
+    if len(items) > BATCH_MAX_REQUESTS:
+        return jsonify({'error': f'Máximo de {BATCH_MAX_REQUESTS} requisições por lote'}), 400
+    for item in items:
+        path = item.get('path') if isinstance(item, dict) else None
+        if not path or not path.startswith('/api/') or path.split('?')[0] in BATCH_EXCLUDED_PATHS:
+            return jsonify({'error': f'Caminho inválido no lote: {path}'}), 400
+        if item.get('method', 'GET').upper() != 'GET':
+            return jsonify({'error': 'Apenas requisições GET são permitidas no lote'}), 400
+    
+    session_data = dict(session)
+    with request_memo():
+        # Cada sub-requisição recebe uma cópia do contexto com o memo ativo
+        futures = [
+            batch_executor.submit(contextvars.copy_context().run, _run_batch_item, item, session_data)
+            for item in items
+        ]
+        wait(futures, timeout=BATCH_TIMEOUT_SECONDS)
+    
+    responses = []
+    for item, future in zip(items, futures):
+        if not future.done():
+            responses.append({'id': item.get('id', item['path']), 'status': 504, 'body': {'error': 'Tempo limite excedido'}})
+            continue
+        try:
+            responses.append(future.result())
+        except Exception as e:
+            responses.append({'id': item.get('id', item['path']), 'status': 500, 'body': {'error': str(e)}})
+    
+    return jsonify({'responses': responses})
+
+@app.route('/api/stream')
+def dashboard_stream():
+    """
+    Canal Server-Sent Events do dashboard
+    Envia um snapshot inicial e depois apenas deltas de inventário, custos, alertas,
+    agendamentos e operações; substitui o polling dos endpoints do dashboard
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    user_id = session['user_id']
+    topics = [t for t in request.args.get('topics', '').split(',') if t] or None
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    
+    inventory_service.watch(lambda uid: get_azure_client(uid)[0])
+    try:
+        subscription = event_bus.subscribe(user_id, topics=topics, last_event_id=last_event_id)
+    except StreamLimitReached as e:
+        # Worker sem threads livres para mais streams: o cliente segue com polling e tenta depois
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = str(RECONNECT_MILLISECONDS // 1000)
+        return response, 503
+    
+    try:
+        snapshot = None
+        if not last_event_id:
+            inventory = inventory_service.peek(user_id)
+            snapshot = {
+                'inventory': inventory.summary() if inventory else None,
+                'topics': topics
+            }
+        
+        response = Response(
+            stream_with_context(sse_stream(subscription, snapshot)),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # desabilita buffering em proxies nginx
+            }
+        )
+    except Exception:
+        subscription.close()  # libera a vaga no limite de conexões do worker
+        raise
+    # O finally do gerador não roda se o corpo nunca for iterado (cliente desconectou
+    # antes do primeiro chunk): fecha a inscrição também no encerramento da resposta
+    response.call_on_close(subscription.close)
+    return response
+
+@app.route('/api/azure/throttling')
+def get_arm_throttling_status():
+    """Estado do governador ARM por subscription (cota restante, concorrência, descartes)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    return jsonify({'subscriptions': arm_governor.status()})
+
 # APIs de Ações Azure - Implementação completa
 @app.route('/api/azure-actions/create-resource-group', methods=['POST'])
 def create_resource_group():
@@ -650,7 +1223,7 @@ def create_resource_group():
         return jsonify({'error': 'Configure suas credenciais Azure'}), 400
     
     try:
-        # Criar Resource Group no Azure
+        # Criar Resource Group no Azure em background
         rg_params = {
             'location': data['location'],
             'tags': {
@@ -660,21 +1233,28 @@ def create_resource_group():
             }
         }
         
-        result = resource_client.resource_groups.create_or_update(
-            data['name'], 
-            rg_params
-        )
+        user_id = session['user_id']
         
-        return jsonify({
-            'success': True,
-            'message': f'Resource Group {data["name"]} criado com sucesso',
-            'resource_group': {
+        def create():
+            result = resource_client.resource_groups.create_or_update(data['name'], rg_params)
+            inventory_service.invalidate(user_id)
+            return {
                 'name': result.name,
                 'location': result.location,
                 'id': result.id,
                 'tags': result.tags
             }
-        })
+        
+        operation_id = operation_tracker.submit_task(
+            session['user_id'], 'resource_group.create', data['name'], create
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': f'Resource Group {data["name"]} está sendo criado',
+            'operation_id': operation_id,
+            'status_url': f'/api/operations/{operation_id}'
+        }), 202
     except Exception as e:
         return jsonify({
             'success': False,
@@ -696,20 +1276,38 @@ def delete_resource_group():
         return jsonify({'error': 'Configure suas credenciais Azure'}), 400
     
     try:
-        # Deletar Resource Group no Azure
-        operation = resource_client.resource_groups.begin_delete(data['name'])
+        # Deletar Resource Group no Azure (LRO acompanhada em background)
+        operation_id = operation_tracker.start_lro(
+            session['user_id'], 'resource_group.delete', data['name'],
+            lambda **kwargs: resource_client.resource_groups.begin_delete(data['name'], **kwargs),
+            resource_client.resource_groups._client
+        )
+        inventory_service.invalidate(session['user_id'])
         
         return jsonify({
             'success': True,
             'message': f'Resource Group {data["name"]} está sendo deletado',
-            'operation_id': operation.polling_method()._operation.location if hasattr(operation, 'polling_method') else 'unknown'
-        })
+            'operation_id': operation_id,
+            'status_url': f'/api/operations/{operation_id}'
+        }), 202
     except Exception as e:
         return jsonify({
             'success': False,
             'error': f'Erro ao deletar Resource Group: {str(e)}'
         }), 500
 
+@app.route('/api/operations/<operation_id>')
+def get_operation_status(operation_id):
+    """Consultar o status de uma operação de longa duração"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    operation = operation_tracker.get_operation(operation_id, session['user_id'])
+    if not operation:
+        return jsonify({'error': 'Operação não encontrada'}), 404
+    
+    return jsonify(operation)
+
 @app.route('/api/azure-actions/create-lock', methods=['POST'])
 def create_lock():
     if 'user_id' not in session:
@@ -741,7 +1339,7 @@ def create_lock():
         
         from azure.identity import ClientSecretCredential
         credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-        lock_client = ManagementLockClient(credential, subscription_id)
+        lock_client = ManagementLockClient(credential, subscription_id, **azure_client_options())
         
         # Determinar escopo do lock
         if data.get('scope') == 'subscription':
@@ -804,7 +1402,7 @@ def remove_lock():
         
         from azure.identity import ClientSecretCredential
         credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-        lock_client = ManagementLockClient(credential, subscription_id)
+        lock_client = ManagementLockClient(credential, subscription_id, **azure_client_options())
         
         # Determinar escopo do lock
         scope = data.get('scope', f'/subscriptions/{subscription_id}')
@@ -822,6 +1420,39 @@ def remove_lock():
             'error': f'Erro ao remover lock: {str(e)}'
         }), 500
 
+@app.route('/api/azure-actions/bulk-locks', methods=['POST'])
+def bulk_locks():
+    """Cria, remove ou converte locks em vários Resource Groups/recursos de uma vez (NDJSON ou JSON)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Não autenticado'}), 401
+    
+    data = request.get_json() or {}
+    operation = data.get('operation', 'create')
+    targets = data.get('targets') or []
+    if not isinstance(targets, list):
+        return jsonify({'error': 'targets deve ser uma lista'}), 400
+    
+    def results():
+        validate_bulk_lock_request(operation, targets)
+        credential, subscription_id = get_azure_credential(session['user_id'])
+        if not credential:
+            raise ValueError('Credenciais Azure não configuradas')
+        
+        from azure.mgmt.resource import ManagementLockClient
+        lock_client = ManagementLockClient(credential, subscription_id, **azure_client_options())
+        yield from run_bulk_lock_operation(
+            lock_client, subscription_id, operation, targets,
+            data.get('lock_name', 'Prevent-Spending-BudgetControl'), data.get('level', 'CanNotDelete'),
+            data.get('notes'), data.get('max_concurrency', BULK_DEFAULT_CONCURRENCY)
+        )
+    
+    try:
+        return bulk_lock_response(results(), operation, data.get('stream', True))
+    except ArmThrottledError as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'error': f'Erro na operação de locks em lote: {str(e)}'}), 500
+
 # APIs de Budget - Implementação completa
 @app.route('/api/azure-budget/configure', methods=['POST'])
 def configure_budget():
@@ -849,7 +1480,7 @@ def configure_budget():
         
         from azure.identity import ClientSecretCredential
         credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-        consumption_client = ConsumptionManagementClient(credential, subscription_id)
+        consumption_client = ConsumptionManagementClient(credential, subscription_id, **azure_client_options())
         
         # Configurar budget no Azure
         budget_name = data.get('name', 'bolt-dashboard-budget')
@@ -920,7 +1551,7 @@ def get_current_costs():
         
         from azure.identity import ClientSecretCredential
         credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-        consumption_client = ConsumptionManagementClient(credential, subscription_id)
+        consumption_client = ConsumptionManagementClient(credential, subscription_id, **azure_client_options())
         
         # Buscar custos atuais do Azure
         from datetime import datetime, timedelta
@@ -1016,6 +1647,7 @@ def remove_azure_credentials():
         cursor.execute('UPDATE azure_credentials SET is_active = 0 WHERE user_id = ?', (session['user_id'],))
         conn.commit()
         conn.close()
+        forget_azure_caches(session['user_id'])
         
         return jsonify({
             'success': True,
@@ -1052,15 +1684,18 @@ def get_budget_configs():
         return jsonify({'error': 'Não autenticado'}), 401
     
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM budget_configs 
-        WHERE user_id = ? 
-        ORDER BY created_at DESC
-    ''', (session['user_id'],))
+    where, params = ['user_id = ?'], [session['user_id']]
+    try:
+        rows, next_cursor = sqlite_page(
+            conn, 'budget_configs', '*', where, params, ['created_at', 'id'],
+            optional_limit(request.args), request.args.get('cursor')
+        )
+    except InvalidCursorError as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 400
     
     configs = []
-    for row in cursor.fetchall():
+    for row in rows:
         configs.append({
             'id': row[0],
             'budget_name': row[2],
@@ -1075,8 +1710,11 @@ def get_budget_configs():
             'created_at': row[11]
         })
     
+    response = {'configs': configs, 'next_cursor': next_cursor}
+    if wants_total(request.args.get('include_total')):
+        response['total'], response['total_exact'] = estimate_total(conn, 'budget_configs', where, params)
     conn.close()
-    return jsonify({'configs': configs})
+    return jsonify(response)
 
 @app.route('/api/budget/configs', methods=['POST'])
 def save_budget_config():
@@ -1107,6 +1745,9 @@ def save_budget_config():
     conn.commit()
     conn.close()
     
+    # Budget novo pode já estar acima de algum limite no período corrente
+    budget_alert_service.evaluate_user(session['user_id'])
+    
     return jsonify({'message': 'Configuração de budget salva com sucesso'})
 
 # APIs Schedules
@@ -1116,15 +1757,18 @@ def get_schedules():
         return jsonify({'error': 'Não autenticado'}), 401
     
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM schedules 
-        WHERE user_id = ? 
-        ORDER BY created_at DESC
-    ''', (session['user_id'],))
+    where, params = ['user_id = ?'], [session['user_id']]
+    try:
+        rows, next_cursor = sqlite_page(
+            conn, 'schedules', '*', where, params, ['created_at', 'id'],
+            optional_limit(request.args), request.args.get('cursor')
+        )
+    except InvalidCursorError as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 400
     
     schedules = []
-    for row in cursor.fetchall():
+    for row in rows:
         schedules.append({
             'id': row[0],
             'schedule_name': row[2],
@@ -1136,8 +1780,11 @@ def get_schedules():
             'created_at': row[8]
         })
     
+    response = {'schedules': schedules, 'next_cursor': next_cursor}
+    if wants_total(request.args.get('include_total')):
+        response['total'], response['total_exact'] = estimate_total(conn, 'schedules', where, params)
     conn.close()
-    return jsonify({'schedules': schedules})
+    return jsonify(response)
 
 @app.route('/api/schedules', methods=['POST'])
 def save_schedule():
@@ -1174,16 +1821,16 @@ def list_schedules():
     
     try:
         conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, schedule_name, schedule_type, cron_expression, action_type, action_config, created_at
-            FROM schedules 
-            WHERE user_id = ?
-            ORDER BY created_at DESC
-        ''', (session['user_id'],))
+        where, params = ['user_id = ?'], [session['user_id']]
+        rows, next_cursor = sqlite_page(
+            conn, 'schedules',
+            'id, schedule_name, schedule_type, cron_expression, action_type, action_config, created_at',
+            where, params, ['created_at', 'id'],
+            optional_limit(request.args), request.args.get('cursor')
+        )
         
         schedules = []
-        for row in cursor.fetchall():
+        for row in rows:
             schedules.append({
                 'id': row[0],
                 'schedule_name': row[1],
@@ -1194,8 +1841,13 @@ def list_schedules():
                 'created_at': row[6]
             })
         
+        response = {'schedules': schedules, 'next_cursor': next_cursor}
+        if wants_total(request.args.get('include_total')):
+            response['total'], response['total_exact'] = estimate_total(conn, 'schedules', where, params)
         conn.close()
-        return jsonify({'schedules': schedules})
+        return jsonify(response)
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao listar agendamentos: {str(e)}'}), 500
 
@@ -1247,21 +1899,31 @@ def export_resources():
         return jsonify({'error': 'Credenciais Azure não configuradas'}), 400
     
     try:
-        resources = []
-        for resource in resource_client.resources.list():
-            resources.append({
-                'name': resource.name,
-                'type': resource.type,
-                'location': resource.location,
-                'resource_group': resource.id.split('/')[4],
-                'tags': resource.tags or {}
-            })
+        # Exporta o snapshot de inventário; os bytes são reaproveitados enquanto a versão não mudar
+        snapshot = inventory_service.get_snapshot(session['user_id'], resource_client)
+        node, filter_key = filter_from_args(request.args)
+        
+        def build_export():
+            if node is None:
+                resources = snapshot.resources.values()
+            else:
+                resources = [snapshot.resources[resource_id] for resource_id in snapshot.select(node)]
+            return {
+                'data': [
+                    {key: value for key, value in resource.items() if key != 'id'}
+                    for resource in resources
+                ],
+                'format': 'json',
+                'exported_at': datetime.fromtimestamp(snapshot.taken_at).isoformat(),
+                'inventory_version': snapshot.version
+            }
         
-        return jsonify({
-            'data': resources,
-            'format': 'json',
-            'exported_at': datetime.now().isoformat()
-        })
+        payload = payload_cache.get_or_encode(
+            (session['user_id'], 'export', snapshot.subscription_id, snapshot.version, filter_key), build_export
+        )
+        return payload_response(payload)
+    except InvalidFilterError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Erro ao exportar: {str(e)}'}), 400
 
@@ -1282,50 +1944,17 @@ def index():
     return send_from_directory(static_dir, 'index.html')
 
 if __name__ == '__main__':
+    # Com debug=True o reloader do werkzeug reexecuta este script: só o processo filho
+    # (WERKZEUG_RUN_MAIN) serve requisições, então só ele inicializa banco e threads
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        startup.run()
     app.run(host='0.0.0.0', port=5001, debug=True)
 
 
 # API para deletar Resource Group
 @app.route('/api/azure-test/delete-resource-group', methods=['DELETE'])
-def delete_resource_group():
-    if 'user_id' not in session:
-        return jsonify({'error': 'Não autenticado'}), 401
-    
-    data = request.get_json()
-    if not data or 'name' not in data:
-        return jsonify({'error': 'Nome do Resource Group é obrigatório'}), 400
-    
-    try:
-        from azure.mgmt.resource import ResourceManagementClient
-        
-        # Obter credenciais Azure
-        conn = sqlite3.connect('bolt_dashboard.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT tenant_id, client_id, client_secret, subscription_id FROM azure_credentials WHERE user_id = ? AND is_active = 1', (session['user_id'],))
-        creds = cursor.fetchone()
-        conn.close()
-        
-        if not creds:
-            return jsonify({'error': 'Credenciais Azure não encontradas'}), 400
-        
-        tenant_id, client_id, client_secret, subscription_id = creds
-        
-        from azure.identity import ClientSecretCredential
-        credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-        resource_client = ResourceManagementClient(credential, subscription_id)
-        
-        # Deletar Resource Group do Azure
-        delete_operation = resource_client.resource_groups.begin_delete(data['name'])
-        
-        return jsonify({
-            'success': True,
-            'message': f'Resource Group {data["name"]} está sendo deletado',
-            'operation_id': str(delete_operation)
-        })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': f'Erro ao deletar Resource Group: {str(e)}'
-        }), 500
-
+def delete_resource_group_test():
+    """API de teste para deletar resource group (alias para /api/azure-actions/delete-resource-group)"""
+    return delete_resource_group()
 
+startup.record_module('src.main')
@@ -6,10 +6,28 @@ from datetime import datetime
 from cryptography.fernet import Fernet
 import os
 import base64
+import hashlib
+import threading
 from flask_sqlalchemy import SQLAlchemy
 
 # Importar db do módulo user
 from src.models.user import db
+from src.utils.credential_cache import credential_cache
+
+# Instância única de Fernet (derivação da chave feita uma vez por processo)
+_fernet = None
+_fernet_lock = threading.Lock()
+
+
+def _get_fernet():
+    global _fernet
+    if _fernet is None:
+        with _fernet_lock:
+            if _fernet is None:
+                fixed_string = "BOLT_Dashboard_Encryption_Key_2024"
+                key_bytes = hashlib.sha256(fixed_string.encode()).digest()
+                _fernet = Fernet(base64.urlsafe_b64encode(key_bytes))
+    return _fernet
 
 class AzureCredentials(db.Model):
     __tablename__ = 'azure_credentials'
@@ -37,25 +55,13 @@ class AzureCredentials(db.Model):
         self.subscription_id = subscription_id
         self.subscription_name = subscription_name
     
-    def _get_encryption_key(self):
-        """Obtém chave de criptografia fixa para debug"""
-        # Gerar chave válida de 32 bytes para Fernet
-        import hashlib
-        fixed_string = "BOLT_Dashboard_Encryption_Key_2024"
-        key_bytes = hashlib.sha256(fixed_string.encode()).digest()
-        return base64.urlsafe_b64encode(key_bytes)
-    
     def _encrypt_secret(self, secret):
         """Criptografa o client secret"""
-        key = self._get_encryption_key()
-        f = Fernet(key)
-        return f.encrypt(secret.encode()).decode()
+        return _get_fernet().encrypt(secret.encode()).decode()
     
     def get_client_secret(self):
         """Descriptografa e retorna o client secret"""
-        key = self._get_encryption_key()
-        f = Fernet(key)
-        return f.decrypt(self.client_secret_encrypted.encode()).decode()
+        return _get_fernet().decrypt(self.client_secret_encrypted.encode()).decode()
     
     def update_credentials(self, tenant_id=None, client_id=None, client_secret=None, 
                           subscription_id=None, subscription_name=None):
@@ -72,6 +78,7 @@ class AzureCredentials(db.Model):
             self.subscription_name = subscription_name
         
         self.updated_at = datetime.utcnow()
+        credential_cache.invalidate(self.user_id)
     
     def mark_as_validated(self):
         """Marca credenciais como validadas"""
@@ -81,6 +88,7 @@ class AzureCredentials(db.Model):
     def deactivate(self):
         """Desativa credenciais"""
         self.is_active = False
+        credential_cache.invalidate(self.user_id)
     
     def to_dict(self, include_secret=False):
         """Converte para dicionário"""
@@ -107,9 +115,15 @@ class AzureCredentials(db.Model):
         """Obtém credenciais por ID do usuário"""
         return cls.query.filter_by(user_id=user_id, is_active=True).first()
     
+    @classmethod
+    def get_version(cls, user_id):
+        """Obtém apenas o updated_at das credenciais ativas (revalidação do cache)"""
+        return db.session.query(cls.updated_at).filter_by(user_id=user_id, is_active=True).scalar()
+    
     @classmethod
     def delete_by_user_id(cls, user_id):
         """Remove credenciais de um usuário"""
+        credential_cache.invalidate(user_id)
         credentials = cls.query.filter_by(user_id=user_id).first()
         if credentials:
             db.session.delete(credentials)
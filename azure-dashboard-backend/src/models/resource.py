@@ -0,0 +1,63 @@
+"""
+Modelo compacto de recurso do inventário
+Registro com __slots__ no lugar do dict por recurso: tipo, região e resource group
+são strings internadas (compartilhadas entre recursos) e o resource group vem do
+parser memoizado de ids ARM. Implementa Mapping somente leitura com as mesmas
+chaves do dict anterior, então serialização, diffs e views binárias continuam
+comparáveis
+"""
+
+import sys
+from collections.abc import Mapping
+
+from src.utils.arm_ids import parse_arm_id
+
+RESOURCE_FIELDS = ('id', 'name', 'type', 'location', 'resource_group', 'tags')
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+class Resource(Mapping):
+    """Recurso do inventário (id, name, type, location, resource_group, tags)"""
+
+    __slots__ = RESOURCE_FIELDS
+
+    def __init__(self, id, name, type, location, resource_group, tags):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.location = location
+        self.resource_group = resource_group
+        self.tags = tags
+
+    @classmethod
+    def from_azure(cls, resource):
+        """Cria a partir de um GenericResource do SDK"""
+        return cls(
+            resource.id,
+            resource.name,
+            _intern(resource.type),
+            _intern(resource.location),
+            parse_arm_id(resource.id).resource_group,
+            resource.tags or {}
+        )
+
+    @property
+    def arm_id(self):
+        return parse_arm_id(self.id)
+
+    def __getitem__(self, key):
+        if key in RESOURCE_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(RESOURCE_FIELDS)
+
+    def __len__(self):
+        return len(RESOURCE_FIELDS)
+
+    def __repr__(self):
+        return f'Resource({self.id!r})'
@@ -5,6 +5,7 @@ Endpoints que executam operações reais na subscription Azure
 
 from flask import Blueprint, request, jsonify, session
 from src.services.azure_actions_service import azure_actions_service
+from src.services.bulk_locks import BULK_DEFAULT_CONCURRENCY, bulk_lock_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -244,6 +245,36 @@ def bulk_shutdown_vms():
         logger.error(f"Erro no shutdown em massa: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@azure_actions_bp.route('/bulk-locks', methods=['POST'])
+def bulk_locks():
+    """Cria, remove ou converte locks em vários Resource Groups/recursos de uma vez"""
+    try:
+        if 'user_id' not in session:
+            return jsonify({'error': 'Usuário não autenticado'}), 401
+        
+        user_id = session['user_id']
+        data = request.get_json() or {}
+        
+        operation = data.get('operation', 'create')
+        targets = data.get('targets') or []
+        lock_name = data.get('lock_name', 'Prevent-Spending-BudgetControl')
+        level = data.get('level', 'CanNotDelete')
+        notes = data.get('notes')
+        max_concurrency = data.get('max_concurrency', BULK_DEFAULT_CONCURRENCY)
+        stream = data.get('stream', True)
+        
+        if not isinstance(targets, list):
+            return jsonify({'error': 'targets deve ser uma lista'}), 400
+        
+        results = azure_actions_service.bulk_lock_operation(
+            user_id, operation, targets, lock_name, level, notes, max_concurrency
+        )
+        return bulk_lock_response(results, operation, stream)
+            
+    except Exception as e:
+        logger.error(f"Erro na operação de locks em lote: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @azure_actions_bp.route('/test', methods=['GET'])
 def test_actions():
     """Endpoint de teste para ações Azure"""
@@ -261,7 +292,8 @@ def test_actions():
             'list-vms',
             'vm-action',
             'apply-tags',
-            'bulk-shutdown-vms'
+            'bulk-shutdown-vms',
+            'bulk-locks'
         ]
     }), 200
 
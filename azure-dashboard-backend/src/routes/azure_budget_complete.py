@@ -8,6 +8,7 @@ from azure.mgmt.consumption import ConsumptionManagementClient
 from azure.mgmt.consumption.models import Budget, BudgetTimePeriod, BudgetFilter, BudgetFilterProperties
 from src.models.user import User
 from src.services.azure_service import azure_auth_service
+from src.services.rightsizing_engine import rightsizing_engine
 import logging
 from datetime import datetime, timedelta
 import uuid
@@ -356,19 +357,23 @@ def get_cost_recommendations():
         if not credentials:
             return jsonify({"error": "Credenciais Azure não configuradas"}), 400
         
-        # Simular recomendações inteligentes
-        recommendations = [
-            {
+        # Redimensionamento calculado pelo motor de rightsizing sobre as métricas coletadas
+        recommendations = []
+        rightsizing = rightsizing_engine.vm_rightsizing_recommendation(user.id)
+        if rightsizing:
+            recommendations.append({
                 "id": "rec_1",
                 "type": "vm_rightsizing",
-                "priority": "high",
-                "potential_savings": 180.50,
-                "title": "Redimensionar VMs subutilizadas",
-                "description": "3 VMs estão com utilização abaixo de 20% nos últimos 30 dias",
-                "action": "Reduzir tamanho das VMs ou desligar quando não utilizadas",
-                "resources": ["vm-web-01", "vm-test-02", "vm-backup-03"],
+                "priority": "high" if rightsizing['potential_savings'] >= 100 else "medium",
+                "potential_savings": rightsizing['potential_savings'],
+                "title": rightsizing['title'],
+                "description": rightsizing['description'],
+                "action": "Reduzir as VMs para o tamanho recomendado da mesma família",
+                "resources": rightsizing['resources'],
+                "candidates": rightsizing['candidates'],
                 "effort": "low"
-            },
+            })
+        recommendations += [
             {
                 "id": "rec_2",
                 "type": "storage_optimization",
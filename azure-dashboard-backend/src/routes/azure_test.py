@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify, session
 from src.services.azure_service import azure_auth_service
 from azure.identity import ClientSecretCredential
 from azure.mgmt.resource import ResourceManagementClient
+from src.utils.azure_clients import azure_client_options
 import logging
 
 logger = logging.getLogger(__name__)
@@ -41,7 +42,7 @@ def create_test_resource_group():
             client_secret=creds.get_client_secret()
         )
         
-        resource_client = ResourceManagementClient(credential, creds.subscription_id)
+        resource_client = ResourceManagementClient(credential, creds.subscription_id, **azure_client_options())
         
         logger.info(f"Cliente criado com sucesso. Subscription: {creds.subscription_id}")
         
@@ -110,7 +111,7 @@ def list_resource_groups():
             client_secret=creds.get_client_secret()
         )
         
-        resource_client = ResourceManagementClient(credential, creds.subscription_id)
+        resource_client = ResourceManagementClient(credential, creds.subscription_id, **azure_client_options())
         
         logger.info(f"Cliente criado. Listando Resource Groups...")
         
@@ -179,7 +180,7 @@ def delete_resource_group():
             client_secret=creds.get_client_secret()
         )
         
-        resource_client = ResourceManagementClient(credential, creds.subscription_id)
+        resource_client = ResourceManagementClient(credential, creds.subscription_id, **azure_client_options())
         
         # Deletar Resource Group (operação assíncrona)
         delete_operation = resource_client.resource_groups.begin_delete(rg_name)
@@ -233,7 +234,7 @@ def create_resource_group():
             client_secret=creds.get_client_secret()
         )
         
-        resource_client = ResourceManagementClient(credential, creds.subscription_id)
+        resource_client = ResourceManagementClient(credential, creds.subscription_id, **azure_client_options())
         
         # Criar Resource Group
         rg_params = {
@@ -4,10 +4,13 @@ Sistema de Monitoramento e Alertas - DADOS REAIS
 
 from flask import Blueprint, request, jsonify, session
 from datetime import datetime, timedelta
-import json
 import sqlite3
 import os
 from src.models.azure_credentials import AzureCredentials
+from src.services.event_bus import event_bus, TOPIC_ALERTS
+from src.services.timeseries_store import timeseries_store
+from src.services.activity_log_service import activity_log_service
+from src.utils.pagination import parse_limit, InvalidCursorError
 
 monitoring_bp = Blueprint('monitoring', __name__)
 
@@ -100,17 +103,47 @@ def get_metrics():
         # Obter recursos por tipo
         resources_by_type = get_resources_by_type()
         
+        # Séries históricas (camada de consolidação escolhida pelo período)
+        history = get_metrics_history(start_time, now)
+        
         return jsonify({
             'resources': resources_metrics,
             'costs': costs_metrics,
             'alerts': alerts,
             'activities': activities,
-            'resourcesByType': resources_by_type
+            'resourcesByType': resources_by_type,
+            'history': history
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def get_metrics_history(start_time, end_time):
+    """Obter séries históricas do usuário a partir das camadas consolidadas"""
+    try:
+        user_id = session.get('user_id')
+        if not user_id:
+            return {}
+        
+        requested = [m for m in request.args.get('metrics', '').split(',') if m]
+        metric_types = requested or sorted({s['metric_type'] for s in timeseries_store.list_series(user_id)})
+        resolution = request.args.get('resolution', type=float)
+        series = request.args.get('series')
+        
+        history = {}
+        for metric_type in metric_types:
+            history[metric_type] = timeseries_store.query(
+                user_id,
+                metric_type,
+                start_time.timestamp(),
+                end_time.timestamp(),
+                resolution=resolution,
+                series=series
+            )
+        return history
+    except Exception:
+        return {}
+
 def get_resources_metrics():
     """Obter métricas de recursos REAIS do Azure"""
     try:
@@ -205,14 +238,21 @@ def get_recent_activities(start_time):
         if not user_id:
             return []
         
-        credentials = AzureCredentials.get_by_user_id(user_id)
-        if not credentials:
-            # Para conta sem credenciais, sem atividades (conta vazia)
-            return []
+        # Atividades já ingeridas do Azure Activity Log + ações locais (sem chamadas ao Azure)
+        page = activity_log_service.query(
+            user_id,
+            limit=20,
+            start=datetime.utcfromtimestamp(start_time.timestamp())
+        )
         
-        # Em produção, obteria atividades reais do Azure Activity Log
-        # Para conta nova/vazia, não há atividades
-        return []
+        return [{
+            'id': item['id'],
+            'action': item['action'],
+            'resource': item['resource_id'].split('/')[-1] if item['resource_id'] else item['resource_type'],
+            'status': item['status'],
+            'timestamp': item['timestamp'],
+            'icon': get_activity_icon(item['operation_name'] or item['action'], item['resource_type'] or '')
+        } for item in page['items']]
         
     except Exception:
         return []
@@ -288,6 +328,8 @@ def acknowledge_alert(alert_id):
         conn.commit()
         conn.close()
         
+        event_bus.publish(session['user_id'], TOPIC_ALERTS, {'action': 'acknowledged', 'alert_id': alert_id})
+        
         return jsonify({'message': 'Alerta reconhecido'}), 200
         
     except Exception as e:
@@ -321,41 +363,76 @@ def create_alert():
         conn.commit()
         conn.close()
         
+        event_bus.publish(session['user_id'], TOPIC_ALERTS, {
+            'action': 'created',
+            'alert': {
+                'id': alert_id,
+                'title': data['title'],
+                'message': data['message'],
+                'severity': data.get('severity', 'info'),
+                'category': data.get('category', 'general'),
+                'resource_id': data.get('resource_id')
+            }
+        })
+        
         return jsonify({'message': 'Alerta criado', 'alert_id': alert_id}), 201
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def log_activity(user_id, action, resource_type=None, resource_id=None, details=None, status='success'):
-    """Registrar atividade no log"""
+@monitoring_bp.route('/activity', methods=['GET'])
+def list_activity():
+    """Listar atividades com paginação por cursor e filtros"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Usuário não autenticado'}), 401
+    
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO activity_log (user_id, action, resource_type, resource_id, details, status)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, action, resource_type, resource_id, details, status))
+        start = request.args.get('start')
+        end = request.args.get('end')
         
-        conn.commit()
-        conn.close()
+        page = activity_log_service.query(
+            session['user_id'],
+            limit=parse_limit(request.args.get('limit')),
+            cursor=request.args.get('cursor'),
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None,
+            resource_id=request.args.get('resource_id'),
+            operation=request.args.get('operation'),
+            status=request.args.get('status'),
+            source=request.args.get('source')
+        )
+        return jsonify(page), 200
         
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Erro ao registrar atividade: {e}")
+        return jsonify({'error': str(e)}), 500
 
-def record_metric(user_id, metric_type, metric_value, metadata=None):
-    """Registrar métrica histórica"""
+@monitoring_bp.route('/activity/sync', methods=['POST'])
+def sync_activity():
+    """Forçar ingestão incremental do Activity Log do usuário"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Usuário não autenticado'}), 401
+    
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        result = activity_log_service.sync_user(session['user_id'])
+        return jsonify(result), 200 if result.get('success') else 400
         
-        cursor.execute('''
-            INSERT INTO metrics_history (user_id, metric_type, metric_value, metadata)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, metric_type, metric_value, json.dumps(metadata) if metadata else None))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def log_activity(user_id, action, resource_type=None, resource_id=None, details=None, status='success'):
+    """Registrar atividade no log"""
+    try:
+        activity_log_service.log_local(user_id, action, resource_type, resource_id, details, status)
         
-        conn.commit()
-        conn.close()
+    except Exception as e:
+        print(f"Erro ao registrar atividade: {e}")
+
+def record_metric(user_id, metric_type, metric_value, metadata=None, series=''):
+    """Registrar métrica histórica (gravação em lote e consolidação em background)"""
+    try:
+        timeseries_store.record(user_id, metric_type, metric_value, metadata=metadata, series=series)
         
     except Exception as e:
         print(f"Erro ao registrar métrica: {e}")
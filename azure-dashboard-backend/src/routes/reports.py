@@ -8,15 +8,16 @@ import json
 import sqlite3
 import os
 import io
-import pandas as pd
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
+from src.utils.startup import startup
+
+# Renderizadores carregados só quando um relatório é exportado (ver src/utils/startup.py)
+pd = startup.lazy_import('pandas')
+pagesizes = startup.lazy_import('reportlab.lib.pagesizes')
+platypus = startup.lazy_import('reportlab.platypus')
+rl_styles = startup.lazy_import('reportlab.lib.styles')
+colors = startup.lazy_import('reportlab.lib.colors')
+matplotlib = startup.lazy_import('matplotlib', on_load=lambda module: module.use('Agg'))  # backend não interativo
+plt = startup.lazy_import('matplotlib.pyplot', on_load=lambda module: module.switch_backend('Agg'))
 
 reports_bp = Blueprint('reports', __name__)
 
@@ -270,12 +271,12 @@ def export_report():
 def export_pdf_report(report_type, data, date_range):
     """Exportar relatório em PDF"""
     buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
+    doc = platypus.SimpleDocTemplate(buffer, pagesize=pagesizes.A4)
+    styles = rl_styles.getSampleStyleSheet()
     story = []
     
     # Título
-    title_style = ParagraphStyle(
+    title_style = rl_styles.ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
         fontSize=24,
@@ -290,30 +291,30 @@ def export_pdf_report(report_type, data, date_range):
         'performance': 'Relatório de Performance'
     }
     
-    story.append(Paragraph(report_titles.get(report_type, 'Relatório'), title_style))
-    story.append(Spacer(1, 12))
+    story.append(platypus.Paragraph(report_titles.get(report_type, 'Relatório'), title_style))
+    story.append(platypus.Spacer(1, 12))
     
     # Data de geração
-    story.append(Paragraph(f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
-    story.append(Paragraph(f"Período: {date_range}", styles['Normal']))
-    story.append(Spacer(1, 20))
+    story.append(platypus.Paragraph(f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
+    story.append(platypus.Paragraph(f"Período: {date_range}", styles['Normal']))
+    story.append(platypus.Spacer(1, 20))
     
     # Conteúdo específico por tipo
     if report_type == 'cost':
-        story.append(Paragraph("Resumo Executivo", styles['Heading2']))
-        story.append(Paragraph(f"Gasto Atual: R$ {data['currentSpend']:.2f}", styles['Normal']))
-        story.append(Paragraph(f"Economia Potencial: R$ {data['potentialSavings']:.2f}", styles['Normal']))
-        story.append(Paragraph(f"Eficiência: {data['efficiency']}%", styles['Normal']))
-        story.append(Spacer(1, 20))
+        story.append(platypus.Paragraph("Resumo Executivo", styles['Heading2']))
+        story.append(platypus.Paragraph(f"Gasto Atual: R$ {data['currentSpend']:.2f}", styles['Normal']))
+        story.append(platypus.Paragraph(f"Economia Potencial: R$ {data['potentialSavings']:.2f}", styles['Normal']))
+        story.append(platypus.Paragraph(f"Eficiência: {data['efficiency']}%", styles['Normal']))
+        story.append(platypus.Spacer(1, 20))
         
         # Tabela de custos por serviço
-        story.append(Paragraph("Custos por Serviço", styles['Heading2']))
+        story.append(platypus.Paragraph("Custos por Serviço", styles['Heading2']))
         table_data = [['Serviço', 'Custo (R$)']]
         for item in data['costsByService']:
             table_data.append([item['service'], f"R$ {item['cost']:.2f}"])
         
-        table = Table(table_data)
-        table.setStyle(TableStyle([
+        table = platypus.Table(table_data)
+        table.setStyle(platypus.TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -461,6 +462,6 @@ def cache_report(user_id, report_type, date_range, data):
     except Exception as e:
         print(f"Erro ao salvar cache: {e}")
 
-# Inicializar banco ao importar
-init_reports_db()
+# Tabelas criadas na fase de inicialização do app, não na importação
+startup.on_init('reports_db', init_reports_db)
 
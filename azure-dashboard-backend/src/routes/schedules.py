@@ -7,6 +7,11 @@ from datetime import datetime, timedelta
 import json
 import sqlite3
 import os
+from src.services.event_bus import event_bus, TOPIC_SCHEDULES
+from src.utils.pagination import (
+    sqlite_page, estimate_total, parse_limit, optional_limit, wants_total, InvalidCursorError
+)
+from src.utils.startup import startup
 
 schedules_bp = Blueprint('schedules', __name__)
 
@@ -50,6 +55,16 @@ def init_schedules_db():
         )
     ''')
     
+    # Índices da paginação por cursor
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_schedules_user_created
+        ON schedules (user_id, created_at, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_schedule_logs_schedule_time
+        ON schedule_logs (schedule_id, execution_time, id)
+    ''')
+    
     conn.commit()
     conn.close()
 
@@ -61,19 +76,19 @@ def list_schedules():
     
     try:
         conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, name, type, schedule_type, time, days_of_week, 
-                   target_scope, target_value, enabled, notification_email, 
-                   description, created_at, last_run, next_run
-            FROM schedules 
-            WHERE user_id = ? 
-            ORDER BY created_at DESC
-        ''', (session['user_id'],))
+        where, params = ['user_id = ?'], [session['user_id']]
+        
+        rows, next_cursor = sqlite_page(
+            conn, 'schedules',
+            '''id, name, type, schedule_type, time, days_of_week, 
+               target_scope, target_value, enabled, notification_email, 
+               description, created_at, last_run, next_run''',
+            where, params, ['created_at', 'id'],
+            optional_limit(request.args), request.args.get('cursor')
+        )
         
         schedules = []
-        for row in cursor.fetchall():
+        for row in rows:
             schedule = {
                 'id': row[0],
                 'name': row[1],
@@ -92,9 +107,14 @@ def list_schedules():
             }
             schedules.append(schedule)
         
+        response = {'schedules': schedules, 'next_cursor': next_cursor}
+        if wants_total(request.args.get('include_total')):
+            response['total'], response['total_exact'] = estimate_total(conn, 'schedules', where, params)
         conn.close()
-        return jsonify({'schedules': schedules}), 200
+        return jsonify(response), 200
         
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -144,6 +164,13 @@ def create_schedule():
         conn.commit()
         conn.close()
         
+        event_bus.publish(session['user_id'], TOPIC_SCHEDULES, {
+            'action': 'created',
+            'schedule_id': schedule_id,
+            'name': data['name'],
+            'next_run': next_run
+        })
+        
         return jsonify({
             'message': 'Agendamento criado com sucesso',
             'schedule_id': schedule_id
@@ -182,6 +209,12 @@ def toggle_schedule(schedule_id):
         conn.commit()
         conn.close()
         
+        event_bus.publish(session['user_id'], TOPIC_SCHEDULES, {
+            'action': 'toggled',
+            'schedule_id': schedule_id,
+            'enabled': bool(enabled)
+        })
+        
         return jsonify({'message': 'Status do agendamento atualizado'}), 200
         
     except Exception as e:
@@ -215,6 +248,11 @@ def delete_schedule(schedule_id):
         conn.commit()
         conn.close()
         
+        event_bus.publish(session['user_id'], TOPIC_SCHEDULES, {
+            'action': 'deleted',
+            'schedule_id': schedule_id
+        })
+        
         return jsonify({'message': 'Agendamento excluído com sucesso'}), 200
         
     except Exception as e:
@@ -239,16 +277,15 @@ def get_schedule_logs(schedule_id):
         if not cursor.fetchone():
             return jsonify({'error': 'Agendamento não encontrado'}), 404
         
-        cursor.execute('''
-            SELECT execution_time, status, message, resources_affected
-            FROM schedule_logs 
-            WHERE schedule_id = ? 
-            ORDER BY execution_time DESC 
-            LIMIT 50
-        ''', (schedule_id,))
+        where, params = ['schedule_id = ?'], [schedule_id]
+        rows, next_cursor = sqlite_page(
+            conn, 'schedule_logs', 'execution_time, status, message, resources_affected',
+            where, params, ['execution_time', 'id'],
+            parse_limit(request.args.get('limit')), request.args.get('cursor')
+        )
         
         logs = []
-        for row in cursor.fetchall():
+        for row in rows:
             logs.append({
                 'execution_time': row[0],
                 'status': row[1],
@@ -256,12 +293,50 @@ def get_schedule_logs(schedule_id):
                 'resources_affected': row[3]
             })
         
+        response = {'logs': logs, 'next_cursor': next_cursor}
+        if wants_total(request.args.get('include_total')):
+            response['total'], response['total_exact'] = estimate_total(conn, 'schedule_logs', where, params)
         conn.close()
-        return jsonify({'logs': logs}), 200
+        return jsonify(response), 200
         
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def record_schedule_execution(schedule_id, status, message=None, resources_affected=0):
+    """Registrar execução de agendamento e notificar o dashboard do dono"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT user_id FROM schedules WHERE id = ?', (schedule_id,))
+    row = cursor.fetchone()
+    if not row:
+        conn.close()
+        return None
+    
+    cursor.execute('''
+        INSERT INTO schedule_logs (schedule_id, status, message, resources_affected)
+        VALUES (?, ?, ?, ?)
+    ''', (schedule_id, status, message, resources_affected))
+    log_id = cursor.lastrowid
+    
+    cursor.execute('UPDATE schedules SET last_run = CURRENT_TIMESTAMP WHERE id = ?', (schedule_id,))
+    
+    conn.commit()
+    conn.close()
+    
+    event_bus.publish(row[0], TOPIC_SCHEDULES, {
+        'action': 'executed',
+        'schedule_id': schedule_id,
+        'log_id': log_id,
+        'status': status,
+        'message': message,
+        'resources_affected': resources_affected,
+        'execution_time': datetime.utcnow().isoformat()
+    })
+    return log_id
+
 def calculate_next_run(schedule_type, time, days_of_week):
     """Calcular próxima execução do agendamento"""
     from datetime import datetime, timedelta
@@ -300,6 +375,6 @@ def calculate_next_run(schedule_type, time, days_of_week):
     
     return next_run.isoformat()
 
-# Inicializar banco ao importar
-init_schedules_db()
+# Tabela criada na fase de inicialização do app, não na importação
+startup.on_init('schedules_db', init_schedules_db)
 
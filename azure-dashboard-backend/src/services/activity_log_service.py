@@ -0,0 +1,391 @@
+"""
+Ingestão incremental do Azure Activity Log
+Busca os eventos da subscription a partir de um cursor persistido, grava em lote
+na tabela activity_log (deduplicando pelo ID do evento) e oferece consulta
+paginada por cursor (keyset) com filtros de período, recurso, operação e status
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.utils.arm_governor import arm_priority, PRIORITY_LOW
+from src.utils.azure_clients import azure_client_options
+from src.utils.pagination import encode_cursor, decode_cursor, DEFAULT_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'app.db')
+
+# Primeira sincronização de uma subscription busca este histórico (Activity Log guarda 90 dias)
+INITIAL_LOOKBACK_DAYS = int(os.environ.get('ACTIVITY_LOG_INITIAL_LOOKBACK_DAYS', '7'))
+# Eventos podem aparecer no Activity Log com atraso: cada busca revisita esta janela
+OVERLAP_MINUTES = int(os.environ.get('ACTIVITY_LOG_OVERLAP_MINUTES', '15'))
+POLL_INTERVAL_SECONDS = float(os.environ.get('ACTIVITY_LOG_POLL_SECONDS', '300'))
+INSERT_BATCH_SIZE = 500
+
+SOURCE_LOCAL = 'local'
+SOURCE_AZURE = 'azure'
+
+# Apenas os campos usados, reduzindo o payload de cada página
+ACTIVITY_LOG_SELECT = ','.join([
+    'eventTimestamp', 'eventDataId', 'operationName', 'resourceId', 'resourceGroupName',
+    'resourceType', 'status', 'subStatus', 'caller', 'correlationId', 'level', 'category'
+])
+
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_NEW_COLUMNS = {
+    'event_id': 'TEXT',
+    'subscription_id': 'TEXT',
+    'operation_name': 'TEXT',
+    'resource_group': 'TEXT',
+    'caller': 'TEXT',
+    'correlation_id': 'TEXT',
+    'level': 'TEXT',
+    'source': f"TEXT NOT NULL DEFAULT '{SOURCE_LOCAL}'"
+}
+
+
+def _localized(value):
+    """Campos LocalizableString do SDK: prefere o texto legível"""
+    if value is None:
+        return None
+    return getattr(value, 'localized_value', None) or getattr(value, 'value', None) or str(value)
+
+
+def _raw_value(value):
+    if value is None:
+        return None
+    return getattr(value, 'value', None) or str(value)
+
+
+def _to_db_timestamp(dt):
+    """Datas do SDK vêm com fuso: normaliza para UTC no formato de CURRENT_TIMESTAMP"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime(_TS_FORMAT)
+
+
+class ActivityLogService:
+    """Ingestão e consulta do log de atividades"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._user_locks = {}
+        self._worker = None
+        self._credential_factory = None
+        self._users_provider = None
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS activity_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    action TEXT NOT NULL,
+                    resource_type TEXT,
+                    resource_id TEXT,
+                    details TEXT,
+                    status TEXT NOT NULL,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(activity_log)')}
+            for column, definition in _NEW_COLUMNS.items():
+                if column not in columns:
+                    cursor.execute(f'ALTER TABLE activity_log ADD COLUMN {column} {definition}')
+
+            # Deduplicação por evento do Azure (linhas locais têm event_id NULL e não colidem)
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_activity_log_event ON activity_log (user_id, event_id)')
+            # Ordem da paginação keyset e filtros mais comuns
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_log_user_time ON activity_log (user_id, timestamp DESC, id DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_log_resource ON activity_log (user_id, resource_id, timestamp DESC)')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS activity_log_cursor (
+                    user_id INTEGER NOT NULL,
+                    subscription_id TEXT NOT NULL,
+                    synced_until TEXT NOT NULL,
+                    last_event_time TEXT,
+                    last_event_id TEXT,
+                    events_ingested INTEGER DEFAULT 0,
+                    updated_at TIMESTAMP,
+                    PRIMARY KEY (user_id, subscription_id)
+                )
+            ''')
+            conn.commit()
+            conn.close()
+            self._initialized = True
+
+    def _user_lock(self, user_id):
+        with self._init_lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = self._user_locks[user_id] = threading.Lock()
+            return lock
+
+    # Gravação -------------------------------------------------------------
+
+    def log_local(self, user_id, action, resource_type=None, resource_id=None, details=None, status='success'):
+        """Registra uma ação executada pelo próprio dashboard"""
+        self._ensure_schema()
+        conn = self._connect()
+        conn.execute('''
+            INSERT INTO activity_log (user_id, action, resource_type, resource_id, details, status, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, action, resource_type, resource_id, details, status, SOURCE_LOCAL))
+        conn.commit()
+        conn.close()
+
+    def _event_row(self, user_id, subscription_id, event):
+        details = {
+            'sub_status': _localized(getattr(event, 'sub_status', None)),
+            'category': _raw_value(getattr(event, 'category', None))
+        }
+        operation = getattr(event, 'operation_name', None)
+        return (
+            user_id,
+            _localized(operation) or 'Unknown',
+            _raw_value(getattr(event, 'resource_type', None)),
+            getattr(event, 'resource_id', None),
+            json.dumps({k: v for k, v in details.items() if v}),
+            _raw_value(getattr(event, 'status', None)) or 'Unknown',
+            _to_db_timestamp(event.event_timestamp),
+            event.event_data_id,
+            subscription_id,
+            _raw_value(operation),
+            getattr(event, 'resource_group_name', None),
+            getattr(event, 'caller', None),
+            getattr(event, 'correlation_id', None),
+            _raw_value(getattr(event, 'level', None)),
+            SOURCE_AZURE
+        )
+
+    def _insert_batch(self, conn, rows):
+        """INSERT OR IGNORE no índice único torna a reingestão da janela de sobreposição idempotente"""
+        before = conn.total_changes
+        conn.executemany('''
+            INSERT OR IGNORE INTO activity_log
+                (user_id, action, resource_type, resource_id, details, status, timestamp,
+                 event_id, subscription_id, operation_name, resource_group, caller,
+                 correlation_id, level, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        return conn.total_changes - before
+
+    # Ingestão -------------------------------------------------------------
+
+    def _get_cursor(self, conn, user_id, subscription_id):
+        row = conn.execute('''
+            SELECT synced_until FROM activity_log_cursor WHERE user_id = ? AND subscription_id = ?
+        ''', (user_id, subscription_id)).fetchone()
+        return datetime.strptime(row[0], _TS_FORMAT) if row else None
+
+    def ingest(self, user_id: int, credential: Any, subscription_id: str,
+               events: Optional[Iterable[Any]] = None) -> Dict[str, Any]:
+        """
+        Busca os eventos novos desde o cursor e grava em lote
+        events permite injetar uma fonte (testes/benchmarks) no lugar do SDK
+        """
+        self._ensure_schema()
+        with self._user_lock(user_id):
+            conn = self._connect()
+            try:
+                now = datetime.utcnow()
+                synced_until = self._get_cursor(conn, user_id, subscription_id)
+                if synced_until:
+                    window_start = synced_until - timedelta(minutes=OVERLAP_MINUTES)
+                else:
+                    window_start = now - timedelta(days=INITIAL_LOOKBACK_DAYS)
+
+                if events is None:
+                    events = self._list_events(credential, subscription_id, window_start, now)
+
+                inserted = 0
+                fetched = 0
+                newest = None
+                newest_id = None
+                batch = []
+                for event in events:
+                    if not getattr(event, 'event_data_id', None) or not getattr(event, 'event_timestamp', None):
+                        continue
+                    fetched += 1
+                    row = self._event_row(user_id, subscription_id, event)
+                    batch.append(row)
+                    event_time = datetime.strptime(row[6], _TS_FORMAT)
+                    if newest is None or event_time > newest:
+                        newest, newest_id = event_time, row[7]
+                    if len(batch) >= INSERT_BATCH_SIZE:
+                        inserted += self._insert_batch(conn, batch)
+                        batch = []
+                if batch:
+                    inserted += self._insert_batch(conn, batch)
+
+                # synced_until marca o fim da janela lida; o último evento fica registrado à parte
+                conn.execute('''
+                    INSERT INTO activity_log_cursor
+                        (user_id, subscription_id, synced_until, last_event_time, last_event_id,
+                         events_ingested, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id, subscription_id) DO UPDATE SET
+                        synced_until = excluded.synced_until,
+                        last_event_time = CASE
+                            WHEN excluded.last_event_time IS NOT NULL
+                                 AND (last_event_time IS NULL OR excluded.last_event_time > last_event_time)
+                            THEN excluded.last_event_time ELSE last_event_time END,
+                        last_event_id = CASE
+                            WHEN excluded.last_event_time IS NOT NULL
+                                 AND (last_event_time IS NULL OR excluded.last_event_time > last_event_time)
+                            THEN excluded.last_event_id ELSE last_event_id END,
+                        events_ingested = events_ingested + excluded.events_ingested,
+                        updated_at = excluded.updated_at
+                ''', (user_id, subscription_id, now.strftime(_TS_FORMAT),
+                      newest.strftime(_TS_FORMAT) if newest else None, newest_id, inserted,
+                      now.isoformat()))
+                conn.commit()
+            finally:
+                conn.close()
+
+        if inserted:
+            logger.info(f"Activity Log do usuário {user_id}: {inserted} eventos novos ({fetched} lidos)")
+        return {'success': True, 'fetched': fetched, 'inserted': inserted,
+                'synced_until': now.strftime(_TS_FORMAT)}
+
+    def _list_events(self, credential, subscription_id, start, end):
+        from azure.mgmt.monitor import MonitorManagementClient
+
+        client = MonitorManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_LOW))
+        event_filter = (
+            f"eventTimestamp ge '{start.strftime('%Y-%m-%dT%H:%M:%SZ')}' "
+            f"and eventTimestamp le '{end.strftime('%Y-%m-%dT%H:%M:%SZ')}'"
+        )
+        with arm_priority(PRIORITY_LOW):
+            for event in client.activity_logs.list(filter=event_filter, select=ACTIVITY_LOG_SELECT):
+                yield event
+
+    def start(self, credential_factory: Callable[[int], Any], users_provider: Callable[[], List[int]]):
+        """
+        Inicia a ingestão periódica em background
+        credential_factory(user_id) -> (credential, subscription_id) ou (None, None)
+        users_provider() -> IDs de usuários com credenciais ativas
+        """
+        with self._init_lock:
+            self._credential_factory = credential_factory
+            self._users_provider = users_provider
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run_worker, name='activity-log-ingest', daemon=True)
+            self._worker.start()
+
+    def sync_user(self, user_id: int) -> Dict[str, Any]:
+        """Sincronização sob demanda de um usuário usando a fábrica de credenciais registrada"""
+        if not self._credential_factory:
+            return {'success': False, 'error': 'Ingestão do Activity Log não iniciada'}
+        credential, subscription_id = self._credential_factory(user_id)
+        if not credential:
+            return {'success': False, 'error': 'Credenciais Azure não configuradas'}
+        return self.ingest(user_id, credential, subscription_id)
+
+    def _run_worker(self):
+        while True:
+            try:
+                for user_id in self._users_provider():
+                    try:
+                        self.sync_user(user_id)
+                    except Exception as e:
+                        logger.error(f"Erro na ingestão do Activity Log do usuário {user_id}: {str(e)}")
+            except Exception as e:
+                logger.error(f"Erro no worker do Activity Log: {str(e)}")
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+    # Consulta -------------------------------------------------------------
+
+    def query(self, user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None,
+              resource_id: Optional[str] = None, operation: Optional[str] = None,
+              status: Optional[str] = None, source: Optional[str] = None) -> Dict[str, Any]:
+        """Página de atividades mais recentes primeiro; next_cursor continua de onde parou"""
+        self._ensure_schema()
+
+        clauses = ['user_id = ?']
+        params = [user_id]
+        if start:
+            clauses.append('timestamp >= ?')
+            params.append(start.strftime(_TS_FORMAT))
+        if end:
+            clauses.append('timestamp < ?')
+            params.append(end.strftime(_TS_FORMAT))
+        if resource_id:
+            clauses.append('resource_id = ? COLLATE NOCASE')
+            params.append(resource_id)
+        if operation:
+            clauses.append('(operation_name LIKE ? OR action LIKE ?)')
+            params.extend([f'{operation}%', f'{operation}%'])
+        if status:
+            clauses.append('status = ? COLLATE NOCASE')
+            params.append(status)
+        if source:
+            clauses.append('source = ?')
+            params.append(source)
+
+        position = decode_cursor(cursor, size=2)
+        if position:
+            clauses.append('(timestamp < ? OR (timestamp = ? AND id < ?))')
+            params.extend([position[0], position[0], position[1]])
+
+        conn = self._connect()
+        rows = conn.execute(f'''
+            SELECT id, action, resource_type, resource_id, details, status, timestamp, event_id,
+                   operation_name, resource_group, caller, correlation_id, level, source
+            FROM activity_log
+            WHERE {' AND '.join(clauses)}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        ''', (*params, limit + 1)).fetchall()
+        conn.close()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [{
+            'id': row[0],
+            'action': row[1],
+            'resource_type': row[2],
+            'resource_id': row[3],
+            'details': json.loads(row[4]) if row[4] and row[4].startswith('{') else row[4],
+            'status': row[5],
+            'timestamp': row[6],
+            'event_id': row[7],
+            'operation_name': row[8],
+            'resource_group': row[9],
+            'caller': row[10],
+            'correlation_id': row[11],
+            'level': row[12],
+            'source': row[13]
+        } for row in rows]
+
+        return {
+            'items': items,
+            'next_cursor': encode_cursor([rows[-1][6], rows[-1][0]]) if has_more else None
+        }
+
+
+# Instância global do serviço
+activity_log_service = ActivityLogService()
@@ -4,14 +4,19 @@ Implementa operações que realmente executam na subscription Azure
 """
 
 import logging
-from typing import Dict, Any, List, Optional
-from azure.identity import ClientSecretCredential
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator
 from azure.mgmt.resource import ResourceManagementClient
 from azure.mgmt.resource.locks import ManagementLockClient
 from azure.mgmt.compute import ComputeManagementClient
 from azure.mgmt.authorization import AuthorizationManagementClient
 from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
 from src.services.azure_service import azure_auth_service
+from src.utils.azure_clients import azure_client_options
+from src.utils.arm_ids import lock_scope, resource_group_of
+from src.services.bulk_locks import (
+    BULK_DEFAULT_CONCURRENCY, validate_bulk_lock_request, run_bulk_lock_operation
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,24 +29,20 @@ class AzureActionsService:
     def _get_clients(self, user_id: int) -> Dict[str, Any]:
         """Obtém clientes Azure autenticados para o usuário"""
         try:
-            if not self.auth_service.is_user_authenticated(user_id):
+            creds = self.auth_service.resolve_credentials(user_id)
+            if not creds:
                 raise Exception("Usuário não tem credenciais Azure configuradas")
             
-            creds = self.auth_service.get_user_credentials(user_id)
-            
-            credential = ClientSecretCredential(
-                tenant_id=creds.tenant_id,
-                client_id=creds.client_id,
-                client_secret=creds.get_client_secret()
-            )
+            credential = creds.get_credential()
             
+            options = azure_client_options()
             return {
                 'credential': credential,
                 'subscription_id': creds.subscription_id,
-                'resource_client': ResourceManagementClient(credential, creds.subscription_id),
-                'compute_client': ComputeManagementClient(credential, creds.subscription_id),
-                'auth_client': AuthorizationManagementClient(credential, creds.subscription_id),
-                'lock_client': ManagementLockClient(credential, creds.subscription_id)
+                'resource_client': ResourceManagementClient(credential, creds.subscription_id, **options),
+                'compute_client': ComputeManagementClient(credential, creds.subscription_id, **options),
+                'auth_client': AuthorizationManagementClient(credential, creds.subscription_id, **options),
+                'lock_client': ManagementLockClient(credential, creds.subscription_id, **options)
             }
         except Exception as e:
             logger.error(f"Erro ao obter clientes Azure: {str(e)}")
@@ -194,7 +195,7 @@ class AzureActionsService:
             
             # Usar delete_by_scope que é mais confiável
             # Extrair o scope do ID do lock (remover a parte do lock)
-            scope = '/'.join(lock_id.split('/')[:-4])  # Remove /providers/Microsoft.Authorization/locks/nome
+            scope = lock_scope(lock_id)  # Remove /providers/Microsoft.Authorization/locks/nome
             
             logger.info(f"Removendo lock usando scope: {scope}")
             lock_client.management_locks.delete_by_scope(
@@ -265,6 +266,29 @@ class AzureActionsService:
                 'count': 0
             }
     
+    def bulk_lock_operation(self, user_id: int, operation: str, targets: List[Any],
+                            lock_name: str = "Prevent-Spending-BudgetControl", level: str = "CanNotDelete",
+                            notes: str = None,
+                            max_concurrency: int = BULK_DEFAULT_CONCURRENCY) -> Iterator[Dict[str, Any]]:
+        """
+        Cria, remove ou converte locks em vários Resource Groups/recursos
+
+        Os clientes Azure são criados uma única vez e compartilhados entre as
+        operações (src/services/bulk_locks.py), que rodam em paralelo com
+        concorrência limitada. Os resultados são gerados item a item.
+        """
+        validate_bulk_lock_request(operation, targets)
+
+        try:
+            clients = self._get_clients(user_id)
+        except Exception as e:
+            # Como nas demais ações, credenciais ausentes/inválidas são erro da requisição (400)
+            raise ValueError(str(e)) from e
+
+        logger.info(f"Usuário {user_id}: operação de lock em lote '{operation}'")
+        yield from run_bulk_lock_operation(clients['lock_client'], clients['subscription_id'], operation, targets,
+                                           lock_name, level, notes, max_concurrency)
+
     def list_virtual_machines(self, user_id: int) -> Dict[str, Any]:
         """Lista todas as VMs da subscription"""
         try:
@@ -278,7 +302,7 @@ class AzureActionsService:
             for vm in vms:
                 # Obter status da VM
                 instance_view = compute_client.virtual_machines.instance_view(
-                    resource_group_name=vm.id.split('/')[4],  # Extrair resource group do ID
+                    resource_group_name=resource_group_of(vm.id),
                     vm_name=vm.name
                 )
                 
@@ -293,7 +317,7 @@ class AzureActionsService:
                     'id': vm.id,
                     'name': vm.name,
                     'location': vm.location,
-                    'resource_group': vm.id.split('/')[4],
+                    'resource_group': resource_group_of(vm.id),
                     'vm_size': vm.hardware_profile.vm_size,
                     'os_type': vm.storage_profile.os_disk.os_type.value if vm.storage_profile.os_disk.os_type else 'Unknown',
                     'power_state': power_state,
@@ -8,6 +8,8 @@ from azure.mgmt.costmanagement import CostManagementClient
 from azure.identity import DefaultAzureCredential, ClientSecretCredential
 from datetime import datetime, timedelta
 import logging
+from src.utils.arm_governor import PRIORITY_LOW
+from src.utils.azure_clients import azure_client_options
 
 logger = logging.getLogger(__name__)
 
@@ -30,10 +32,12 @@ class AzureCostRealService:
         try:
             self.consumption_client = ConsumptionManagementClient(
                 credential=self.credential,
-                subscription_id=subscription_id
+                subscription_id=subscription_id,
+                **azure_client_options(PRIORITY_LOW)
             )
             self.cost_client = CostManagementClient(
-                credential=self.credential
+                credential=self.credential,
+                **azure_client_options(PRIORITY_LOW)
             )
         except Exception as e:
             logger.error(f"Erro ao inicializar clientes Azure: {e}")
@@ -7,6 +7,7 @@ from typing import Optional, Dict, Any
 from azure.identity import ClientSecretCredential
 from azure.mgmt.subscription import SubscriptionClient
 from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
+from src.utils.azure_clients import azure_client_options
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +31,7 @@ def test_azure_credentials(tenant_id: str, client_id: str, client_secret: str, s
         logger.info("Credencial criada com sucesso")
         
         # Testar autenticação
-        subscription_client = SubscriptionClient(credential)
+        subscription_client = SubscriptionClient(credential, **azure_client_options())
         logger.info("Cliente de subscription criado")
         
         # Obter informações da subscription
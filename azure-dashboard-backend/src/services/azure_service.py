@@ -13,6 +13,10 @@ from azure.mgmt.consumption import ConsumptionManagementClient
 from azure.mgmt.subscription import SubscriptionClient
 from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
 from src.models.azure_credentials import AzureCredentials, db
+from src.utils.arm_governor import arm_priority, PRIORITY_LOW
+from src.utils.azure_clients import azure_client_options
+from src.utils.arm_ids import resource_group_of
+from src.utils.credential_cache import credential_cache, ResolvedCredentials, version_stamp
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +41,7 @@ class AzureAuthService:
             )
             
             # Testar autenticação obtendo informações da subscription
-            subscription_client = SubscriptionClient(credential)
+            subscription_client = SubscriptionClient(credential, **azure_client_options())
             subscription = subscription_client.subscriptions.get(subscription_id)
             
             # Se chegou até aqui, as credenciais são válidas
@@ -101,55 +105,74 @@ class AzureAuthService:
         """Obtém credenciais configuradas para um usuário"""
         return AzureCredentials.get_by_user_id(user_id)
     
+    def resolve_credentials(self, user_id: int) -> Optional[ResolvedCredentials]:
+        """
+        Resolve as credenciais descriptografadas do usuário usando o cache versionado
+        Dentro da janela de revalidação não acessa o banco; depois dela, consulta apenas
+        o updated_at e só recarrega/descriptografa se a versão mudou
+        """
+        cached, fresh = credential_cache.lookup(user_id)
+        if cached and fresh:
+            return cached
+        
+        if cached and credential_cache.touch(user_id, version_stamp(AzureCredentials.get_version(user_id))):
+            return cached
+        
+        creds = AzureCredentials.get_by_user_id(user_id)
+        if not creds:
+            credential_cache.invalidate(user_id)
+            return None
+        
+        resolved = ResolvedCredentials.from_model(creds)
+        credential_cache.put(resolved)
+        return resolved
+    
     def is_user_authenticated(self, user_id: int) -> bool:
         """Verifica se usuário tem credenciais válidas configuradas"""
-        creds = self.get_user_credentials(user_id)
-        return creds is not None and creds.is_active
+        return self.resolve_credentials(user_id) is not None
     
     def get_credential_object(self, user_id: int) -> Optional[ClientSecretCredential]:
         """Obtém objeto de credencial Azure para um usuário"""
-        creds = self.get_user_credentials(user_id)
-        if not creds:
+        resolved = self.resolve_credentials(user_id)
+        if not resolved:
             return None
         
-        return ClientSecretCredential(
-            tenant_id=creds.tenant_id,
-            client_id=creds.client_id,
-            client_secret=creds.get_client_secret()
-        )
+        return resolved.get_credential()
+    
+    def _get_user_clients(self, user_id: int, resolved: ResolvedCredentials) -> Dict[str, Any]:
+        """Cache de clientes do usuário, descartado quando a versão das credenciais muda"""
+        clients = self.active_clients.get(user_id)
+        if clients is None or clients.get('version') != resolved.version:
+            clients = self.active_clients[user_id] = {'version': resolved.version}
+        return clients
     
     def get_resource_client(self, user_id: int) -> Optional[ResourceManagementClient]:
         """Obtém cliente de Resource Management para um usuário"""
-        if not self.is_user_authenticated(user_id):
+        resolved = self.resolve_credentials(user_id)
+        if not resolved:
             return None
         
-        if user_id not in self.active_clients:
-            self.active_clients[user_id] = {}
-        
-        if 'resource' not in self.active_clients[user_id]:
-            creds = self.get_user_credentials(user_id)
-            credential = self.get_credential_object(user_id)
-            
-            self.active_clients[user_id]['resource'] = ResourceManagementClient(
-                credential,
-                creds.subscription_id
+        clients = self._get_user_clients(user_id, resolved)
+        if 'resource' not in clients:
+            clients['resource'] = ResourceManagementClient(
+                resolved.get_credential(),
+                resolved.subscription_id,
+                **azure_client_options()
             )
         
-        return self.active_clients[user_id]['resource']
+        return clients['resource']
     
     def get_cost_client(self, user_id: int) -> Optional[CostManagementClient]:
         """Obtém cliente de Cost Management para um usuário"""
-        if not self.is_user_authenticated(user_id):
+        resolved = self.resolve_credentials(user_id)
+        if not resolved:
             return None
         
-        if user_id not in self.active_clients:
-            self.active_clients[user_id] = {}
+        clients = self._get_user_clients(user_id, resolved)
+        if 'cost' not in clients:
+            clients['cost'] = CostManagementClient(resolved.get_credential(), **azure_client_options())
         
-        if 'cost' not in self.active_clients[user_id]:
-            credential = self.get_credential_object(user_id)
-            self.active_clients[user_id]['cost'] = CostManagementClient(credential)
-        
-        return self.active_clients[user_id]['cost']
+        return clients['cost']
     
     def remove_user_credentials(self, user_id: int) -> bool:
         """Remove credenciais de um usuário"""
@@ -157,6 +180,7 @@ class AzureAuthService:
             # Limpar cache
             if user_id in self.active_clients:
                 del self.active_clients[user_id]
+            credential_cache.invalidate(user_id)
             
             # Remover do banco
             return AzureCredentials.delete_by_user_id(user_id)
@@ -178,12 +202,13 @@ class AzureResourceService:
                 return {'error': 'Credenciais não configuradas'}
             
             resource_groups = []
-            for rg in client.resource_groups.list():
-                resource_groups.append({
-                    'name': rg.name,
-                    'location': rg.location,
-                    'tags': rg.tags or {}
-                })
+            with arm_priority(PRIORITY_LOW):
+                for rg in client.resource_groups.list():
+                    resource_groups.append({
+                        'name': rg.name,
+                        'location': rg.location,
+                        'tags': rg.tags or {}
+                    })
             
             return {
                 'success': True,
@@ -208,14 +233,15 @@ class AzureResourceService:
             else:
                 resource_list = client.resources.list()
             
-            for resource in resource_list:
-                resources.append({
-                    'name': resource.name,
-                    'type': resource.type,
-                    'location': resource.location,
-                    'resource_group': resource.id.split('/')[4],  # Extrair RG do ID
-                    'tags': resource.tags or {}
-                })
+            with arm_priority(PRIORITY_LOW):
+                for resource in resource_list:
+                    resources.append({
+                        'name': resource.name,
+                        'type': resource.type,
+                        'location': resource.location,
+                        'resource_group': resource_group_of(resource.id),
+                        'tags': resource.tags or {}
+                    })
             
             return {
                 'success': True,
@@ -237,7 +263,7 @@ class AzureCostService:
         """Obtém custos do mês atual"""
         try:
             client = self.auth_service.get_cost_client(user_id)
-            creds = self.auth_service.get_user_credentials(user_id)
+            creds = self.auth_service.resolve_credentials(user_id)
             
             if not client or not creds:
                 return {'error': 'Credenciais não configuradas'}
@@ -276,7 +302,8 @@ class AzureCostService:
             }
             
             # Executar query
-            result = client.query.usage(scope, query_definition)
+            with arm_priority(PRIORITY_LOW):
+                result = client.query.usage(scope, query_definition)
             
             # Processar resultados
             daily_costs = []
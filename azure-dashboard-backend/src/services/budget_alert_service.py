@@ -0,0 +1,277 @@
+"""
+Avaliação incremental de alertas de budget
+A cada atualização de custos compara o total acumulado do período (e a previsão
+linear para o fim do mês) com os limites 50/75/90/100% de cada budget ativo.
+Cada limite dispara uma única vez por período; só volta a disparar se o gasto cair
+abaixo do limite menos a histerese (estornos, créditos) e cruzar de novo
+"""
+
+import os
+import sqlite3
+import logging
+import calendar
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.services.cost_store import cost_store, current_period
+from src.services.event_bus import event_bus, TOPIC_ALERTS
+from src.services.webhook_delivery import webhook_queue
+
+logger = logging.getLogger(__name__)
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(SRC_DIR, 'bolt_dashboard.db')
+DEFAULT_ALERTS_DB_PATH = os.path.join(SRC_DIR, 'database', 'app.db')
+
+THRESHOLDS = (50, 75, 90, 100)
+# Fração abaixo do limite que o gasto precisa atingir para o alerta ser rearmado
+HYSTERESIS = float(os.environ.get('BUDGET_ALERT_HYSTERESIS', '0.05'))
+# Previsão só é considerada após alguns dias de dados no período
+FORECAST_MIN_DAYS = 3
+
+KIND_ACTUAL = 'actual'
+KIND_FORECAST = 'forecast'
+
+SEVERITY_BY_THRESHOLD = {50: 'info', 75: 'warning', 90: 'warning', 100: 'critical'}
+
+
+def linear_forecast(total: float, last_usage_date: Optional[str]) -> Optional[float]:
+    """Projeção do gasto no fim do mês pela média diária observada até agora"""
+    if not last_usage_date:
+        return None
+    usage_day = datetime.strptime(last_usage_date, '%Y-%m-%d')
+    if usage_day.day < FORECAST_MIN_DAYS:
+        return None
+    days_in_month = calendar.monthrange(usage_day.year, usage_day.month)[1]
+    return total / usage_day.day * days_in_month
+
+
+class BudgetAlertService:
+    """Avalia budgets ativos contra os totais do período e registra/entrega os alertas"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, alerts_db_path: str = DEFAULT_ALERTS_DB_PATH):
+        self.db_path = db_path
+        self.alerts_db_path = alerts_db_path
+        self._initialized = False
+        self._lock = threading.Lock()
+        # Serializa avaliações do mesmo usuário (worker de custos x requisições)
+        self._eval_lock = threading.Lock()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS budget_alert_state (
+                    budget_id INTEGER NOT NULL,
+                    period TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    threshold INTEGER NOT NULL,
+                    armed BOOLEAN NOT NULL DEFAULT 1,
+                    fire_count INTEGER NOT NULL DEFAULT 0,
+                    last_fired_at TIMESTAMP,
+                    last_ratio REAL,
+                    PRIMARY KEY (budget_id, period, kind, threshold)
+                )
+            ''')
+            conn.commit()
+            conn.close()
+
+            alerts_conn = sqlite3.connect(self.alerts_db_path, timeout=30)
+            alerts_conn.execute('''
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    resource_id TEXT,
+                    acknowledged BOOLEAN DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    acknowledged_at TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            alerts_conn.commit()
+            alerts_conn.close()
+            self._initialized = True
+
+    def on_costs_updated(self, user_id: int, periods: Dict[str, Dict[str, Any]]):
+        """Listener do cost_store: avalia apenas o período corrente, se ele mudou"""
+        totals = periods.get(current_period())
+        if totals:
+            self.evaluate(user_id, totals)
+
+    def evaluate_user(self, user_id: int) -> List[Dict[str, Any]]:
+        """Reavalia o período corrente a partir do total já armazenado (ex.: budget novo)"""
+        totals = cost_store.get_period_total(user_id)
+        if not totals:
+            return []
+        return self.evaluate(user_id, totals)
+
+    def evaluate(self, user_id: int, totals: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Compara o total do período com cada budget ativo do usuário
+        Custo O(budgets): um SELECT de budgets, um de estado e escrita só nas transições
+        """
+        self._ensure_schema()
+        period = totals['period']
+        spend = totals['total']
+        forecast = linear_forecast(spend, totals.get('last_usage_date'))
+
+        with self._eval_lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, budget_name, amount, alert_threshold_50, alert_threshold_75,
+                       alert_threshold_90, alert_threshold_100, webhook_url
+                FROM budget_configs
+                WHERE user_id = ? AND is_active = TRUE AND amount > 0
+            ''', (user_id,))
+            budgets = cursor.fetchall()
+            if not budgets:
+                conn.close()
+                return []
+
+            placeholders = ','.join('?' * len(budgets))
+            cursor.execute(f'''
+                SELECT budget_id, kind, threshold, armed FROM budget_alert_state
+                WHERE period = ? AND budget_id IN ({placeholders})
+            ''', [period] + [row[0] for row in budgets])
+            state = {(row[0], row[1], row[2]): bool(row[3]) for row in cursor.fetchall()}
+
+            fired = []
+            now = datetime.utcnow().isoformat()
+            for budget_id, name, amount, t50, t75, t90, t100, webhook_url in budgets:
+                enabled = dict(zip(THRESHOLDS, (t50, t75, t90, t100)))
+                checks = [(KIND_ACTUAL, threshold, spend / amount) for threshold in THRESHOLDS if enabled[threshold]]
+                if forecast is not None and enabled[100]:
+                    checks.append((KIND_FORECAST, 100, forecast / amount))
+
+                for kind, threshold, ratio in checks:
+                    key = (budget_id, kind, threshold)
+                    armed = state.get(key, True)
+                    limit = threshold / 100.0
+
+                    if armed and ratio >= limit:
+                        cursor.execute('''
+                            INSERT INTO budget_alert_state
+                                (budget_id, period, kind, threshold, armed, fire_count, last_fired_at, last_ratio)
+                            VALUES (?, ?, ?, ?, 0, 1, ?, ?)
+                            ON CONFLICT (budget_id, period, kind, threshold) DO UPDATE SET
+                                armed = 0, fire_count = fire_count + 1,
+                                last_fired_at = excluded.last_fired_at, last_ratio = excluded.last_ratio
+                        ''', (budget_id, period, kind, threshold, now, ratio))
+                        fired.append({
+                            'budget_id': budget_id,
+                            'budget_name': name,
+                            'amount': amount,
+                            'period': period,
+                            'kind': kind,
+                            'threshold': threshold,
+                            'spend': spend,
+                            'forecast': round(forecast, 2) if forecast is not None else None,
+                            'currency': totals.get('currency'),
+                            'webhook_url': webhook_url
+                        })
+                    elif not armed and ratio < limit - HYSTERESIS:
+                        cursor.execute('''
+                            UPDATE budget_alert_state SET armed = 1, last_ratio = ?
+                            WHERE budget_id = ? AND period = ? AND kind = ? AND threshold = ?
+                        ''', (ratio, budget_id, period, kind, threshold))
+
+            # Estado gravado antes de notificar: uma falha no envio não gera duplicatas
+            conn.commit()
+            conn.close()
+
+        for alert in fired:
+            self._notify(user_id, alert)
+        return fired
+
+    def _notify(self, user_id, alert):
+        currency = alert['currency'] or ''
+        if alert['kind'] == KIND_FORECAST:
+            title = f"Budget '{alert['budget_name']}' deve ser excedido"
+            message = (f"Previsão de {currency} {alert['forecast']:.2f} para {alert['period']} "
+                       f"ultrapassa o budget de {currency} {alert['amount']:.2f}")
+            severity = 'warning'
+        else:
+            title = f"Budget '{alert['budget_name']}' atingiu {alert['threshold']}%"
+            message = (f"Gasto de {currency} {alert['spend']:.2f} em {alert['period']} "
+                       f"({alert['threshold']}% de {currency} {alert['amount']:.2f})")
+            severity = SEVERITY_BY_THRESHOLD[alert['threshold']]
+        resource_id = f"budget:{alert['budget_id']}"
+
+        try:
+            conn = sqlite3.connect(self.alerts_db_path, timeout=30)
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO alerts (user_id, title, message, severity, category, resource_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, title, message, severity, 'budget', resource_id))
+            alert_id = cursor.lastrowid
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Erro ao registrar alerta de budget: {str(e)}")
+            return
+
+        event_bus.publish(user_id, TOPIC_ALERTS, {
+            'action': 'created',
+            'alert': {
+                'id': alert_id,
+                'title': title,
+                'message': message,
+                'severity': severity,
+                'category': 'budget',
+                'resource_id': resource_id
+            }
+        })
+
+        if alert['webhook_url']:
+            webhook_queue.enqueue(alert['webhook_url'], {
+                'event': 'budget.threshold_reached' if alert['kind'] == KIND_ACTUAL else 'budget.forecast_exceeded',
+                'alert_id': alert_id,
+                'budget_id': alert['budget_id'],
+                'budget_name': alert['budget_name'],
+                'period': alert['period'],
+                'threshold': alert['threshold'],
+                'amount': alert['amount'],
+                'spend': alert['spend'],
+                'forecast': alert['forecast'],
+                'currency': alert['currency'],
+                'message': message
+            }, user_id=user_id)
+
+    def list_alerts(self, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        """Alertas de budget mais recentes do usuário"""
+        self._ensure_schema()
+        conn = sqlite3.connect(self.alerts_db_path, timeout=30)
+        rows = conn.execute('''
+            SELECT id, title, message, severity, resource_id, acknowledged, created_at
+            FROM alerts WHERE user_id = ? AND category = 'budget'
+            ORDER BY id DESC LIMIT ?
+        ''', (user_id, limit)).fetchall()
+        conn.close()
+        return [{
+            'id': row[0],
+            'title': row[1],
+            'message': row[2],
+            'severity': row[3],
+            'budget_id': int(row[4].split(':', 1)[1]) if row[4] else None,
+            'acknowledged': bool(row[5]),
+            'created_at': row[6]
+        } for row in rows]
+
+
+# Instância global do serviço
+budget_alert_service = BudgetAlertService()
+cost_store.add_listener(budget_alert_service.on_costs_updated)
@@ -0,0 +1,171 @@
+"""
+Operações de lock em lote (criar, remover ou converter) em vários Resource Groups/recursos
+Recebe um ManagementLockClient já criado, independente de como as credenciais foram
+obtidas (rotas do app ou azure_actions_service), e gera os resultados item a item
+"""
+
+import json
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+from azure.core.exceptions import HttpResponseError
+from flask import Response, jsonify, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+# Limites para operações de lock em lote
+BULK_LOCK_OPERATIONS = ('create', 'remove', 'convert')
+BULK_MAX_TARGETS = 500
+BULK_DEFAULT_CONCURRENCY = 8
+BULK_MAX_CONCURRENCY = 16
+
+
+def validate_bulk_lock_request(operation: str, targets: List[Any]):
+    """Levanta ValueError para operação inválida ou lista de alvos vazia/grande demais"""
+    if operation not in BULK_LOCK_OPERATIONS:
+        raise ValueError(f'Operação inválida: {operation}. Use {", ".join(BULK_LOCK_OPERATIONS)}')
+    if not targets:
+        raise ValueError('Nenhum alvo informado')
+    if len(targets) > BULK_MAX_TARGETS:
+        raise ValueError(f'Máximo de {BULK_MAX_TARGETS} alvos por requisição')
+
+
+def resolve_lock_target(subscription_id: str, target: Any) -> Dict[str, str]:
+    """Normaliza um alvo de operação em lote (nome de RG, ID de recurso ou dicionário)"""
+    if isinstance(target, str):
+        target = {'resource_id': target} if target.startswith('/') else {'resource_group': target}
+
+    if target.get('resource_id'):
+        scope = target['resource_id'].rstrip('/')
+        return {'scope': scope, 'label': scope}
+
+    if target.get('resource_group'):
+        resource_group = target['resource_group']
+        return {
+            'scope': f'/subscriptions/{subscription_id}/resourceGroups/{resource_group}',
+            'label': resource_group
+        }
+
+    raise ValueError('Alvo deve conter "resource_group" ou "resource_id"')
+
+
+def apply_lock_operation(lock_client, operation: str, scope: str, lock_name: str,
+                         level: str, notes: Optional[str]) -> Dict[str, Any]:
+    """Executa uma operação de lock em um único escopo usando clientes já criados"""
+    if operation == 'create':
+        result = lock_client.management_locks.create_or_update_by_scope(
+            scope=scope,
+            lock_name=lock_name,
+            parameters={
+                'level': level,
+                'notes': notes or f"Lock criado pelo BOLT Dashboard - {datetime.utcnow().isoformat()}"
+            }
+        )
+        return {'lock_name': result.name, 'level': result.level, 'id': result.id}
+
+    if operation == 'remove':
+        lock_client.management_locks.delete_by_scope(scope=scope, lock_name=lock_name)
+        return {'lock_name': lock_name}
+
+    # convert: altera o nível de um lock existente preservando as notas
+    existing = lock_client.management_locks.get_by_scope(scope=scope, lock_name=lock_name)
+    if existing.level == level:
+        return {'lock_name': existing.name, 'level': existing.level, 'id': existing.id, 'unchanged': True}
+
+    result = lock_client.management_locks.create_or_update_by_scope(
+        scope=scope,
+        lock_name=lock_name,
+        parameters={'level': level, 'notes': notes or existing.notes}
+    )
+    return {'lock_name': result.name, 'level': result.level, 'previous_level': existing.level, 'id': result.id}
+
+
+def run_bulk_lock_operation(lock_client, subscription_id: str, operation: str, targets: List[Any],
+                            lock_name: str = "Prevent-Spending-BudgetControl", level: str = "CanNotDelete",
+                            notes: Optional[str] = None,
+                            max_concurrency: int = BULK_DEFAULT_CONCURRENCY) -> Iterator[Dict[str, Any]]:
+    """
+    Aplica a operação em todos os alvos com concorrência limitada, compartilhando o cliente
+    Os resultados são gerados conforme cada operação termina (campo index = posição do alvo)
+    """
+    workers = max(1, min(int(max_concurrency or BULK_DEFAULT_CONCURRENCY), BULK_MAX_CONCURRENCY, len(targets)))
+    logger.info(f"Operação '{operation}' de lock '{lock_name}' em {len(targets)} alvos ({workers} em paralelo)")
+
+    def run(index, target):
+        try:
+            resolved = resolve_lock_target(subscription_id, target)
+        except Exception as e:
+            return {'index': index, 'target': target, 'success': False, 'error': str(e)}
+
+        try:
+            details = apply_lock_operation(lock_client, operation, resolved['scope'], lock_name, level, notes)
+            return {'index': index, 'target': resolved['label'], 'scope': resolved['scope'],
+                    'success': True, **details}
+        except HttpResponseError as e:
+            if e.status_code == 404:
+                error = f'Escopo ou lock não encontrado: {resolved["label"]}'
+            elif e.status_code == 409:
+                error = f'Conflito ao aplicar lock em {resolved["label"]}'
+            else:
+                error = f'Erro HTTP {e.status_code}: {e.message}'
+            return {'index': index, 'target': resolved['label'], 'scope': resolved['scope'],
+                    'success': False, 'error': error}
+        except Exception as e:
+            return {'index': index, 'target': resolved['label'], 'scope': resolved['scope'],
+                    'success': False, 'error': str(e)}
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(run, index, target) for index, target in enumerate(targets)]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Se o consumidor desistir (ex.: cliente desconectou), não iniciar operações pendentes
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def bulk_lock_response(results: Iterator[Dict[str, Any]], operation: str, stream: bool = True):
+    """
+    Resposta HTTP de uma operação em lote: NDJSON (uma linha por item e um resumo) ou JSON
+    O primeiro item é obtido antes de responder, para que erros de validação/credenciais
+    (ValueError) virem 400 em vez de interromper o stream
+    """
+    try:
+        first = next(results, None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not stream:
+        items = ([first] if first else []) + list(results)
+        items.sort(key=lambda item: item['index'])
+        succeeded = sum(1 for item in items if item['success'])
+        return jsonify({
+            'success': succeeded == len(items),
+            'operation': operation,
+            'total': len(items),
+            'succeeded': succeeded,
+            'failed': len(items) - succeeded,
+            'results': items
+        }), 200
+
+    def generate():
+        total = succeeded = 0
+        for item in ([first] if first else []):
+            total += 1
+            succeeded += item['success']
+            yield json.dumps(item) + '\n'
+        for item in results:
+            total += 1
+            succeeded += item['success']
+            yield json.dumps(item) + '\n'
+        yield json.dumps({
+            'type': 'summary',
+            'operation': operation,
+            'total': total,
+            'succeeded': succeeded,
+            'failed': total - succeeded
+        }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
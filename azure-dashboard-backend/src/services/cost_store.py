@@ -0,0 +1,264 @@
+"""
+Armazenamento local de custos diários
+Recebe custos por dia (Cost Management), mantém incrementalmente o total acumulado
+de cada período e notifica os interessados (alertas de budget, stream do dashboard)
+apenas quando os valores mudam
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.services.event_bus import event_bus, TOPIC_COSTS
+from src.utils.arm_governor import arm_priority, PRIORITY_LOW
+from src.utils.azure_clients import azure_client_options
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bolt_dashboard.db')
+
+# Cost Management atualiza os dados algumas vezes ao dia
+SYNC_INTERVAL_SECONDS = float(os.environ.get('COST_SYNC_INTERVAL_SECONDS', '3600'))
+
+
+def period_of(usage_date: str) -> str:
+    """Período (mês de calendário) de uma data YYYY-MM-DD"""
+    return usage_date[:7]
+
+
+def current_period() -> str:
+    return datetime.utcnow().strftime('%Y-%m')
+
+
+def fetch_daily_costs(credential: Any, subscription_id: str) -> Tuple[Dict[str, float], str]:
+    """Custos diários do mês corrente de uma subscription: ({YYYY-MM-DD: valor}, moeda)"""
+    from azure.mgmt.costmanagement import CostManagementClient
+
+    client = CostManagementClient(credential, **azure_client_options(PRIORITY_LOW))
+    today = date.today()
+    query_definition = {
+        'type': 'ActualCost',
+        'timeframe': 'Custom',
+        'timePeriod': {
+            'from': today.replace(day=1).strftime('%Y-%m-%dT00:00:00Z'),
+            'to': today.strftime('%Y-%m-%dT23:59:59Z')
+        },
+        'dataset': {
+            'granularity': 'Daily',
+            'aggregation': {'totalCost': {'name': 'PreTaxCost', 'function': 'Sum'}}
+        }
+    }
+    with arm_priority(PRIORITY_LOW):
+        result = client.query.usage(f'/subscriptions/{subscription_id}', query_definition)
+
+    columns = [column.name.lower() for column in result.columns]
+    cost_index = next((i for i, name in enumerate(columns) if 'cost' in name), 0)
+    date_index = next((i for i, name in enumerate(columns) if 'date' in name), 1)
+    currency_index = next((i for i, name in enumerate(columns) if name == 'currency'), None)
+
+    daily = {}
+    currency = 'USD'
+    for row in result.rows:
+        raw_date = str(row[date_index])
+        usage_date = f'{raw_date[:4]}-{raw_date[4:6]}-{raw_date[6:8]}' if raw_date.isdigit() else raw_date[:10]
+        daily[usage_date] = daily.get(usage_date, 0.0) + float(row[cost_index] or 0)
+        if currency_index is not None and row[currency_index]:
+            currency = row[currency_index]
+    return daily, currency
+
+
+class CostStore:
+    """Custos diários por usuário com totais por período mantidos incrementalmente"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._worker = None
+        self._credential_factory = None
+        self._users_provider = None
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cost_daily (
+                    user_id INTEGER NOT NULL,
+                    subscription_id TEXT NOT NULL,
+                    usage_date TEXT NOT NULL,
+                    cost REAL NOT NULL,
+                    currency TEXT,
+                    updated_at TIMESTAMP,
+                    PRIMARY KEY (user_id, subscription_id, usage_date)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cost_period_totals (
+                    user_id INTEGER NOT NULL,
+                    period TEXT NOT NULL,
+                    total REAL NOT NULL DEFAULT 0,
+                    last_usage_date TEXT,
+                    currency TEXT,
+                    updated_at TIMESTAMP,
+                    PRIMARY KEY (user_id, period)
+                )
+            ''')
+            conn.commit()
+            conn.close()
+            self._initialized = True
+
+    def add_listener(self, listener: Callable[[int, Dict[str, Dict[str, Any]]], None]):
+        """listener(user_id, {período: totais}) é chamado após cada gravação com mudanças"""
+        self._listeners.append(listener)
+
+    def upsert_daily(self, user_id: int, subscription_id: str, rows: Iterable[Tuple[str, float]],
+                     currency: str = 'USD') -> Dict[str, Dict[str, Any]]:
+        """
+        Grava custos diários (YYYY-MM-DD, valor) e aplica somente a diferença aos totais
+        Retorna os períodos alterados com seus novos totais
+        """
+        self._ensure_schema()
+        now = datetime.utcnow().isoformat()
+        deltas = {}
+        last_dates = {}
+
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            for usage_date, cost in rows:
+                cost = round(float(cost or 0), 6)
+                cursor.execute('''
+                    SELECT cost FROM cost_daily WHERE user_id = ? AND subscription_id = ? AND usage_date = ?
+                ''', (user_id, subscription_id, usage_date))
+                row = cursor.fetchone()
+                previous = row[0] if row else 0.0
+                if row and abs(previous - cost) < 1e-9:
+                    continue
+
+                cursor.execute('''
+                    INSERT INTO cost_daily (user_id, subscription_id, usage_date, cost, currency, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id, subscription_id, usage_date)
+                    DO UPDATE SET cost = excluded.cost, currency = excluded.currency, updated_at = excluded.updated_at
+                ''', (user_id, subscription_id, usage_date, cost, currency, now))
+
+                period = period_of(usage_date)
+                deltas[period] = deltas.get(period, 0.0) + (cost - previous)
+                last_dates[period] = max(last_dates.get(period, usage_date), usage_date)
+
+            changed = {}
+            for period, delta in deltas.items():
+                cursor.execute('''
+                    INSERT INTO cost_period_totals (user_id, period, total, last_usage_date, currency, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id, period) DO UPDATE SET
+                        total = total + excluded.total,
+                        last_usage_date = MAX(COALESCE(last_usage_date, ''), excluded.last_usage_date),
+                        currency = excluded.currency,
+                        updated_at = excluded.updated_at
+                ''', (user_id, period, delta, last_dates[period], currency, now))
+                cursor.execute('''
+                    SELECT total, last_usage_date, currency FROM cost_period_totals WHERE user_id = ? AND period = ?
+                ''', (user_id, period))
+                total, last_usage_date, period_currency = cursor.fetchone()
+                changed[period] = {
+                    'period': period,
+                    'total': round(total, 2),
+                    'last_usage_date': last_usage_date,
+                    'currency': period_currency
+                }
+            conn.commit()
+        finally:
+            conn.close()
+
+        if changed:
+            event_bus.publish(user_id, TOPIC_COSTS, {'periods': list(changed.values())})
+            for listener in self._listeners:
+                try:
+                    listener(user_id, changed)
+                except Exception as e:
+                    logger.error(f"Erro ao notificar atualização de custos: {str(e)}")
+        return changed
+
+    def get_period_total(self, user_id: int, period: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Total acumulado do período (consulta de uma linha)"""
+        self._ensure_schema()
+        period = period or current_period()
+        conn = self._connect()
+        row = conn.execute('''
+            SELECT total, last_usage_date, currency FROM cost_period_totals WHERE user_id = ? AND period = ?
+        ''', (user_id, period)).fetchone()
+        conn.close()
+        if not row:
+            return None
+        return {'period': period, 'total': round(row[0], 2), 'last_usage_date': row[1], 'currency': row[2]}
+
+    def get_daily(self, user_id: int, start: str, end: str) -> List[Dict[str, Any]]:
+        """Custos diários somados entre subscriptions no intervalo [start, end]"""
+        self._ensure_schema()
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT usage_date, SUM(cost) FROM cost_daily
+            WHERE user_id = ? AND usage_date >= ? AND usage_date <= ?
+            GROUP BY usage_date ORDER BY usage_date
+        ''', (user_id, start, end)).fetchall()
+        conn.close()
+        return [{'date': row[0], 'cost': round(row[1], 2)} for row in rows]
+
+    # Sincronização com o Azure ---------------------------------------------
+
+    def sync_from_azure(self, user_id: int, credential: Any, subscription_id: str) -> Dict[str, Any]:
+        """Busca os custos diários do mês corrente no Cost Management e grava as diferenças"""
+        daily, currency = fetch_daily_costs(credential, subscription_id)
+        changed = self.upsert_daily(user_id, subscription_id, sorted(daily.items()), currency)
+        return {'success': True, 'days': len(daily), 'periods_changed': list(changed.keys())}
+
+    def start(self, credential_factory: Callable[[int], Any], users_provider: Callable[[], List[int]]):
+        """
+        Inicia a sincronização periódica em background
+        credential_factory(user_id) -> (credential, subscription_id) ou (None, None)
+        """
+        with self._lock:
+            self._credential_factory = credential_factory
+            self._users_provider = users_provider
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run_worker, name='cost-sync', daemon=True)
+            self._worker.start()
+
+    def sync_user(self, user_id: int) -> Dict[str, Any]:
+        if not self._credential_factory:
+            return {'success': False, 'error': 'Sincronização de custos não iniciada'}
+        credential, subscription_id = self._credential_factory(user_id)
+        if not credential:
+            return {'success': False, 'error': 'Credenciais Azure não configuradas'}
+        return self.sync_from_azure(user_id, credential, subscription_id)
+
+    def _run_worker(self):
+        while True:
+            try:
+                for user_id in self._users_provider():
+                    try:
+                        self.sync_user(user_id)
+                    except Exception as e:
+                        logger.error(f"Erro ao sincronizar custos do usuário {user_id}: {str(e)}")
+            except Exception as e:
+                logger.error(f"Erro no worker de custos: {str(e)}")
+            time.sleep(SYNC_INTERVAL_SECONDS)
+
+
+# Instância global do serviço
+cost_store = CostStore()
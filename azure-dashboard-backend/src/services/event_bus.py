@@ -0,0 +1,358 @@
+"""
+Barramento de eventos em processo (pub/sub) para o canal de push do dashboard
+Distribui deltas por usuário para todas as conexões SSE abertas, com buffer de
+replay para reconexões e descarte controlado para consumidores lentos. Com vários
+workers, os tópicos produzidos só no líder (custos, alertas, operações) e nas rotas
+são replicados aos demais processos por EventRelay
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import itertools
+import threading
+from collections import deque
+from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+# Tópicos publicados no stream do dashboard
+TOPIC_INVENTORY = 'inventory'
+TOPIC_COSTS = 'costs'
+TOPIC_ALERTS = 'alerts'
+TOPIC_SCHEDULES = 'schedules'
+TOPIC_OPERATIONS = 'operations'
+
+# Eventos pendentes por conexão antes de considerá-la lenta
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('EVENT_BUS_QUEUE_SIZE', '100'))
+# Eventos recentes mantidos por usuário para retomada via Last-Event-ID
+REPLAY_BUFFER_SIZE = int(os.environ.get('EVENT_BUS_REPLAY_SIZE', '200'))
+# Buffers de usuários sem conexões e sem eventos recentes são descartados (a reconexão
+# depois disso recebe resync); a varredura roda no máximo uma vez por REPLAY_SWEEP_SECONDS
+REPLAY_IDLE_SECONDS = float(os.environ.get('EVENT_BUS_REPLAY_IDLE_SECONDS', '900'))
+REPLAY_SWEEP_SECONDS = 60
+HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+RECONNECT_MILLISECONDS = 5000
+# Conexões SSE abertas por processo (0 = sem limite). Cada conexão ocupa uma thread
+# do servidor até fechar: com gthread o limite deve deixar threads livres para as
+# demais rotas (gunicorn.conf.py usa metade de GUNICORN_THREADS)
+MAX_CONNECTIONS = int(os.environ.get('SSE_MAX_CONNECTIONS', '0'))
+
+# Modo pré-fork: tópicos replicados entre workers por uma tabela SQLite que cada
+# processo acompanha. O inventário fica de fora: cada worker com assinantes o atualiza
+# a partir do SharedCache e publica localmente
+RELAYED_TOPICS = (TOPIC_COSTS, TOPIC_ALERTS, TOPIC_SCHEDULES, TOPIC_OPERATIONS)
+RELAY_POLL_SECONDS = float(os.environ.get('EVENT_RELAY_POLL_SECONDS', '1'))
+RELAY_RETENTION_SECONDS = 300
+
+# IDs de evento só são comparáveis dentro do mesmo processo
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def _json_default(value):
+    # Registros do inventário (src/models/resource.py) são Mappings
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def format_sse(event, data, event_id=None):
+    """Formata uma mensagem no protocolo text/event-stream"""
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=_json_default)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class StreamLimitReached(Exception):
+    """Limite de conexões SSE do processo atingido"""
+
+
+class Event:
+    """Evento publicado para um usuário"""
+
+    __slots__ = ('seq', 'user_id', 'topic', 'data', 'created_at')
+
+    def __init__(self, seq, user_id, topic, data):
+        self.seq = seq
+        self.user_id = user_id
+        self.topic = topic
+        self.data = data
+        self.created_at = time.time()
+
+    @property
+    def id(self):
+        return f'{_BOOT_ID}-{self.seq}'
+
+    def to_sse(self):
+        return format_sse(self.topic, self.data, self.id)
+
+
+class Subscription:
+    """Conexão de um cliente ao barramento, com fila limitada de eventos pendentes"""
+
+    def __init__(self, bus, user_id, topics=None, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        self.bus = bus
+        self.user_id = user_id
+        self.topics = set(topics) if topics else None
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.closed = False
+        self._queue = deque()
+        self._resync = False
+        self._condition = threading.Condition()
+
+    def wants(self, topic):
+        return self.topics is None or topic in self.topics
+
+    def offer(self, event):
+        """Entrega não bloqueante chamada pelo publicador"""
+        with self._condition:
+            if self.closed:
+                return
+            if len(self._queue) >= self.max_queue:
+                # Consumidor lento: deltas antigos perdem valor, o cliente recarrega o estado completo
+                self.dropped += len(self._queue)
+                self._queue.clear()
+                self._resync = True
+            self._queue.append(event)
+            self._condition.notify()
+
+    def request_resync(self):
+        with self._condition:
+            self._resync = True
+            self._condition.notify()
+
+    def get(self, timeout):
+        """Aguarda até timeout e retorna (eventos pendentes, precisa_resync)"""
+        with self._condition:
+            if not self._queue and not self._resync and not self.closed:
+                self._condition.wait(timeout)
+            events = list(self._queue)
+            self._queue.clear()
+            resync, self._resync = self._resync, False
+            return events, resync
+
+    def close(self):
+        with self._condition:
+            if self.closed:
+                return
+            self.closed = True
+            self._condition.notify_all()
+        self.bus.unsubscribe(self)
+
+
+class EventRelay:
+    """
+    Replica eventos entre os processos do gunicorn: cada publicação local é gravada
+    na tabela e os demais processos a leem em polling e entregam aos seus assinantes
+    """
+
+    def __init__(self, bus, db_path):
+        self.bus = bus
+        self.db_path = db_path
+        self.pid = os.getpid()
+        self._thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS relayed_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin_pid INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        # Eventos anteriores à entrada deste processo não são reenviados
+        last_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM relayed_events').fetchone()[0]
+        conn.close()
+        self._thread = threading.Thread(target=self._run, args=(last_seq,), name='event-relay', daemon=True)
+        self._thread.start()
+
+    def append(self, user_id, topic, data):
+        try:
+            conn = self._connect()
+            conn.execute('''
+                INSERT INTO relayed_events (origin_pid, user_id, topic, data, created_at) VALUES (?, ?, ?, ?, ?)
+            ''', (self.pid, user_id, topic, json.dumps(data, default=_json_default), time.time()))
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao replicar evento {topic} para os demais workers: {str(e)}")
+
+    def _run(self, last_seq):
+        last_cleanup = time.monotonic()
+        while True:
+            time.sleep(RELAY_POLL_SECONDS)
+            try:
+                conn = self._connect()
+                rows = conn.execute('''
+                    SELECT seq, origin_pid, user_id, topic, data FROM relayed_events WHERE seq > ? ORDER BY seq
+                ''', (last_seq,)).fetchall()
+                if time.monotonic() - last_cleanup > RELAY_RETENTION_SECONDS:
+                    conn.execute('DELETE FROM relayed_events WHERE created_at < ?',
+                                 (time.time() - RELAY_RETENTION_SECONDS,))
+                    conn.commit()
+                    last_cleanup = time.monotonic()
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao ler eventos replicados: {str(e)}")
+                continue
+            for seq, origin_pid, user_id, topic, data in rows:
+                last_seq = seq
+                if origin_pid != self.pid and self.bus.has_subscribers(user_id):
+                    self.bus.deliver(user_id, topic, json.loads(data))
+
+
+class EventBus:
+    """Pub/sub em processo com fan-out por usuário"""
+
+    def __init__(self, replay_size=REPLAY_BUFFER_SIZE, max_connections=MAX_CONNECTIONS):
+        self.replay_size = replay_size
+        self.max_connections = max_connections
+        self._connections = 0
+        self._subscribers = {}  # user_id -> set(Subscription)
+        self._replay = {}  # user_id -> deque(Event)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._relay = None
+        self._last_sweep = time.monotonic()
+
+    def subscribe(self, user_id, topics=None, last_event_id=None):
+        """
+        Registra uma conexão; com last_event_id, reenvia o que foi perdido ou pede resync
+        Levanta StreamLimitReached quando o processo já tem max_connections conexões
+        """
+        subscription = Subscription(self, user_id, topics)
+        with self._lock:
+            if self.max_connections and self._connections >= self.max_connections:
+                raise StreamLimitReached(f'Limite de {self.max_connections} conexões de stream atingido')
+            self._connections += 1
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            replay = list(self._replay.get(user_id, ()))
+
+        if last_event_id:
+            missed = self._events_after(replay, last_event_id)
+            if missed is None:
+                subscription.request_resync()
+            else:
+                for event in missed:
+                    if subscription.wants(event.topic):
+                        subscription.offer(event)
+        return subscription
+
+    def _events_after(self, replay, last_event_id):
+        boot_id, _, seq = last_event_id.partition('-')
+        if boot_id != _BOOT_ID or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if replay and replay[0].seq > seq + 1:
+            return None  # buffer já descartou eventos que o cliente não viu
+        return [event for event in replay if event.seq > seq]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._connections -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def enable_relay(self, db_path):
+        """Replica os RELAYED_TOPICS entre processos (chamado em cada worker após o fork)"""
+        if self._relay is not None and self._relay.pid == os.getpid():
+            return
+        self._relay = EventRelay(self, db_path)
+        self._relay.start()
+
+    def publish(self, user_id, topic, data):
+        """Publica um evento para todas as conexões do usuário (nunca bloqueia o publicador)"""
+        if self._relay is not None and topic in RELAYED_TOPICS:
+            self._relay.append(user_id, topic, data)
+        return self.deliver(user_id, topic, data)
+
+    def deliver(self, user_id, topic, data):
+        """Entrega às conexões deste processo"""
+        event = Event(next(self._seq), user_id, topic, data)
+        with self._lock:
+            replay = self._replay.get(user_id)
+            if replay is None:
+                replay = self._replay[user_id] = deque(maxlen=self.replay_size)
+            replay.append(event)
+            subscribers = list(self._subscribers.get(user_id, ()))
+            if time.monotonic() - self._last_sweep > REPLAY_SWEEP_SECONDS:
+                self._evict_idle_replay()
+
+        for subscription in subscribers:
+            if subscription.wants(topic):
+                subscription.offer(event)
+        return event
+
+    def _evict_idle_replay(self):
+        """Remove buffers de replay de usuários sem conexões cujo último evento é antigo (com _lock)"""
+        self._last_sweep = time.monotonic()
+        cutoff = time.time() - REPLAY_IDLE_SECONDS
+        idle = [user_id for user_id, replay in self._replay.items()
+                if user_id not in self._subscribers and (not replay or replay[-1].created_at < cutoff)]
+        for user_id in idle:
+            del self._replay[user_id]
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return bool(self._subscribers.get(user_id))
+
+    def subscribed_users(self):
+        with self._lock:
+            return list(self._subscribers.keys())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._subscribers),
+                'replay_buffers': len(self._replay),
+                'connections': self._connections,
+                'max_connections': self.max_connections
+            }
+
+
+def sse_stream(subscription, snapshot=None, heartbeat=HEARTBEAT_SECONDS):
+    """
+    Gerador text/event-stream para uma inscrição
+    Envia o snapshot inicial, depois apenas deltas; comentários de heartbeat mantêm
+    proxies abertos e detectam clientes desconectados
+    """
+    try:
+        yield f'retry: {RECONNECT_MILLISECONDS}\n\n'
+        if snapshot is not None:
+            yield format_sse('snapshot', snapshot)
+
+        while not subscription.closed:
+            events, resync = subscription.get(heartbeat)
+            if resync:
+                yield format_sse('resync', {'reason': 'events_dropped', 'dropped': subscription.dropped})
+            for event in events:
+                yield event.to_sse()
+            if not events and not resync:
+                yield ': keep-alive\n\n'
+    finally:
+        subscription.close()
+
+
+# Instância global do serviço
+event_bus = EventBus()
@@ -0,0 +1,357 @@
+"""
+Snapshot de inventário Azure por usuário
+Mantém em memória a última listagem de recursos e resource groups, serve as
+consultas do dashboard a partir dela e publica no barramento apenas o que mudou
+entre duas atualizações. O snapshot é publicado no cache compartilhado em formato
+binário colunar (src/utils/snapshot_format.py): com vários workers só um processo
+lista o ARM por usuário e os demais leem o mesmo arquivo mapeado; após um restart o
+arquivo é servido de imediato enquanto uma nova listagem roda em background. Snapshots
+e arquivos são da subscription do cliente: trocar as credenciais não serve o inventário
+da subscription anterior
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.services.event_bus import event_bus, TOPIC_INVENTORY
+from src.services.shared_cache import shared_cache
+from src.models.resource import Resource
+from src.utils.inventory_index import InventoryIndex
+from src.utils.search_index import SearchIndex
+from src.utils.snapshot_format import encode_inventory, InventoryView, SnapshotFormatError
+from src.utils.arm_governor import arm_priority, PRIORITY_LOW
+
+logger = logging.getLogger(__name__)
+
+# Idade máxima do snapshot servido às consultas antes de nova listagem no ARM
+INVENTORY_MAX_AGE_SECONDS = float(os.environ.get('INVENTORY_MAX_AGE_SECONDS', '60'))
+# Intervalo de atualização em background para usuários com dashboard aberto
+INVENTORY_REFRESH_SECONDS = float(os.environ.get('INVENTORY_REFRESH_SECONDS', '60'))
+# Idade máxima de um snapshot restaurado do disco servido enquanto a nova listagem roda
+INVENTORY_RESTORE_MAX_AGE_SECONDS = float(os.environ.get('INVENTORY_RESTORE_MAX_AGE_SECONDS', '86400'))
+
+
+class InventorySnapshot:
+    """Inventário de um usuário em um instante"""
+
+    def __init__(self, version, resources, resource_groups, taken_at=None, subscription_id=''):
+        self.version = version
+        self.subscription_id = subscription_id
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self.resources = resources  # id (minúsculo) -> Resource (ou view do arquivo)
+        self.resource_groups = resource_groups  # nome -> dict do resource group
+        # Carregado do arquivo antes de qualquer listagem neste processo (ex.: após restart)
+        self.restored = False
+        self._sorted_ids = None
+        self._index = None
+        self._search = None
+
+    @property
+    def age(self):
+        return time.time() - self.taken_at
+
+    def sorted_ids(self):
+        """Ids em ordem estável para paginação (calculado uma vez por snapshot)"""
+        if self._sorted_ids is None:
+            if hasattr(self.resources, 'sorted_keys'):
+                self._sorted_ids = self.resources.sorted_keys()  # view binária já ordenada
+            else:
+                self._sorted_ids = sorted(self.resources)
+        return self._sorted_ids
+
+    def index(self):
+        """Índice invertido de tags/tipo/região/RG (montado uma vez por snapshot)"""
+        if self._index is None:
+            self._index = InventoryIndex(self.sorted_ids(), self.resources)
+        return self._index
+
+    def search_index(self):
+        """Índice de busca por nome/RG/tag (montado na primeira busca, depois herdado)"""
+        if self._search is None:
+            self._search = SearchIndex(self.resources)
+        return self._search
+
+    def inherit_search_index(self, previous, delta):
+        """Reaproveita o índice de busca do snapshot anterior aplicando só o delta"""
+        if previous is not None and previous._search is not None and self._search is None:
+            self._search = previous._search.apply_delta(previous.resources, delta)
+
+    def select(self, node=None):
+        """Ids (ordenados) que satisfazem o filtro de inventory_index.filter_from_args"""
+        if node is None:
+            return self.sorted_ids()
+        index = self.index()
+        return index.select(index.evaluate(node))
+
+    def summary(self):
+        return {
+            'version': self.version,
+            'taken_at': self.taken_at,
+            'total_resources': len(self.resources),
+            'resource_groups': len(self.resource_groups)
+        }
+
+
+def _as_dict(mapping):
+    # Views binárias são materializadas uma vez (leitura sequencial) em vez de buscas por chave
+    return mapping if isinstance(mapping, dict) else dict(mapping.items())
+
+
+def diff_snapshots(old: Optional[InventorySnapshot], new: InventorySnapshot) -> Dict[str, Any]:
+    """Calcula o delta entre dois snapshots (recursos e resource groups)"""
+    old_resources = _as_dict(old.resources) if old else {}
+    old_groups = _as_dict(old.resource_groups) if old else {}
+    new_resources = _as_dict(new.resources)
+
+    added = [new_resources[key] for key in new_resources.keys() - old_resources.keys()]
+    removed = [old_resources[key]['id'] for key in old_resources.keys() - new_resources.keys()]
+    changed = [
+        resource for key, resource in new_resources.items()
+        if key in old_resources and old_resources[key] != resource
+    ]
+
+    return {
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'resource_groups_added': sorted(new.resource_groups.keys() - old_groups.keys()),
+        'resource_groups_removed': sorted(old_groups.keys() - new.resource_groups.keys())
+    }
+
+
+def delta_is_empty(delta):
+    return not any(delta.values())
+
+
+def subscription_of(resource_client) -> str:
+    """Subscription (minúsculas) do ResourceManagementClient que lista o inventário"""
+    config = getattr(resource_client, '_config', None)
+    return (getattr(config, 'subscription_id', None) or '').lower()
+
+
+def _shared_key(user_id, subscription_id):
+    return f'{user_id}-{subscription_id}'
+
+
+class InventoryService:
+    """Cache de inventário por usuário com publicação de deltas"""
+
+    def __init__(self, max_age: float = INVENTORY_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._snapshots = {}  # user_id -> InventorySnapshot
+        self._user_locks = {}  # user_id -> Lock (coalesce listagens simultâneas)
+        self._lock = threading.Lock()
+        self._client_factory = None
+        self._refresher_thread = None
+        self._background_refreshes = set()
+
+    def _user_lock(self, user_id):
+        with self._lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = self._user_locks[user_id] = threading.Lock()
+            return lock
+
+    def peek(self, user_id: int) -> Optional[InventorySnapshot]:
+        """Snapshot atual sem acessar o Azure (pode estar desatualizado)"""
+        return self._snapshots.get(user_id)
+
+    def _local(self, user_id, subscription_id):
+        """Snapshot em memória, desde que seja da subscription informada"""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is not None and snapshot.subscription_id == subscription_id:
+            return snapshot
+        return None
+
+    def get_snapshot(self, user_id: int, resource_client: Any,
+                     max_age: Optional[float] = None) -> InventorySnapshot:
+        """Retorna o snapshot se recente o bastante, senão lista novamente no ARM"""
+        max_age = self.max_age if max_age is None else max_age
+        subscription_id = subscription_of(resource_client)
+        # Com cache compartilhado, confere a versão publicada (um stat) para ver
+        # atualizações e invalidações feitas por outros workers
+        snapshot = self._adopt_shared(user_id, subscription_id, load=False)
+        if snapshot and snapshot.age <= max_age:
+            return snapshot
+
+        with self._user_lock(user_id):
+            # Outra requisição (ou outro worker) pode ter atualizado enquanto aguardávamos
+            snapshot = self._adopt_shared(user_id, subscription_id)
+            if snapshot and snapshot.age <= max_age:
+                return snapshot
+            if snapshot and snapshot.restored and snapshot.age <= INVENTORY_RESTORE_MAX_AGE_SECONDS:
+                # Início a quente: serve o arquivo e lista o ARM em background
+                self._refresh_in_background(user_id, resource_client, max_age)
+                return snapshot
+            return self._refresh_if_stale_locked(user_id, resource_client, max_age)
+
+    def _refresh_if_stale_locked(self, user_id, resource_client, max_age):
+        subscription_id = subscription_of(resource_client)
+        if not shared_cache.enabled:
+            return self._refresh_locked(user_id, resource_client)
+        with shared_cache.exclusive('inventory', _shared_key(user_id, subscription_id)):
+            snapshot = self._adopt_shared(user_id, subscription_id)
+            if snapshot and snapshot.age <= max_age:
+                return snapshot
+            return self._refresh_locked(user_id, resource_client)
+
+    def _refresh_in_background(self, user_id, resource_client, max_age):
+        with self._lock:
+            if user_id in self._background_refreshes:
+                return
+            self._background_refreshes.add(user_id)
+
+        def run():
+            try:
+                with self._user_lock(user_id):
+                    self._refresh_if_stale_locked(user_id, resource_client, max_age)
+            except Exception as e:
+                logger.error(f"Erro ao atualizar inventário restaurado do usuário {user_id}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._background_refreshes.discard(user_id)
+
+        threading.Thread(target=run, name=f'inventory-restore-{user_id}', daemon=True).start()
+
+    def refresh(self, user_id: int, resource_client: Any) -> InventorySnapshot:
+        """Força nova listagem e publica o delta em relação ao snapshot anterior"""
+        subscription_id = subscription_of(resource_client)
+        with self._user_lock(user_id):
+            if not shared_cache.enabled:
+                return self._refresh_locked(user_id, resource_client)
+            with shared_cache.exclusive('inventory', _shared_key(user_id, subscription_id)):
+                self._adopt_shared(user_id, subscription_id)
+                return self._refresh_locked(user_id, resource_client)
+
+    def _adopt_shared(self, user_id, subscription_id, load=True):
+        """
+        Atualiza o snapshot local a partir do publicado por outro worker
+        Uma versão nova é carregada (e seu delta publicado aos assinantes deste processo);
+        a mesma versão só renova o instante da última listagem. Com load=False (fora do
+        lock do usuário) retorna None quando há versão nova a carregar
+        """
+        local = self._local(user_id, subscription_id)
+        if not shared_cache.enabled:
+            return local
+        entry = shared_cache.read('inventory', _shared_key(user_id, subscription_id))
+        if entry is None:
+            return local
+        if local is not None and entry.version <= local.version:
+            if entry.version == local.version:
+                local.taken_at = entry.taken_at
+            return local
+        if not load:
+            return None
+
+        try:
+            view = InventoryView(entry.body)
+        except SnapshotFormatError as e:
+            logger.warning(f"Ignorando snapshot de inventário do usuário {user_id}: {str(e)}")
+            return local
+        snapshot = InventorySnapshot(entry.version, view.resources, view.resource_groups, entry.taken_at,
+                                     subscription_id)
+        snapshot.restored = local is None
+        if local is not None:
+            delta = diff_snapshots(local, snapshot)
+            snapshot.inherit_search_index(local, delta)
+        self._snapshots[user_id] = snapshot
+        if local is not None:
+            event_bus.publish(user_id, TOPIC_INVENTORY, {**snapshot.summary(), 'delta': delta})
+        return snapshot
+
+    def _publish_shared(self, user_id, snapshot):
+        """Grava o snapshot binário e passa a servi-lo do arquivo mapeado, liberando os dicts"""
+        if not shared_cache.enabled:
+            return
+        key = _shared_key(user_id, snapshot.subscription_id)
+        body = encode_inventory(snapshot.resources, snapshot.resource_groups)
+        shared_cache.publish('inventory', key, snapshot.version, body, snapshot.taken_at)
+        entry = shared_cache.read('inventory', key)
+        if entry is not None and entry.version == snapshot.version:
+            view = InventoryView(entry.body)
+            snapshot.resources = view.resources
+            snapshot.resource_groups = view.resource_groups
+
+    def _refresh_locked(self, user_id, resource_client):
+        subscription_id = subscription_of(resource_client)
+        with arm_priority(PRIORITY_LOW):
+            resource_groups = {
+                rg.name: {'name': rg.name, 'location': rg.location, 'tags': rg.tags or {}}
+                for rg in resource_client.resource_groups.list()
+            }
+            resources = {
+                resource.id.lower(): Resource.from_azure(resource)
+                for resource in resource_client.resources.list()
+            }
+
+        previous = self._local(user_id, subscription_id)
+        snapshot = InventorySnapshot((previous.version + 1) if previous else 1, resources, resource_groups,
+                                     subscription_id=subscription_id)
+
+        delta = diff_snapshots(previous, snapshot)
+        snapshot.inherit_search_index(previous, delta)
+        if previous is not None and delta_is_empty(delta):
+            # Nada mudou: mantém a versão para não gerar eventos nem invalidar caches derivados
+            snapshot.version = previous.version
+            self._snapshots[user_id] = snapshot
+            self._publish_shared(user_id, snapshot)
+            return snapshot
+
+        self._snapshots[user_id] = snapshot
+        self._publish_shared(user_id, snapshot)
+        if previous is not None:
+            event_bus.publish(user_id, TOPIC_INVENTORY, {**snapshot.summary(), 'delta': delta})
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        """Marca o snapshot como vencido (ex.: após criar/remover recursos)"""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot:
+            snapshot.taken_at = 0
+        if shared_cache.enabled:
+            for key in shared_cache.keys('inventory', _shared_key(user_id, '')):
+                shared_cache.expire('inventory', key)
+
+    def forget(self, user_id: int):
+        """Descarta os snapshots do usuário, em memória e em disco (ex.: troca de credenciais)"""
+        with self._user_lock(user_id):
+            self._snapshots.pop(user_id, None)
+            if shared_cache.enabled:
+                for key in shared_cache.keys('inventory', _shared_key(user_id, '')):
+                    shared_cache.remove('inventory', key)
+
+    def watch(self, client_factory: Callable[[int], Any]):
+        """
+        Inicia a atualização periódica para usuários com conexões SSE abertas
+        client_factory(user_id) deve retornar um ResourceManagementClient ou None
+        """
+        with self._lock:
+            self._client_factory = client_factory
+            if self._refresher_thread is not None:
+                return
+            self._refresher_thread = threading.Thread(
+                target=self._run_refresher, name='inventory-refresher', daemon=True
+            )
+            self._refresher_thread.start()
+
+    def _run_refresher(self):
+        while True:
+            time.sleep(INVENTORY_REFRESH_SECONDS)
+            for user_id in event_bus.subscribed_users():
+                snapshot = self._snapshots.get(user_id)
+                if snapshot and snapshot.age < INVENTORY_REFRESH_SECONDS:
+                    continue  # já atualizado por uma consulta recente
+                try:
+                    resource_client = self._client_factory(user_id)
+                    if resource_client:
+                        # Reaproveita a listagem de outro worker com assinantes do mesmo usuário
+                        self.get_snapshot(user_id, resource_client, max_age=INVENTORY_REFRESH_SECONDS)
+                except Exception as e:
+                    logger.error(f"Erro ao atualizar inventário do usuário {user_id}: {str(e)}")
+
+
+# Instância global do serviço
+inventory_service = InventoryService()
@@ -0,0 +1,484 @@
+"""
+Coleta de métricas de utilização do Azure Monitor
+Lista VMs, storage accounts e bancos SQL da subscription e busca CPU, memória,
+disco e rede em lote: a consulta multi-recurso do Monitor (escopo de subscription,
+por região e namespace) cobre até METRICS_BATCH_SIZE recursos por chamada, em vez de
+uma chamada por recurso. Os pontos chegam em granularidade de 1 hora e são gravados
+direto na camada 1h do timeseries_store; a rota de utilização lê só o banco local
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from src.services.timeseries_store import timeseries_store
+from src.utils.arm_governor import arm_priority, PRIORITY_LOW
+from src.utils.arm_ids import parse_arm_id
+from src.utils.azure_clients import azure_client_options
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_INTERVAL_SECONDS = float(os.environ.get('METRICS_COLLECTION_INTERVAL_SECONDS', '3600'))
+# Recursos por consulta multi-recurso (mesma região e namespace)
+METRICS_BATCH_SIZE = int(os.environ.get('METRICS_BATCH_SIZE', '50'))
+# Histórico buscado na primeira coleta de um usuário e janela máxima por execução
+METRICS_BACKFILL_HOURS = int(os.environ.get('METRICS_BACKFILL_HOURS', '72'))
+METRICS_MAX_WINDOW_HOURS = int(os.environ.get('METRICS_MAX_WINDOW_HOURS', '168'))
+
+METRICS_TIER = '1h'
+HOUR = 3600
+
+VM_TYPE = 'Microsoft.Compute/virtualMachines'
+STORAGE_TYPE = 'Microsoft.Storage/storageAccounts'
+SQL_DATABASE_TYPE = 'Microsoft.Sql/servers/databases'
+
+# Tipo de recurso -> [(métrica do Monitor, metric_type local, agregação)]
+# 'average' grava média/mín/máx da hora; 'total' grava o total da hora
+COLLECTED_METRICS = {
+    VM_TYPE: [
+        ('Percentage CPU', 'vm.cpu_percent', 'average'),
+        ('Available Memory Bytes', 'vm.memory_available_bytes', 'average'),
+        ('Disk Read Bytes', 'vm.disk_read_bytes', 'total'),
+        ('Disk Write Bytes', 'vm.disk_write_bytes', 'total'),
+        ('Network In Total', 'vm.network_in_bytes', 'total'),
+        ('Network Out Total', 'vm.network_out_bytes', 'total'),
+    ],
+    STORAGE_TYPE: [
+        ('UsedCapacity', 'storage.used_bytes', 'average'),
+        ('Transactions', 'storage.transactions', 'total'),
+        ('Ingress', 'storage.ingress_bytes', 'total'),
+        ('Egress', 'storage.egress_bytes', 'total'),
+    ],
+    SQL_DATABASE_TYPE: [
+        ('cpu_percent', 'sql.cpu_percent', 'average'),
+        ('dtu_consumption_percent', 'sql.dtu_percent', 'average'),
+        ('storage_percent', 'sql.storage_percent', 'average'),
+        ('physical_data_read_percent', 'sql.data_io_percent', 'average'),
+    ],
+}
+
+# Faixas de CPU (%) usadas na classificação de utilização
+UNDERUTILIZED_CPU_AVG = 20.0
+UNDERUTILIZED_CPU_MAX = 50.0
+OVERUTILIZED_CPU_AVG = 80.0
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _normalize_region(location):
+    return (location or '').replace(' ', '').lower()
+
+
+def list_monitored_resources(credential: Any, subscription_id: str) -> List[Dict[str, Any]]:
+    """VMs (com tamanho), storage accounts e bancos SQL da subscription"""
+    from azure.mgmt.resource import ResourceManagementClient
+    from azure.mgmt.compute import ComputeManagementClient
+
+    resource_client = ResourceManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_LOW))
+    compute_client = ComputeManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_LOW))
+    type_filter = ' or '.join(f"resourceType eq '{resource_type}'" for resource_type in COLLECTED_METRICS)
+
+    with arm_priority(PRIORITY_LOW):
+        vm_sizes = {
+            vm.id.lower(): vm.hardware_profile.vm_size if vm.hardware_profile else None
+            for vm in compute_client.virtual_machines.list_all()
+        }
+        generic = list(resource_client.resources.list(filter=type_filter))
+
+    resources = []
+    for resource in generic:
+        key = resource.id.lower()
+        if resource.type == VM_TYPE:
+            sku = vm_sizes.get(key)
+        else:
+            sku = resource.sku.name if resource.sku else None
+        resources.append({
+            'id': resource.id,
+            'name': resource.name,
+            'type': resource.type,
+            'resource_group': parse_arm_id(resource.id).resource_group,
+            'location': _normalize_region(resource.location),
+            'sku': sku
+        })
+    return resources
+
+
+def plan_batches(resources: List[Dict[str, Any]], batch_size: int = METRICS_BATCH_SIZE):
+    """Agrupa os recursos por (região, tipo) em lotes de até batch_size ids"""
+    groups = {}
+    for resource in resources:
+        if resource['type'] in COLLECTED_METRICS:
+            groups.setdefault((resource['location'], resource['type']), []).append(resource['id'])
+    batches = []
+    for (location, resource_type), ids in sorted(groups.items()):
+        for index in range(0, len(ids), batch_size):
+            batches.append((location, resource_type, ids[index:index + batch_size]))
+    return batches
+
+
+def fetch_metrics_batch(monitor_client: Any, location: str, resource_type: str, resource_ids: List[str],
+                        start: float, end: float) -> Dict[str, List[tuple]]:
+    """
+    Uma consulta multi-recurso do Monitor para o lote
+    Retorna {metric_type: [(series, bucket_start, count, sum, min, max)]}, série = id em minúsculas
+    """
+    from azure.mgmt.monitor.models import SubscriptionScopeMetricsRequestBodyParameters
+
+    definitions = COLLECTED_METRICS[resource_type]
+    by_name = {azure_name.lower(): (metric_type, aggregation) for azure_name, metric_type, aggregation in definitions}
+    body = SubscriptionScopeMetricsRequestBodyParameters(
+        timespan=f'{_iso(start)}/{_iso(end)}',
+        interval='PT1H',
+        metric_names=','.join(azure_name for azure_name, _, _ in definitions),
+        aggregation='average,minimum,maximum,total',
+        metric_namespace=resource_type,
+        filter=' or '.join(f"Microsoft.ResourceId eq '{resource_id}'" for resource_id in resource_ids),
+        top=len(resource_ids),
+        auto_adjust_timegrain=True,
+        validate_dimensions=False
+    )
+    with arm_priority(PRIORITY_LOW):
+        response = monitor_client.metrics.list_at_subscription_scope_post(region=location, body=body)
+
+    results = {}
+    for metric in response.value or []:
+        definition = by_name.get((metric.name.value or '').lower())
+        if definition is None:
+            continue
+        metric_type, aggregation = definition
+        rows = results.setdefault(metric_type, [])
+        for series in metric.timeseries or []:
+            resource_id = next(
+                (item.value for item in series.metadatavalues or []
+                 if (item.name.value or '').lower() == 'microsoft.resourceid'),
+                None
+            )
+            if not resource_id:
+                continue
+            resource_key = resource_id.lower()
+            for point in series.data or []:
+                bucket_start = (int(point.time_stamp.timestamp()) // HOUR) * HOUR
+                if aggregation == 'total':
+                    if point.total is None:
+                        continue
+                    rows.append((resource_key, bucket_start, 1, point.total, point.total, point.total))
+                else:
+                    if point.average is None:
+                        continue
+                    minimum = point.minimum if point.minimum is not None else point.average
+                    maximum = point.maximum if point.maximum is not None else point.average
+                    rows.append((resource_key, bucket_start, 1, point.average, minimum, maximum))
+    return results
+
+
+class MetricsCollector:
+    """Coleta agendada de métricas em lote e leitura de utilização a partir do banco local"""
+
+    def __init__(self, store=timeseries_store):
+        self.store = store
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._worker = None
+        self._credential_factory = None
+        self._users_provider = None
+        self._listeners = []
+
+    def _connect(self):
+        return sqlite3.connect(self.store.db_path, timeout=30)
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            cursor = conn.cursor()
+            # Catálogo dos recursos monitorados (nome, RG, região e SKU para a rota de utilização)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metrics_resources (
+                    user_id INTEGER NOT NULL,
+                    resource_id TEXT NOT NULL,
+                    resource_type TEXT NOT NULL,
+                    name TEXT,
+                    resource_group TEXT,
+                    location TEXT,
+                    sku TEXT,
+                    updated_at INTEGER,
+                    PRIMARY KEY (user_id, resource_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metrics_collection_state (
+                    user_id INTEGER NOT NULL,
+                    subscription_id TEXT NOT NULL,
+                    collected_until INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, subscription_id)
+                )
+            ''')
+            conn.commit()
+            conn.close()
+            self._initialized = True
+
+    def add_listener(self, listener: Callable[[int, Dict[str, Any]], None]):
+        """listener(user_id, resultado da coleta) é chamado após cada coleta que gravou pontos"""
+        self._listeners.append(listener)
+
+    def _save_catalog(self, user_id, subscription_id, resources, now):
+        conn = self._connect()
+        conn.executemany('''
+            INSERT OR REPLACE INTO metrics_resources
+                (user_id, resource_id, resource_type, name, resource_group, location, sku, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(user_id, resource['id'].lower(), resource['type'], resource['name'], resource['resource_group'],
+               resource['location'], resource['sku'], now) for resource in resources])
+        # Recursos removidos da subscription saem do catálogo (as séries expiram pela retenção)
+        conn.execute('''
+            DELETE FROM metrics_resources
+            WHERE user_id = ? AND resource_id LIKE ? AND updated_at < ?
+        ''', (user_id, f'/subscriptions/{subscription_id.lower()}/%', now))
+        # A coleta é de uma subscription por usuário: ao trocar de subscription, o catálogo
+        # e a marca d'água da anterior sairiam da utilização e travariam collected_until
+        conn.execute('''
+            DELETE FROM metrics_resources WHERE user_id = ? AND resource_id NOT LIKE ?
+        ''', (user_id, f'/subscriptions/{subscription_id.lower()}/%'))
+        conn.execute('''
+            DELETE FROM metrics_collection_state WHERE user_id = ? AND lower(subscription_id) != ?
+        ''', (user_id, subscription_id.lower()))
+        conn.commit()
+        conn.close()
+
+    def _collection_window(self, user_id, subscription_id, now):
+        end = (int(now) // HOUR) * HOUR  # apenas horas fechadas
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT collected_until FROM metrics_collection_state WHERE user_id = ? AND subscription_id = ?
+        ''', (user_id, subscription_id))
+        row = cursor.fetchone()
+        conn.close()
+        start = row[0] if row else end - METRICS_BACKFILL_HOURS * HOUR
+        return max(start, end - METRICS_MAX_WINDOW_HOURS * HOUR), end
+
+    def collect(self, user_id: int, credential: Any, subscription_id: str) -> Dict[str, Any]:
+        """Atualiza o catálogo e grava as horas fechadas desde a última coleta"""
+        from azure.mgmt.monitor import MonitorManagementClient
+
+        self._ensure_schema()
+        now = int(time.time())
+        resources = list_monitored_resources(credential, subscription_id)
+        self._save_catalog(user_id, subscription_id, resources, now)
+
+        start, end = self._collection_window(user_id, subscription_id, now)
+        if start >= end:
+            return {'success': True, 'resources': len(resources), 'batches': 0, 'points': 0}
+
+        monitor_client = MonitorManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_LOW))
+        batches = plan_batches(resources)
+        points = 0
+        failed = 0
+        for location, resource_type, resource_ids in batches:
+            try:
+                series = fetch_metrics_batch(monitor_client, location, resource_type, resource_ids, start, end)
+            except Exception as e:
+                failed += 1
+                logger.error(f"Erro ao coletar métricas ({resource_type}, {location}, "
+                             f"{len(resource_ids)} recursos) do usuário {user_id}: {str(e)}")
+                continue
+            for metric_type, rows in series.items():
+                points += self.store.record_buckets(user_id, metric_type, rows, tier=METRICS_TIER)
+
+        # Com lotes falhos a janela é repetida na próxima execução (regravar buckets é idempotente)
+        if not failed:
+            conn = self._connect()
+            conn.execute('''
+                INSERT OR REPLACE INTO metrics_collection_state (user_id, subscription_id, collected_until)
+                VALUES (?, ?, ?)
+            ''', (user_id, subscription_id, end))
+            conn.commit()
+            conn.close()
+
+        result = {
+            'success': not failed,
+            'resources': len(resources),
+            'batches': len(batches),
+            'failed_batches': failed,
+            'points': points,
+            'window': {'start': _iso(start), 'end': _iso(end)}
+        }
+        if points:
+            for listener in self._listeners:
+                try:
+                    listener(user_id, result)
+                except Exception as e:
+                    logger.error(f"Erro ao notificar coleta de métricas: {str(e)}")
+        return result
+
+    def collect_user(self, user_id: int) -> Dict[str, Any]:
+        if not self._credential_factory:
+            return {'success': False, 'error': 'Coleta de métricas não iniciada'}
+        credential, subscription_id = self._credential_factory(user_id)
+        if not credential:
+            return {'success': False, 'error': 'Credenciais Azure não configuradas'}
+        return self.collect(user_id, credential, subscription_id)
+
+    def start(self, credential_factory: Callable[[int], Any], users_provider: Callable[[], List[int]]):
+        """
+        Inicia a coleta periódica em background
+        credential_factory(user_id) -> (credential, subscription_id) ou (None, None)
+        """
+        with self._lock:
+            self._credential_factory = credential_factory
+            self._users_provider = users_provider
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run_worker, name='metrics-collector', daemon=True)
+            self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            try:
+                for user_id in self._users_provider():
+                    try:
+                        self.collect_user(user_id)
+                    except Exception as e:
+                        logger.error(f"Erro ao coletar métricas do usuário {user_id}: {str(e)}")
+            except Exception as e:
+                logger.error(f"Erro no worker de métricas: {str(e)}")
+            time.sleep(COLLECTION_INTERVAL_SECONDS)
+
+    # Leitura --------------------------------------------------------------
+
+    def collected_until(self, user_id: int) -> Optional[int]:
+        """Instante até o qual a subscription coletada do usuário tem métricas gravadas"""
+        self._ensure_schema()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT MIN(collected_until) FROM metrics_collection_state WHERE user_id = ?', (user_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def catalog(self, user_id: int, resource_type: Optional[str] = None,
+                subscription_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recursos monitorados do usuário (id em minúsculas = série no timeseries_store)"""
+        self._ensure_schema()
+        clauses = ['user_id = ?']
+        params = [user_id]
+        if resource_type:
+            clauses.append('resource_type = ?')
+            params.append(resource_type)
+        if subscription_id:
+            clauses.append('resource_id LIKE ?')
+            params.append(f'/subscriptions/{subscription_id.lower()}/%')
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT resource_id, resource_type, name, resource_group, location, sku
+            FROM metrics_resources WHERE {' AND '.join(clauses)} ORDER BY resource_id
+        ''', params)
+        rows = cursor.fetchall()
+        conn.close()
+        return [
+            {'id': row[0], 'type': row[1], 'name': row[2], 'resource_group': row[3], 'location': row[4], 'sku': row[5]}
+            for row in rows
+        ]
+
+    def utilization(self, user_id: int, days: int = 30, subscription_id: Optional[str] = None) -> Dict[str, Any]:
+        """Utilização por recurso no período, a partir das séries horárias gravadas localmente"""
+        end = time.time()
+        start = end - days * 86400
+        resources = self.catalog(user_id, subscription_id=subscription_id)
+        metric_types = [metric_type for definitions in COLLECTED_METRICS.values() for _, metric_type, _ in definitions]
+        stats = self.store.summarize(user_id, metric_types, start, end, tier=METRICS_TIER)
+
+        def stat(metric_type, key, field='avg'):
+            entry = stats.get((metric_type, key))
+            return entry[field] if entry else None
+
+        def rounded(value, digits=2):
+            return round(value, digits) if value is not None else None
+
+        virtual_machines, storage_accounts, databases = [], [], []
+        status_counts = {'underutilized': 0, 'overutilized': 0, 'optimal': 0, 'no_data': 0}
+        for resource in resources:
+            key = resource['id']
+            base = {
+                'id': key,
+                'name': resource['name'],
+                'resource_group': resource['resource_group'],
+                'location': resource['location']
+            }
+            if resource['type'] == VM_TYPE:
+                cpu_avg = stat('vm.cpu_percent', key)
+                cpu_max = stat('vm.cpu_percent', key, 'max')
+                if cpu_avg is None:
+                    status = 'no_data'
+                elif cpu_avg < UNDERUTILIZED_CPU_AVG and (cpu_max or 0) < UNDERUTILIZED_CPU_MAX:
+                    status = 'underutilized'
+                elif cpu_avg > OVERUTILIZED_CPU_AVG:
+                    status = 'overutilized'
+                else:
+                    status = 'optimal'
+                status_counts[status] += 1
+                memory_available = stat('vm.memory_available_bytes', key, 'min')
+                virtual_machines.append({
+                    **base,
+                    'size': resource['sku'],
+                    'cpu_avg': rounded(cpu_avg),
+                    'cpu_max': rounded(cpu_max),
+                    'memory_available_min_gb': rounded(memory_available / 1024 ** 3 if memory_available is not None else None),
+                    'disk_bytes_per_hour_avg': rounded(
+                        (stat('vm.disk_read_bytes', key) or 0) + (stat('vm.disk_write_bytes', key) or 0)
+                        if cpu_avg is not None else None, 0),
+                    'network_bytes_per_hour_avg': rounded(
+                        (stat('vm.network_in_bytes', key) or 0) + (stat('vm.network_out_bytes', key) or 0)
+                        if cpu_avg is not None else None, 0),
+                    'hours_with_data': stat('vm.cpu_percent', key, 'count') or 0,
+                    'status': status
+                })
+            elif resource['type'] == STORAGE_TYPE:
+                hours = stat('storage.transactions', key, 'count') or 0
+                transactions = stat('storage.transactions', key, 'sum')
+                used = stat('storage.used_bytes', key, 'max')
+                storage_accounts.append({
+                    **base,
+                    'sku': resource['sku'],
+                    'used_gb': rounded(used / 1024 ** 3 if used is not None else None),
+                    'transactions_per_day': rounded(transactions * 24 / hours if hours else None, 0),
+                    'egress_gb': rounded((stat('storage.egress_bytes', key, 'sum') or 0) / 1024 ** 3)
+                })
+            elif resource['type'] == SQL_DATABASE_TYPE:
+                databases.append({
+                    **base,
+                    'tier': resource['sku'],
+                    'cpu_avg': rounded(stat('sql.cpu_percent', key)),
+                    'dtu_avg': rounded(stat('sql.dtu_percent', key)),
+                    'dtu_max': rounded(stat('sql.dtu_percent', key, 'max')),
+                    'storage_percent': rounded(stat('sql.storage_percent', key, 'max')),
+                    'data_io_avg': rounded(stat('sql.data_io_percent', key))
+                })
+
+        measured = len(virtual_machines) - status_counts['no_data']
+        return {
+            'period_days': days,
+            'source': 'azure_monitor',
+            'summary': {
+                'total_resources': len(resources),
+                **status_counts,
+                'utilization_score': round(100 * status_counts['optimal'] / measured) if measured else None
+            },
+            'virtual_machines': virtual_machines,
+            'storage_accounts': storage_accounts,
+            'databases': databases
+        }
+
+
+# Instância global do serviço
+metrics_collector = MetricsCollector()
@@ -2,15 +2,25 @@
 Serviço de autenticação Microsoft Entra ID (OAuth)
 """
 
+import os
+import time
 import msal
 import requests
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
-from flask import current_app, session, url_for
+from flask import current_app, session, url_for, has_request_context
 from src.models.user import User, db
+from src.utils.msal_token_cache import PersistedTokenCache
 
 logger = logging.getLogger(__name__)
 
+# Renovação proativa: tokens que expiram dentro desta janela são renovados em background
+REFRESH_AHEAD_SECONDS = int(os.environ.get('MSAL_REFRESH_AHEAD_SECONDS', '300'))
+REFRESH_CHECK_INTERVAL = int(os.environ.get('MSAL_REFRESH_CHECK_INTERVAL', '60'))
+REFRESH_WAIT_TIMEOUT = 30
+
 class MicrosoftAuthService:
     """Serviço para autenticação OAuth com Microsoft Entra ID"""
     
@@ -24,6 +34,21 @@ class MicrosoftAuthService:
             "https://management.azure.com/user_impersonation"
         ]
         self.redirect_uri = None  # Será definido dinamicamente
+        
+        # Cache de tokens persistido e compartilhado entre workers
+        self.token_cache = PersistedTokenCache()
+        self._msal_app = None
+        self._msal_app_config = None
+        self._app_lock = threading.Lock()
+        
+        # Renovação em background
+        self._accounts = {}  # user_id -> home_account_id
+        self._accounts_lock = threading.Lock()
+        self._inflight = {}  # home_account_id -> Future (renovações coalescidas)
+        self._inflight_lock = threading.Lock()
+        self._executor = None
+        self._refresher_thread = None
+        self._stop_event = threading.Event()
     
     def configure_oauth(self, client_id: str, client_secret: str, redirect_uri: str):
         """Configura parâmetros OAuth"""
@@ -32,12 +57,18 @@ class MicrosoftAuthService:
         self.redirect_uri = redirect_uri
     
     def get_msal_app(self):
-        """Cria instância do MSAL app"""
-        return msal.ConfidentialClientApplication(
-            client_id=self.client_id,
-            client_credential=self.client_secret,
-            authority=self.authority
-        )
+        """Instância única do MSAL app, recriada apenas quando a configuração OAuth muda"""
+        config = (self.client_id, self.client_secret, self.authority)
+        with self._app_lock:
+            if self._msal_app is None or self._msal_app_config != config:
+                self._msal_app = msal.ConfidentialClientApplication(
+                    client_id=self.client_id,
+                    client_credential=self.client_secret,
+                    authority=self.authority,
+                    token_cache=self.token_cache.cache
+                )
+                self._msal_app_config = config
+            return self._msal_app
     
     def get_auth_url(self) -> str:
         """
@@ -74,12 +105,13 @@ class MicrosoftAuthService:
             
             msal_app = self.get_msal_app()
             
-            # Trocar código por tokens
-            result = msal_app.acquire_token_by_authorization_code(
-                code=authorization_code,
-                scopes=self.scope,
-                redirect_uri=self.redirect_uri
-            )
+            # Trocar código por tokens (gravados no cache persistido)
+            with self.token_cache.locked():
+                result = msal_app.acquire_token_by_authorization_code(
+                    code=authorization_code,
+                    scopes=self.scope,
+                    redirect_uri=self.redirect_uri
+                )
             
             if 'error' in result:
                 logger.error(f"Erro OAuth: {result.get('error_description', result['error'])}")
@@ -102,6 +134,11 @@ class MicrosoftAuthService:
             session['access_token'] = access_token
             session['refresh_token'] = result.get('refresh_token')
             
+            home_account_id = self._home_account_id(result)
+            if home_account_id:
+                session['msal_account_id'] = home_account_id
+                self.track_user(user.id, home_account_id)
+            
             # Limpar state
             session.pop('oauth_state', None)
             
@@ -184,11 +221,146 @@ class MicrosoftAuthService:
             db.session.rollback()
             raise
     
+    def _home_account_id(self, token_result: Dict[str, Any]) -> Optional[str]:
+        """Identificador da conta no cache MSAL (oid.tid do id_token)"""
+        claims = token_result.get('id_token_claims') or {}
+        if claims.get('oid') and claims.get('tid'):
+            return f"{claims['oid']}.{claims['tid']}"
+        return None
+    
+    def _ensure_refresher(self):
+        """Inicia o pool de renovação e a thread de varredura sob demanda (nunca no import)"""
+        with self._inflight_lock:
+            if self._refresher_thread is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='msal-refresh')
+            self._refresher_thread = threading.Thread(
+                target=self._run_refresher, name='msal-refresher', daemon=True
+            )
+            self._refresher_thread.start()
+    
+    def track_user(self, user_id: int, home_account_id: str):
+        """Registra a conta do usuário para renovação proativa"""
+        with self._accounts_lock:
+            self._accounts[user_id] = home_account_id
+        self._ensure_refresher()
+    
+    def _cached_access_token(self, home_account_id: str):
+        """Retorna (token, expira_em) mais recente do cache, sem acesso à rede"""
+        cache = self.token_cache.refresh_from_disk()
+        best = None
+        for entry in cache.find(msal.TokenCache.CredentialType.ACCESS_TOKEN,
+                                query={'home_account_id': home_account_id}):
+            expires_on = int(entry.get('expires_on', 0))
+            if best is None or expires_on > best[1]:
+                best = (entry.get('secret'), expires_on)
+        return best
+    
+    def schedule_refresh(self, home_account_id: str):
+        """Agenda renovação em background; pedidos simultâneos da mesma conta compartilham o Future"""
+        self._ensure_refresher()
+        with self._inflight_lock:
+            future = self._inflight.get(home_account_id)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._refresh_account, home_account_id)
+            self._inflight[home_account_id] = future
+        future.add_done_callback(lambda f: self._refresh_done(home_account_id, f))
+        return future
+    
+    def _refresh_done(self, home_account_id, future):
+        with self._inflight_lock:
+            if self._inflight.get(home_account_id) is future:
+                del self._inflight[home_account_id]
+    
+    def _refresh_account(self, home_account_id: str) -> Optional[str]:
+        """Renova o access token da conta usando o refresh token do cache persistido"""
+        msal_app = self.get_msal_app()
+        with self.token_cache.locked():
+            # Outro worker pode ter renovado enquanto aguardávamos o lock
+            cached = self._cached_access_token(home_account_id)
+            if cached and cached[1] - time.time() > REFRESH_AHEAD_SECONDS:
+                return cached[0]
+            
+            accounts = [a for a in msal_app.get_accounts() if a.get('home_account_id') == home_account_id]
+            if not accounts:
+                self._forget_account(home_account_id)
+                return None
+            
+            result = msal_app.acquire_token_silent_with_error(
+                self.scope, account=accounts[0], force_refresh=True
+            )
+        
+        if not result or 'error' in result:
+            error = (result or {}).get('error')
+            logger.error(f"Erro ao renovar token da conta {home_account_id}: "
+                         f"{(result or {}).get('error_description', error)}")
+            if error == 'invalid_grant':
+                # Refresh token revogado/expirado: exige novo login
+                self._forget_account(home_account_id)
+            return None
+        
+        return result['access_token']
+    
+    def _forget_account(self, home_account_id: str):
+        with self._accounts_lock:
+            for user_id, account_id in list(self._accounts.items()):
+                if account_id == home_account_id:
+                    self._accounts.pop(user_id, None)
+    
+    def _run_refresher(self):
+        """Varre periodicamente as contas registradas e renova as que estão perto de expirar"""
+        while not self._stop_event.wait(REFRESH_CHECK_INTERVAL):
+            # Qualquer erro fica nesta volta: a thread não pode morrer
+            try:
+                with self._accounts_lock:
+                    accounts = set(self._accounts.values())
+                now = time.time()
+                for home_account_id in accounts:
+                    try:
+                        cached = self._cached_access_token(home_account_id)
+                        if not cached or cached[1] - now <= REFRESH_AHEAD_SECONDS:
+                            self.schedule_refresh(home_account_id)
+                    except Exception as e:
+                        logger.error(f"Erro ao verificar token da conta {home_account_id}: {str(e)}")
+            except Exception as e:
+                logger.error(f"Erro na varredura de tokens: {str(e)}")
+    
+    def get_access_token(self, user_id: int) -> Optional[str]:
+        """
+        Retorna o access token do cache sem nunca aguardar a rede
+        Tokens perto de expirar continuam sendo servidos enquanto a renovação roda em background
+        """
+        home_account_id = self._accounts.get(user_id)
+        if not home_account_id and has_request_context():
+            home_account_id = session.get('msal_account_id')
+        if not home_account_id:
+            return session.get('access_token') if has_request_context() else None
+        
+        if user_id not in self._accounts:
+            self.track_user(user_id, home_account_id)
+        
+        cached = self._cached_access_token(home_account_id)
+        now = time.time()
+        if not cached or cached[1] - now <= REFRESH_AHEAD_SECONDS:
+            self.schedule_refresh(home_account_id)
+        if cached and cached[1] > now:
+            return cached[0]
+        return None
+    
     def refresh_access_token(self, user_id: int) -> Optional[str]:
         """
         Renova access token usando refresh token
         """
         try:
+            home_account_id = self._accounts.get(user_id) or session.get('msal_account_id')
+            if home_account_id:
+                # Junta-se a uma renovação já em andamento, se houver
+                token = self.schedule_refresh(home_account_id).result(timeout=REFRESH_WAIT_TIMEOUT)
+                if token:
+                    session['access_token'] = token
+                return token
+            
             refresh_token = session.get('refresh_token')
             if not refresh_token:
                 return None
@@ -220,12 +392,13 @@ class MicrosoftAuthService:
         Obtém credenciais Azure usando token do usuário
         """
         try:
-            access_token = session.get('access_token')
+            # Token válido: não bloqueia (a renovação antecipada acontece em background)
+            access_token = self.get_access_token(user_id)
             if not access_token:
-                # Tentar renovar token
+                # Já expirado: aguarda a renovação pelo refresh token
                 access_token = self.refresh_access_token(user_id)
-                if not access_token:
-                    return None
+            if not access_token:
+                return None
             
             # Com o token do usuário, podemos acessar recursos Azure
             # usando delegated permissions
@@ -243,10 +416,21 @@ class MicrosoftAuthService:
         Faz logout do usuário
         """
         try:
+            # Remover conta do cache de tokens e da renovação em background
+            home_account_id = session.get('msal_account_id')
+            if home_account_id:
+                self._forget_account(home_account_id)
+                msal_app = self.get_msal_app()
+                with self.token_cache.locked():
+                    for account in msal_app.get_accounts():
+                        if account.get('home_account_id') == home_account_id:
+                            msal_app.remove_account(account)
+            
             # Limpar sessão
             session.pop('user_id', None)
             session.pop('access_token', None)
             session.pop('refresh_token', None)
+            session.pop('msal_account_id', None)
             session.pop('oauth_state', None)
             
             # URL de logout do Microsoft
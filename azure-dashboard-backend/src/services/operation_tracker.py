@@ -0,0 +1,429 @@
+"""
+Rastreamento de operações de longa duração (LRO) do Azure
+Inicia operações ARM sem bloquear a requisição, persiste o registro da operação
+e acompanha a conclusão em um pool de polling em background
+"""
+
+import os
+import json
+import time
+import uuid
+import heapq
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from src.services.event_bus import event_bus, TOPIC_OPERATIONS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bolt_dashboard.db')
+
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+
+# Intervalos de polling (segundos): começa curto e cresce até o máximo quando o ARM não envia Retry-After
+MIN_POLL_INTERVAL = float(os.environ.get('LRO_MIN_POLL_INTERVAL', '2'))
+MAX_POLL_INTERVAL = float(os.environ.get('LRO_MAX_POLL_INTERVAL', '60'))
+POLL_BACKOFF_FACTOR = 1.5
+
+# Cada processo renova o heartbeat das operações que executa; sem renovação (worker
+# reciclado ou encerrado) a operação é considerada órfã e o líder a retoma ou encerra
+HEARTBEAT_SECONDS = float(os.environ.get('LRO_HEARTBEAT_SECONDS', '30'))
+ORPHAN_AFTER_SECONDS = HEARTBEAT_SECONDS * 3
+
+
+class OperationTracker:
+    """Gerencia operações assíncronas e seu estado persistido"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_workers: int = 4):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self._pollers = {}  # op_id -> (polling_method, intervalo atual)
+        self._owners = {}  # op_id -> (user_id, kind, target) para publicar a conclusão
+        self._schedule = []  # heap de (próximo polling, op_id)
+        self._condition = threading.Condition()
+        self._executor = None
+        self._scheduler_thread = None
+        self._heartbeat_thread = None
+        self._recovery_thread = None
+        self._initialized = False
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _ensure_schema(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS operations (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                target TEXT,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                continuation_token TEXT,
+                poll_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                completed_at TIMESTAMP,
+                owner_pid INTEGER,
+                heartbeat_at REAL
+            )
+        ''')
+        # Bancos criados antes do heartbeat
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(operations)')}
+        for column, column_type in (('owner_pid', 'INTEGER'), ('heartbeat_at', 'REAL')):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE operations ADD COLUMN {column} {column_type}')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_operations_user ON operations (user_id, created_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_operations_status ON operations (status, heartbeat_at)')
+        conn.commit()
+        conn.close()
+
+    def _ensure_started(self):
+        """Cria tabela e inicia o pool de polling sob demanda (nunca no import)"""
+        with self._condition:
+            if self._initialized:
+                return
+
+            self._ensure_schema()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='lro-poller')
+            self._scheduler_thread = threading.Thread(target=self._run_scheduler, name='lro-scheduler', daemon=True)
+            self._scheduler_thread.start()
+            self._heartbeat_thread = threading.Thread(target=self._run_heartbeat, name='lro-heartbeat', daemon=True)
+            self._heartbeat_thread.start()
+            self._initialized = True
+
+    def _run_heartbeat(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"Erro ao renovar heartbeat das operações: {str(e)}")
+
+    def heartbeat(self) -> int:
+        """Renova o heartbeat das operações executadas por este processo"""
+        op_ids = list(self._owners)
+        if not op_ids:
+            return 0
+        now = time.time()
+        conn = self._connect()
+        for index in range(0, len(op_ids), 500):
+            chunk = op_ids[index:index + 500]
+            conn.execute(f'''
+                UPDATE operations SET heartbeat_at = ?, owner_pid = ?
+                WHERE status = ? AND id IN ({", ".join("?" * len(chunk))})
+            ''', (now, os.getpid(), STATUS_RUNNING, *chunk))
+        conn.commit()
+        conn.close()
+        return len(op_ids)
+
+    def _insert(self, op_id, user_id, kind, target, continuation_token=None):
+        now = datetime.utcnow().isoformat()
+        conn = self._connect()
+        conn.execute('''
+            INSERT INTO operations (id, user_id, kind, target, status, continuation_token, created_at, updated_at,
+                                    owner_pid, heartbeat_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (op_id, user_id, kind, target, STATUS_RUNNING, continuation_token, now, now, os.getpid(), time.time()))
+        conn.commit()
+        conn.close()
+        self._owners[op_id] = (user_id, kind, target)
+
+    def _update(self, op_id, status=None, result=None, error=None, increment_polls=False):
+        now = datetime.utcnow().isoformat()
+        fields = ['updated_at = ?']
+        values = [now]
+        if status:
+            fields.append('status = ?')
+            values.append(status)
+            if status != STATUS_RUNNING:
+                fields.append('completed_at = ?')
+                values.append(now)
+        if result is not None:
+            fields.append('result = ?')
+            values.append(json.dumps(result, default=str))
+        if error is not None:
+            fields.append('error = ?')
+            values.append(str(error))
+        if increment_polls:
+            fields.append('poll_count = poll_count + 1')
+
+        conn = self._connect()
+        conn.execute(f'UPDATE operations SET {", ".join(fields)} WHERE id = ?', (*values, op_id))
+        conn.commit()
+        conn.close()
+
+        if status and status != STATUS_RUNNING:
+            self._publish_completion(op_id, status, error)
+
+    def _publish_completion(self, op_id, status, error):
+        """Notifica o dashboard do usuário pelo barramento de eventos (substitui polling do status)"""
+        owner = self._owners.pop(op_id, None)
+        if not owner:
+            return
+        user_id, kind, target = owner
+        event_bus.publish(user_id, TOPIC_OPERATIONS, {
+            'id': op_id,
+            'kind': kind,
+            'target': target,
+            'status': status,
+            'error': str(error) if error is not None else None
+        })
+
+    def start_lro(self, user_id: int, kind: str, target: str, begin: Callable[..., Any],
+                  pipeline_client: Any) -> str:
+        """
+        Inicia uma LRO do ARM e retorna o ID da operação imediatamente
+
+        begin: função begin_* do SDK (recebe polling/continuation_token)
+        pipeline_client: cliente de pipeline do operations group (ex.: resource_groups._client)
+        """
+        self._ensure_started()
+
+        # polling=False envia apenas a requisição inicial, sem thread de polling do SDK
+        initial_poller = begin(polling=False)
+        continuation_token = initial_poller.continuation_token()
+
+        op_id = str(uuid.uuid4())
+        self._insert(op_id, user_id, kind, target, continuation_token)
+
+        try:
+            polling_method = self._build_polling_method(continuation_token, pipeline_client)
+        except Exception as e:
+            # Sem polling possível: a aceitação pelo ARM é o melhor estado que temos
+            logger.warning(f"Operação {op_id}: polling indisponível ({str(e)})")
+            self._update(op_id, status=STATUS_SUCCEEDED, result={'accepted': True, 'tracked': False})
+            return op_id
+
+        if polling_method.finished():
+            self._finish(op_id, polling_method)
+        else:
+            self._schedule_poll(op_id, polling_method, self._next_interval(polling_method, None))
+
+        logger.info(f"Operação {op_id} ({kind} {target}) iniciada")
+        return op_id
+
+    def submit_task(self, user_id: int, kind: str, target: str, task: Callable[[], Any]) -> str:
+        """Executa uma chamada síncrona do SDK no pool e retorna o ID da operação imediatamente"""
+        self._ensure_started()
+
+        op_id = str(uuid.uuid4())
+        self._insert(op_id, user_id, kind, target)
+
+        def run():
+            try:
+                result = task()
+                self._update(op_id, status=STATUS_SUCCEEDED, result=result)
+            except Exception as e:
+                logger.error(f"Operação {op_id} ({kind} {target}) falhou: {str(e)}")
+                self._update(op_id, status=STATUS_FAILED, error=e)
+
+        self._executor.submit(run)
+        return op_id
+
+    def get_operation(self, op_id: str, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Obtém o estado atual de uma operação (restrito ao usuário quando informado)"""
+        self._ensure_started()
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, user_id, kind, target, status, result, error, poll_count,
+                   created_at, updated_at, completed_at
+            FROM operations WHERE id = ?
+        ''', (op_id,))
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row or (user_id is not None and row[1] != user_id):
+            return None
+
+        return {
+            'id': row[0],
+            'kind': row[2],
+            'target': row[3],
+            'status': row[4],
+            'result': json.loads(row[5]) if row[5] else None,
+            'error': row[6],
+            'poll_count': row[7],
+            'created_at': row[8],
+            'updated_at': row[9],
+            'completed_at': row[10],
+            'done': row[4] != STATUS_RUNNING
+        }
+
+    def fail_interrupted(self) -> int:
+        """
+        Encerra como falha as operações 'running' sem continuation token (submit_task):
+        a chamada rodava em uma thread do processo anterior e não há como retomá-la.
+        Só na partida, antes de algum processo aceitar requisições (não inicia threads)
+        """
+        now = datetime.utcnow().isoformat()
+        self._ensure_schema()
+        conn = self._connect()
+        cursor = conn.execute('''
+            UPDATE operations SET status = ?, error = ?, updated_at = ?, completed_at = ?
+            WHERE status = ? AND continuation_token IS NULL
+        ''', (STATUS_FAILED, 'Operação interrompida pelo reinício do servidor', now, now, STATUS_RUNNING))
+        interrupted = cursor.rowcount
+        # Nenhum processo anterior segue vivo: as LROs ficam disponíveis para o líder retomar já
+        conn.execute('UPDATE operations SET heartbeat_at = NULL WHERE status = ?', (STATUS_RUNNING,))
+        conn.commit()
+        conn.close()
+        if interrupted:
+            logger.warning(f"{interrupted} operação(ões) interrompidas pelo reinício marcadas como falha")
+        return interrupted
+
+    def recover_orphaned(self, pipeline_client_factory: Callable[[int, str], Any]) -> Dict[str, int]:
+        """
+        Assume as operações 'running' cujo processo dono parou de renovar o heartbeat
+        (reinício, worker reciclado): LROs voltam a ser acompanhadas pelo continuation
+        token; chamadas síncronas (submit_task) não podem ser retomadas e viram falha
+        pipeline_client_factory(user_id, kind) deve retornar o cliente de pipeline adequado
+        """
+        self._ensure_started()
+
+        cutoff = time.time() - ORPHAN_AFTER_SECONDS
+        conn = self._connect()
+        orphaned = conn.execute('''
+            SELECT id, user_id, kind, target, continuation_token FROM operations
+            WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+        ''', (STATUS_RUNNING, cutoff)).fetchall()
+
+        resumed = failed = 0
+        for op_id, user_id, kind, target, token in orphaned:
+            if op_id in self._owners:
+                continue
+            # Outro processo pode ter assumido a operação entre a leitura e aqui
+            claimed = conn.execute('''
+                UPDATE operations SET owner_pid = ?, heartbeat_at = ?
+                WHERE id = ? AND status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+            ''', (os.getpid(), time.time(), op_id, STATUS_RUNNING, cutoff)).rowcount
+            conn.commit()
+            if not claimed:
+                continue
+
+            self._owners[op_id] = (user_id, kind, target)
+            if token is None:
+                self._update(op_id, status=STATUS_FAILED,
+                             error='Operação interrompida: o processo que a executava foi encerrado')
+                failed += 1
+                continue
+            try:
+                polling_method = self._build_polling_method(token, pipeline_client_factory(user_id, kind))
+                self._schedule_poll(op_id, polling_method, MIN_POLL_INTERVAL)
+                resumed += 1
+            except Exception as e:
+                self._update(op_id, status=STATUS_FAILED, error=f'Não foi possível retomar: {str(e)}')
+                failed += 1
+        conn.close()
+
+        if resumed or failed:
+            logger.info(f"Operações órfãs: {resumed} retomada(s), {failed} encerrada(s) como falha")
+        return {'resumed': resumed, 'failed': failed}
+
+    def start_recovery(self, pipeline_client_factory: Callable[[int, str], Any]):
+        """Verifica operações órfãs agora e a cada HEARTBEAT_SECONDS (executado no processo líder)"""
+        with self._condition:
+            if self._recovery_thread is not None:
+                return
+
+            def run():
+                while True:
+                    try:
+                        self.recover_orphaned(pipeline_client_factory)
+                    except Exception as e:
+                        logger.error(f"Erro ao recuperar operações órfãs: {str(e)}")
+                    time.sleep(HEARTBEAT_SECONDS)
+
+            self._recovery_thread = threading.Thread(target=run, name='lro-recovery', daemon=True)
+            self._recovery_thread.start()
+
+    def _build_polling_method(self, continuation_token, pipeline_client):
+        from azure.mgmt.core.polling.arm_polling import ARMPolling
+
+        polling_method = ARMPolling(timeout=MIN_POLL_INTERVAL)
+        client, initial_response, deserialization_callback = ARMPolling.from_continuation_token(
+            continuation_token,
+            client=pipeline_client,
+            deserialization_callback=lambda pipeline_response: None
+        )
+        polling_method.initialize(client, initial_response, deserialization_callback)
+        return polling_method
+
+    def _next_interval(self, polling_method, previous):
+        """Segue o Retry-After do ARM; sem ele, aumenta o intervalo progressivamente"""
+        try:
+            headers = polling_method._pipeline_response.http_response.headers
+            retry_after = headers.get('Retry-After')
+            if retry_after:
+                return min(max(float(retry_after), MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+        if previous is None:
+            return MIN_POLL_INTERVAL
+        return min(previous * POLL_BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+
+    def _schedule_poll(self, op_id, polling_method, interval):
+        with self._condition:
+            self._pollers[op_id] = (polling_method, interval)
+            heapq.heappush(self._schedule, (time.monotonic() + interval, op_id))
+            self._condition.notify()
+
+    def _run_scheduler(self):
+        while True:
+            with self._condition:
+                while not self._schedule:
+                    self._condition.wait()
+                due_at, op_id = self._schedule[0]
+                wait = due_at - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(timeout=wait)
+                    continue
+                heapq.heappop(self._schedule)
+            self._executor.submit(self._poll_once, op_id)
+
+    def _poll_once(self, op_id):
+        with self._condition:
+            entry = self._pollers.get(op_id)
+        if not entry:
+            return
+        polling_method, interval = entry
+
+        try:
+            polling_method.update_status()
+            self._update(op_id, increment_polls=True)
+        except Exception as e:
+            logger.error(f"Erro no polling da operação {op_id}: {str(e)}")
+            with self._condition:
+                self._pollers.pop(op_id, None)
+            self._update(op_id, status=STATUS_FAILED, error=e)
+            return
+
+        if polling_method.finished():
+            self._finish(op_id, polling_method)
+        else:
+            self._schedule_poll(op_id, polling_method, self._next_interval(polling_method, interval))
+
+    def _finish(self, op_id, polling_method):
+        with self._condition:
+            self._pollers.pop(op_id, None)
+
+        status = (polling_method.status() or '').lower()
+        if status == 'succeeded':
+            self._update(op_id, status=STATUS_SUCCEEDED, result={'provisioning_state': polling_method.status()})
+        else:
+            self._update(op_id, status=STATUS_FAILED, error=f'Operação terminou com status {polling_method.status()}')
+        logger.info(f"Operação {op_id} finalizada: {polling_method.status()}")
+
+
+# Instância global do serviço
+operation_tracker = OperationTracker()
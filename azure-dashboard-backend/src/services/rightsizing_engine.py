@@ -0,0 +1,409 @@
+"""
+Motor de rightsizing de VMs sobre o histórico de utilização
+Calcula P50/P95/máximo de CPU e memória de todas as VMs do usuário de uma vez com
+NumPy: cada dia fechado vira um histograma por VM (linhas) em faixas de 1% e os
+percentis da janela saem da soma dos histogramas diários, sem laço por VM. Quando um
+dia novo chega só ele é lido do timeseries_store; o dia que sai da janela é
+descartado; VMs criadas, removidas ou redimensionadas só remapeiam as linhas (as novas
+são lidas por série). O tamanho alvo é o SKU mais barato da mesma família (tabela local
+de src/utils/vm_skus.py) que comporta o P95 com folga, gerando candidatos de redução e
+aumento ordenados pela economia estimada; VMs saturadas no maior tamanho da família
+aparecem como aumento bloqueado
+"""
+
+import os
+import time
+import logging
+import threading
+from functools import reduce
+from typing import Any, Dict, Optional
+
+from src.services.metrics_collector import metrics_collector, VM_TYPE, METRICS_TIER
+from src.utils.startup import startup
+from src.utils.vm_skus import load_sku_table, HOURS_PER_MONTH
+
+np = startup.lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = int(os.environ.get('RIGHTSIZING_WINDOW_DAYS', '30'))
+# Horas com dados exigidas para recomendar (evita decidir com uma semana incompleta)
+MIN_COVERAGE_HOURS = int(os.environ.get('RIGHTSIZING_MIN_COVERAGE_HOURS', '168'))
+# Utilização alvo do P95 no tamanho recomendado
+TARGET_CPU_PERCENT = float(os.environ.get('RIGHTSIZING_TARGET_CPU_PERCENT', '70'))
+TARGET_MEMORY_PERCENT = float(os.environ.get('RIGHTSIZING_TARGET_MEMORY_PERCENT', '80'))
+
+DAY = 86400
+BINS = 101  # faixas de 1% (0..100)
+GB = 1024 ** 3
+VM_METRICS = ['vm.cpu_percent', 'vm.memory_available_bytes']
+
+
+class _FleetWindow:
+    """Histogramas diários das VMs de um usuário (uma linha por VM do catálogo)"""
+
+    def __init__(self, signature, vms, skus):
+        # início do dia -> (hist CPU, hist memória, pico CPU, pico memória)
+        self.days = {}
+        self.result = None
+        self._assign(signature, vms, skus)
+
+    def _assign(self, signature, vms, skus):
+        self.signature = signature
+        self.vms = vms
+        self.rows = {vm['id']: row for row, vm in enumerate(vms)}
+        self.skus = skus  # VmSku ou None por linha
+        self.memory_bytes = np.array(
+            [sku.memory_gb * GB if sku else np.nan for sku in skus], dtype=np.float64
+        )
+
+    @property
+    def size(self):
+        return len(self.vms)
+
+    def rekey(self, signature, vms, skus):
+        """
+        Troca o catálogo mantendo os histogramas das VMs que continuam com o mesmo SKU
+        Retorna os IDs sem histórico na janela (novas ou redimensionadas: a memória em %
+        depende da capacidade), que precisam ser lidos do banco
+        """
+        kept_new, kept_old, added = [], [], []
+        for row, vm in enumerate(vms):
+            old = self.rows.get(vm['id'])
+            if old is not None and self.vms[old]['sku'] == vm['sku']:
+                kept_new.append(row)
+                kept_old.append(old)
+            else:
+                added.append(vm['id'])
+
+        size = len(vms)
+        for day, (cpu_hist, memory_hist, cpu_max, memory_max) in list(self.days.items()):
+            remapped = []
+            for hist in (cpu_hist, memory_hist):
+                new_hist = np.zeros((size, BINS), dtype=np.uint8)
+                new_hist[kept_new] = hist[kept_old]
+                remapped.append(new_hist)
+            for peak in (cpu_max, memory_max):
+                new_peak = np.full(size, np.nan, dtype=np.float32)
+                new_peak[kept_new] = peak[kept_old]
+                remapped.append(new_peak)
+            self.days[day] = tuple(remapped)
+
+        self._assign(signature, vms, skus)
+        self.result = None
+        return added
+
+
+def _day_arrays(window, rows, peak_column):
+    """Converte linhas (series, bucket, count, sum, min, max) em arrays numpy alinhados às VMs"""
+    if not rows:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty, empty
+    series, _, counts, totals, minimums, maximums = zip(*rows)
+    row_index = np.fromiter((window.rows.get(key, -1) for key in series), dtype=np.int64, count=len(series))
+    values = np.asarray(totals, dtype=np.float64) / np.maximum(np.asarray(counts, dtype=np.float64), 1)
+    peaks = np.asarray(minimums if peak_column == 'min' else maximums, dtype=np.float64)
+    known = row_index >= 0
+    return row_index[known], values[known], peaks[known]
+
+
+def _histograms(size, row_index, percent, peak_percent):
+    """Histograma (VMs x faixas) e pico por VM de um dia"""
+    valid = ~np.isnan(percent)
+    bins = np.clip(percent[valid], 0, 100).astype(np.int64)
+    hist = np.bincount(row_index[valid] * BINS + bins, minlength=size * BINS).reshape(size, BINS)
+    peak = np.full(size, np.nan, dtype=np.float32)
+    valid_peak = ~np.isnan(peak_percent)
+    np.fmax.at(peak, row_index[valid_peak], np.clip(peak_percent[valid_peak], 0, 100).astype(np.float32))
+    # No máximo 24 horas por faixa em um dia
+    return hist.astype(np.uint8), peak
+
+
+def _percentiles(hist, quantiles):
+    """Percentis por linha a partir dos histogramas (limite superior da faixa)"""
+    totals = hist.sum(axis=1)
+    cdf = np.cumsum(hist, axis=1)
+    results = []
+    for quantile in quantiles:
+        threshold = np.ceil(quantile * totals)[:, None]
+        index = (cdf >= np.maximum(threshold, 1)).argmax(axis=1)
+        values = np.minimum(index + 1, 100).astype(np.float64)
+        values[totals == 0] = np.nan
+        results.append(values)
+    return results
+
+
+class RightsizingEngine:
+    """Estatísticas de utilização da frota e candidatos de redimensionamento por usuário"""
+
+    def __init__(self, collector=metrics_collector):
+        self.collector = collector
+        self._windows = {}  # user_id -> _FleetWindow
+        self._user_locks = {}  # user_id -> Lock (um usuário lendo o banco não bloqueia os demais)
+        self._lock = threading.Lock()
+
+    def _user_lock(self, user_id):
+        with self._lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = self._user_locks[user_id] = threading.Lock()
+            return lock
+
+    def _ingest(self, window, user_id, day):
+        """Lê do banco um dia (CPU e memória na mesma consulta) e monta seus histogramas"""
+        rows = self.collector.store.read_buckets(user_id, VM_METRICS, day, day + DAY, METRICS_TIER)
+        window.days[day] = self._day_histograms(window, rows)
+
+    def _backfill(self, window, user_id, series):
+        """Lê a janela inteira só das séries informadas e soma aos histogramas dos dias"""
+        if not window.days or not series:
+            return
+        days = sorted(window.days)
+        rows = self.collector.store.read_buckets(
+            user_id, VM_METRICS, days[0], days[-1] + DAY, METRICS_TIER, series=series
+        )
+        by_day = {}
+        for row in rows:
+            by_day.setdefault((row[2] // DAY) * DAY, []).append(row)
+        for day, day_rows in by_day.items():
+            if day not in window.days:
+                continue
+            # As linhas dessas VMs estão zeradas: somar equivale a preencher
+            cpu_hist, memory_hist, cpu_max, memory_max = window.days[day]
+            new_cpu_hist, new_memory_hist, new_cpu_max, new_memory_max = self._day_histograms(window, day_rows)
+            window.days[day] = (
+                cpu_hist + new_cpu_hist, memory_hist + new_memory_hist,
+                np.fmax(cpu_max, new_cpu_max), np.fmax(memory_max, new_memory_max)
+            )
+
+    def _day_histograms(self, window, rows):
+        """Histogramas e picos de um dia a partir das linhas de read_buckets"""
+        cpu_rows, cpu_percent, cpu_peak = _day_arrays(
+            window, [row[1:] for row in rows if row[0] == 'vm.cpu_percent'], 'max')
+        memory_rows, available, available_min = _day_arrays(
+            window, [row[1:] for row in rows if row[0] == 'vm.memory_available_bytes'], 'min')
+
+        # Memória disponível -> % em uso pela capacidade do SKU atual
+        capacity = window.memory_bytes[memory_rows]
+        memory_percent = 100 * (1 - available / capacity)
+        memory_peak = 100 * (1 - available_min / capacity)
+
+        cpu_hist, cpu_max = _histograms(window.size, cpu_rows, cpu_percent, cpu_peak)
+        memory_hist, memory_max = _histograms(window.size, memory_rows, memory_percent, memory_peak)
+        return cpu_hist, memory_hist, cpu_max, memory_max
+
+    def refresh(self, user_id: int) -> Dict[str, Any]:
+        """Incorpora os dias fechados ainda não lidos e recalcula as recomendações se algo mudou"""
+        vms = self.collector.catalog(user_id, VM_TYPE)
+        table = load_sku_table()
+        skus = [table.get((vm['sku'] or '').lower()) for vm in vms]
+        signature = tuple((vm['id'], vm['sku']) for vm in vms)
+
+        # Só dias inteiramente coletados (o coletor grava horas fechadas)
+        collected = self.collector.collected_until(user_id)
+        end_day = (int(min(time.time(), collected or 0)) // DAY) * DAY
+        window_days = list(range(end_day - WINDOW_DAYS * DAY, end_day, DAY)) if collected else []
+
+        with self._user_lock(user_id):
+            window = self._windows.get(user_id)
+            if window is None:
+                window = self._windows[user_id] = _FleetWindow(signature, vms, skus)
+
+            expired = [day for day in window.days if day not in window_days]
+            for day in expired:
+                del window.days[day]
+
+            if window.signature != signature:
+                # VMs criadas, removidas ou redimensionadas: remapeia as linhas e lê só as novas
+                started = time.perf_counter()
+                added = window.rekey(signature, vms, skus)
+                if len(added) * 2 > len(vms):
+                    window.days = {}  # catálogo quase todo novo: a leitura por dia é mais barata
+                else:
+                    self._backfill(window, user_id, added)
+                    logger.info(f"Rightsizing do usuário {user_id}: {len(added)} VM(s) novas ou "
+                                f"redimensionadas lidas em {(time.perf_counter() - started) * 1000:.0f} ms")
+
+            missing = [day for day in window_days if day not in window.days]
+            if missing and window.size:
+                started = time.perf_counter()
+                for day in missing:
+                    self._ingest(window, user_id, day)
+                logger.info(f"Rightsizing do usuário {user_id}: {len(missing)} dia(s) incorporados para "
+                            f"{window.size} VMs em {(time.perf_counter() - started) * 1000:.0f} ms")
+            if window.result is None or missing or expired:
+                window.result = self._compute(window, end_day)
+            return window.result
+
+    def _compute(self, window, end_day):
+        size = window.size
+        summary = {
+            'window_days': WINDOW_DAYS,
+            'window_end': end_day,
+            'vms': size,
+            'analyzed': 0,
+            'insufficient_data': 0,
+            'unknown_sku': 0,
+            'downsize': 0,
+            'upsize': 0,
+            'upsize_blocked': 0,
+            'total_monthly_savings': 0.0,
+            'total_monthly_increase': 0.0,
+            'currency': 'USD'
+        }
+        if not size or not window.days:
+            summary['insufficient_data'] = size
+            return {'summary': summary, 'candidates': []}
+
+        days = [window.days[day] for day in sorted(window.days)]
+        cpu_hist = reduce(np.add, (day[0].astype(np.int32) for day in days))
+        memory_hist = reduce(np.add, (day[1].astype(np.int32) for day in days))
+        cpu_max = reduce(np.fmax, (day[2] for day in days))
+        memory_max = reduce(np.fmax, (day[3] for day in days))
+        coverage = cpu_hist.sum(axis=1)
+        cpu_p50, cpu_p95 = _percentiles(cpu_hist, (0.5, 0.95))
+        memory_p50, memory_p95 = _percentiles(memory_hist, (0.5, 0.95))
+
+        known = np.array([sku is not None for sku in window.skus])
+        vcpus = np.array([sku.vcpus if sku else 0 for sku in window.skus], dtype=np.float64)
+        memory_gb = np.array([sku.memory_gb if sku else 0 for sku in window.skus], dtype=np.float64)
+        price = np.array([sku.hourly_price if sku else 0 for sku in window.skus], dtype=np.float64)
+        families = np.array([sku.family if sku else '' for sku in window.skus], dtype=object)
+
+        # Capacidade necessária para manter o P95 na utilização alvo (sem dado de memória: mantém a atual)
+        need_vcpus = vcpus * cpu_p95 / TARGET_CPU_PERCENT
+        need_memory = np.where(np.isnan(memory_p95), memory_gb, memory_gb * memory_p95 / TARGET_MEMORY_PERCENT)
+        eligible = known & (coverage >= MIN_COVERAGE_HOURS)
+
+        target = np.full(size, -1, dtype=np.int64)
+        fits_any = np.zeros(size, dtype=bool)
+        target_names, target_vcpus, target_price = [], [], []
+        catalog = sorted(load_sku_table().values(), key=lambda sku: (sku.family, sku.hourly_price, sku.vcpus))
+        offset = 0
+        for family in np.unique(families[eligible]):
+            options = [sku for sku in catalog if sku.family == family]
+            option_vcpus = np.array([sku.vcpus for sku in options], dtype=np.float64)
+            option_memory = np.array([sku.memory_gb for sku in options], dtype=np.float64)
+            rows = np.nonzero(eligible & (families == family))[0]
+            fits = (option_vcpus[None, :] >= need_vcpus[rows, None]) & (option_memory[None, :] >= need_memory[rows, None])
+            # Opções em ordem de preço: o primeiro que comporta; nenhum comporta -> o maior da família
+            fits_any[rows] = fits.any(axis=1)
+            choice = np.where(fits_any[rows], fits.argmax(axis=1), len(options) - 1)
+            target[rows] = offset + choice
+            target_names.extend(sku.name for sku in options)
+            target_vcpus.extend(sku.vcpus for sku in options)
+            target_price.extend(sku.hourly_price for sku in options)
+            offset += len(options)
+
+        has_target = target >= 0
+        new_price = np.where(has_target, np.asarray(target_price + [0.0])[target], price)
+        new_vcpus = np.where(has_target, np.asarray(target_vcpus + [0])[target], vcpus)
+        monthly_delta = (price - new_price) * HOURS_PER_MONTH
+        downsize = has_target & (new_price < price)
+        upsize = has_target & (new_price > price)
+        # Nada comporta o P95 e o maior da família não é maior que o atual: não há para onde crescer
+        upsize_blocked = has_target & ~fits_any & ~upsize
+        # Pico de CPU projetado no novo tamanho acima de 100%: redução arriscada
+        projected_peak = np.where(new_vcpus > 0, cpu_max * vcpus / np.maximum(new_vcpus, 1), np.nan)
+        confidence = np.minimum(100, np.round(100 * coverage / (WINDOW_DAYS * 24)))
+
+        summary.update({
+            'analyzed': int(eligible.sum()),
+            'insufficient_data': int((known & ~eligible).sum()),
+            'unknown_sku': int((~known).sum()),
+            'downsize': int(downsize.sum()),
+            'upsize': int(upsize.sum()),
+            'upsize_blocked': int(upsize_blocked.sum()),
+            'total_monthly_savings': round(float(monthly_delta[downsize].sum()), 2),
+            'total_monthly_increase': round(float(-monthly_delta[upsize].sum()) + 0.0, 2)
+        })
+
+        def value(array, row):
+            item = array[row]
+            return None if np.isnan(item) else round(float(item), 1)
+
+        def by_pressure(mask):
+            return np.nonzero(mask)[0][np.argsort(-np.fmax(cpu_p95[mask], np.nan_to_num(memory_p95[mask])), kind='stable')]
+
+        # Reduções pela economia, depois aumentos (possíveis e bloqueados) pela pressão de CPU/memória
+        order = np.concatenate([
+            np.nonzero(downsize)[0][np.argsort(-monthly_delta[downsize], kind='stable')],
+            by_pressure(upsize),
+            by_pressure(upsize_blocked)
+        ])
+        candidates = []
+        for row in order.tolist():
+            vm = window.vms[row]
+            if upsize_blocked[row]:
+                candidates.append({
+                    'id': vm['id'],
+                    'name': vm['name'],
+                    'resource_group': vm['resource_group'],
+                    'location': vm['location'],
+                    'action': 'upsize_blocked',
+                    'current_size': window.skus[row].name,
+                    'recommended_size': None,
+                    'reason': f"Nenhum tamanho maior na família {window.skus[row].family}",
+                    'cpu': {'p50': value(cpu_p50, row), 'p95': value(cpu_p95, row), 'max': value(cpu_max, row)},
+                    'memory': {'p50': value(memory_p50, row), 'p95': value(memory_p95, row), 'max': value(memory_max, row)},
+                    'hours_analyzed': int(coverage[row]),
+                    'monthly_savings': 0,
+                    'monthly_increase': 0,
+                    'confidence': int(confidence[row]),
+                    'risk': 'high'
+                })
+                continue
+            action = 'downsize' if downsize[row] else 'upsize'
+            candidates.append({
+                'id': vm['id'],
+                'name': vm['name'],
+                'resource_group': vm['resource_group'],
+                'location': vm['location'],
+                'action': action,
+                'current_size': window.skus[row].name,
+                'recommended_size': target_names[target[row]],
+                'cpu': {'p50': value(cpu_p50, row), 'p95': value(cpu_p95, row), 'max': value(cpu_max, row)},
+                'memory': {'p50': value(memory_p50, row), 'p95': value(memory_p95, row), 'max': value(memory_max, row)},
+                'hours_analyzed': int(coverage[row]),
+                'monthly_savings': round(float(monthly_delta[row]), 2) if action == 'downsize' else 0,
+                'monthly_increase': round(float(-monthly_delta[row]), 2) if action == 'upsize' else 0,
+                'confidence': int(confidence[row]),
+                'risk': 'high' if action == 'downsize' and projected_peak[row] > 100 else 'low'
+            })
+        return {'summary': summary, 'candidates': candidates}
+
+    def recommendations(self, user_id: int, limit: Optional[int] = None,
+                        action: Optional[str] = None) -> Dict[str, Any]:
+        """Candidatos ordenados (pré-calculados a cada coleta; recalcula só dias novos)"""
+        result = self.refresh(user_id)
+        candidates = result['candidates']
+        if action:
+            candidates = [candidate for candidate in candidates if candidate['action'] == action]
+        if limit is not None:
+            candidates = candidates[:limit]
+        return {'summary': result['summary'], 'candidates': candidates}
+
+    def on_metrics_collected(self, user_id: int, _result: Dict[str, Any]):
+        """Após cada coleta, incorpora os dias fechados para a página abrir pronta"""
+        self.refresh(user_id)
+
+    def vm_rightsizing_recommendation(self, user_id: int, max_resources: int = 10) -> Optional[Dict[str, Any]]:
+        """Resumo das reduções no formato das listas de recomendações existentes"""
+        result = self.recommendations(user_id, action='downsize')
+        summary, candidates = result['summary'], result['candidates']
+        if not candidates:
+            return None
+        return {
+            'type': 'vm_rightsizing',
+            'title': 'Redimensionar VMs subutilizadas',
+            'description': f"{summary['downsize']} VMs com P95 de utilização abaixo do tamanho atual "
+                           f"nos últimos {summary['window_days']} dias",
+            'potential_savings': summary['total_monthly_savings'],
+            'resources': [candidate['name'] for candidate in candidates[:max_resources]],
+            'candidates': candidates[:max_resources]
+        }
+
+
+# Instância global do serviço
+rightsizing_engine = RightsizingEngine()
+metrics_collector.add_listener(rightsizing_engine.on_metrics_collected)
@@ -0,0 +1,173 @@
+"""
+Cache compartilhado entre processos
+Com vários workers (gunicorn pré-fork) cada processo teria sua própria cópia dos
+caches em memória e listaria o ARM por conta própria. Aqui as entradas ficam em
+arquivos de um diretório comum, lidos via mmap: um worker atualiza (sob flock) e
+publica com troca atômica do arquivo; os demais apenas leem a versão publicada.
+Os arquivos persistem entre restarts. Também elege o processo que executa os serviços de background
+"""
+
+import os
+import mmap
+import time
+import fcntl
+import struct
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Os arquivos sobrevivem a restarts (início a quente); SHARED_CACHE_DIR vazio desativa o cache
+SHARED_CACHE_DIR = os.environ.get(
+    'SHARED_CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
+)
+
+# Cabeçalho: magic, versão dos dados, instante da atualização (epoch)
+_HEADER = struct.Struct('<4sQd')
+_MAGIC = b'BSC1'
+_TAKEN_AT_OFFSET = 4 + 8
+
+
+class SharedEntry:
+    """Entrada publicada; body é uma view do arquivo mapeado (sem cópia)"""
+
+    __slots__ = ('version', '_mapping', 'body')
+
+    def __init__(self, mapping):
+        magic, self.version, _ = _HEADER.unpack_from(mapping, 0)
+        if magic != _MAGIC:
+            raise ValueError('Arquivo de cache compartilhado inválido')
+        self._mapping = mapping
+        self.body = memoryview(mapping)[_HEADER.size:]
+
+    @property
+    def taken_at(self):
+        # Lido a cada acesso: expire() altera o valor no próprio arquivo
+        return _HEADER.unpack_from(self._mapping, 0)[2]
+
+    @property
+    def age(self):
+        return time.time() - self.taken_at
+
+
+class SharedCache:
+    """Entradas versionadas por (namespace, chave) visíveis a todos os workers"""
+
+    def __init__(self, directory: Optional[str] = SHARED_CACHE_DIR):
+        self.directory = directory
+        self._mapped = {}  # caminho -> (inode, SharedEntry)
+        self._lock = threading.Lock()
+        self._leader_thread = None
+        self._leader_file = None
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def _path(self, namespace, key, suffix='.bin'):
+        folder = os.path.join(self.directory, namespace)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f'{key}{suffix}')
+
+    def publish(self, namespace: str, key: Any, version: int, body: bytes, taken_at: Optional[float] = None):
+        """Grava a entrada em arquivo temporário e troca atomicamente pelo atual"""
+        path = self._path(namespace, key)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(_HEADER.pack(_MAGIC, version, time.time() if taken_at is None else taken_at))
+                tmp.write(body)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def read(self, namespace: str, key: Any) -> Optional[SharedEntry]:
+        """Entrada publicada ou None; remapeia só quando o arquivo foi trocado"""
+        path = self._path(namespace, key)
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._mapped.get(path)
+            if cached and cached[0] == inode:
+                return cached[1]
+
+        try:
+            with open(path, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                mapping = mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)
+            entry = SharedEntry(mapping)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Ignorando cache compartilhado {path}: {str(e)}")
+            return None
+
+        with self._lock:
+            self._mapped[path] = (inode, entry)
+        return entry
+
+    def expire(self, namespace: str, key: Any):
+        """Marca a entrada como vencida para todos os processos, mantendo a versão"""
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'r+b') as f:
+                f.seek(_TAKEN_AT_OFFSET)
+                f.write(struct.pack('<d', 0.0))
+        except FileNotFoundError:
+            pass
+
+    def keys(self, namespace: str, prefix: str = '') -> List[str]:
+        """Chaves publicadas no namespace (opcionalmente com um prefixo)"""
+        try:
+            names = os.listdir(os.path.join(self.directory, namespace))
+        except FileNotFoundError:
+            return []
+        return [name[:-len('.bin')] for name in names if name.endswith('.bin') and name.startswith(prefix)]
+
+    def remove(self, namespace: str, key: Any):
+        """Apaga a entrada para todos os processos (os mapeamentos abertos seguem válidos)"""
+        try:
+            os.unlink(self._path(namespace, key))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def exclusive(self, namespace: str, key: Any):
+        """Lock entre processos para a atualização de uma entrada"""
+        with open(self._path(namespace, key, '.lock'), 'a+b') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def elect_leader(self, on_elected: Callable[[], None], name: str = 'background'):
+        """
+        Aguarda, em uma thread, o lock de líder e chama on_elected() ao obtê-lo
+        O lock fica com o processo até ele terminar; se o líder morrer, outro worker assume
+        """
+        if not self.enabled:
+            on_elected()  # processo único
+            return
+        if self._leader_thread is not None:
+            return
+
+        def wait_for_leadership():
+            lock_file = open(self._path('leader', name, '.lock'), 'a+b')
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            logger.info(f"Processo {os.getpid()} eleito para os serviços de background ({name})")
+            self._leader_file = lock_file  # mantém o descritor (e o lock) vivo
+            on_elected()
+
+        self._leader_thread = threading.Thread(target=wait_for_leadership, name=f'leader-{name}', daemon=True)
+        self._leader_thread.start()
+
+
+# Instância global do serviço
+shared_cache = SharedCache()
@@ -0,0 +1,330 @@
+"""
+Agregação multi-subscription
+Descobre as subscriptions visíveis ao service principal, guarda a seleção do
+usuário e executa consultas de inventário, locks e custos em paralelo em todas
+elas, combinando os resultados em visões do tenant. Falhas em uma subscription
+não derrubam a consulta: aparecem em 'errors' junto com os resultados das demais
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from src.services.cost_store import cost_store, fetch_daily_costs
+from src.models.resource import Resource
+from src.utils.arm_governor import arm_priority, ArmThrottledError, PRIORITY_LOW
+from src.utils.azure_clients import azure_client_options
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bolt_dashboard.db')
+
+# Paralelismo total entre usuários; o governador ARM continua limitando por subscription
+FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', '16'))
+FANOUT_TIMEOUT_SECONDS = float(os.environ.get('FANOUT_TIMEOUT_SECONDS', '60'))
+
+DISCOVERY_TTL_SECONDS = 900
+CACHE_TTL_SECONDS = {
+    'inventory': 120,
+    'locks': 300,
+    'costs': 3600
+}
+
+
+class SubscriptionCache:
+    """Cache com expiração por (usuário, subscription, tipo de consulta)"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl):
+        entry = self._entries.get(key)
+        if entry and time.time() - entry[0] <= ttl:
+            return entry[1], entry[0]
+        return None, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+
+class SubscriptionFanOut:
+    """Descoberta de subscriptions e execução paralela por subscription"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_workers: int = FANOUT_MAX_WORKERS):
+        self.db_path = db_path
+        self.cache = SubscriptionCache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='subscription-fanout')
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS user_subscriptions (
+                    user_id INTEGER NOT NULL,
+                    subscription_id TEXT NOT NULL,
+                    display_name TEXT,
+                    state TEXT,
+                    tenant_id TEXT,
+                    selected BOOLEAN DEFAULT 1,
+                    discovered_at TIMESTAMP,
+                    PRIMARY KEY (user_id, subscription_id)
+                )
+            ''')
+            conn.commit()
+            conn.close()
+            self._initialized = True
+
+    # Descoberta e seleção ---------------------------------------------------
+
+    def discover(self, user_id: int, credential: Any, force: bool = False) -> List[Dict[str, Any]]:
+        """Lista as subscriptions do service principal (cache de 15 min) e atualiza a tabela local"""
+        cached, _ = self.cache.get((user_id, '*', 'subscriptions'), DISCOVERY_TTL_SECONDS)
+        if cached is not None and not force:
+            return self.list_subscriptions(user_id)
+
+        from azure.mgmt.resource import SubscriptionClient
+
+        client = SubscriptionClient(credential, **azure_client_options())
+        discovered = [{
+            'subscription_id': subscription.subscription_id,
+            'display_name': subscription.display_name,
+            'state': getattr(subscription.state, 'value', subscription.state),
+            'tenant_id': subscription.tenant_id
+        } for subscription in client.subscriptions.list()]
+
+        self._ensure_schema()
+        now = datetime.utcnow().isoformat()
+        conn = self._connect()
+        for subscription in discovered:
+            # Subscriptions novas entram selecionadas; a seleção existente é preservada
+            conn.execute('''
+                INSERT INTO user_subscriptions (user_id, subscription_id, display_name, state, tenant_id, discovered_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, subscription_id) DO UPDATE SET
+                    display_name = excluded.display_name, state = excluded.state,
+                    tenant_id = excluded.tenant_id, discovered_at = excluded.discovered_at
+            ''', (user_id, subscription['subscription_id'], subscription['display_name'],
+                  subscription['state'], subscription['tenant_id'], now))
+        if discovered:
+            conn.execute(f'''
+                DELETE FROM user_subscriptions
+                WHERE user_id = ? AND subscription_id NOT IN ({','.join('?' * len(discovered))})
+            ''', [user_id] + [subscription['subscription_id'] for subscription in discovered])
+        conn.commit()
+        conn.close()
+
+        self.cache.put((user_id, '*', 'subscriptions'), True)
+        return self.list_subscriptions(user_id)
+
+    def list_subscriptions(self, user_id: int) -> List[Dict[str, Any]]:
+        self._ensure_schema()
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT subscription_id, display_name, state, tenant_id, selected, discovered_at
+            FROM user_subscriptions WHERE user_id = ? ORDER BY display_name, subscription_id
+        ''', (user_id,)).fetchall()
+        conn.close()
+        return [{
+            'subscription_id': row[0],
+            'display_name': row[1],
+            'state': row[2],
+            'tenant_id': row[3],
+            'selected': bool(row[4]),
+            'discovered_at': row[5]
+        } for row in rows]
+
+    def set_selection(self, user_id: int, subscription_ids: List[str]) -> List[Dict[str, Any]]:
+        """Marca como selecionadas apenas as subscriptions informadas"""
+        self._ensure_schema()
+        conn = self._connect()
+        conn.execute('UPDATE user_subscriptions SET selected = 0 WHERE user_id = ?', (user_id,))
+        conn.executemany('''
+            UPDATE user_subscriptions SET selected = 1 WHERE user_id = ? AND subscription_id = ?
+        ''', [(user_id, subscription_id) for subscription_id in subscription_ids])
+        conn.commit()
+        conn.close()
+        return self.list_subscriptions(user_id)
+
+    def selected_subscriptions(self, user_id: int, credential: Any) -> List[str]:
+        subscriptions = self.discover(user_id, credential)
+        return [
+            subscription['subscription_id'] for subscription in subscriptions
+            if subscription['selected'] and subscription['state'] in (None, 'Enabled')
+        ]
+
+    # Execução paralela ------------------------------------------------------
+
+    def run(self, user_id: int, kind: str, subscription_ids: List[str],
+            fetch: Callable[[str], Any], refresh: bool = False,
+            timeout: float = FANOUT_TIMEOUT_SECONDS) -> Dict[str, Any]:
+        """
+        Executa fetch(subscription_id) em paralelo, usando o cache por subscription
+        Retorna {'results': {sub: valor}, 'errors': {sub: mensagem}, 'cached_at': {sub: ts}}
+        """
+        ttl = CACHE_TTL_SECONDS.get(kind, 300)
+        results, errors, cached_at = {}, {}, {}
+        futures = {}
+
+        for subscription_id in subscription_ids:
+            key = (user_id, subscription_id, kind)
+            value, stamp = (None, None) if refresh else self.cache.get(key, ttl)
+            if value is not None:
+                results[subscription_id] = value
+                cached_at[subscription_id] = stamp
+                continue
+            # copy_context: as chamadas da subscription contam na requisição que disparou o fan-out
+            future = self._executor.submit(
+                contextvars.copy_context().run, self._fetch_and_cache, key, fetch, subscription_id
+            )
+            futures[future] = subscription_id
+
+        done, pending = wait(futures, timeout=timeout)
+        for future in done:
+            subscription_id = futures[future]
+            try:
+                results[subscription_id] = future.result()
+                cached_at[subscription_id] = time.time()
+            except ArmThrottledError as e:
+                errors[subscription_id] = f'Limite de requisições do Azure atingido: {str(e)}'
+            except Exception as e:
+                logger.warning(f"Falha em {kind} da subscription {subscription_id}: {str(e)}")
+                errors[subscription_id] = str(e)
+        for future in pending:
+            # Continua em background e alimenta o cache para a próxima consulta
+            errors[futures[future]] = 'Tempo limite excedido'
+
+        return {'results': results, 'errors': errors, 'cached_at': cached_at}
+
+    def _fetch_and_cache(self, key, fetch, subscription_id):
+        value = fetch(subscription_id)
+        self.cache.put(key, value)
+        return value
+
+    # Visões do tenant -------------------------------------------------------
+
+    def tenant_inventory(self, user_id: int, credential: Any, refresh: bool = False) -> Dict[str, Any]:
+        from azure.mgmt.resource import ResourceManagementClient
+
+        def fetch(subscription_id):
+            client = ResourceManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_LOW))
+            with arm_priority(PRIORITY_LOW):
+                resource_groups = [rg.name for rg in client.resource_groups.list()]
+                resources = [
+                    {**Resource.from_azure(resource), 'subscription_id': subscription_id}
+                    for resource in client.resources.list()
+                ]
+            return {'resource_groups': resource_groups, 'resources': resources}
+
+        subscription_ids = self.selected_subscriptions(user_id, credential)
+        outcome = self.run(user_id, 'inventory', subscription_ids, fetch, refresh)
+
+        by_type = {}
+        per_subscription = {}
+        resources = []
+        for subscription_id, value in outcome['results'].items():
+            resources.extend(value['resources'])
+            per_subscription[subscription_id] = {
+                'resources': len(value['resources']),
+                'resource_groups': len(value['resource_groups'])
+            }
+            for resource in value['resources']:
+                by_type[resource['type']] = by_type.get(resource['type'], 0) + 1
+
+        return {
+            'resources': resources,
+            'total_resources': len(resources),
+            'total_resource_groups': sum(item['resource_groups'] for item in per_subscription.values()),
+            'by_type': by_type,
+            'subscriptions': per_subscription,
+            **self._coverage(subscription_ids, outcome)
+        }
+
+    def tenant_locks(self, user_id: int, credential: Any, refresh: bool = False) -> Dict[str, Any]:
+        from azure.mgmt.resource import ManagementLockClient
+
+        def fetch(subscription_id):
+            client = ManagementLockClient(credential, subscription_id, **azure_client_options(PRIORITY_LOW))
+            with arm_priority(PRIORITY_LOW):
+                return [{
+                    'id': lock.id,
+                    'name': lock.name,
+                    'level': getattr(lock.level, 'value', lock.level),
+                    'notes': lock.notes,
+                    'subscription_id': subscription_id
+                } for lock in client.management_locks.list_at_subscription_level()]
+
+        subscription_ids = self.selected_subscriptions(user_id, credential)
+        outcome = self.run(user_id, 'locks', subscription_ids, fetch, refresh)
+
+        locks = [lock for value in outcome['results'].values() for lock in value]
+        return {
+            'locks': locks,
+            'total_locks': len(locks),
+            'subscriptions': {subscription_id: len(value) for subscription_id, value in outcome['results'].items()},
+            **self._coverage(subscription_ids, outcome)
+        }
+
+    def tenant_costs(self, user_id: int, credential: Any, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Custos do mês corrente por subscription do tenant
+        Não alimenta o cost_store: os totais do período usados por budgets e alertas
+        continuam restritos à subscription principal do usuário
+        """
+        def fetch(subscription_id):
+            daily, currency = fetch_daily_costs(credential, subscription_id)
+            return {'total': round(sum(daily.values()), 2), 'currency': currency}
+
+        subscription_ids = self.selected_subscriptions(user_id, credential)
+        outcome = self.run(user_id, 'costs', subscription_ids, fetch, refresh)
+
+        # Subscriptions podem faturar em moedas diferentes: soma apenas dentro da mesma moeda
+        totals_by_currency = {}
+        for value in outcome['results'].values():
+            totals_by_currency[value['currency']] = totals_by_currency.get(value['currency'], 0.0) + value['total']
+        totals_by_currency = {currency: round(total, 2) for currency, total in totals_by_currency.items()}
+        single_currency = next(iter(totals_by_currency)) if len(totals_by_currency) == 1 else None
+
+        return {
+            'total_cost': totals_by_currency[single_currency] if single_currency else None,
+            'currency': single_currency,
+            'totals_by_currency': totals_by_currency,
+            'subscriptions': outcome['results'],
+            'period_total': cost_store.get_period_total(user_id),
+            **self._coverage(subscription_ids, outcome)
+        }
+
+    @staticmethod
+    def _coverage(subscription_ids, outcome):
+        return {
+            'subscription_count': len(subscription_ids),
+            'succeeded': len(outcome['results']),
+            'errors': outcome['errors'],
+            'partial': bool(outcome['errors']),
+            'cached_at': outcome['cached_at']
+        }
+
+
+# Instância global do serviço
+subscription_fanout = SubscriptionFanOut()
@@ -0,0 +1,575 @@
+"""
+Armazenamento de séries temporais de métricas
+Bufferiza a ingestão de pontos brutos em metrics_history com inserts em lote,
+consolida em background em camadas de 1 minuto, 1 hora e 1 dia
+(min/max/avg/sum/count) e aplica retenção por camada. Consultas por período
+escolhem automaticamente a camada mais grossa que atende a resolução pedida
+e reagrupam o resultado em no máximo max_points pontos
+"""
+
+import os
+import json
+import math
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'app.db')
+
+# Ingestão
+FLUSH_BATCH_SIZE = int(os.environ.get('METRICS_FLUSH_BATCH_SIZE', '500'))
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('METRICS_FLUSH_INTERVAL_SECONDS', '5'))
+MAX_BUFFERED_POINTS = int(os.environ.get('METRICS_MAX_BUFFERED_POINTS', '50000'))
+
+# Consolidação e retenção
+ROLLUP_INTERVAL_SECONDS = float(os.environ.get('METRICS_ROLLUP_INTERVAL_SECONDS', '60'))
+RETENTION_INTERVAL_SECONDS = float(os.environ.get('METRICS_RETENTION_INTERVAL_SECONDS', '3600'))
+# Janela recalculada a cada consolidação para absorver pontos que chegam atrasados
+LATE_ARRIVAL_SECONDS = 300
+
+DEFAULT_MAX_POINTS = 300
+
+TIER_RAW = 'raw'
+
+# (camada, tamanho do bucket em segundos, camada de origem, retenção em segundos)
+TIERS = [
+    (TIER_RAW, 0, None, int(os.environ.get('METRICS_RAW_RETENTION_HOURS', '48')) * 3600),
+    ('1m', 60, TIER_RAW, int(os.environ.get('METRICS_1M_RETENTION_DAYS', '7')) * 86400),
+    ('1h', 3600, '1m', int(os.environ.get('METRICS_1H_RETENTION_DAYS', '90')) * 86400),
+    ('1d', 86400, '1h', int(os.environ.get('METRICS_1D_RETENTION_DAYS', '730')) * 86400),
+]
+TIER_BUCKETS = {name: bucket for name, bucket, _, _ in TIERS}
+TIER_RETENTION = {name: retention for name, _, _, retention in TIERS}
+
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _to_db_timestamp(ts):
+    """Mesmo formato (UTC) de CURRENT_TIMESTAMP, permitindo comparar como texto"""
+    return datetime.utcfromtimestamp(ts).strftime(_TS_FORMAT)
+
+
+class TimeSeriesStore:
+    """Ingestão, consolidação e consulta de métricas históricas"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._rollup_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self.dropped_points = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _ensure_started(self):
+        """Cria tabelas e inicia a thread de flush/consolidação sob demanda"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metrics_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    metric_type TEXT NOT NULL,
+                    metric_value REAL NOT NULL,
+                    metadata TEXT,
+                    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            columns = {row[1] for row in cursor.execute('PRAGMA table_info(metrics_history)')}
+            if 'series' not in columns:
+                cursor.execute("ALTER TABLE metrics_history ADD COLUMN series TEXT NOT NULL DEFAULT ''")
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_metrics_history_recorded ON metrics_history (recorded_at)')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metrics_rollup (
+                    user_id INTEGER NOT NULL,
+                    metric_type TEXT NOT NULL,
+                    series TEXT NOT NULL DEFAULT '',
+                    tier TEXT NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    sum REAL NOT NULL,
+                    min REAL NOT NULL,
+                    max REAL NOT NULL,
+                    PRIMARY KEY (user_id, metric_type, series, tier, bucket_start)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_metrics_rollup_tier ON metrics_rollup (tier, bucket_start)')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metrics_rollup_state (
+                    tier TEXT PRIMARY KEY,
+                    watermark INTEGER NOT NULL
+                )
+            ''')
+
+            # Registro de séries conhecidas (evita varrer o histórico para listar métricas)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metrics_series (
+                    user_id INTEGER NOT NULL,
+                    metric_type TEXT NOT NULL,
+                    series TEXT NOT NULL DEFAULT '',
+                    first_seen INTEGER NOT NULL,
+                    last_seen INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, metric_type, series)
+                ) WITHOUT ROWID
+            ''')
+            conn.commit()
+            conn.close()
+
+            self._worker = threading.Thread(target=self._run_worker, name='metrics-rollup', daemon=True)
+            self._worker.start()
+            atexit.register(self.flush)
+            self._initialized = True
+
+    # Ingestão -------------------------------------------------------------
+
+    def record(self, user_id: int, metric_type: str, value: float, metadata: Optional[Dict[str, Any]] = None,
+               series: str = '', timestamp: Optional[float] = None):
+        """Enfileira um ponto; a gravação acontece em lote"""
+        self._ensure_started()
+        point = (
+            user_id,
+            metric_type,
+            float(value),
+            json.dumps(metadata) if metadata else None,
+            series or '',
+            timestamp if timestamp is not None else time.time()
+        )
+        with self._buffer_lock:
+            if len(self._buffer) >= MAX_BUFFERED_POINTS:
+                # Banco indisponível por muito tempo: descarta o ponto mais antigo
+                self._buffer.pop(0)
+                self.dropped_points += 1
+            self._buffer.append(point)
+            should_flush = len(self._buffer) >= FLUSH_BATCH_SIZE
+        if should_flush:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Grava os pontos pendentes em uma única transação"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+
+            series_seen = {}
+            for user_id, metric_type, _, _, series, ts in batch:
+                key = (user_id, metric_type, series)
+                first, last = series_seen.get(key, (ts, ts))
+                series_seen[key] = (min(first, ts), max(last, ts))
+
+            try:
+                conn = self._connect()
+                conn.executemany('''
+                    INSERT INTO metrics_history (user_id, metric_type, metric_value, metadata, series, recorded_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(u, m, v, meta, s, _to_db_timestamp(ts)) for u, m, v, meta, s, ts in batch])
+                conn.executemany('''
+                    INSERT INTO metrics_series (user_id, metric_type, series, first_seen, last_seen)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (user_id, metric_type, series)
+                    DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen)
+                ''', [(u, m, s, int(first), int(last)) for (u, m, s), (first, last) in series_seen.items()])
+                conn.commit()
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao gravar lote de métricas: {str(e)}")
+                # Devolve o lote ao buffer (respeitando o limite) para a próxima tentativa
+                with self._buffer_lock:
+                    room = max(0, MAX_BUFFERED_POINTS - len(self._buffer))
+                    self._buffer[:0] = batch[len(batch) - room:] if room else []
+                    self.dropped_points += max(0, len(batch) - room)
+                return 0
+            return len(batch)
+
+    def record_buckets(self, user_id: int, metric_type: str, rows: List[tuple], tier: str = '1h') -> int:
+        """
+        Grava buckets já agregados na origem (ex.: métricas horárias do Azure Monitor)
+        rows: [(series, bucket_start, count, sum, min, max)]; regravar o mesmo bucket o
+        substitui. As camadas mais grossas voltam a marca d'água para reconsolidar o período
+        """
+        self._ensure_started()
+        if not rows:
+            return 0
+        earliest = min(row[1] for row in rows)
+        series_seen = {}
+        for series, bucket_start, *_ in rows:
+            first, last = series_seen.get(series, (bucket_start, bucket_start))
+            series_seen[series] = (min(first, bucket_start), max(last, bucket_start))
+
+        with self._rollup_lock:
+            conn = self._connect()
+            conn.executemany('''
+                INSERT OR REPLACE INTO metrics_rollup
+                    (user_id, metric_type, series, tier, bucket_start, count, sum, min, max)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(user_id, metric_type, series or '', tier, int(start), count, total, minimum, maximum)
+                  for series, start, count, total, minimum, maximum in rows])
+            conn.executemany('''
+                INSERT INTO metrics_series (user_id, metric_type, series, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, metric_type, series)
+                DO UPDATE SET first_seen = MIN(first_seen, excluded.first_seen),
+                              last_seen = MAX(last_seen, excluded.last_seen)
+            ''', [(user_id, metric_type, series or '', int(first), int(last))
+                  for series, (first, last) in series_seen.items()])
+            coarser = [(name, bucket) for name, bucket, _, _ in TIERS if bucket > TIER_BUCKETS[tier]]
+            conn.executemany('''
+                UPDATE metrics_rollup_state SET watermark = MIN(watermark, ?) WHERE tier = ?
+            ''', [((int(earliest) // bucket) * bucket + bucket, name) for name, bucket in coarser])
+            conn.commit()
+            conn.close()
+        return len(rows)
+
+    # Consolidação ---------------------------------------------------------
+
+    def _get_watermark(self, cursor, tier):
+        cursor.execute('SELECT watermark FROM metrics_rollup_state WHERE tier = ?', (tier,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _source_start(self, cursor, tier, source):
+        """Primeiro instante com dados na camada de origem (primeira consolidação)"""
+        if source == TIER_RAW:
+            cursor.execute("SELECT MIN(CAST(strftime('%s', recorded_at) AS INTEGER)) FROM metrics_history")
+        else:
+            cursor.execute('SELECT MIN(bucket_start) FROM metrics_rollup WHERE tier = ?', (source,))
+        row = cursor.fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def rollup(self, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Consolida buckets fechados de cada camada a partir da camada anterior
+        Os últimos buckets são sempre recalculados por completo (idempotente via upsert)
+        """
+        now = int(now if now is not None else time.time())
+        results = {}
+        with self._rollup_lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            for tier, bucket, source, _ in TIERS:
+                if source is None:
+                    continue
+
+                # Só consolida buckets cuja origem já está fechada
+                source_bucket = TIER_BUCKETS[source] or 1
+                closed_until = ((now - LATE_ARRIVAL_SECONDS) // source_bucket) * source_bucket
+                closed_until = (closed_until // bucket) * bucket
+
+                watermark = self._get_watermark(cursor, tier)
+                if watermark is None:
+                    first = self._source_start(cursor, tier, source)
+                    if first is None:
+                        # Sem origem (ex.: camada alimentada só por record_buckets): a marca
+                        # d'água acompanha o tempo para que as consultas leiam a camada
+                        cursor.execute('''
+                            INSERT OR REPLACE INTO metrics_rollup_state (tier, watermark) VALUES (?, ?)
+                        ''', (tier, closed_until))
+                        conn.commit()
+                        continue
+                    start = (first // bucket) * bucket
+                else:
+                    start = max(0, watermark - max(bucket, LATE_ARRIVAL_SECONDS))
+                    start = (start // bucket) * bucket
+                if start >= closed_until:
+                    continue
+
+                if source == TIER_RAW:
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO metrics_rollup
+                            (user_id, metric_type, series, tier, bucket_start, count, sum, min, max)
+                        SELECT user_id, metric_type, series, ?,
+                               (CAST(strftime('%s', recorded_at) AS INTEGER) / ?) * ? AS bucket,
+                               COUNT(*), SUM(metric_value), MIN(metric_value), MAX(metric_value)
+                        FROM metrics_history
+                        WHERE recorded_at >= ? AND recorded_at < ?
+                        GROUP BY user_id, metric_type, series, bucket
+                    ''', (tier, bucket, bucket, _to_db_timestamp(start), _to_db_timestamp(closed_until)))
+                else:
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO metrics_rollup
+                            (user_id, metric_type, series, tier, bucket_start, count, sum, min, max)
+                        SELECT user_id, metric_type, series, ?, (bucket_start / ?) * ? AS bucket,
+                               SUM(count), SUM(sum), MIN(min), MAX(max)
+                        FROM metrics_rollup
+                        WHERE tier = ? AND bucket_start >= ? AND bucket_start < ?
+                        GROUP BY user_id, metric_type, series, bucket
+                    ''', (tier, bucket, bucket, source, start, closed_until))
+                results[tier] = cursor.rowcount
+
+                cursor.execute('''
+                    INSERT OR REPLACE INTO metrics_rollup_state (tier, watermark) VALUES (?, ?)
+                ''', (tier, closed_until))
+                conn.commit()
+            conn.close()
+        return results
+
+    def apply_retention(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Remove dados mais antigos que a retenção de cada camada"""
+        now = int(now if now is not None else time.time())
+        deleted = {}
+        with self._rollup_lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            for tier, _, _, retention in TIERS:
+                cutoff = now - retention
+                if tier == TIER_RAW:
+                    # Nunca apagar dados brutos ainda não consolidados
+                    watermark = self._get_watermark(cursor, '1m')
+                    if watermark is None:
+                        continue
+                    cursor.execute('DELETE FROM metrics_history WHERE recorded_at < ?',
+                                   (_to_db_timestamp(min(cutoff, watermark)),))
+                else:
+                    cursor.execute('DELETE FROM metrics_rollup WHERE tier = ? AND bucket_start < ?', (tier, cutoff))
+                deleted[tier] = cursor.rowcount
+            conn.commit()
+            conn.close()
+        return deleted
+
+    def _run_worker(self):
+        last_rollup = last_retention = time.monotonic()
+        while True:
+            self._wake.wait(FLUSH_INTERVAL_SECONDS)
+            self._wake.clear()
+            try:
+                self.flush()
+                now = time.monotonic()
+                if now - last_rollup >= ROLLUP_INTERVAL_SECONDS:
+                    self.rollup()
+                    last_rollup = now
+                if now - last_retention >= RETENTION_INTERVAL_SECONDS:
+                    self.apply_retention()
+                    last_retention = now
+            except Exception as e:
+                logger.error(f"Erro na consolidação de métricas: {str(e)}")
+
+    # Consulta -------------------------------------------------------------
+
+    @staticmethod
+    def effective_resolution(start: float, end: float, resolution: Optional[float] = None,
+                             max_points: int = DEFAULT_MAX_POINTS) -> float:
+        """
+        Largura dos pontos devolvidos: a resolução pedida, mas nunca fina a ponto de
+        passar de max_points pontos no período (um bucket extra pelo alinhamento)
+        """
+        return max(1.0, float(resolution or 0), (end - start) / max(1, max_points - 1))
+
+    def choose_tier(self, start: float, end: float, resolution: Optional[float] = None,
+                    max_points: int = DEFAULT_MAX_POINTS, now: Optional[float] = None) -> str:
+        """
+        Camada mais grossa cujo bucket não excede a resolução efetiva e que ainda
+        retém o início do período
+        """
+        now = now if now is not None else time.time()
+        resolution = self.effective_resolution(start, end, resolution, max_points)
+
+        chosen = None
+        for tier, bucket, _, retention in TIERS:
+            if bucket <= resolution and start >= now - retention:
+                chosen = tier
+        if chosen is None:
+            # Período além da retenção das camadas finas: usar a que ainda tem os dados
+            covering = [tier for tier, _, _, retention in TIERS if start >= now - retention]
+            chosen = covering[0] if covering else TIERS[-1][0]
+        return chosen
+
+    def query(self, user_id: int, metric_type: str, start: float, end: float,
+              resolution: Optional[float] = None, series: Optional[str] = None,
+              max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, Any]:
+        """
+        Série agregada do período, lida da camada escolhida automaticamente e
+        reagrupada na resolução efetiva (no máximo max_points pontos)
+        """
+        self._ensure_started()
+        self.flush()
+
+        tier = self.choose_tier(start, end, resolution, max_points)
+        tier_bucket = TIER_BUCKETS[tier]
+        # Múltiplo do bucket da camada para que cada bucket lido caia inteiro em um ponto
+        unit = tier_bucket or 1
+        bucket = int(math.ceil(self.effective_resolution(start, end, resolution, max_points) / unit)) * unit
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        buckets = {}
+
+        # Lê a camada escolhida até sua marca d'água; a cauda ainda não consolidada vem
+        # das camadas mais finas (e por fim dos dados brutos), reagrupada no mesmo bucket
+        position = start
+        finer_tiers = [name for name, size, _, _ in TIERS if 0 < size <= tier_bucket]
+        for read_tier in reversed(finer_tiers):
+            if position >= end:
+                break
+            watermark = self._get_watermark(cursor, read_tier)
+            if watermark is None or watermark <= position:
+                continue
+            until = min(end, watermark)
+            for bucket_start, count, total, minimum, maximum in self._read_rollup(
+                    cursor, user_id, metric_type, series, read_tier, position, until):
+                self._merge(buckets, (bucket_start // bucket) * bucket, count, total, minimum, maximum)
+            position = until
+
+        if position < end:
+            for ts, value in self._read_raw(cursor, user_id, metric_type, series, position, end):
+                self._merge(buckets, (int(ts) // bucket) * bucket, 1, value, value, value)
+        conn.close()
+
+        points = [
+            {
+                't': bucket_start,
+                'avg': total / count if count else None,
+                'min': minimum,
+                'max': maximum,
+                'sum': total,
+                'count': count
+            }
+            for bucket_start, (count, total, minimum, maximum) in sorted(buckets.items())
+        ]
+        return {'tier': tier, 'bucket_seconds': bucket, 'points': points}
+
+    def _merge(self, buckets, key, count, total, minimum, maximum):
+        entry = buckets.get(key)
+        if entry is None:
+            buckets[key] = [count, total, minimum, maximum]
+        else:
+            entry[0] += count
+            entry[1] += total
+            entry[2] = min(entry[2], minimum)
+            entry[3] = max(entry[3], maximum)
+
+    def _read_rollup(self, cursor, user_id, metric_type, series, tier, start, end):
+        params = [user_id, metric_type, tier, int(start), int(end)]
+        series_clause = ''
+        if series is not None:
+            series_clause = ' AND series = ?'
+            params.insert(2, series)
+        cursor.execute(f'''
+            SELECT bucket_start, SUM(count), SUM(sum), MIN(min), MAX(max)
+            FROM metrics_rollup
+            WHERE user_id = ? AND metric_type = ?{series_clause} AND tier = ?
+              AND bucket_start >= ? AND bucket_start < ?
+            GROUP BY bucket_start
+        ''', params)
+        return cursor.fetchall()
+
+    def _read_raw(self, cursor, user_id, metric_type, series, start, end):
+        params = [user_id, metric_type, _to_db_timestamp(start), _to_db_timestamp(end)]
+        series_clause = ''
+        if series is not None:
+            series_clause = ' AND series = ?'
+            params.append(series)
+        cursor.execute(f'''
+            SELECT CAST(strftime('%s', recorded_at) AS INTEGER), metric_value
+            FROM metrics_history
+            WHERE user_id = ? AND metric_type = ? AND recorded_at >= ? AND recorded_at < ?{series_clause}
+            ORDER BY recorded_at
+        ''', params)
+        return cursor.fetchall()
+
+    def summarize(self, user_id: int, metric_types: List[str], start: float, end: Optional[float] = None,
+                  tier: str = '1h') -> Dict[tuple, Dict[str, float]]:
+        """Agregado do período por (metric_type, series) lido de uma camada, em uma consulta"""
+        self._ensure_started()
+        if not metric_types:
+            return {}
+        end = end if end is not None else time.time()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT metric_type, series, SUM(count), SUM(sum), MIN(min), MAX(max)
+            FROM metrics_rollup
+            WHERE user_id = ? AND tier = ? AND metric_type IN ({','.join('?' * len(metric_types))})
+              AND bucket_start >= ? AND bucket_start < ?
+            GROUP BY metric_type, series
+        ''', [user_id, tier, *metric_types, int(start), int(end)])
+        rows = cursor.fetchall()
+        conn.close()
+        return {
+            (metric_type, series): {
+                'count': count,
+                'sum': total,
+                'avg': total / count if count else None,
+                'min': minimum,
+                'max': maximum
+            }
+            for metric_type, series, count, total, minimum, maximum in rows
+        }
+
+    def read_buckets(self, user_id: int, metric_types: List[str], start: float, end: float,
+                     tier: str = '1h', series: Optional[List[str]] = None) -> List[tuple]:
+        """
+        Buckets de todas as séries do período em uma consulta:
+        [(metric_type, series, bucket_start, count, sum, min, max)]
+        series restringe a leitura a algumas séries (busca pela chave primária)
+        """
+        self._ensure_started()
+        conn = self._connect()
+        cursor = conn.cursor()
+        query = f'''
+            SELECT metric_type, series, bucket_start, count, sum, min, max FROM metrics_rollup
+            WHERE user_id = ? AND tier = ? AND metric_type IN ({','.join('?' * len(metric_types))})
+              AND bucket_start >= ? AND bucket_start < ?
+        '''
+        params = [user_id, tier, *metric_types, int(start), int(end)]
+        if series is None:
+            rows = cursor.execute(query, params).fetchall()
+        else:
+            rows = []
+            # Lotes abaixo do limite de variáveis do SQLite
+            for offset in range(0, len(series), 500):
+                chunk = series[offset:offset + 500]
+                rows.extend(cursor.execute(
+                    query + f' AND series IN ({",".join("?" * len(chunk))})', params + chunk
+                ).fetchall())
+        conn.close()
+        return rows
+
+    def list_series(self, user_id: int, metric_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Séries conhecidas do usuário (opcionalmente de um tipo de métrica)"""
+        self._ensure_started()
+        conn = self._connect()
+        cursor = conn.cursor()
+        if metric_type:
+            cursor.execute('''
+                SELECT metric_type, series, first_seen, last_seen FROM metrics_series
+                WHERE user_id = ? AND metric_type = ? ORDER BY metric_type, series
+            ''', (user_id, metric_type))
+        else:
+            cursor.execute('''
+                SELECT metric_type, series, first_seen, last_seen FROM metrics_series
+                WHERE user_id = ? ORDER BY metric_type, series
+            ''', (user_id,))
+        rows = cursor.fetchall()
+        conn.close()
+        return [
+            {'metric_type': row[0], 'series': row[1], 'first_seen': row[2], 'last_seen': row[3]}
+            for row in rows
+        ]
+
+
+# Instância global do serviço
+timeseries_store = TimeSeriesStore()
@@ -0,0 +1,194 @@
+"""
+Fila persistente de entrega de webhooks
+As notificações são gravadas antes do envio e entregues por uma thread em
+background, com novas tentativas em backoff exponencial; o fluxo que gerou o
+evento nunca espera pela resposta do destino
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bolt_dashboard.db')
+
+WEBHOOK_TIMEOUT_SECONDS = float(os.environ.get('WEBHOOK_TIMEOUT_SECONDS', '10'))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', '8'))
+BACKOFF_BASE_SECONDS = 15
+BACKOFF_MAX_SECONDS = 3600
+POLL_INTERVAL_SECONDS = 30
+BATCH_SIZE = 20
+
+
+def backoff_delay(attempts: int) -> float:
+    """Atraso até a próxima tentativa (exponencial com jitter)"""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class WebhookDeliveryQueue:
+    """Entregas pendentes em SQLite; cada entrega é reservada antes do envio"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._session = requests.Session()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS webhook_deliveries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    url TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    delivered_at TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_webhook_deliveries_due
+                ON webhook_deliveries (status, next_attempt_at)
+            ''')
+            conn.commit()
+            conn.close()
+            self._initialized = True
+
+    def enqueue(self, url: str, payload: Dict[str, Any], user_id: Optional[int] = None) -> int:
+        """Grava a entrega e acorda o worker; retorna o id da entrega"""
+        self._ensure_schema()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO webhook_deliveries (user_id, url, payload, next_attempt_at)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, url, json.dumps(payload, default=str), time.time()))
+        delivery_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+
+        self._ensure_started()
+        self._wakeup.set()
+        return delivery_id
+
+    def _ensure_started(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run_worker, name='webhook-delivery', daemon=True)
+            self._worker.start()
+
+    def start(self):
+        """Inicia o worker (retoma entregas pendentes de execuções anteriores)"""
+        self._ensure_schema()
+        self._ensure_started()
+
+    def _run_worker(self):
+        while True:
+            try:
+                delivered = self.deliver_due()
+            except Exception as e:
+                logger.error(f"Erro no worker de webhooks: {str(e)}")
+                delivered = 0
+            if delivered < BATCH_SIZE:
+                self._wakeup.wait(POLL_INTERVAL_SECONDS)
+                self._wakeup.clear()
+
+    def deliver_due(self) -> int:
+        """Tenta as entregas vencidas; retorna quantas foram processadas"""
+        self._ensure_schema()
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT id, url, payload, attempts FROM webhook_deliveries
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY next_attempt_at LIMIT ?
+        ''', (time.time(), BATCH_SIZE)).fetchall()
+        claimed = [row for row in rows if self._claim(conn, row[0])]
+        conn.close()
+
+        for delivery_id, url, payload, attempts in claimed:
+            self._attempt(delivery_id, url, payload, attempts + 1)
+        return len(rows)
+
+    def _claim(self, conn, delivery_id):
+        """
+        Reserva a entrega adiando next_attempt_at pelo tempo de uma tentativa
+        Com vários workers (processos) apenas um vence o UPDATE condicional
+        """
+        now = time.time()
+        cursor = conn.execute('''
+            UPDATE webhook_deliveries SET next_attempt_at = ?
+            WHERE id = ? AND status = 'pending' AND next_attempt_at <= ?
+        ''', (now + WEBHOOK_TIMEOUT_SECONDS * 3, delivery_id, now))
+        conn.commit()
+        return cursor.rowcount == 1
+
+    def _attempt(self, delivery_id, url, payload, attempts):
+        error = None
+        try:
+            response = self._session.post(
+                url,
+                data=payload,
+                headers={'Content-Type': 'application/json', 'X-Delivery-Id': str(delivery_id)},
+                timeout=WEBHOOK_TIMEOUT_SECONDS
+            )
+            if response.status_code >= 400:
+                error = f'HTTP {response.status_code}'
+        except requests.RequestException as e:
+            error = str(e)
+
+        conn = self._connect()
+        if error is None:
+            conn.execute('''
+                UPDATE webhook_deliveries SET status = 'delivered', attempts = ?, last_error = NULL, delivered_at = ?
+                WHERE id = ?
+            ''', (attempts, datetime.utcnow().isoformat(), delivery_id))
+        elif attempts >= WEBHOOK_MAX_ATTEMPTS:
+            logger.warning(f"Webhook {delivery_id} descartado após {attempts} tentativas: {error}")
+            conn.execute('''
+                UPDATE webhook_deliveries SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?
+            ''', (attempts, error, delivery_id))
+        else:
+            conn.execute('''
+                UPDATE webhook_deliveries SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?
+            ''', (attempts, error, time.time() + backoff_delay(attempts), delivery_id))
+        conn.commit()
+        conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        self._ensure_schema()
+        conn = self._connect()
+        rows = conn.execute('SELECT status, COUNT(*) FROM webhook_deliveries GROUP BY status').fetchall()
+        conn.close()
+        return dict(rows)
+
+
+# Instância global do serviço
+webhook_queue = WebhookDeliveryQueue()
@@ -0,0 +1,93 @@
+"""
+Parser de ids do Azure Resource Manager
+Substitui a indexação ad hoc (resource.id.split('/')[4], lock.scope.split('/')) por
+um parser memoizado que devolve a estrutura do id: subscription, resource group,
+namespace do provider, cadeia de tipos e nomes (tipos aninhados) e o escopo sob o
+qual o recurso existe (para extensões como locks, o recurso alvo). Segmentos que se
+repetem entre recursos (subscription, resource group, provider, tipos) são internados
+"""
+
+import os
+import sys
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+ARM_ID_CACHE_SIZE = int(os.environ.get('ARM_ID_CACHE_SIZE', '131072'))
+
+_LOCK_SUFFIX = '/providers/microsoft.authorization/locks/'
+
+
+class ArmId(NamedTuple):
+    """Estrutura de um id ARM"""
+    subscription: Optional[str]
+    resource_group: Optional[str]
+    provider: Optional[str]  # ex.: Microsoft.Compute
+    types: Tuple[str, ...]  # ex.: ('virtualMachines', 'extensions')
+    names: Tuple[str, ...]  # nomes correspondentes a cada tipo
+    scope: Optional[str]  # id do escopo do provider (resource group, subscription ou recurso alvo)
+
+    @property
+    def name(self) -> Optional[str]:
+        if self.names:
+            return self.names[-1]
+        return self.resource_group or self.subscription
+
+    @property
+    def resource_type(self) -> Optional[str]:
+        """Tipo completo, ex.: Microsoft.Compute/virtualMachines/extensions"""
+        if not self.provider:
+            return None
+        return '/'.join((self.provider,) + self.types)
+
+    @property
+    def parent_path(self) -> str:
+        """Caminho dos pais de um tipo aninhado (parent_resource_path do SDK), ex.: servers/sql01"""
+        return '/'.join(f'{type_}/{name}' for type_, name in zip(self.types[:-1], self.names[:-1]))
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+@lru_cache(maxsize=ARM_ID_CACHE_SIZE)
+def parse_arm_id(resource_id: str) -> ArmId:
+    """
+    Decompõe um id ARM (o resultado é memoizado por id)
+    Ex.: /subscriptions/s/resourceGroups/rg/providers/Microsoft.Compute/virtualMachines/vm
+    """
+    own_id = resource_id or ''
+    parts = [part for part in own_id.split('/') if part]
+    subscription = resource_group = provider = scope = None
+    index = 0
+    if len(parts) > 1 and parts[0].lower() == 'subscriptions':
+        subscription = _intern(parts[1])
+        index = 2
+    if len(parts) > index + 1 and parts[index].lower() == 'resourcegroups':
+        resource_group = _intern(parts[index + 1])
+        index += 2
+
+    # O último /providers/ define o recurso; o que vem antes é o seu escopo (para
+    # recursos de extensão, como locks, é o recurso alvo)
+    last_providers = own_id.lower().rfind('/providers/')
+    if last_providers >= 0:
+        scope = own_id[:last_providers]
+        index = len([part for part in scope.split('/') if part])
+        if index + 1 < len(parts):
+            provider = _intern(parts[index + 1])
+            index += 2
+
+    chain = parts[index:]
+    types = tuple(_intern(value) for value in chain[0::2])
+    names = tuple(chain[1::2])
+    return ArmId(subscription, resource_group, provider, types, names, scope)
+
+
+def resource_group_of(resource_id: str) -> Optional[str]:
+    """Resource group do id (None para escopos de subscription/tenant)"""
+    return parse_arm_id(resource_id).resource_group
+
+
+def lock_scope(lock_id: str) -> str:
+    """Escopo de um lock: o id sem /providers/Microsoft.Authorization/locks/{nome}"""
+    index = lock_id.lower().rfind(_LOCK_SUFFIX)
+    return lock_id[:index] if index >= 0 else lock_id
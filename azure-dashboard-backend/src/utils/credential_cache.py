@@ -0,0 +1,106 @@
+"""
+Cache de resolução de credenciais Azure
+Mantém por usuário o material de credencial já descriptografado, carimbado com a
+versão do registro (updated_at), evitando consultas repetidas ao banco e
+descriptografia a cada obtenção de cliente
+"""
+
+import os
+import time
+import threading
+
+# Após este intervalo a entrada é revalidada com uma consulta leve da versão no banco
+REVALIDATE_SECONDS = float(os.environ.get('CREDENTIAL_CACHE_REVALIDATE_SECONDS', '60'))
+
+
+class ResolvedCredentials:
+    """Credenciais descriptografadas de um usuário em uma versão específica do registro"""
+
+    __slots__ = ('user_id', 'tenant_id', 'client_id', 'client_secret', 'subscription_id',
+                 'subscription_name', 'version', '_credential', '_lock')
+
+    def __init__(self, user_id, tenant_id, client_id, client_secret, subscription_id,
+                 subscription_name, version):
+        self.user_id = user_id
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.subscription_id = subscription_id
+        self.subscription_name = subscription_name
+        self.version = version
+        self._credential = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_model(cls, creds):
+        """Resolve a partir do modelo AzureCredentials (única descriptografia por versão)"""
+        return cls(
+            user_id=creds.user_id,
+            tenant_id=creds.tenant_id,
+            client_id=creds.client_id,
+            client_secret=creds.get_client_secret(),
+            subscription_id=creds.subscription_id,
+            subscription_name=creds.subscription_name,
+            version=version_stamp(creds.updated_at)
+        )
+
+    def get_credential(self):
+        """ClientSecretCredential reutilizado enquanto a versão não mudar (preserva o cache de tokens)"""
+        with self._lock:
+            if self._credential is None:
+                from azure.identity import ClientSecretCredential
+
+                self._credential = ClientSecretCredential(
+                    tenant_id=self.tenant_id,
+                    client_id=self.client_id,
+                    client_secret=self.client_secret
+                )
+            return self._credential
+
+
+def version_stamp(updated_at):
+    """Normaliza o updated_at do registro para comparação de versão"""
+    return updated_at.isoformat() if updated_at else None
+
+
+class CredentialCache:
+    """Cache em processo de credenciais resolvidas, indexado por usuário"""
+
+    def __init__(self, revalidate_seconds=REVALIDATE_SECONDS):
+        self.revalidate_seconds = revalidate_seconds
+        self._entries = {}  # user_id -> (ResolvedCredentials, validado em)
+        self._lock = threading.Lock()
+
+    def lookup(self, user_id):
+        """Retorna (credenciais, fresca); fresca=False indica que a versão deve ser revalidada"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if not entry:
+            return None, False
+        resolved, validated_at = entry
+        return resolved, (time.monotonic() - validated_at) < self.revalidate_seconds
+
+    def put(self, resolved):
+        with self._lock:
+            self._entries[resolved.user_id] = (resolved, time.monotonic())
+
+    def touch(self, user_id, version):
+        """Marca a entrada como revalidada se a versão ainda for a mesma"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0].version == version:
+                self._entries[user_id] = (entry[0], time.monotonic())
+                return True
+            return False
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Instância global compartilhada pelo modelo e pelos serviços
+credential_cache = CredentialCache()
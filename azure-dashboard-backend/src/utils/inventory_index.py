@@ -0,0 +1,279 @@
+"""
+Índice invertido do inventário para filtros por tag, tipo, região e resource group
+Cada valor aponta para as linhas (posição em sorted_ids do snapshot) que o contêm;
+filtros booleanos são avaliados como operações de bitset (int do Python) em vez
+de percorrer todos os recursos. O índice é montado uma vez por versão do snapshot
+
+Sintaxe de filtro (parâmetro filter):
+    tag:Environment=Production AND NOT tag:Owner
+    (type:Microsoft.Compute/virtualMachines OR type:Microsoft.Compute/disks) AND location:eastus
+Valores com espaços vão entre aspas: tag:"Cost Center"="Finance Team".
+Comparações ignoram maiúsculas/minúsculas, como no ARM
+"""
+
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+FIELDS = {'tag', 'type', 'location', 'rg', 'resource_group'}
+# Parâmetros de atalho aceitos nas rotas (valores separados por vírgula = OR)
+SHORTCUT_PARAMS = ('tag', 'missing_tag', 'type', 'location', 'resource_group')
+
+# Bitsets materializados mantidos por índice
+BITSET_CACHE_SIZE = 256
+
+# Posições dos bits ligados em cada valor de byte (conversão bitset -> linhas)
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"=:]+)|(=)|(:))')
+
+
+class InvalidFilterError(ValueError):
+    """Expressão de filtro malformada"""
+
+
+def _norm(value):
+    return value.strip().lower() if value is not None else ''
+
+
+class InventoryIndex:
+    """Postings por tag (chave e chave=valor), tipo, região e resource group"""
+
+    def __init__(self, ids, resources):
+        self.ids = ids
+        self.size = len(ids)
+        self.all_bits = (1 << self.size) - 1
+        self._postings = {}  # (campo, valor) -> array de linhas em ordem crescente
+        self._bitsets = OrderedDict()
+        self._lock = threading.Lock()
+
+        postings = {}
+
+        def add(key, row):
+            rows = postings.get(key)
+            if rows is None:
+                rows = postings[key] = array('I')
+            rows.append(row)
+
+        # Views binárias já iteram na ordem de sorted_ids; dicts são acessados por id
+        rows_iter = resources.values() if hasattr(resources, 'sorted_keys') else (resources[key] for key in ids)
+        for row, resource in enumerate(rows_iter):
+            add(('type', _norm(resource.get('type'))), row)
+            add(('location', _norm(resource.get('location'))), row)
+            add(('rg', _norm(resource.get('resource_group'))), row)
+            for tag_key, tag_value in (resource.get('tags') or {}).items():
+                tag_key = _norm(tag_key)
+                add(('tagkey', tag_key), row)
+                add(('tag', tag_key, _norm(tag_value)), row)
+        self._postings = postings
+
+    def bits(self, key):
+        """Bitset do posting (materializado sob demanda, com cache LRU)"""
+        with self._lock:
+            bits = self._bitsets.get(key)
+            if bits is not None:
+                self._bitsets.move_to_end(key)
+                return bits
+
+        rows = self._postings.get(key)
+        if not rows:
+            bits = 0
+        else:
+            buffer = bytearray((rows[-1] >> 3) + 1)
+            for row in rows:
+                buffer[row >> 3] |= 1 << (row & 7)
+            bits = int.from_bytes(buffer, 'little')
+
+        with self._lock:
+            self._bitsets[key] = bits
+            if len(self._bitsets) > BITSET_CACHE_SIZE:
+                self._bitsets.popitem(last=False)
+        return bits
+
+    def count(self, key):
+        rows = self._postings.get(key)
+        return len(rows) if rows else 0
+
+    def tag_values(self, tag_key):
+        """Valores (normalizados) de uma chave de tag com suas contagens"""
+        tag_key = _norm(tag_key)
+        return {
+            key[2]: len(rows) for key, rows in self._postings.items()
+            if key[0] == 'tag' and key[1] == tag_key
+        }
+
+    def evaluate(self, node):
+        """Avalia a árvore gerada por parse_filter e retorna o bitset resultante"""
+        operator = node[0]
+        if operator == 'and':
+            bits = self.all_bits
+            for child in node[1:]:
+                bits &= self.evaluate(child)
+                if not bits:
+                    break
+            return bits
+        if operator == 'or':
+            bits = 0
+            for child in node[1:]:
+                bits |= self.evaluate(child)
+            return bits
+        if operator == 'not':
+            return self.all_bits & ~self.evaluate(node[1])
+        if operator == 'tag':
+            _, tag_key, tag_value = node
+            if tag_value is None:
+                return self.bits(('tagkey', tag_key))
+            return self.bits(('tag', tag_key, tag_value))
+        return self.bits((operator, node[1]))
+
+    def select(self, bits):
+        """Ids (em ordem) das linhas presentes no bitset"""
+        if bits == self.all_bits:
+            return self.ids
+        ids = self.ids
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        return [
+            ids[(byte_index << 3) + bit]
+            for byte_index, byte in enumerate(data) if byte
+            for bit in _BYTE_BITS[byte]
+        ]
+
+
+# Expressões ---------------------------------------------------------------
+
+def _tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise InvalidFilterError(f'Filtro inválido próximo de: {expression[position:position + 20]}')
+        position = match.end()
+        open_paren, close_paren, quoted, word, equals, colon = match.groups()
+        if open_paren:
+            tokens.append(('(', None))
+        elif close_paren:
+            tokens.append((')', None))
+        elif quoted is not None:
+            tokens.append(('word', re.sub(r'\\(.)', r'\1', quoted)))
+        elif word is not None:
+            upper = word.upper()
+            tokens.append((upper, None) if upper in ('AND', 'OR', 'NOT') else ('word', word))
+        elif equals:
+            tokens.append(('=', None))
+        elif colon:
+            tokens.append((':', None))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self, kind):
+        if self.peek() != kind:
+            raise InvalidFilterError(f"Filtro inválido: esperado '{kind}'")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token[1]
+
+    def parse(self):
+        node = self.expression()
+        if self.position != len(self.tokens):
+            raise InvalidFilterError('Filtro inválido: conteúdo após o fim da expressão')
+        return node
+
+    def expression(self):
+        children = [self.term()]
+        while self.peek() == 'OR':
+            self.take('OR')
+            children.append(self.term())
+        return children[0] if len(children) == 1 else ('or', *children)
+
+    def term(self):
+        children = [self.factor()]
+        # AND explícito ou implícito (termos lado a lado)
+        while self.peek() in ('AND', 'NOT', '(', 'word'):
+            if self.peek() == 'AND':
+                self.take('AND')
+            children.append(self.factor())
+        return children[0] if len(children) == 1 else ('and', *children)
+
+    def factor(self):
+        if self.peek() == 'NOT':
+            self.take('NOT')
+            return ('not', self.factor())
+        if self.peek() == '(':
+            self.take('(')
+            node = self.expression()
+            self.take(')')
+            return node
+        return self.atom()
+
+    def atom(self):
+        field = self.take('word').lower()
+        if field not in FIELDS:
+            raise InvalidFilterError(f'Campo de filtro desconhecido: {field}')
+        self.take(':')
+        value = self.take('word')
+        if field == 'tag':
+            tag_value = None
+            if self.peek() == '=':
+                self.take('=')
+                tag_value = _norm(self.take('word'))
+            return ('tag', _norm(value), tag_value)
+        if self.peek() == '=':
+            raise InvalidFilterError("Filtro inválido: '=' só é aceito em tag")
+        return ('rg' if field == 'resource_group' else field, _norm(value))
+
+
+def parse_filter(expression):
+    """Converte a expressão em árvore de (operador, ...); None para expressão vazia"""
+    if not expression or not expression.strip():
+        return None
+    return _Parser(_tokenize(expression)).parse()
+
+
+def _shortcut_node(param, value):
+    if param in ('tag', 'missing_tag'):
+        tag_key, _, tag_value = value.partition('=')
+        node = ('tag', _norm(tag_key), _norm(tag_value) if tag_value else None)
+        return ('not', node) if param == 'missing_tag' else node
+    return ('rg' if param == 'resource_group' else param, _norm(value))
+
+
+def filter_from_args(args):
+    """
+    Monta o filtro a partir dos parâmetros da requisição: filter=<expressão> e os
+    atalhos tag=Chave[=Valor], missing_tag=Chave, type, location e resource_group
+    (vírgula = OR dentro do parâmetro; parâmetros diferentes = AND)
+    Retorna (árvore ou None, chave canônica para cache)
+    """
+    nodes = []
+    cache_key = []
+    expression = args.get('filter')
+    if expression:
+        node = parse_filter(expression)
+        if node is not None:
+            nodes.append(node)
+            cache_key.append(('filter', expression.strip()))
+
+    for param in SHORTCUT_PARAMS:
+        for raw in args.getlist(param):
+            values = [value for value in raw.split(',') if value.strip()]
+            if not values:
+                continue
+            options = [_shortcut_node(param, value) for value in values]
+            nodes.append(options[0] if len(options) == 1 else ('or', *options))
+            cache_key.append((param, raw))
+
+    if not nodes:
+        return None, None
+    node = nodes[0] if len(nodes) == 1 else ('and', *nodes)
+    return node, tuple(sorted(cache_key))
@@ -0,0 +1,62 @@
+"""
+Provider JSON do Flask com encoder rápido
+Usa orjson quando instalado (fallback para o json da stdlib) e não reordena chaves
+nem indenta: as respostas grandes (inventário, custos, exportações) eram dominadas
+pelo custo de serialização
+"""
+
+import json
+from collections.abc import Mapping
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+def _default(value):
+    """Tipos não nativos (datetime já é nativo no orjson; Decimal, UUID, dataclasses, sets...)"""
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Mapping):
+        return dict(value)  # ex.: Resource (src/models/resource.py)
+    return DefaultJSONProvider.default(value)
+
+
+def dumps_bytes(value):
+    """Serializa em bytes UTF-8 compactos"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads_bytes(data):
+    """Desserializa bytes ou memoryview (ex.: view de um arquivo mapeado)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Substitui o provider padrão: app.json = FastJSONProvider(app)"""
+
+    sort_keys = False
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Chamadas com opções explícitas (indent, sort_keys...) mantêm o comportamento padrão
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        # Gera os bytes diretamente, sem passar por str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
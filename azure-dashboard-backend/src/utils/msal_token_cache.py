@@ -0,0 +1,80 @@
+"""
+Cache de tokens MSAL serializado e persistido em disco
+Compartilhado entre workers: cada processo recarrega o arquivo quando outro o
+altera e grava de forma atômica sob lock de arquivo
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+import msal
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas exclusão entre threads do processo
+    fcntl = None
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    'MSAL_TOKEN_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'msal_token_cache.json')
+)
+
+
+class PersistedTokenCache:
+    """SerializableTokenCache do MSAL sincronizado com um arquivo compartilhado"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.cache = msal.SerializableTokenCache()
+        self._mtime = None
+        self._lock = threading.RLock()
+
+    def refresh_from_disk(self):
+        """Recarrega o cache se outro worker gravou uma versão mais nova"""
+        with self._lock:
+            self._reload()
+            return self.cache
+
+    @contextmanager
+    def locked(self):
+        """
+        Seção crítica entre threads e workers: recarrega o estado do disco na entrada
+        e persiste as alterações feitas pelo MSAL na saída
+        """
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + '.lock', 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._reload()
+                    yield self.cache
+                    self._persist()
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.path, 'r') as f:
+            state = f.read()
+        if state:
+            self.cache.deserialize(state)
+        self._mtime = mtime
+
+    def _persist(self):
+        if not self.cache.has_state_changed:
+            return
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.cache.serialize())
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+        self.cache.has_state_changed = False
@@ -0,0 +1,122 @@
+"""
+Utilitários de paginação por cursor (keyset)
+O cursor é opaco para o cliente: codifica os valores da chave de ordenação do
+último item retornado, permitindo buscar a próxima página com WHERE em vez de OFFSET
+"""
+
+import json
+import bisect
+import base64
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursorError(ValueError):
+    """Cursor malformado ou adulterado"""
+
+
+def encode_cursor(values):
+    """Codifica a chave de ordenação do último item (lista de valores JSON-serializáveis)"""
+    raw = json.dumps(list(values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size=None):
+    """Decodifica um cursor; size valida a quantidade de colunas da chave"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursorError('Cursor inválido') from e
+    if not isinstance(values, list) or (size is not None and len(values) != size):
+        raise InvalidCursorError('Cursor inválido')
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        raise InvalidCursorError('Cursor inválido')
+    return values
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Normaliza o tamanho de página recebido na query string"""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def optional_limit(args, maximum=MAX_PAGE_SIZE):
+    """
+    Tamanho de página de listagens que antes retornavam tudo: sem limit nem cursor na
+    query string retorna None (lista completa, como os clientes existentes esperam)
+    """
+    if args.get('limit') is None and args.get('cursor') is None:
+        return None
+    return parse_limit(args.get('limit'), maximum=maximum)
+
+
+# Estimativa de total limitada: contar além disso custaria tanto quanto listar tudo
+TOTAL_COUNT_CAP = 10000
+
+
+def sqlite_page(conn, table, columns, where, params, keys, limit, cursor=None, descending=True):
+    """
+    Página keyset sobre uma tabela SQLite
+    keys são as colunas da ordenação (a última deve ser única, ex.: id); seus valores
+    são lidos junto com columns e removidos das linhas retornadas; limit None lê tudo
+    Retorna (rows, next_cursor)
+    """
+    clauses = list(where)
+    values = list(params)
+    position = decode_cursor(cursor, size=len(keys))
+    if position:
+        operator = '<' if descending else '>'
+        clauses.append(f"({', '.join(keys)}) {operator} ({', '.join('?' * len(keys))})")
+        values.extend(position)
+
+    direction = 'DESC' if descending else 'ASC'
+    rows = conn.execute(f'''
+        SELECT {columns}, {', '.join(keys)}
+        FROM {table}
+        WHERE {' AND '.join(clauses) or '1'}
+        ORDER BY {', '.join(f'{key} {direction}' for key in keys)}
+        LIMIT ?
+    ''', (*values, -1 if limit is None else limit + 1)).fetchall()
+
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][-len(keys):]) if has_more else None
+    return [row[:-len(keys)] for row in rows], next_cursor
+
+
+def estimate_total(conn, table, where, params, cap=TOTAL_COUNT_CAP):
+    """Contagem limitada a cap; retorna (total, exato)"""
+    total = conn.execute(f'''
+        SELECT COUNT(*) FROM (SELECT 1 FROM {table} WHERE {' AND '.join(where) or '1'} LIMIT ?)
+    ''', (*params, cap)).fetchone()[0]
+    return total, total < cap
+
+
+def sequence_page(sorted_keys, limit, cursor=None):
+    """
+    Página keyset sobre uma lista de chaves únicas em ordem crescente (ex.: cache em memória)
+    Retorna (keys, next_cursor); itens inseridos/removidos entre páginas não deslocam as demais
+    limit None retorna todas as chaves a partir do cursor
+    """
+    position = decode_cursor(cursor, size=1)
+    try:
+        start = bisect.bisect_right(sorted_keys, position[0]) if position else 0
+    except TypeError as e:
+        raise InvalidCursorError('Cursor inválido') from e
+    if limit is None:
+        return sorted_keys[start:], None
+    keys = sorted_keys[start:start + limit]
+    next_cursor = encode_cursor([keys[-1]]) if start + limit < len(sorted_keys) else None
+    return keys, next_cursor
+
+
+def wants_total(value):
+    """Interpreta o parâmetro include_total da query string"""
+    return str(value).lower() in ('1', 'true', 'yes')
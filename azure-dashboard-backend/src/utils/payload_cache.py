@@ -0,0 +1,111 @@
+"""
+Cache de respostas pré-serializadas
+Guarda os bytes JSON (e, sob demanda, a versão gzip) de respostas derivadas de
+dados versionados, como o snapshot de inventário. Um acerto de cache escreve os
+bytes prontos na resposta, sem reconstruir nem reserializar a estrutura
+"""
+
+import os
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app, request
+
+from src.utils.json_provider import dumps_bytes
+
+PAYLOAD_CACHE_MAX_BYTES = int(os.environ.get('PAYLOAD_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Respostas menores que isso não compensam compressão
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+
+
+class EncodedPayload:
+    """Corpo JSON serializado com ETag e gzip calculado na primeira requisição que aceitar"""
+
+    __slots__ = ('body', 'etag', 'charge', '_gzipped', '_lock')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        # Espaço contabilizado no cache: corpo + estimativa do gzip (~25%), calculado depois
+        self.charge = len(body) + len(body) // 4
+        self._gzipped = None
+        self._lock = threading.Lock()
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            with self._lock:
+                if self._gzipped is None:
+                    self._gzipped = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+        return self._gzipped
+
+
+class PayloadCache:
+    """LRU limitado pelo total de bytes; as chaves devem incluir a versão dos dados"""
+
+    def __init__(self, max_bytes=PAYLOAD_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_encode(self, key, build):
+        """Retorna o EncodedPayload da chave; build() monta o objeto só em caso de miss"""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            self.misses += 1
+
+        payload = EncodedPayload(dumps_bytes(build()))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.charge
+            self._entries[key] = payload
+            self._bytes += payload.charge
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.charge
+        return payload
+
+    def invalidate(self, predicate):
+        """Remove as chaves para as quais predicate(key) é verdadeiro"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._bytes -= self._entries.pop(key).charge
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+def payload_response(payload, status=200):
+    """Resposta com os bytes pré-serializados: 304 por ETag e gzip quando aceito"""
+    if request.if_none_match.contains(payload.etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(payload.etag)
+        return response
+
+    use_gzip = len(payload.body) >= GZIP_MIN_BYTES and 'gzip' in request.accept_encodings
+    response = current_app.response_class(
+        payload.gzipped if use_gzip else payload.body,
+        status=status,
+        mimetype='application/json'
+    )
+    response.set_etag(payload.etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+# Instância global compartilhada pelas rotas
+payload_cache = PayloadCache()
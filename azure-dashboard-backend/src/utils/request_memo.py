@@ -0,0 +1,49 @@
+"""
+Memoização com escopo de requisição
+Dentro de um bloco request_memo() (ex.: /api/batch), consultas repetidas como a
+busca de credenciais e a criação dos clientes Azure são resolvidas uma única vez
+e compartilhadas entre as sub-requisições, inclusive as executadas em outras threads
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_memo = ContextVar('request_memo', default=None)
+
+
+class RequestMemo:
+    """Valores calculados no escopo atual; chamadas simultâneas da mesma chave aguardam a primeira"""
+
+    def __init__(self):
+        self._values = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, factory):
+        if key in self._values:
+            return self._values[key]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._values:
+                self._values[key] = factory()
+            return self._values[key]
+
+
+@contextmanager
+def request_memo():
+    """Ativa a memoização no contexto atual (propagada com contextvars.copy_context)"""
+    token = _current_memo.set(RequestMemo())
+    try:
+        yield _current_memo.get()
+    finally:
+        _current_memo.reset(token)
+
+
+def memoized(key, factory):
+    """factory() memoizado no escopo ativo; fora de um escopo apenas executa factory()"""
+    memo = _current_memo.get()
+    if memo is None:
+        return factory()
+    return memo.get_or_compute(key, factory)
@@ -0,0 +1,180 @@
+"""
+Índice de busca por nome para o typeahead do dashboard
+Indexa nomes de recursos, nomes de resource group e valores de tag: uma lista
+ordenada de termos (busca de prefixo por bisect) e trigramas -> termos (busca por
+substring sem varrer o inventário). Atualizado incrementalmente com o delta entre
+snapshots em vez de ser reconstruído a cada listagem. Consultas com menos de 3
+caracteres usam só prefixo; o ranqueamento percorre grupos (termo, campo) em ordem de
+pontuação e para ao completar o limite
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+# Peso do campo em que o termo aparece
+FIELD_WEIGHTS = {'name': 3.0, 'resource_group': 1.5, 'tag': 1.0}
+# Peso do tipo de correspondência
+MATCH_WEIGHTS = {'exact': 4.0, 'prefix': 2.5, 'word': 1.8, 'substring': 1.0}
+# Separadores que marcam início de palavra em nomes de recursos
+WORD_SEPARATORS = '-_. /'
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+def _trigrams(term):
+    return {term[index:index + 3] for index in range(len(term) - 2)}
+
+
+def _resource_terms(resource):
+    """(campo, termo) indexados de um recurso"""
+    terms = set()
+    if resource.get('name'):
+        terms.add(('name', resource['name'].lower()))
+    if resource.get('resource_group'):
+        terms.add(('resource_group', resource['resource_group'].lower()))
+    for tag_value in (resource.get('tags') or {}).values():
+        if tag_value:
+            terms.add(('tag', str(tag_value).lower()))
+    return terms
+
+
+class SearchIndex:
+    """Termos -> recursos com buscas de prefixo e substring ranqueadas"""
+
+    def __init__(self, resources=None):
+        self._postings = {}  # termo -> {campo: set(ids)}
+        self._sorted_terms = []  # termos distintos em ordem (prefixo)
+        self._trigrams = {}  # trigrama -> set(termos) (substring)
+        self._lock = threading.Lock()
+        if resources:
+            for key, resource in resources.items():
+                self._add(key, resource)
+            self._sorted_terms.sort()
+
+    # Manutenção -----------------------------------------------------------
+
+    def _add(self, key, resource, keep_sorted=False):
+        for field, term in _resource_terms(resource):
+            fields = self._postings.get(term)
+            if fields is None:
+                fields = self._postings[term] = {}
+                if keep_sorted:
+                    insort(self._sorted_terms, term)
+                else:
+                    self._sorted_terms.append(term)
+                for trigram in _trigrams(term):
+                    self._trigrams.setdefault(trigram, set()).add(term)
+            fields.setdefault(field, set()).add(key)
+
+    def _remove(self, key, resource):
+        for field, term in _resource_terms(resource):
+            fields = self._postings.get(term)
+            if not fields or field not in fields:
+                continue
+            fields[field].discard(key)
+            if not fields[field]:
+                del fields[field]
+            if not fields:
+                del self._postings[term]
+                position = bisect_left(self._sorted_terms, term)
+                if position < len(self._sorted_terms) and self._sorted_terms[position] == term:
+                    del self._sorted_terms[position]
+                for trigram in _trigrams(term):
+                    terms = self._trigrams.get(trigram)
+                    if terms is not None:
+                        terms.discard(term)
+                        if not terms:
+                            del self._trigrams[trigram]
+
+    def apply_delta(self, old_resources, delta):
+        """Aplica o delta de inventory_service.diff_snapshots (added/removed/changed)"""
+        with self._lock:
+            for resource_id in delta.get('removed', []):
+                key = resource_id.lower()
+                previous = old_resources.get(key)
+                if previous is not None:
+                    self._remove(key, previous)
+            for resource in delta.get('changed', []):
+                key = resource['id'].lower()
+                previous = old_resources.get(key)
+                if previous is not None:
+                    self._remove(key, previous)
+                self._add(key, resource, keep_sorted=True)
+            for resource in delta.get('added', []):
+                self._add(resource['id'].lower(), resource, keep_sorted=True)
+        return self
+
+    # Consulta -------------------------------------------------------------
+
+    def _prefix_terms(self, query):
+        terms = self._sorted_terms
+        for index in range(bisect_left(terms, query), len(terms)):
+            term = terms[index]
+            if not term.startswith(query):
+                break
+            yield term
+
+    def _substring_terms(self, query):
+        if len(query) < 3:
+            # Consulta curta: sem trigramas, varrer os termos custaria o inventário inteiro
+            return []
+        candidates = None
+        for trigram in sorted(_trigrams(query), key=lambda value: len(self._trigrams.get(value, ()))):
+            terms = self._trigrams.get(trigram)
+            if not terms:
+                return []
+            candidates = set(terms) if candidates is None else candidates & terms
+            if not candidates:
+                return []
+        return [term for term in candidates if query in term]
+
+    @staticmethod
+    def _match_kind(term, query):
+        if term == query:
+            return 'exact'
+        if term.startswith(query):
+            return 'prefix'
+        position = term.find(query)
+        if position > 0 and term[position - 1] in WORD_SEPARATORS:
+            return 'word'
+        return 'substring'
+
+    def search(self, query, limit=SEARCH_DEFAULT_LIMIT):
+        """
+        Retorna [(id, pontuação, campo, termo)] ordenados por relevância
+        Correspondência exata > prefixo > início de palavra > substring; nome pesa
+        mais que resource group e tags, e termos curtos vencem os longos
+        """
+        query = (query or '').strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        with self._lock:
+            terms = set(self._prefix_terms(query))
+            terms.update(self._substring_terms(query))
+
+            # Todos os recursos de um grupo (termo, campo) têm a mesma pontuação
+            groups = []
+            for term in terms:
+                kind = self._match_kind(term, query)
+                # Proporção do termo coberta pela consulta desempata termos longos
+                coverage = len(query) / len(term)
+                for field in self._postings[term]:
+                    groups.append((-(FIELD_WEIGHTS[field] * MATCH_WEIGHTS[kind] + coverage), term, field))
+            heapq.heapify(groups)
+
+            # Grupos em ordem de (pontuação, termo): a primeira ocorrência de um recurso é a melhor
+            results, seen = [], set()
+            while groups and len(results) < limit:
+                negative_score, term, field = heapq.heappop(groups)
+                keys = (key for key in self._postings[term][field] if key not in seen)
+                for key in heapq.nsmallest(limit - len(results), keys):
+                    seen.add(key)
+                    results.append((key, round(-negative_score, 3), field, term))
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {'terms': len(self._postings), 'trigrams': len(self._trigrams)}
@@ -0,0 +1,256 @@
+"""
+Formato binário de snapshots de inventário
+Em vez de listas de dicts, o snapshot é gravado como uma tabela de strings
+internadas (ids, nomes, tipos, regiões, chaves e valores de tag) e colunas de
+inteiros de largura fixa. O arquivo é lido via mmap e acessado por views sem
+cópia: os dicts de um recurso só são montados quando ele é consultado
+
+Layout (little-endian, tudo alinhado em 4 bytes):
+    cabeçalho    magic 'BINV', formato, nº de strings, recursos, resource groups e pares de tag
+    offsets      uint32[strings + 1] com o início de cada string nos bytes UTF-8
+    recursos     colunas uint32[recursos]: key, id, name, type, location, resource_group,
+                 tag_start, tag_count (linhas ordenadas pela key, o id em minúsculas)
+    rgs          colunas uint32[resource groups]: name, location, tag_start, tag_count
+                 (linhas ordenadas pelo nome)
+    tags         uint32[pares * 2]: (chave, valor) intercalados
+    strings      bytes UTF-8 concatenados
+"""
+
+import sys
+import struct
+from collections.abc import Mapping
+
+MAGIC = b'BINV'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIIII')
+# Índice reservado para valores None (ex.: location ausente)
+NONE = 0xFFFFFFFF
+
+RESOURCE_COLUMNS = ('key', 'id', 'name', 'type', 'location', 'resource_group', 'tag_start', 'tag_count')
+GROUP_COLUMNS = ('name', 'location', 'tag_start', 'tag_count')
+
+if sys.byteorder != 'little':  # pragma: no cover - as views usam a ordem nativa
+    raise ImportError('snapshot_format requer uma plataforma little-endian')
+
+
+class SnapshotFormatError(ValueError):
+    """Arquivo de snapshot inválido ou de outra versão do formato"""
+
+
+class _StringTable:
+    """Interna as strings na ordem de primeira ocorrência"""
+
+    def __init__(self):
+        self.index = {}
+        self.encoded = []
+
+    def add(self, value):
+        if value is None:
+            return NONE
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.encoded)
+            self.encoded.append(value.encode('utf-8'))
+        return position
+
+
+def _pack_u32(values):
+    return struct.pack(f'<{len(values)}I', *values)
+
+
+def encode_inventory(resources, resource_groups):
+    """
+    Serializa {key: recurso} e {nome: resource group} no formato binário
+    Os recursos seguem as chaves de src/models/resource.py (Resource ou dict)
+    """
+    strings = _StringTable()
+    tags = []
+
+    def add_tags(values):
+        start = len(tags) // 2
+        for tag_key, tag_value in (values or {}).items():
+            tags.append(strings.add(tag_key))
+            tags.append(strings.add(None if tag_value is None else str(tag_value)))
+        return start, len(tags) // 2 - start
+
+    resource_columns = [[] for _ in RESOURCE_COLUMNS]
+    for key in sorted(resources):
+        resource = resources[key]
+        tag_start, tag_count = add_tags(resource.get('tags'))
+        row = (
+            strings.add(key),
+            strings.add(resource['id']),
+            strings.add(resource['name']),
+            strings.add(resource['type']),
+            strings.add(resource.get('location')),
+            strings.add(resource.get('resource_group')),
+            tag_start,
+            tag_count
+        )
+        for column, value in zip(resource_columns, row):
+            column.append(value)
+
+    group_columns = [[] for _ in GROUP_COLUMNS]
+    for name in sorted(resource_groups):
+        group = resource_groups[name]
+        tag_start, tag_count = add_tags(group.get('tags'))
+        row = (strings.add(name), strings.add(group.get('location')), tag_start, tag_count)
+        for column, value in zip(group_columns, row):
+            column.append(value)
+
+    offsets = [0]
+    for encoded in strings.encoded:
+        offsets.append(offsets[-1] + len(encoded))
+
+    parts = [
+        _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(strings.encoded), len(resources),
+                     len(resource_groups), len(tags) // 2),
+        _pack_u32(offsets)
+    ]
+    parts += [_pack_u32(column) for column in resource_columns]
+    parts += [_pack_u32(column) for column in group_columns]
+    parts.append(_pack_u32(tags))
+    parts += strings.encoded
+    return b''.join(parts)
+
+
+class InventoryView:
+    """Acesso sem cópia a um snapshot binário (bytes, mmap ou memoryview)"""
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size:
+            raise SnapshotFormatError('Snapshot truncado')
+        magic, version, _, n_strings, n_resources, n_groups, n_tags = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SnapshotFormatError('Snapshot de inventário em formato desconhecido')
+
+        position = _HEADER.size
+
+        def u32_array(count):
+            nonlocal position
+            array = view[position:position + count * 4].cast('I')
+            position += count * 4
+            return array
+
+        self._offsets = u32_array(n_strings + 1)
+        self._resource_columns = {name: u32_array(n_resources) for name in RESOURCE_COLUMNS}
+        self._group_columns = {name: u32_array(n_groups) for name in GROUP_COLUMNS}
+        self._tags = u32_array(n_tags * 2)
+        self._strings = view[position:]
+        if len(self._strings) != self._offsets[n_strings]:
+            raise SnapshotFormatError('Snapshot truncado')
+
+        self.resources = ResourcesView(self, n_resources)
+        self.resource_groups = ResourceGroupsView(self, n_groups)
+
+    def string(self, index):
+        if index == NONE:
+            return None
+        return str(self._strings[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def string_bytes(self, index):
+        # bytes (cópia só da string) porque memoryview não suporta comparação de ordem
+        return self._strings[self._offsets[index]:self._offsets[index + 1]].tobytes()
+
+    def tags(self, start, count):
+        tags = self._tags
+        return {
+            self.string(tags[pair * 2]): self.string(tags[pair * 2 + 1])
+            for pair in range(start, start + count)
+        }
+
+
+class _ColumnarMapping(Mapping):
+    """Mapping somente leitura sobre linhas ordenadas pela chave (busca binária)"""
+
+    def __init__(self, view, count):
+        self._view = view
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def _key_index(self, row):
+        raise NotImplementedError
+
+    def _row_of(self, key):
+        if not isinstance(key, str):
+            return -1
+        target = key.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._view.string_bytes(self._key_index(middle)) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._view.string_bytes(self._key_index(low)) == target:
+            return low
+        return -1
+
+    def __contains__(self, key):
+        return self._row_of(key) >= 0
+
+    def __getitem__(self, key):
+        row = self._row_of(key)
+        if row < 0:
+            raise KeyError(key)
+        return self.row(row)
+
+    def __iter__(self):
+        for row in range(self._count):
+            yield self._view.string(self._key_index(row))
+
+    def sorted_keys(self):
+        """Chaves já em ordem (as linhas são gravadas ordenadas)"""
+        return list(self)
+
+    def values(self):
+        return [self.row(row) for row in range(self._count)]
+
+    def items(self):
+        return [(self._view.string(self._key_index(row)), self.row(row)) for row in range(self._count)]
+
+
+class ResourcesView(_ColumnarMapping):
+    """{key: recurso} lido das colunas de recursos"""
+
+    def __init__(self, view, count):
+        super().__init__(view, count)
+        self._columns = view._resource_columns
+
+    def _key_index(self, row):
+        return self._columns['key'][row]
+
+    def row(self, row):
+        columns = self._columns
+        string = self._view.string
+        return {
+            'id': string(columns['id'][row]),
+            'name': string(columns['name'][row]),
+            'type': string(columns['type'][row]),
+            'location': string(columns['location'][row]),
+            'resource_group': string(columns['resource_group'][row]),
+            'tags': self._view.tags(columns['tag_start'][row], columns['tag_count'][row])
+        }
+
+
+class ResourceGroupsView(_ColumnarMapping):
+    """{nome: resource group} lido das colunas de resource groups"""
+
+    def __init__(self, view, count):
+        super().__init__(view, count)
+        self._columns = view._group_columns
+
+    def _key_index(self, row):
+        return self._columns['name'][row]
+
+    def row(self, row):
+        columns = self._columns
+        return {
+            'name': self._view.string(columns['name'][row]),
+            'location': self._view.string(columns['location'][row]),
+            'tags': self._view.tags(columns['tag_start'][row], columns['tag_count'][row])
+        }
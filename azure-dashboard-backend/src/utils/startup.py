@@ -0,0 +1,252 @@
+"""
+Inicialização do backend em duas fases
+Importar o app não toca em SDKs pesados nem no banco: módulos como azure.mgmt.*,
+azure.identity, pandas, reportlab e matplotlib entram como proxies (lazy_import) e
+só são carregados no primeiro uso de um atributo; criação de tabelas e threads de
+background são etapas registradas (on_init) que rodam uma única vez, explicitamente
+(run) ou antes da primeira requisição (ensure). Tempos de importação e de cada
+etapa ficam no relatório de perfil (report)
+
+Perfil de importação do app (python -X importtime agregado):
+    python -m src.utils.startup [--top 25] [--module src.main]
+"""
+
+import os
+import sys
+import time
+import logging
+import importlib
+import threading
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# Tempo de importação (cumulativo) a partir do qual um módulo é destacado no log
+SLOW_IMPORT_SECONDS = float(os.environ.get('STARTUP_SLOW_IMPORT_SECONDS', '0.2'))
+# Nova tentativa de etapas que falharam: intervalo inicial, dobrado a cada falha até o máximo
+RETRY_SECONDS = float(os.environ.get('STARTUP_RETRY_SECONDS', '5'))
+RETRY_MAX_SECONDS = float(os.environ.get('STARTUP_RETRY_MAX_SECONDS', '300'))
+
+
+class LazyModule:
+    """Proxy de módulo: importa no primeiro acesso a atributo e registra o tempo gasto"""
+
+    def __init__(self, name, registry, on_load=None):
+        object.__setattr__(self, '_lazy_name', name)
+        object.__setattr__(self, '_lazy_registry', registry)
+        object.__setattr__(self, '_lazy_on_load', on_load)
+        object.__setattr__(self, '_lazy_module', None)
+
+    def _load(self):
+        module = self._lazy_module
+        if module is not None:
+            return module
+        with self._lazy_registry._lock:
+            module = self._lazy_module
+            if module is None:
+                started = time.perf_counter()
+                module = importlib.import_module(self._lazy_name)
+                if self._lazy_on_load is not None:
+                    self._lazy_on_load(module)
+                self._lazy_registry._record_import(self._lazy_name, time.perf_counter() - started)
+                object.__setattr__(self, '_lazy_module', module)
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'carregado' if self._lazy_module is not None else 'pendente'
+        return f'<LazyModule {self._lazy_name} ({state})>'
+
+
+class Startup:
+    """Registro de módulos preguiçosos e das etapas de inicialização únicas"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._steps = []  # (nome, função) na ordem de registro
+        self._completed = {}  # nome -> segundos
+        self._errors = {}  # nome -> mensagem
+        self._attempts = {}  # nome -> falhas consecutivas
+        self._retry_timer = None
+        self._lazy = {}  # nome do módulo -> LazyModule
+        self._imports = {}  # nome do módulo -> segundos da primeira carga
+        self._module_times = {}  # módulo do app -> segundos de importação
+        self._pending = False
+        self._ready_at = None
+        self._created_at = time.perf_counter()
+
+    # Módulos --------------------------------------------------------------
+
+    def lazy_import(self, name, on_load=None):
+        """Proxy para o módulo (um por nome); on_load(módulo) roda após a primeira carga"""
+        with self._lock:
+            proxy = self._lazy.get(name)
+            if proxy is None:
+                proxy = self._lazy[name] = LazyModule(name, self, on_load)
+            return proxy
+
+    def _record_import(self, name, seconds):
+        self._imports[name] = seconds
+        if seconds >= SLOW_IMPORT_SECONDS:
+            logger.info(f"Módulo {name} carregado sob demanda em {seconds * 1000:.0f} ms")
+
+    def record_module(self, name, started=None):
+        """
+        Registra o tempo de importação de um módulo do app (started = perf_counter no topo;
+        sem ele, conta desde a importação deste módulo, que o app importa primeiro)
+        """
+        self._module_times[name] = time.perf_counter() - (self._created_at if started is None else started)
+
+    # Etapas ---------------------------------------------------------------
+
+    def on_init(self, name, function=None):
+        """Registra uma etapa única (também utilizável como decorator)"""
+        def register(step):
+            with self._lock:
+                if all(existing != name for existing, _ in self._steps):
+                    self._steps.append((name, step))
+                    self._pending = True
+            return step
+        return register(function) if function is not None else register
+
+    def run(self):
+        """Executa as etapas ainda não concluídas, na ordem de registro"""
+        with self._lock:
+            for name, step in self._steps:
+                if name in self._completed:
+                    continue
+                started = time.perf_counter()
+                try:
+                    step()
+                except Exception as e:
+                    # A etapa volta a ser tentada em segundo plano, com backoff (_schedule_retry)
+                    self._errors[name] = str(e)
+                    self._attempts[name] = self._attempts.get(name, 0) + 1
+                    logger.error(f"Erro na etapa de inicialização {name}: {str(e)}")
+                    continue
+                self._completed[name] = time.perf_counter() - started
+                self._errors.pop(name, None)
+                self._attempts.pop(name, None)
+            # Pendentes são só as etapas nunca tentadas; as que falharam ficam com o timer
+            self._pending = any(name not in self._completed and name not in self._errors
+                                for name, _ in self._steps)
+            if self._errors:
+                self._schedule_retry()
+            if self._ready_at is None:
+                self._ready_at = time.perf_counter()
+                steps = ', '.join(f'{name}={seconds * 1000:.0f}ms' for name, seconds in self._completed.items())
+                logger.info(f"Inicialização concluída em {(self._ready_at - self._created_at) * 1000:.0f} ms ({steps})")
+
+    def ensure(self):
+        """
+        Garante a inicialização (custo de uma leitura de atributo depois da primeira vez)
+        Etapas que falharam não são repetidas aqui, no caminho da requisição: ficam com o
+        timer de nova tentativa, recriado se o processo não tiver um (ex.: worker após o fork)
+        """
+        if self._pending or self._ready_at is None:
+            self.run()
+        elif self._errors and not self._retry_scheduled():
+            with self._lock:
+                self._schedule_retry()
+
+    def _retry_scheduled(self):
+        timer = self._retry_timer
+        return timer is not None and timer.is_alive()
+
+    def _retry(self):
+        with self._lock:
+            self._retry_timer = None
+        self.run()
+
+    def _schedule_retry(self):
+        """Agenda (uma vez por processo) nova execução das etapas que falharam"""
+        if not self._errors or self._retry_scheduled():
+            return
+        failures = max(self._attempts.values(), default=1)
+        delay = min(RETRY_SECONDS * 2 ** (failures - 1), RETRY_MAX_SECONDS)
+        logger.info(f"Nova tentativa de {', '.join(self._errors)} em {delay:.0f}s")
+        timer = threading.Timer(delay, self._retry)
+        timer.daemon = True
+        self._retry_timer = timer
+        timer.start()
+
+    @property
+    def initialized(self):
+        return self._ready_at is not None and not self._pending and not self._errors
+
+    # Relatório ------------------------------------------------------------
+
+    def report(self):
+        """Perfil da partida: importação dos módulos do app, cargas sob demanda e etapas"""
+        with self._lock:
+            return {
+                'initialized': self.initialized,
+                'ready_after_seconds': round(self._ready_at - self._created_at, 4) if self._ready_at else None,
+                'modules': {name: round(seconds, 4) for name, seconds in self._module_times.items()},
+                'lazy_modules': {
+                    name: round(self._imports[name], 4) if name in self._imports else None
+                    for name in sorted(self._lazy)
+                },
+                'init_steps': {
+                    name: {
+                        'seconds': round(self._completed[name], 4) if name in self._completed else None,
+                        'error': self._errors.get(name),
+                        'failures': self._attempts.get(name, 0)
+                    }
+                    for name, _ in self._steps
+                }
+            }
+
+
+def profile_imports(module='src.main', top=25):
+    """
+    Importa o módulo em um interpretador novo com -X importtime e retorna
+    [(segundos cumulativos, segundos próprios, módulo)] dos mais lentos
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=backend_dir, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            own, cumulative, name = line[len('import time:'):].split('|', 2)
+            rows.append((int(cumulative) / 1e6, int(own) / 1e6, name.strip()))
+        except ValueError:
+            continue
+    if result.returncode != 0:
+        logger.error(f"Importação de {module} falhou: {result.stderr.strip().splitlines()[-1:]}")
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def _main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Perfil de importação do backend')
+    parser.add_argument('--module', default='src.main')
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args(argv)
+
+    print(f"{'cumulativo':>12} {'próprio':>10}  módulo")
+    for cumulative, own, name in profile_imports(args.module, args.top):
+        print(f'{cumulative * 1000:10.1f}ms {own * 1000:8.1f}ms  {name}')
+
+
+# Instância global do serviço
+startup = Startup()
+
+if __name__ == '__main__':
+    _main(sys.argv[1:])
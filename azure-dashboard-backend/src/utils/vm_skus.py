@@ -0,0 +1,97 @@
+"""
+Tabela local de SKUs de VM (capacidade e preço) usada no rightsizing
+Preços horários pay-as-you-go Linux de referência (USD, East US). Uma tabela própria
+(preços negociados, outra região) pode ser carregada de um JSON em VM_SKU_TABLE_PATH:
+    [{"name": "Standard_D2s_v5", "vcpus": 2, "memory_gb": 8, "hourly_price": 0.096}, ...]
+"""
+
+import os
+import re
+import json
+import logging
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+VM_SKU_TABLE_PATH = os.environ.get('VM_SKU_TABLE_PATH', '')
+HOURS_PER_MONTH = 730
+
+_SKU_NAME = re.compile(r'^Standard_([A-Z]+)(\d+)([a-z]*)(?:_(v\d+))?$', re.IGNORECASE)
+
+
+class VmSku(NamedTuple):
+    name: str
+    family: str
+    vcpus: int
+    memory_gb: float
+    hourly_price: float
+
+    @property
+    def monthly_price(self) -> float:
+        return self.hourly_price * HOURS_PER_MONTH
+
+
+# (nome, vCPUs, memória GB, preço/hora)
+_DEFAULT_SKUS = [
+    ('Standard_B1s', 1, 1, 0.0104), ('Standard_B1ms', 1, 2, 0.0207), ('Standard_B2s', 2, 4, 0.0416),
+    ('Standard_B2ms', 2, 8, 0.0832), ('Standard_B4ms', 4, 16, 0.166), ('Standard_B8ms', 8, 32, 0.333),
+    ('Standard_B12ms', 12, 48, 0.499), ('Standard_B16ms', 16, 64, 0.666), ('Standard_B20ms', 20, 80, 0.832),
+    ('Standard_D2s_v3', 2, 8, 0.096), ('Standard_D4s_v3', 4, 16, 0.192), ('Standard_D8s_v3', 8, 32, 0.384),
+    ('Standard_D16s_v3', 16, 64, 0.768), ('Standard_D32s_v3', 32, 128, 1.536), ('Standard_D48s_v3', 48, 192, 2.304),
+    ('Standard_D64s_v3', 64, 256, 3.072),
+    ('Standard_D2_v3', 2, 8, 0.096), ('Standard_D4_v3', 4, 16, 0.192), ('Standard_D8_v3', 8, 32, 0.384),
+    ('Standard_D16_v3', 16, 64, 0.768), ('Standard_D32_v3', 32, 128, 1.536), ('Standard_D64_v3', 64, 256, 3.072),
+    ('Standard_D2s_v5', 2, 8, 0.096), ('Standard_D4s_v5', 4, 16, 0.192), ('Standard_D8s_v5', 8, 32, 0.384),
+    ('Standard_D16s_v5', 16, 64, 0.768), ('Standard_D32s_v5', 32, 128, 1.536), ('Standard_D48s_v5', 48, 192, 2.304),
+    ('Standard_D64s_v5', 64, 256, 3.072), ('Standard_D96s_v5', 96, 384, 4.608),
+    ('Standard_D2as_v5', 2, 8, 0.086), ('Standard_D4as_v5', 4, 16, 0.172), ('Standard_D8as_v5', 8, 32, 0.344),
+    ('Standard_D16as_v5', 16, 64, 0.688), ('Standard_D32as_v5', 32, 128, 1.376), ('Standard_D64as_v5', 64, 256, 2.752),
+    ('Standard_E2s_v3', 2, 16, 0.126), ('Standard_E4s_v3', 4, 32, 0.252), ('Standard_E8s_v3', 8, 64, 0.504),
+    ('Standard_E16s_v3', 16, 128, 1.008), ('Standard_E32s_v3', 32, 256, 2.016), ('Standard_E64s_v3', 64, 432, 3.629),
+    ('Standard_E2s_v5', 2, 16, 0.126), ('Standard_E4s_v5', 4, 32, 0.252), ('Standard_E8s_v5', 8, 64, 0.504),
+    ('Standard_E16s_v5', 16, 128, 1.008), ('Standard_E32s_v5', 32, 256, 2.016), ('Standard_E64s_v5', 64, 512, 4.032),
+    ('Standard_F2s_v2', 2, 4, 0.085), ('Standard_F4s_v2', 4, 8, 0.169), ('Standard_F8s_v2', 8, 16, 0.338),
+    ('Standard_F16s_v2', 16, 32, 0.677), ('Standard_F32s_v2', 32, 64, 1.353), ('Standard_F48s_v2', 48, 96, 2.03),
+    ('Standard_F64s_v2', 64, 128, 2.706), ('Standard_F72s_v2', 72, 144, 3.045),
+]
+
+
+def sku_family(name: str) -> Optional[str]:
+    """
+    Família do SKU (tamanhos intercambiáveis), ex.: Standard_D4s_v5 -> Ds_v5
+    Na série B os sufixos (s, ms, ls) só variam a proporção de memória: uma família só (B)
+    """
+    match = _SKU_NAME.match(name or '')
+    if not match:
+        return None
+    series, _, features, version = match.groups()
+    series = series.upper()
+    if series == 'B':
+        features = ''
+    return f"{series}{features.lower()}{'_' + version.lower() if version else ''}"
+
+
+@lru_cache(maxsize=1)
+def load_sku_table() -> Dict[str, VmSku]:
+    """SKUs por nome em minúsculas (tabela padrão ou arquivo de VM_SKU_TABLE_PATH)"""
+    rows = [
+        {'name': name, 'vcpus': vcpus, 'memory_gb': memory_gb, 'hourly_price': price}
+        for name, vcpus, memory_gb, price in _DEFAULT_SKUS
+    ]
+    if VM_SKU_TABLE_PATH:
+        try:
+            with open(VM_SKU_TABLE_PATH, encoding='utf-8') as handle:
+                rows = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao ler tabela de SKUs {VM_SKU_TABLE_PATH}, usando a padrão: {str(e)}")
+
+    table = {}
+    for row in rows:
+        family = sku_family(row['name'])
+        if family is None:
+            continue
+        table[row['name'].lower()] = VmSku(
+            row['name'], family, int(row['vcpus']), float(row['memory_gb']), float(row['hourly_price'])
+        )
+    return table
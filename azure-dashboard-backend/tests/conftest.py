@@ -0,0 +1,9 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Os benchmarks importam fake_arm/run_benchmarks pelo nome do módulo; os testes de
+# unidade importam src.* do próprio backend
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+sys.path.insert(1, BACKEND_DIR)
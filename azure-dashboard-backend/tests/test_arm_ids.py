@@ -0,0 +1,72 @@
+"""Decomposição de ids ARM"""
+
+from src.utils.arm_ids import parse_arm_id, resource_group_of, lock_scope
+
+RG = '/subscriptions/s1/resourceGroups/rg1'
+VM = f'{RG}/providers/Microsoft.Compute/virtualMachines/vm1'
+
+
+def test_resource_id():
+    parsed = parse_arm_id(VM)
+    assert (parsed.subscription, parsed.resource_group, parsed.provider) == ('s1', 'rg1', 'Microsoft.Compute')
+    assert parsed.types == ('virtualMachines',) and parsed.names == ('vm1',)
+    assert parsed.name == 'vm1'
+    assert parsed.resource_type == 'Microsoft.Compute/virtualMachines'
+    assert parsed.scope == RG
+    assert parsed.parent_path == ''
+
+
+def test_nested_resource_id():
+    parsed = parse_arm_id(f'{RG}/providers/Microsoft.Sql/servers/sql01/databases/db1')
+    assert parsed.types == ('servers', 'databases') and parsed.names == ('sql01', 'db1')
+    assert parsed.name == 'db1'
+    assert parsed.resource_type == 'Microsoft.Sql/servers/databases'
+    assert parsed.parent_path == 'servers/sql01'
+
+
+def test_resource_group_and_subscription_ids():
+    group = parse_arm_id(RG)
+    assert (group.subscription, group.resource_group, group.provider) == ('s1', 'rg1', None)
+    assert group.name == 'rg1' and group.resource_type is None and group.scope is None
+
+    subscription = parse_arm_id('/subscriptions/s1')
+    assert subscription.resource_group is None and subscription.name == 's1'
+
+
+def test_lock_on_resource_group():
+    parsed = parse_arm_id(f'{RG}/providers/Microsoft.Authorization/locks/lk')
+    assert parsed.resource_type == 'Microsoft.Authorization/locks'
+    assert parsed.name == 'lk'
+    assert parsed.scope == RG
+
+
+def test_lock_on_resource_keeps_target_as_scope():
+    lock_id = f'{VM}/providers/Microsoft.Authorization/locks/lk'
+    parsed = parse_arm_id(lock_id)
+    assert parsed.resource_group == 'rg1'
+    assert parsed.resource_type == 'Microsoft.Authorization/locks'
+    assert parsed.scope == VM
+    assert lock_scope(lock_id) == VM
+
+
+def test_case_insensitive_segments():
+    parsed = parse_arm_id('/SUBSCRIPTIONS/s1/resourcegroups/rg1/PROVIDERS/Microsoft.Web/sites/app')
+    assert (parsed.subscription, parsed.resource_group, parsed.name) == ('s1', 'rg1', 'app')
+    assert parsed.resource_type == 'Microsoft.Web/sites'
+
+
+def test_empty_and_invalid_ids():
+    for value in ('', None, 'not-an-id'):
+        parsed = parse_arm_id(value)
+        assert parsed.subscription is None and parsed.resource_group is None and parsed.provider is None
+
+
+def test_helpers():
+    assert resource_group_of(VM) == 'rg1'
+    assert resource_group_of('/subscriptions/s1') is None
+    assert lock_scope(VM) == VM
+    assert lock_scope(f'{RG}/providers/microsoft.authorization/locks/lk') == RG
+
+
+def test_parse_is_memoized():
+    assert parse_arm_id(VM) is parse_arm_id(VM)
@@ -0,0 +1,53 @@
+"""Limites de chamadas ao Azure por endpoint contra o ARM falso"""
+
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+from fake_arm import FakeArmServer, FakeArmConfig
+from run_benchmarks import prepare_app_tree, load_app, seed_database, TEST_USER
+from call_budget import CallBudgetExceeded, assert_max_calls, check_endpoints, pages
+
+CONFIG = FakeArmConfig(subscriptions=2, resources=1500, resource_groups=60, locks=10, page_size=500,
+                       latency_ms=0, latency_jitter_ms=0)
+
+
+@pytest.fixture(scope='module')
+def backend():
+    fake_server = FakeArmServer(CONFIG).start()
+    workdir = tempfile.mkdtemp(prefix='bolt-call-budget-test-')
+    try:
+        prepare_app_tree(workdir)
+        app_module = load_app(workdir, fake_server, SimpleNamespace(inventory_max_age=None))
+        user_id = seed_database(app_module, SimpleNamespace(seed_rows=3), fake_server.state.subscription_ids[0])
+        client = app_module.app.test_client()
+        client.post('/api/auth/login', json=TEST_USER)
+        yield SimpleNamespace(app=app_module, user_id=user_id, client=client)
+    finally:
+        fake_server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_endpoints_within_call_budget(backend):
+    results = check_endpoints(backend.app, CONFIG, backend.user_id)
+    exceeded = [result for result in results if not result['ok']]
+    assert not exceeded, exceeded
+    assert all(result['status'] == 200 for result in results)
+
+
+def test_resource_groups_listed_once_per_page(backend):
+    backend.app.inventory_service.invalidate(backend.user_id)
+    with assert_max_calls(pages(CONFIG.resource_groups, CONFIG.page_size),
+                          operation='GET /subscriptions/{}/resourcegroups', name='resources') as ledger:
+        response = backend.client.get('/api/azure/resources?limit=100')
+    assert response.status_code == 200
+    assert ledger.count('GET /subscriptions/{}/resourcegroups') >= 1
+
+
+def test_budget_exceeded_is_reported(backend):
+    backend.app.inventory_service.invalidate(backend.user_id)
+    with pytest.raises(CallBudgetExceeded, match='resources'):
+        with assert_max_calls(0, name='resources'):
+            backend.client.get('/api/azure/resources?limit=100')
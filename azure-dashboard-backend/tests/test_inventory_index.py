@@ -0,0 +1,98 @@
+"""Filtros por tag, tipo, região e resource group sobre o índice invertido"""
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from src.utils.inventory_index import InventoryIndex, InvalidFilterError, parse_filter, filter_from_args
+from src.utils.snapshot_format import encode_inventory, InventoryView
+
+VM = 'Microsoft.Compute/virtualMachines'
+DISK = 'Microsoft.Compute/disks'
+
+RESOURCES = {
+    'vm-1': {'type': VM, 'location': 'eastus', 'resource_group': 'rg-prod',
+             'tags': {'Environment': 'Production', 'Owner': 'ana'}},
+    'vm-2': {'type': VM, 'location': 'westus', 'resource_group': 'rg-prod',
+             'tags': {'Environment': 'Production'}},
+    'vm-3': {'type': VM, 'location': 'eastus', 'resource_group': 'rg-dev',
+             'tags': {'environment': 'dev', 'Cost Center': 'Finance Team'}},
+    'disk-1': {'type': DISK, 'location': 'EastUS', 'resource_group': 'RG-DEV', 'tags': {}},
+}
+IDS = sorted(RESOURCES)
+
+
+@pytest.fixture(scope='module')
+def index():
+    return InventoryIndex(IDS, RESOURCES)
+
+
+def select(index, args):
+    node, _ = filter_from_args(MultiDict(args))
+    return index.select(index.evaluate(node))
+
+
+def test_parse_filter_precedence():
+    assert parse_filter('tag:Environment=Production AND NOT tag:Owner') == (
+        'and', ('tag', 'environment', 'production'), ('not', ('tag', 'owner', None))
+    )
+    assert parse_filter('(type:a OR type:b) AND location:eastus') == (
+        'and', ('or', ('type', 'a'), ('type', 'b')), ('location', 'eastus')
+    )
+    assert parse_filter('tag:"Cost Center"="Finance Team"') == ('tag', 'cost center', 'finance team')
+    assert parse_filter('  ') is None
+
+
+@pytest.mark.parametrize('expression', ['foo:x', 'tag:', '(type:a', 'tag:a OR', 'tag:a AND AND tag:b'])
+def test_parse_filter_rejects_malformed_expressions(expression):
+    with pytest.raises(InvalidFilterError):
+        parse_filter(expression)
+
+
+def test_filter_expression(index):
+    assert select(index, {'filter': 'tag:Environment=Production AND NOT tag:Owner'}) == ['vm-2']
+    assert select(index, {'filter': f'type:{DISK} OR tag:"Cost Center"'}) == ['disk-1', 'vm-3']
+
+
+def test_comparisons_ignore_case(index):
+    assert select(index, {'tag': 'ENVIRONMENT=production'}) == ['vm-1', 'vm-2']
+    assert select(index, {'resource_group': 'rg-dev', 'location': 'eastus'}) == ['disk-1', 'vm-3']
+
+
+def test_tag_shortcuts(index):
+    assert select(index, {'tag': 'Environment'}) == ['vm-1', 'vm-2', 'vm-3']
+    assert select(index, {'tag': 'Environment=dev,Owner'}) == ['vm-1', 'vm-3']
+
+
+def test_missing_tag(index):
+    assert select(index, {'missing_tag': 'Owner'}) == ['disk-1', 'vm-2', 'vm-3']
+    assert select(index, {'missing_tag': 'Environment'}) == ['disk-1']
+    # Vírgula = OR: sem ao menos uma das chaves
+    assert select(index, {'missing_tag': 'Owner,Cost Center'}) == IDS
+    assert select(index, {'missing_tag': 'Inexistente'}) == IDS
+
+
+def test_shortcuts_and_filter_are_combined_with_and(index):
+    args = MultiDict([('filter', f'type:{VM}'), ('missing_tag', 'Owner'), ('location', 'eastus')])
+    node, cache_key = filter_from_args(args)
+    assert index.select(index.evaluate(node)) == ['vm-3']
+    assert cache_key == tuple(sorted([('filter', f'type:{VM}'), ('missing_tag', 'Owner'), ('location', 'eastus')]))
+
+
+def test_no_filter(index):
+    assert filter_from_args(MultiDict({'tag': ' , '})) == (None, None)
+    assert index.select(index.all_bits) is index.ids
+    assert index.select(0) == []
+
+
+def test_counts_and_tag_values(index):
+    assert index.count(('type', VM.lower())) == 3
+    assert index.tag_values('environment') == {'production': 2, 'dev': 1}
+
+
+def test_index_over_binary_snapshot():
+    resources = {
+        key: dict(resource, id=key, name=key) for key, resource in RESOURCES.items()
+    }
+    view = InventoryView(encode_inventory(resources, {}))
+    index = InventoryIndex(view.resources.sorted_keys(), view.resources)
+    assert select(index, {'missing_tag': 'Owner', 'type': VM}) == ['vm-2', 'vm-3']
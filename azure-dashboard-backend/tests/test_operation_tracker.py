@@ -0,0 +1,143 @@
+"""Estado persistido das operações assíncronas"""
+
+import sqlite3
+import time
+
+import pytest
+
+from src.services import operation_tracker as tracker_module
+from src.services.operation_tracker import OperationTracker, STATUS_FAILED, STATUS_RUNNING, STATUS_SUCCEEDED
+
+
+class FinishedPolling:
+    """Polling já concluído com o status terminal informado"""
+
+    def __init__(self, status):
+        self._status = status
+
+    def status(self):
+        return self._status
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'operations.db')
+
+
+@pytest.fixture
+def tracker(db_path):
+    return OperationTracker(db_path, max_workers=2)
+
+
+def wait_done(tracker, op_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        operation = tracker.get_operation(op_id)
+        if operation['done']:
+            return operation
+        time.sleep(0.01)
+    raise AssertionError(f'Operação {op_id} não terminou')
+
+
+def insert_running(tracker, op_id, continuation_token=None, heartbeat_at=None):
+    """Operação 'running' deixada por outro processo"""
+    tracker._ensure_schema()
+    conn = sqlite3.connect(tracker.db_path)
+    conn.execute('''
+        INSERT INTO operations (id, user_id, kind, target, status, continuation_token, owner_pid, heartbeat_at)
+        VALUES (?, 1, 'delete_resource_group', 'rg1', ?, ?, 1, ?)
+    ''', (op_id, STATUS_RUNNING, continuation_token, heartbeat_at))
+    conn.commit()
+    conn.close()
+
+
+def test_submit_task_succeeds(tracker):
+    op_id = tracker.submit_task(1, 'create_resource_group', 'rg1', lambda: {'name': 'rg1'})
+    operation = wait_done(tracker, op_id)
+    assert operation['status'] == STATUS_SUCCEEDED
+    assert operation['result'] == {'name': 'rg1'}
+    assert operation['error'] is None and operation['completed_at']
+
+
+def test_submit_task_failure_is_recorded(tracker):
+    def fail():
+        raise RuntimeError('quota excedida')
+
+    operation = wait_done(tracker, tracker.submit_task(1, 'create_resource_group', 'rg1', fail))
+    assert operation['status'] == STATUS_FAILED
+    assert operation['error'] == 'quota excedida'
+
+
+def test_get_operation_is_restricted_to_owner(tracker):
+    op_id = tracker.submit_task(1, 'create_resource_group', 'rg1', lambda: None)
+    assert tracker.get_operation(op_id, user_id=2) is None
+    assert tracker.get_operation(op_id, user_id=1)['id'] == op_id
+    assert tracker.get_operation('inexistente') is None
+
+
+@pytest.mark.parametrize('arm_status, expected', [
+    ('Succeeded', STATUS_SUCCEEDED),
+    ('Failed', STATUS_FAILED),
+    ('Canceled', STATUS_FAILED),
+])
+def test_finish_maps_terminal_status(tracker, arm_status, expected):
+    tracker._ensure_started()
+    tracker._insert('op-1', 1, 'delete_resource_group', 'rg1', 'token')
+    tracker._finish('op-1', FinishedPolling(arm_status))
+    operation = tracker.get_operation('op-1')
+    assert operation['status'] == expected
+    if expected == STATUS_FAILED:
+        assert arm_status in operation['error']
+    else:
+        assert operation['result'] == {'provisioning_state': arm_status}
+
+
+def test_lro_without_polling_is_accepted_untracked(tracker):
+    class Poller:
+        def continuation_token(self):
+            return 'token-invalido'
+
+    op_id = tracker.start_lro(1, 'delete_resource_group', 'rg1', lambda polling: Poller(), pipeline_client=None)
+    operation = tracker.get_operation(op_id)
+    assert operation['status'] == STATUS_SUCCEEDED
+    assert operation['result'] == {'accepted': True, 'tracked': False}
+
+
+def test_fail_interrupted_fails_only_tasks_without_token(db_path):
+    previous = OperationTracker(db_path)
+    insert_running(previous, 'task', heartbeat_at=time.time())
+    insert_running(previous, 'lro', continuation_token='token', heartbeat_at=time.time())
+
+    restarted = OperationTracker(db_path)
+    assert restarted.fail_interrupted() == 1
+    task = restarted.get_operation('task')
+    assert task['status'] == STATUS_FAILED and task['done']
+    assert restarted.get_operation('lro')['status'] == STATUS_RUNNING
+
+    # A LRO fica liberada para o líder retomar sem esperar o heartbeat vencer
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT heartbeat_at FROM operations WHERE id = 'lro'").fetchone() == (None,)
+    conn.close()
+
+
+def test_recover_orphaned_skips_live_operations(tracker):
+    stale = time.time() - tracker_module.ORPHAN_AFTER_SECONDS - 1
+    insert_running(tracker, 'orphan', heartbeat_at=stale)
+    insert_running(tracker, 'alive', heartbeat_at=time.time())
+
+    def factory(user_id, kind):
+        raise AssertionError('operações sem token não são retomadas')
+
+    assert tracker.recover_orphaned(factory) == {'resumed': 0, 'failed': 1}
+    orphan = tracker.get_operation('orphan')
+    assert orphan['status'] == STATUS_FAILED
+    assert 'encerrado' in orphan['error']
+    assert tracker.get_operation('alive')['status'] == STATUS_RUNNING
+    # Já assumida: uma nova verificação não faz nada
+    assert tracker.recover_orphaned(factory) == {'resumed': 0, 'failed': 0}
+
+
+def test_recover_orphaned_fails_lro_that_cannot_resume(tracker):
+    insert_running(tracker, 'lro', continuation_token='token-invalido')
+    assert tracker.recover_orphaned(lambda user_id, kind: None) == {'resumed': 0, 'failed': 1}
+    assert tracker.get_operation('lro')['error'].startswith('Não foi possível retomar')
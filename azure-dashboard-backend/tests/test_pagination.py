@@ -0,0 +1,162 @@
+"""Cursores keyset e páginas sobre SQLite e listas em memória"""
+
+import base64
+import shutil
+import sqlite3
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from fake_arm import FakeArmServer, FakeArmConfig
+from run_benchmarks import prepare_app_tree, load_app, seed_database, TEST_USER
+from src.utils.pagination import (
+    encode_cursor, decode_cursor, parse_limit, optional_limit, sqlite_page, sequence_page, estimate_total,
+    InvalidCursorError, MAX_PAGE_SIZE
+)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, owner INTEGER, created_at TEXT)')
+    # Datas repetidas: o desempate fica com o id
+    conn.executemany('INSERT INTO items (id, owner, created_at) VALUES (?, ?, ?)',
+                     [(index, index % 2, f'2024-01-0{index // 3 + 1}') for index in range(1, 10)])
+    yield conn
+    conn.close()
+
+
+def walk(conn, limit, where=(), params=(), descending=True):
+    """Percorre todas as páginas e retorna (ids, quantidade de páginas)"""
+    ids, pages, cursor = [], 0, None
+    while True:
+        rows, cursor = sqlite_page(conn, 'items', 'id', list(where), list(params), ['created_at', 'id'],
+                                   limit, cursor, descending)
+        ids += [row[0] for row in rows]
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_roundtrip():
+    values = ['2024-01-01 00:00:00', 42, None, 1.5]
+    assert decode_cursor(encode_cursor(values)) == values
+    assert decode_cursor(encode_cursor(values), size=4) == values
+    assert decode_cursor(None) is None
+    assert decode_cursor('') is None
+
+
+@pytest.mark.parametrize('token', [
+    'garbage!',
+    'bm90IGpzb24',  # "not json"
+    base64.urlsafe_b64encode(b'{"a":1}').decode(),  # objeto em vez de lista
+    base64.urlsafe_b64encode(b'[[1],2]').decode(),  # valor não escalar
+])
+def test_tampered_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(token)
+
+
+def test_cursor_with_wrong_key_size_is_rejected():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor([1]), size=2)
+
+
+def test_parse_limit():
+    assert parse_limit(None) == 50
+    assert parse_limit('abc') == 50
+    assert parse_limit('0') == 1
+    assert parse_limit('-5') == 1
+    assert parse_limit(str(MAX_PAGE_SIZE * 10)) == MAX_PAGE_SIZE
+    assert parse_limit('20', maximum=10) == 10
+
+
+def test_optional_limit_keeps_full_lists():
+    assert optional_limit(MultiDict()) is None
+    assert optional_limit(MultiDict({'limit': '5'})) == 5
+    assert optional_limit(MultiDict({'cursor': 'x'})) == 50
+
+
+@pytest.mark.parametrize('limit, pages', [(1, 9), (3, 3), (4, 3), (9, 1), (100, 1)])
+def test_sqlite_page_walks_every_row_once(conn, limit, pages):
+    ids, walked = walk(conn, limit)
+    assert ids == [9, 8, 7, 6, 5, 4, 3, 2, 1]
+    assert walked == pages
+
+
+def test_sqlite_page_ascending_with_filter(conn):
+    ids, _ = walk(conn, 2, where=['owner = ?'], params=[1], descending=False)
+    assert ids == [1, 3, 5, 7, 9]
+
+
+def test_sqlite_page_without_limit_reads_everything(conn):
+    rows, cursor = sqlite_page(conn, 'items', 'id', [], [], ['created_at', 'id'], None)
+    assert len(rows) == 9 and cursor is None
+
+
+def test_sqlite_page_exact_last_page_has_no_cursor(conn):
+    rows, cursor = sqlite_page(conn, 'items', 'id', ['owner = ?'], [0], ['created_at', 'id'], 4)
+    assert [row[0] for row in rows] == [8, 6, 4, 2]
+    assert cursor is None
+
+
+def test_sqlite_page_rejects_tampered_cursor(conn):
+    with pytest.raises(InvalidCursorError):
+        sqlite_page(conn, 'items', 'id', [], [], ['created_at', 'id'], 5, encode_cursor([1]))
+
+
+def test_estimate_total_is_capped(conn):
+    assert estimate_total(conn, 'items', [], []) == (9, True)
+    assert estimate_total(conn, 'items', [], [], cap=5) == (5, False)
+
+
+def test_sequence_page():
+    keys = ['a', 'b', 'c', 'd', 'e']
+    page, cursor = sequence_page(keys, 2)
+    assert page == ['a', 'b']
+    page, cursor = sequence_page(keys, 2, cursor)
+    assert page == ['c', 'd']
+    # Itens removidos entre páginas não deslocam a próxima
+    page, cursor = sequence_page(['a', 'e'], 2, cursor)
+    assert page == ['e'] and cursor is None
+    with pytest.raises(InvalidCursorError):
+        sequence_page(keys, 2, encode_cursor([1]))
+
+
+@pytest.fixture(scope='module')
+def client():
+    fake_server = FakeArmServer(FakeArmConfig(subscriptions=1, resources=10, resource_groups=2,
+                                              latency_ms=0, latency_jitter_ms=0)).start()
+    workdir = tempfile.mkdtemp(prefix='bolt-pagination-test-')
+    try:
+        prepare_app_tree(workdir)
+        app_module = load_app(workdir, fake_server, SimpleNamespace(inventory_max_age=None))
+        seed_database(app_module, SimpleNamespace(seed_rows=5), fake_server.state.subscription_ids[0])
+        client = app_module.app.test_client()
+        client.post('/api/auth/login', json=TEST_USER)
+        yield client
+    finally:
+        fake_server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_route_pages_follow_cursor(client):
+    first = client.get('/api/schedules/list?limit=2&include_total=1').get_json()
+    assert len(first['schedules']) == 2 and first['total'] == 5
+    second = client.get(f"/api/schedules/list?limit=2&cursor={first['next_cursor']}").get_json()
+    seen = {schedule['id'] for schedule in first['schedules'] + second['schedules']}
+    assert len(seen) == 4
+
+
+def test_route_without_limit_returns_full_list(client):
+    response = client.get('/api/schedules/list').get_json()
+    assert len(response['schedules']) == 5 and response['next_cursor'] is None
+
+
+@pytest.mark.parametrize('path', ['/api/schedules', '/api/schedules/list'])
+def test_route_tampered_cursor_returns_400(client, path):
+    response = client.get(f'{path}?cursor=garbage')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
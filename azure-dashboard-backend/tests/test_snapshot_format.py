@@ -0,0 +1,87 @@
+"""Formato binário dos snapshots de inventário"""
+
+import mmap
+
+import pytest
+
+from src.utils.snapshot_format import encode_inventory, InventoryView, SnapshotFormatError
+
+
+def resource(name, resource_group, location='eastus', tags=None, type_='Microsoft.Compute/virtualMachines'):
+    resource_id = f'/subscriptions/sub/resourceGroups/{resource_group}/providers/{type_}/{name}'
+    return {
+        'id': resource_id,
+        'name': name,
+        'type': type_,
+        'location': location,
+        'resource_group': resource_group,
+        'tags': tags or {}
+    }
+
+
+RESOURCES = {
+    item['id'].lower(): item for item in [
+        resource('vm-b', 'rg-prod', tags={'Environment': 'Production', 'Owner': None}),
+        resource('vm-a', 'rg-prod', tags={'Environment': 'Production', 'CostCenter': 'Finance Team'}),
+        resource('disco-ç', 'rg-dev', location=None, type_='Microsoft.Compute/disks'),
+    ]
+}
+GROUPS = {
+    'rg-prod': {'name': 'rg-prod', 'location': 'eastus', 'tags': {'Environment': 'Production'}},
+    'rg-dev': {'name': 'rg-dev', 'location': None, 'tags': {}},
+}
+
+
+def test_roundtrip():
+    view = InventoryView(encode_inventory(RESOURCES, GROUPS))
+    assert dict(view.resources.items()) == RESOURCES
+    assert dict(view.resource_groups.items()) == GROUPS
+    assert len(view.resources) == 3 and len(view.resource_groups) == 2
+
+
+def test_rows_are_sorted_by_key():
+    view = InventoryView(encode_inventory(RESOURCES, GROUPS))
+    assert view.resources.sorted_keys() == sorted(RESOURCES)
+    assert list(view.resource_groups) == ['rg-dev', 'rg-prod']
+
+
+def test_lookup():
+    view = InventoryView(encode_inventory(RESOURCES, GROUPS))
+    key = next(iter(RESOURCES))
+    assert key in view.resources
+    assert view.resources[key] == RESOURCES[key]
+    assert 'missing' not in view.resources
+    assert 42 not in view.resources
+    with pytest.raises(KeyError):
+        view.resource_groups['rg-missing']
+
+
+def test_tag_values_are_stored_as_strings():
+    data = {'/r': dict(resource('vm', 'rg'), id='/r', tags={'Size': 3})}
+    view = InventoryView(encode_inventory(data, {}))
+    assert view.resources['/r']['tags'] == {'Size': '3'}
+
+
+def test_empty_inventory():
+    view = InventoryView(encode_inventory({}, {}))
+    assert len(view.resources) == 0 and list(view.resource_groups) == []
+
+
+def test_read_through_mmap(tmp_path):
+    path = tmp_path / 'inventory.bin'
+    path.write_bytes(encode_inventory(RESOURCES, GROUPS))
+    with open(path, 'rb') as file:
+        # As views apontam para o mapeamento (sem cópia): ele vive enquanto elas existirem
+        view = InventoryView(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    assert dict(view.resources.items()) == RESOURCES
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda data: data[:10],  # menor que o cabeçalho
+    lambda data: data[:-3],  # tabela de strings incompleta
+    lambda data: b'XXXX' + data[4:],  # magic
+    lambda data: data[:4] + b'\x09\x00' + data[6:],  # versão do formato
+])
+def test_invalid_snapshot_is_rejected(corrupt):
+    with pytest.raises(SnapshotFormatError):
+        InventoryView(corrupt(encode_inventory(RESOURCES, GROUPS)))
@@ -0,0 +1,100 @@
+"""Camadas de consolidação e retenção das métricas históricas"""
+
+import sqlite3
+
+import pytest
+
+from src.services.timeseries_store import TimeSeriesStore
+
+HOUR = 3600
+DAY = 86400
+# Meia-noite UTC fixa: os buckets de todas as camadas começam alinhados
+BASE = 1_700_000_000 // DAY * DAY
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TimeSeriesStore(str(tmp_path / 'metrics.db'))
+
+
+def rollup_rows(store, tier):
+    conn = sqlite3.connect(store.db_path)
+    rows = conn.execute('''
+        SELECT bucket_start, count, sum, min, max FROM metrics_rollup WHERE tier = ? ORDER BY bucket_start
+    ''', (tier,)).fetchall()
+    conn.close()
+    return rows
+
+
+def raw_count(store):
+    conn = sqlite3.connect(store.db_path)
+    count = conn.execute('SELECT COUNT(*) FROM metrics_history').fetchone()[0]
+    conn.close()
+    return count
+
+
+@pytest.mark.parametrize('span, expected', [
+    (HOUR, 'raw'),
+    (DAY, '1m'),
+    (30 * DAY, '1h'),
+    (365 * DAY, '1d'),
+])
+def test_choose_tier_by_span(store, span, expected):
+    now = BASE + DAY
+    assert store.choose_tier(now - span, now, now=now) == expected
+
+
+def test_choose_tier_falls_back_to_tier_that_still_retains_start(store):
+    now = BASE + 30 * DAY
+    # Uma hora de 8 dias atrás: bruto (48h) e 1m (7 dias) já não têm o início
+    assert store.choose_tier(now - 8 * DAY, now - 8 * DAY + HOUR, now=now) == '1h'
+
+
+def test_explicit_resolution_is_capped_by_max_points(store):
+    now = BASE + DAY
+    assert store.choose_tier(now - DAY, now, resolution=HOUR, now=now) == '1h'
+    assert store.choose_tier(now - DAY, now, resolution=1, max_points=2000, now=now) == 'raw'
+
+
+def test_rollup_consolidates_closed_buckets(store):
+    for offset, value in ((10, 1.0), (20, 3.0), (70, 5.0)):
+        store.record(1, 'cpu', value, timestamp=BASE + offset)
+    assert store.flush() == 3
+
+    store.rollup(now=BASE + 2 * HOUR)
+
+    assert rollup_rows(store, '1m') == [(BASE, 2, 4.0, 1.0, 3.0), (BASE + 60, 1, 5.0, 5.0, 5.0)]
+    assert rollup_rows(store, '1h') == [(BASE, 3, 9.0, 1.0, 5.0)]
+    # O dia ainda está aberto
+    assert rollup_rows(store, '1d') == []
+
+
+def test_rollup_is_idempotent(store):
+    store.record(1, 'cpu', 2.0, timestamp=BASE + 10)
+    store.flush()
+    store.rollup(now=BASE + 2 * HOUR)
+    store.rollup(now=BASE + 2 * HOUR)
+    assert rollup_rows(store, '1m') == [(BASE, 1, 2.0, 2.0, 2.0)]
+
+
+def test_retention_keeps_raw_points_not_yet_consolidated(store):
+    store.record(1, 'cpu', 1.0, timestamp=BASE + 10)
+    store.flush()
+    store.apply_retention(now=BASE + 30 * DAY)
+    assert raw_count(store) == 1
+
+
+def test_retention_per_tier(store):
+    for offset in (10, 20, 70):
+        store.record(1, 'cpu', 1.0, timestamp=BASE + offset)
+    store.flush()
+    store.rollup(now=BASE + 2 * HOUR)
+
+    deleted = store.apply_retention(now=BASE + 49 * HOUR)
+    assert deleted['raw'] == 3
+    assert raw_count(store) == 0
+    assert len(rollup_rows(store, '1m')) == 2
+
+    store.apply_retention(now=BASE + 8 * DAY)
+    assert rollup_rows(store, '1m') == []
+    assert rollup_rows(store, '1h') == [(BASE, 3, 3.0, 1.0, 1.0)]
@@ -6,7 +6,14 @@ from azure.identity import DefaultAzureCredential, ClientSecretCredential
 from azure.mgmt.resource import ResourceManagementClient
 from azure.mgmt.resource.locks import ManagementLockClient
 import os
+import sys
+sys.path.append('..')
+from shared_arm_governor import PRIORITY_HIGH
+from shared_azure_clients import azure_client_options
+from shared_invocation import accounted_invocation
+from shared_arm_ids import parse_arm_id
 
+@accounted_invocation('BudgetExceededUnlock')
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Azure Function para remoção de locks quando budget é excedido
@@ -55,8 +62,8 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             credential = DefaultAzureCredential()
         
         # Clientes Azure
-        resource_client = ResourceManagementClient(credential, subscription_id)
-        lock_client = ManagementLockClient(credential, subscription_id)
+        resource_client = ResourceManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_HIGH))
+        lock_client = ManagementLockClient(credential, subscription_id, **azure_client_options(PRIORITY_HIGH))
         
         # Resultado da operação
         result = {
@@ -107,10 +114,12 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             # Adicionar locks de recursos individuais
             for resource in resource_client.resources.list():
                 try:
+                    target = parse_arm_id(resource.id)
                     resource_locks = list(lock_client.management_locks.list_at_resource_level(
-                        resource_group_name=resource.id.split('/')[4],
-                        resource_provider_namespace=resource.type.split('/')[0],
-                        resource_type=resource.type.split('/')[1],
+                        resource_group_name=target.resource_group,
+                        resource_provider_namespace=target.provider,
+                        parent_resource_path=target.parent_path,
+                        resource_type=target.types[-1],
                         resource_name=resource.name
                     ))
                     all_locks.extend(resource_locks)
@@ -140,9 +149,8 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             try:
                 if lock.name == "HoldLock":
                     # Extrair nome do resource group do scope do lock
-                    scope_parts = lock.scope.split('/')
-                    if len(scope_parts) >= 5 and scope_parts[3] == 'resourceGroups':
-                        resource_group_name = scope_parts[4]
+                    resource_group_name = parse_arm_id(lock.scope).resource_group
+                    if resource_group_name:
                         
                         if resource_group_name not in allowed_resource_groups:
                             allowed_resource_groups.append(resource_group_name)
@@ -176,29 +184,23 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     
                     try:
                         # Determinar o método de remoção baseado no scope
-                        if '/subscriptions/' in lock.scope and '/resourceGroups/' not in lock.scope:
+                        target = parse_arm_id(lock.scope)
+                        if target.resource_group is None:
                             # Lock da subscription
                             lock_client.management_locks.delete_at_subscription_level(lock.name)
-                        elif '/resourceGroups/' in lock.scope and '/providers/' not in lock.scope:
+                        elif target.provider is None:
                             # Lock de resource group
-                            rg_name = lock.scope.split('/')[4]
-                            lock_client.management_locks.delete_at_resource_group_level(rg_name, lock.name)
-                        else:
-                            # Lock de recurso individual
-                            scope_parts = lock.scope.split('/')
-                            if len(scope_parts) >= 9:
-                                rg_name = scope_parts[4]
-                                provider = scope_parts[6]
-                                resource_type = scope_parts[7]
-                                resource_name = scope_parts[8]
-                                
-                                lock_client.management_locks.delete_at_resource_level(
-                                    resource_group_name=rg_name,
-                                    resource_provider_namespace=provider,
-                                    resource_type=resource_type,
-                                    resource_name=resource_name,
-                                    lock_name=lock.name
-                                )
+                            lock_client.management_locks.delete_at_resource_group_level(target.resource_group, lock.name)
+                        elif target.names:
+                            # Lock de recurso individual (inclusive tipos aninhados)
+                            lock_client.management_locks.delete_at_resource_level(
+                                resource_group_name=target.resource_group,
+                                resource_provider_namespace=target.provider,
+                                parent_resource_path=target.parent_path,
+                                resource_type=target.types[-1],
+                                resource_name=target.names[-1],
+                                lock_name=lock.name
+                            )
                         
                         result['locks_removed'].append({
                             'name': lock.name,
@@ -288,7 +290,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         logging.info(f'✅ Subscription {subscription_id} processada para exclusão de recursos')
         
         return func.HttpResponse(
-            json.dumps(result, indent=2),
+            json.dumps(result, separators=(',', ':')),
             status_code=200,
             headers={'Content-Type': 'application/json'}
         )
@@ -10,7 +10,12 @@ import os
 import sys
 sys.path.append('..')
 from shared_config import AzureFunctionConfig
+from shared_arm_governor import PRIORITY_LOW
+from shared_azure_clients import azure_client_options
+from shared_invocation import accounted_invocation
+from shared_arm_ids import resource_group_of
 
+@accounted_invocation('CleanupUntaggedResources')
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Azure Function para limpeza automática de recursos sem tags obrigatórias
@@ -63,9 +68,9 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             logging.info("Usando Default Azure Credential")
         
         # Clientes Azure
-        resource_client = ResourceManagementClient(credential, subscription_id)
-        compute_client = ComputeManagementClient(credential, subscription_id)
-        storage_client = StorageManagementClient(credential, subscription_id)
+        resource_client = ResourceManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_LOW))
+        compute_client = ComputeManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_LOW))
+        storage_client = StorageManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_LOW))
         
         # Tags obrigatórias (configuráveis via environment)
         required_tags = os.getenv('REQUIRED_TAGS', 'Environment,Owner,Project').split(',')
@@ -111,7 +116,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                         'name': resource.name,
                         'type': resource.type,
                         'location': resource.location,
-                        'resource_group': resource.id.split('/')[4],
+                        'resource_group': resource_group_of(resource.id),
                         'missing_tags': missing_tags,
                         'current_tags': resource_tags
                     }
@@ -178,7 +183,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         logging.info(f'   - Erros: {len(cleanup_results["errors"])}')
         
         return func.HttpResponse(
-            json.dumps(cleanup_results, indent=2),
+            json.dumps(cleanup_results, separators=(',', ':')),
             status_code=200,
             headers={'Content-Type': 'application/json'}
         )
@@ -208,7 +213,7 @@ def is_orphaned_resource(resource, compute_client, storage_client):
         # Discos não anexados
         if 'microsoft.compute/disks' in resource_type:
             disk = compute_client.disks.get(
-                resource.id.split('/')[4],  # resource group
+                resource_group_of(resource.id),
                 resource.name
             )
             return disk.disk_state == 'Unattached'
@@ -254,7 +259,7 @@ def is_long_stopped_vm(compute_client, resource):
     """
     try:
         vm = compute_client.virtual_machines.get(
-            resource.id.split('/')[4],  # resource group
+            resource_group_of(resource.id),
             resource.name,
             expand='instanceView'
         )
@@ -306,6 +311,7 @@ def send_cleanup_notification(cleanup_results):
     except Exception as e:
         logging.error(f"Erro ao enviar notificação: {str(e)}")
 
+@accounted_invocation('CleanupUntaggedResources.timer')
 def main_timer(mytimer: func.TimerRequest) -> None:
     """
     Versão Timer Trigger para execução automática no horário configurado
@@ -5,8 +5,19 @@ from datetime import datetime, timedelta
 from azure.identity import DefaultAzureCredential, ClientSecretCredential
 from azure.mgmt.resource import ResourceManagementClient
 from azure.mgmt.resource.locks import ManagementLockClient
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
+import sys
+sys.path.append('..')
+from shared_arm_governor import PRIORITY_NORMAL
+from shared_azure_clients import azure_client_options
+from shared_invocation import accounted_invocation
+from shared_arm_ids import parse_arm_id, lock_scope
 
+# Concorrência padrão para remoção de locks em lote
+DEFAULT_MAX_WORKERS = int(os.environ.get('LOCK_REMOVAL_MAX_WORKERS', '8'))
+
+@accounted_invocation('RemoveResourceLocks')
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Azure Function para remoção automática de locks de recursos
@@ -16,6 +27,10 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     - Remove locks de recursos deletados
     - Gera relatório de locks removidos
     - Notifica sobre locks críticos
+    
+    Modos (parâmetro mode):
+    - batch (padrão): carrega locks, RGs e recursos uma única vez e classifica em memória
+    - sequential: análise lock a lock com consultas individuais ao ARM
     """
     
     logging.info('Iniciando remoção automática de locks Azure')
@@ -38,8 +53,8 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             credential = DefaultAzureCredential()
         
         # Clientes Azure
-        resource_client = ResourceManagementClient(credential, subscription_id)
-        lock_client = ManagementLockClient(credential, subscription_id)
+        resource_client = ResourceManagementClient(credential, subscription_id, **azure_client_options(PRIORITY_NORMAL))
+        lock_client = ManagementLockClient(credential, subscription_id, **azure_client_options(PRIORITY_NORMAL))
         
         # Resultados da operação
         lock_results = {
@@ -56,6 +71,28 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         # Parâmetros da requisição
         auto_remove = req.params.get('auto_remove', 'false').lower() == 'true'
         max_age_days = int(req.params.get('max_age_days', '90'))
+        mode = req.params.get('mode', 'batch').lower()
+        max_workers = int(req.params.get('max_workers', str(DEFAULT_MAX_WORKERS)))
+        
+        if mode == 'batch':
+            lock_results['mode'] = 'batch'
+            analyze_locks_batch(resource_client, lock_client, lock_results,
+                                max_age_days, auto_remove, max_workers)
+            
+            lock_results['summary'] = build_summary(lock_results)
+            
+            if lock_results['locks_removed'] or lock_results['critical_locks']:
+                send_lock_notification(lock_results)
+            
+            logging.info(f"Remoção de locks concluída (batch): {lock_results['summary']}")
+            
+            return func.HttpResponse(
+                json.dumps(lock_results, default=str),
+                status_code=200,
+                headers={'Content-Type': 'application/json'}
+            )
+        
+        lock_results['mode'] = 'sequential'
         
         # 1. Analisar todos os locks na subscription
         logging.info('Analisando locks na subscription...')
@@ -69,7 +106,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     'name': lock.name,
                     'level': lock.level,
                     'notes': lock.notes,
-                    'scope': lock.scope,
+                    'scope': get_lock_scope(lock),
                     'created_date': getattr(lock, 'created_date', None),
                     'created_by': getattr(lock, 'created_by', None)
                 }
@@ -89,7 +126,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                             })
                 
                 # 3. Verificar se lock é órfão (recurso não existe mais)
-                elif is_orphaned_lock(resource_client, lock):
+                elif is_orphaned_lock(resource_client, lock_info['scope']):
                     lock_results['orphaned_locks'].append(lock_info)
                     
                     if auto_remove:
@@ -103,7 +140,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                             })
                 
                 # 4. Identificar locks críticos (CanNotDelete em recursos importantes)
-                elif is_critical_lock(lock):
+                elif is_critical_lock(lock, lock_info['scope']):
                     lock_results['critical_locks'].append(lock_info)
                 
             except Exception as e:
@@ -124,7 +161,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                         'name': lock.name,
                         'level': lock.level,
                         'notes': lock.notes,
-                        'scope': lock.scope,
+                        'scope': get_lock_scope(lock),
                         'resource_group': rg.name
                     }
                     
@@ -141,14 +178,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 logging.warning(f"Erro ao analisar locks do RG {rg.name}: {str(e)}")
         
         # 6. Gerar resumo
-        lock_results['summary'] = {
-            'total_locks': lock_results['locks_analyzed'],
-            'expired_locks': len(lock_results['expired_locks']),
-            'orphaned_locks': len(lock_results['orphaned_locks']),
-            'locks_removed': len(lock_results['locks_removed']),
-            'critical_locks': len(lock_results['critical_locks']),
-            'errors_count': len(lock_results['errors'])
-        }
+        lock_results['summary'] = build_summary(lock_results)
         
         # 7. Enviar notificações se necessário
         if lock_results['locks_removed'] or lock_results['critical_locks']:
@@ -157,7 +187,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         logging.info(f"Remoção de locks concluída: {lock_results['summary']}")
         
         return func.HttpResponse(
-            json.dumps(lock_results, indent=2, default=str),
+            json.dumps(lock_results, default=str, separators=(',', ':')),
             status_code=200,
             headers={'Content-Type': 'application/json'}
         )
@@ -173,6 +203,170 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             headers={'Content-Type': 'application/json'}
         )
 
+def build_summary(lock_results):
+    """
+    Gera resumo da análise de locks
+    """
+    return {
+        'total_locks': lock_results['locks_analyzed'],
+        'expired_locks': len(lock_results['expired_locks']),
+        'orphaned_locks': len(lock_results['orphaned_locks']),
+        'locks_removed': len(lock_results['locks_removed']),
+        'critical_locks': len(lock_results['critical_locks']),
+        'errors_count': len(lock_results['errors'])
+    }
+
+def load_existing_ids(resource_client):
+    """
+    Carrega uma única vez os IDs (minúsculos) de todos os RGs e recursos da subscription
+    """
+    resource_group_ids = {rg.id.lower() for rg in resource_client.resource_groups.list()}
+    resource_ids = {resource.id.lower() for resource in resource_client.resources.list()}
+    return resource_group_ids, resource_ids
+
+def get_lock_scope(lock):
+    """
+    Obtém o scope do lock (derivado do ID quando o SDK não expõe o atributo)
+    """
+    scope = getattr(lock, 'scope', None)
+    if scope:
+        return scope
+    return lock_scope(lock.id or '')
+
+def classify_lock_scope(scope, resource_group_ids, resource_ids):
+    """
+    Classifica o scope de um lock contra os conjuntos de IDs existentes
+    
+    Retorna 'exists', 'orphaned' ou 'unknown' (recurso aninhado que a listagem
+    de recursos não cobre e precisa de verificação individual)
+    """
+    normalized = scope.rstrip('/').lower()
+    target = parse_arm_id(normalized)
+    
+    # Lock de subscription nunca é órfão
+    if target.resource_group is None:
+        return 'exists'
+    
+    # Lock de resource group: /subscriptions/{id}/resourceGroups/{rg}
+    rg_id = f'/subscriptions/{target.subscription}/resourcegroups/{target.resource_group}'
+    if target.provider is None:
+        return 'exists' if normalized in resource_group_ids else 'orphaned'
+    
+    if normalized in resource_ids:
+        return 'exists'
+    
+    # Se o resource group nem existe, o recurso certamente não existe
+    if rg_id not in resource_group_ids:
+        return 'orphaned'
+    
+    # Tipos aninhados (ex.: servers/databases) nem sempre aparecem em resources.list
+    if len(target.types) > 1:
+        return 'unknown'
+    
+    return 'orphaned'
+
+def analyze_locks_batch(resource_client, lock_client, lock_results, max_age_days,
+                        auto_remove, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Análise de locks em lote
+    
+    Lista todos os locks da subscription (list_at_subscription_level já inclui
+    locks de RGs e recursos) e os IDs de RGs/recursos uma única vez, resolvendo
+    órfãos por busca em conjunto em vez de uma consulta ao ARM por lock.
+    As remoções são executadas em paralelo com resultado por item.
+    """
+    logging.info('Analisando locks em lote...')
+    
+    all_locks = list(lock_client.management_locks.list_at_subscription_level())
+    resource_group_ids, resource_ids = load_existing_ids(resource_client)
+    
+    logging.info(f'Locks: {len(all_locks)}, RGs: {len(resource_group_ids)}, recursos: {len(resource_ids)}')
+    
+    to_remove = []
+    seen_lock_ids = set()
+    
+    for lock in all_locks:
+        # Evitar contar duas vezes o mesmo lock
+        lock_key = (lock.id or '').lower()
+        if lock_key in seen_lock_ids:
+            continue
+        seen_lock_ids.add(lock_key)
+        lock_results['locks_analyzed'] += 1
+        
+        try:
+            lock_info = {
+                'id': lock.id,
+                'name': lock.name,
+                'level': lock.level,
+                'notes': lock.notes,
+                'scope': get_lock_scope(lock),
+                'created_date': getattr(lock, 'created_date', None),
+                'created_by': getattr(lock, 'created_by', None)
+            }
+            
+            if is_expired_lock(lock, max_age_days):
+                lock_results['expired_locks'].append(lock_info)
+                to_remove.append((lock, lock_info))
+                continue
+            
+            scope_status = classify_lock_scope(lock_info['scope'], resource_group_ids, resource_ids)
+            if scope_status == 'unknown':
+                # Apenas recursos aninhados fora da listagem caem na verificação individual
+                scope_status = 'orphaned' if is_orphaned_lock(resource_client, lock_info['scope']) else 'exists'
+            
+            if scope_status == 'orphaned':
+                lock_results['orphaned_locks'].append(lock_info)
+                to_remove.append((lock, lock_info))
+            elif is_critical_lock(lock, lock_info['scope']):
+                lock_results['critical_locks'].append(lock_info)
+                
+        except Exception as e:
+            logging.error(f"Erro ao analisar lock {lock.id}: {str(e)}")
+            lock_results['errors'].append({
+                'lock_id': lock.id,
+                'error': str(e)
+            })
+    
+    if auto_remove and to_remove:
+        lock_results['removal_results'] = remove_locks_parallel(lock_client, to_remove, max_workers)
+        for item in lock_results['removal_results']:
+            if item['success']:
+                lock_results['locks_removed'].append(item['lock'])
+            else:
+                lock_results['errors'].append({
+                    'lock_id': item['lock']['id'],
+                    'error': item['error']
+                })
+    
+    return lock_results
+
+def remove_locks_parallel(lock_client, locks_with_info, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Remove locks em paralelo e retorna o resultado individual de cada remoção
+    """
+    results = []
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(remove_lock, lock_client, lock): lock_info
+            for lock, lock_info in locks_with_info
+        }
+        for future in as_completed(futures):
+            lock_info = futures[future]
+            try:
+                remove_result = future.result()
+            except Exception as e:
+                remove_result = {'success': False, 'error': str(e)}
+            
+            results.append({
+                'lock': lock_info,
+                'success': remove_result['success'],
+                'message': remove_result.get('message'),
+                'error': remove_result.get('error')
+            })
+    
+    return results
+
 def is_expired_lock(lock, max_age_days):
     """
     Verifica se lock está expirado baseado na idade
@@ -195,29 +389,28 @@ def is_expired_lock(lock, max_age_days):
         logging.warning(f"Erro ao verificar expiração do lock: {str(e)}")
         return False
 
-def is_orphaned_lock(resource_client, lock):
+def is_orphaned_lock(resource_client, scope):
     """
     Verifica se lock é órfão (recurso não existe mais)
+    scope: scope do lock, obtido com get_lock_scope (ManagementLockObject não tem o atributo)
     """
     try:
-        # Extrair resource ID do scope do lock
-        scope = lock.scope
+        target = parse_arm_id(scope)
         
         # Se é lock de subscription, não é órfão
-        if '/subscriptions/' in scope and scope.count('/') <= 2:
+        if target.resource_group is None and target.provider is None:
             return False
         
         # Se é lock de resource group
-        if '/resourceGroups/' in scope and '/providers/' not in scope:
-            rg_name = scope.split('/resourceGroups/')[1].split('/')[0]
+        if target.provider is None:
             try:
-                resource_client.resource_groups.get(rg_name)
+                resource_client.resource_groups.get(target.resource_group)
                 return False  # Resource group existe
             except:
                 return True   # Resource group não existe
         
         # Se é lock de recurso específico
-        if '/providers/' in scope:
+        if target.provider is not None:
             try:
                 # Tentar obter o recurso
                 resource_client.resources.get_by_id(scope, api_version='2021-04-01')
@@ -231,14 +424,15 @@ def is_orphaned_lock(resource_client, lock):
         logging.warning(f"Erro ao verificar se lock é órfão: {str(e)}")
         return False
 
-def is_critical_lock(lock):
+def is_critical_lock(lock, scope):
     """
     Identifica locks críticos que precisam de atenção especial
+    scope: scope do lock, obtido com get_lock_scope
     """
     try:
         # Locks CanNotDelete em recursos críticos
         if lock.level == 'CanNotDelete':
-            scope = lock.scope.lower()
+            scope = scope.lower()
             
             # Recursos críticos que merecem atenção
             critical_resources = [
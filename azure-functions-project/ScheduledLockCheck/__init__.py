@@ -8,7 +8,11 @@ import os
 import sys
 sys.path.append('..')
 from shared_config import AzureFunctionConfig
+from shared_arm_governor import PRIORITY_NORMAL
+from shared_azure_clients import azure_client_options
+from shared_invocation import accounted_invocation
 
+@accounted_invocation('ScheduledLockCheck')
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Azure Function para verificação e remoção de lock da subscription
@@ -62,7 +66,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             logging.info("Usando Default Azure Credential")
         
         # Cliente para gerenciar locks
-        lock_client = ManagementLockClient(credential, subscription_id)
+        lock_client = ManagementLockClient(credential, subscription_id, **azure_client_options(PRIORITY_NORMAL))
         
         # Nome do lock configurável
         target_lock_name = AzureFunctionConfig.BUDGET_LOCK_NAME
@@ -147,7 +151,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             logging.info('✅ Verificação concluída: Nenhum lock encontrado')
         
         return func.HttpResponse(
-            json.dumps(result, indent=2),
+            json.dumps(result, separators=(',', ':')),
             status_code=200,
             headers={'Content-Type': 'application/json'}
         )
@@ -169,6 +173,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             headers={'Content-Type': 'application/json'}
         )
 
+@accounted_invocation('ScheduledLockCheck.timer')
 def main_timer(mytimer: func.TimerRequest) -> None:
     """
     Versão Timer Trigger para execução automática no dia configurado
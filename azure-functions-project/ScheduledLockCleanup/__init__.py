@@ -5,7 +5,13 @@ from datetime import datetime
 from azure.identity import DefaultAzureCredential, ClientSecretCredential
 from azure.mgmt.resource.locks import ManagementLockClient
 import os
+import sys
+sys.path.append('..')
+from shared_arm_governor import PRIORITY_NORMAL
+from shared_azure_clients import azure_client_options
+from shared_invocation import accounted_invocation
 
+@accounted_invocation('ScheduledLockCleanup')
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Azure Function para remoção agendada de lock da subscription
@@ -54,7 +60,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             logging.info("Usando Default Azure Credential")
         
         # Cliente para gerenciar locks
-        lock_client = ManagementLockClient(credential, subscription_id)
+        lock_client = ManagementLockClient(credential, subscription_id, **azure_client_options(PRIORITY_NORMAL))
         
         # Resultado da operação
         result = {
@@ -137,7 +143,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         send_cleanup_notification(result)
         
         return func.HttpResponse(
-            json.dumps(result, indent=2),
+            json.dumps(result, separators=(',', ':')),
             status_code=200,
             headers={'Content-Type': 'application/json'}
         )
@@ -185,6 +191,7 @@ def send_cleanup_notification(result):
         logging.error(f"Erro ao enviar notificação: {str(e)}")
 
 # Função para ser chamada via Timer Trigger
+@accounted_invocation('ScheduledLockCleanup.timer')
 def main_timer(mytimer: func.TimerRequest) -> None:
     """
     Versão Timer Trigger para execução automática todo dia 02
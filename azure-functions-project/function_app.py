@@ -109,14 +109,16 @@ def cost_monitoring_http(req: func.HttpRequest) -> func.HttpResponse:
 # ============================================================================
 
 @app.route(route="budget-webhook", auth_level=func.AuthLevel.ANONYMOUS, methods=["POST"])
-def budget_webhook(req: func.HttpRequest) -> func.HttpResponse:
+@app.queue_output(arg_name="unlockjob", queue_name="budget-unlock-jobs", connection="AzureWebJobsStorage")
+def budget_webhook(req: func.HttpRequest, unlockjob: func.Out[str]) -> func.HttpResponse:
     """
     Webhook: Recebe alertas do Azure Budget
-    Função: Processa alertas e aciona ações automáticas
+    Função: Processa alertas e enfileira a remoção de locks (retorna 202 imediatamente)
     """
+    import json
+    from datetime import datetime
+    
     try:
-        import json
-        
         # Log do webhook recebido
         logging.info("=== WEBHOOK BUDGET RECEBIDO ===")
         
@@ -127,7 +129,13 @@ def budget_webhook(req: func.HttpRequest) -> func.HttpResponse:
             webhook_data = {}
         
         # Log dos dados recebidos
-        logging.info(f"Dados do webhook: {json.dumps(webhook_data, indent=2)}")
+        logging.info(f"Dados do webhook: {json.dumps(webhook_data)}")
+        
+        response_body = {
+            'status': 'webhook_processed',
+            'timestamp': datetime.utcnow().isoformat(),
+            'data_received': webhook_data is not None
+        }
         
         # Verificar se é alerta de budget excedido
         if webhook_data and 'data' in webhook_data:
@@ -141,31 +149,26 @@ def budget_webhook(req: func.HttpRequest) -> func.HttpResponse:
             
             logging.info(f"Budget: {budget_name}, Threshold: {threshold}%, Actual: ${actual_spend}, Forecast: ${forecasted_spend}")
             
-            # Se threshold >= 100%, acionar remoção de locks
+            # Se threshold >= 100%, enfileirar remoção de locks (processada pelo worker da fila)
             if threshold >= 100:
-                logging.critical(f"🚨 BUDGET EXCEDIDO: {threshold}% - Acionando remoção de locks")
+                logging.critical(f"🚨 BUDGET EXCEDIDO: {threshold}% - Enfileirando remoção de locks")
                 
-                # Chamar function de remoção de locks
-                from .BudgetExceededUnlock import main as budget_unlock_main
+                from .shared_jobs import enqueue_budget_unlock
+                job = enqueue_budget_unlock(alert_data, unlockjob)
                 
-                # Simular requisição para a function
-                fake_req = type('obj', (object,), {
-                    'params': {
-                        'budget_limit': str(actual_spend / (threshold / 100)),
-                        'current_cost': str(actual_spend),
-                        'force_unlock': 'true'
-                    }
-                })()
-                
-                unlock_result = budget_unlock_main(fake_req)
-                logging.info(f"Resultado da remoção de locks: {unlock_result.status_code}")
+                response_body.update({
+                    'status': 'unlock_enqueued',
+                    'idempotency_key': job['idempotency_key'],
+                    'budget_period': job['period']
+                })
+                return func.HttpResponse(
+                    json.dumps(response_body),
+                    status_code=202,
+                    headers={'Content-Type': 'application/json'}
+                )
         
         return func.HttpResponse(
-            json.dumps({
-                'status': 'webhook_processed',
-                'timestamp': func.datetime.utcnow().isoformat(),
-                'data_received': webhook_data is not None
-            }),
+            json.dumps(response_body),
             status_code=200,
             headers={'Content-Type': 'application/json'}
         )
@@ -178,6 +181,19 @@ def budget_webhook(req: func.HttpRequest) -> func.HttpResponse:
             headers={'Content-Type': 'application/json'}
         )
 
+@app.queue_trigger(arg_name="unlockjob", queue_name="budget-unlock-jobs", connection="AzureWebJobsStorage")
+def budget_unlock_worker(unlockjob: func.QueueMessage) -> None:
+    """
+    Queue Trigger: Processa jobs de remoção de locks enfileirados pelo webhook
+    Função: Executa BudgetExceededUnlock uma única vez por budget/período (deduplicação)
+    """
+    from .shared_jobs import process_budget_unlock_job
+    from .BudgetExceededUnlock import main as budget_unlock_main
+    
+    logging.info(f"Processando job de unlock (tentativa {unlockjob.dequeue_count})")
+    result = process_budget_unlock_job(unlockjob.get_body().decode('utf-8'), budget_unlock_main)
+    logging.info(f"Resultado do job de unlock: {result}")
+
 # ============================================================================
 # FUNCTION 7: Health Check
 # ============================================================================
@@ -199,7 +215,8 @@ def health_check(req: func.HttpRequest) -> func.HttpResponse:
             'cleanup_untagged_resources': 'active',
             'shutdown_scheduled_resources': 'active',
             'cost_monitoring': 'active',
-            'budget_webhook': 'active'
+            'budget_webhook': 'active',
+            'budget_unlock_worker': 'active'
         },
         'environment': {
             'subscription_id': 'configured' if func.os.environ.get('AZURE_SUBSCRIPTION_ID') else 'missing',
@@ -210,7 +227,7 @@ def health_check(req: func.HttpRequest) -> func.HttpResponse:
     }
     
     return func.HttpResponse(
-        json.dumps(health_status, indent=2),
+        json.dumps(health_status, separators=(',', ':')),
         status_code=200,
         headers={'Content-Type': 'application/json'}
     )
@@ -0,0 +1,267 @@
+# Arquivo gerado a partir de azure-dashboard-backend/src/utils/arm_governor.py
+# por scripts/sync_shared_modules.py: não edite aqui
+"""
+Governador de throttling do Azure Resource Manager
+Controla por subscription a taxa e a concorrência das chamadas ARM com base nos
+headers x-ms-ratelimit-remaining-subscription-reads/writes, priorizando
+operações críticas (ex.: unlock por budget) sobre atualizações de dashboard
+"""
+
+import os
+import re
+import time
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from azure.core.pipeline.policies import HTTPPolicy
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (menor valor = mais importante)
+PRIORITY_HIGH = 0      # Ações emergenciais (unlock por budget, remoção de locks)
+PRIORITY_NORMAL = 1    # Ações do usuário
+PRIORITY_LOW = 2       # Atualizações de dashboard, listagens em background
+
+# Capacidade e reposição dos buckets por subscription (modelo de token bucket do ARM)
+READ_BUCKET_CAPACITY = float(os.environ.get('ARM_READ_BUCKET_CAPACITY', '250'))
+READ_REFILL_PER_SECOND = float(os.environ.get('ARM_READ_REFILL_PER_SECOND', '25'))
+WRITE_BUCKET_CAPACITY = float(os.environ.get('ARM_WRITE_BUCKET_CAPACITY', '200'))
+WRITE_REFILL_PER_SECOND = float(os.environ.get('ARM_WRITE_REFILL_PER_SECOND', '10'))
+
+# Fração do bucket reservada para prioridades mais altas
+PRIORITY_RESERVE = {PRIORITY_HIGH: 0.0, PRIORITY_NORMAL: 0.1, PRIORITY_LOW: 0.3}
+
+# Tempo máximo de espera na fila antes de descartar a chamada (segundos)
+PRIORITY_MAX_WAIT = {PRIORITY_HIGH: 300.0, PRIORITY_NORMAL: 30.0, PRIORITY_LOW: 5.0}
+
+# Concorrência adaptativa (AIMD) por subscription
+INITIAL_CONCURRENCY = int(os.environ.get('ARM_INITIAL_CONCURRENCY', '8'))
+MAX_CONCURRENCY = int(os.environ.get('ARM_MAX_CONCURRENCY', '32'))
+HIGH_PRIORITY_EXTRA_SLOTS = 2
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+_SUBSCRIPTION_RE = re.compile(r'/subscriptions/([0-9a-fA-F-]{36})', re.IGNORECASE)
+
+_current_priority = contextvars.ContextVar('arm_priority', default=None)
+
+
+class ArmThrottledError(Exception):
+    """Chamada descartada pelo governador para preservar a cota de prioridades mais altas"""
+
+
+@contextmanager
+def arm_priority(priority):
+    """Define a prioridade das chamadas ARM feitas dentro do bloco"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket sincronizado com a cota restante informada pelo ARM"""
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated = now
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens
+
+    def take(self, now, amount=1.0):
+        self._refill(now)
+        self.tokens -= amount
+
+    def seconds_until(self, now, level):
+        self._refill(now)
+        if self.tokens >= level:
+            return 0.0
+        return (level - self.tokens) / self.refill_per_second
+
+    def sync_remaining(self, now, remaining):
+        """O ARM é a fonte da verdade: nunca acreditar em mais tokens do que ele reporta"""
+        self._refill(now)
+        self.tokens = min(self.capacity, float(remaining))
+
+
+class SubscriptionGovernor:
+    """Estado de throttling de uma subscription"""
+
+    def __init__(self, subscription_id):
+        self.subscription_id = subscription_id
+        self.buckets = {
+            'reads': TokenBucket(READ_BUCKET_CAPACITY, READ_REFILL_PER_SECOND),
+            'writes': TokenBucket(WRITE_BUCKET_CAPACITY, WRITE_REFILL_PER_SECOND)
+        }
+        self.concurrency_limit = INITIAL_CONCURRENCY
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.consecutive_throttles = 0
+        self.successes_since_increase = 0
+        self.shed_count = 0
+        self._condition = threading.Condition()
+
+    def _wait_time(self, kind, priority, now):
+        """Retorna 0 se a chamada pode seguir agora, senão quanto esperar"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        slots = self.concurrency_limit + (HIGH_PRIORITY_EXTRA_SLOTS if priority == PRIORITY_HIGH else 0)
+        if self.in_flight >= slots:
+            return None  # aguardar liberação de slot
+
+        bucket = self.buckets[kind]
+        reserve = bucket.capacity * PRIORITY_RESERVE.get(priority, 0.0)
+        return bucket.seconds_until(now, reserve + 1.0)
+
+    def acquire(self, kind, priority):
+        max_wait = PRIORITY_MAX_WAIT.get(priority, PRIORITY_MAX_WAIT[PRIORITY_NORMAL])
+        deadline = time.monotonic() + max_wait
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(kind, priority, now)
+                if wait == 0:
+                    self.buckets[kind].take(now)
+                    self.in_flight += 1
+                    return
+
+                remaining = deadline - now
+                if remaining <= 0 or (wait is not None and wait > remaining and priority != PRIORITY_HIGH):
+                    self.shed_count += 1
+                    raise ArmThrottledError(
+                        f'Cota ARM de {kind} da subscription {self.subscription_id} reservada para '
+                        f'operações prioritárias; tente novamente em instantes'
+                    )
+                self._condition.wait(timeout=min(remaining, wait if wait is not None else remaining, 1.0))
+
+    def release(self, kind, status_code, headers):
+        now = time.monotonic()
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+
+            for header_kind in ('reads', 'writes'):
+                remaining = headers.get(f'x-ms-ratelimit-remaining-subscription-{header_kind}') if headers else None
+                if remaining is not None:
+                    try:
+                        self.buckets[header_kind].sync_remaining(now, remaining)
+                    except ValueError:
+                        pass
+
+            if status_code == 429:
+                self.consecutive_throttles += 1
+                self.concurrency_limit = max(1, self.concurrency_limit // 2)
+                self.successes_since_increase = 0
+                self.blocked_until = max(self.blocked_until, now + self._backoff_seconds(headers))
+                logger.warning(
+                    f'ARM 429 na subscription {self.subscription_id}: concorrência reduzida para '
+                    f'{self.concurrency_limit}, pausa de {self.blocked_until - now:.1f}s'
+                )
+            elif status_code is not None and status_code < 500:
+                self.consecutive_throttles = 0
+                self.successes_since_increase += 1
+                if (self.successes_since_increase >= self.concurrency_limit
+                        and self.concurrency_limit < MAX_CONCURRENCY):
+                    self.concurrency_limit += 1
+                    self.successes_since_increase = 0
+
+            self._condition.notify_all()
+
+    def _backoff_seconds(self, headers):
+        """Retry-After do ARM com jitter; sem header, backoff exponencial com jitter completo"""
+        retry_after = headers.get('Retry-After') if headers else None
+        if retry_after:
+            try:
+                return float(retry_after) * random.uniform(1.0, 1.3)
+            except ValueError:
+                pass
+        ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** self.consecutive_throttles))
+        return random.uniform(BACKOFF_BASE_SECONDS, ceiling)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._condition:
+            return {
+                'subscription_id': self.subscription_id,
+                'reads_available': round(self.buckets['reads'].available(now), 1),
+                'writes_available': round(self.buckets['writes'].available(now), 1),
+                'concurrency_limit': self.concurrency_limit,
+                'in_flight': self.in_flight,
+                'blocked_for_seconds': round(max(0.0, self.blocked_until - now), 1),
+                'shed_count': self.shed_count
+            }
+
+
+class ArmGovernor:
+    """Registro de governadores por subscription, compartilhado por todo o processo"""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def for_subscription(self, subscription_id):
+        key = subscription_id.lower()
+        with self._lock:
+            governor = self._subscriptions.get(key)
+            if governor is None:
+                governor = self._subscriptions[key] = SubscriptionGovernor(key)
+            return governor
+
+    def status(self):
+        with self._lock:
+            governors = list(self._subscriptions.values())
+        return [governor.snapshot() for governor in governors]
+
+
+class ArmGovernorPolicy(HTTPPolicy):
+    """
+    Policy de pipeline do SDK que passa cada tentativa de chamada ARM pelo governador
+    Instalada como per_retry_policy, vê também as novas tentativas após um 429
+    """
+
+    def __init__(self, priority=PRIORITY_NORMAL, governor=None):
+        super().__init__()
+        self.priority = priority
+        self.governor = governor or arm_governor
+
+    def send(self, request):
+        match = _SUBSCRIPTION_RE.search(request.http_request.url)
+        if not match:
+            return self.next.send(request)
+
+        priority = _current_priority.get()
+        if priority is None:
+            priority = self.priority
+        kind = 'reads' if request.http_request.method.upper() in ('GET', 'HEAD') else 'writes'
+
+        subscription = self.governor.for_subscription(match.group(1))
+        subscription.acquire(kind, priority)
+
+        status_code = None
+        headers = None
+        try:
+            response = self.next.send(request)
+            status_code = response.http_response.status_code
+            headers = response.http_response.headers
+            return response
+        finally:
+            subscription.release(kind, status_code, headers)
+
+
+# Instância global compartilhada por todos os serviços
+arm_governor = ArmGovernor()
@@ -0,0 +1,30 @@
+# Arquivo gerado a partir de azure-dashboard-backend/src/utils/azure_clients.py
+# por scripts/sync_shared_modules.py: não edite aqui
+"""
+Opções comuns para criação dos clientes do SDK Azure
+Garante que todo cliente ARM passe pelo governador de throttling compartilhado
+e tenha suas chamadas contabilizadas na requisição corrente
+"""
+
+import os
+
+from shared_arm_governor import ArmGovernorPolicy, PRIORITY_NORMAL
+from shared_call_accounting import CallAccountingPolicy
+
+
+# Endpoint do Resource Manager (nuvens soberanas ou servidor local de benchmark)
+MANAGEMENT_ENDPOINT = os.environ.get('AZURE_MANAGEMENT_ENDPOINT', '').rstrip('/')
+
+
+def azure_client_options(priority=PRIORITY_NORMAL):
+    """
+    Retorna kwargs para os construtores dos clientes de gerenciamento
+    Ex.: ResourceManagementClient(credential, subscription_id, **azure_client_options())
+    """
+    options = {
+        # O governador envolve a contabilização: o tempo medido é o da chamada, sem a espera na fila
+        'per_retry_policies': [ArmGovernorPolicy(priority), CallAccountingPolicy()]
+    }
+    if MANAGEMENT_ENDPOINT:
+        options['base_url'] = MANAGEMENT_ENDPOINT
+    return options
@@ -0,0 +1,182 @@
+# Arquivo gerado a partir de azure-dashboard-backend/src/utils/call_accounting.py
+# por scripts/sync_shared_modules.py: não edite aqui
+"""
+Contabilização das chamadas ao Azure por requisição
+Policy de pipeline que conta e cronometra cada chamada HTTP dos SDKs de gerenciamento,
+agrupando por operação (URL normalizada sem ids), dentro do escopo ativo: uma
+requisição Flask, uma sub-requisição de /api/batch ou um bloco track_calls().
+Torna visíveis padrões N+1 (uma chamada por recurso/resource group)
+"""
+
+import os
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from azure.core.pipeline.policies import HTTPPolicy
+
+logger = logging.getLogger(__name__)
+
+# Acima deste número de chamadas em uma requisição o resumo é logado como aviso
+CALL_WARN_THRESHOLD = int(os.environ.get('AZURE_CALL_WARN_THRESHOLD', '25'))
+
+_current_ledger = contextvars.ContextVar('azure_call_ledger', default=None)
+
+# Segmentos seguidos por um nome/id (substituído por {} na operação)
+_NAMED_SEGMENTS = {'subscriptions', 'resourcegroups', 'managementgroups', 'tenants', 'deployments'}
+
+
+@lru_cache(maxsize=4096)
+def operation_name(method, path):
+    """
+    Normaliza a URL de uma chamada ARM em um nome de operação estável
+    Ex.: GET /subscriptions/{}/resourcegroups/{}/providers/microsoft.compute/virtualmachines/{}
+    """
+    parts = [part for part in path.split('/') if part]
+    normalized = []
+    index = 0
+    while index < len(parts):
+        segment = parts[index].lower()
+        if segment == 'providers' and index + 1 < len(parts):
+            normalized += ['providers', parts[index + 1].lower()]
+            index += 2
+            # Após o namespace os segmentos alternam tipo/nome; um segmento final ímpar é uma ação
+            while index < len(parts) and parts[index].lower() != 'providers':
+                normalized.append(parts[index].lower())
+                if index + 1 < len(parts) and parts[index + 1].lower() != 'providers':
+                    normalized.append('{}')
+                index += 2
+        elif segment in _NAMED_SEGMENTS and index + 1 < len(parts):
+            normalized += [segment, '{}']
+            index += 2
+        else:
+            normalized.append(segment)
+            index += 1
+    return f"{method.upper()} /{'/'.join(normalized)}"
+
+
+class CallLedger:
+    """Chamadas registradas em um escopo; propaga também para o escopo pai"""
+
+    def __init__(self, name=None, parent=None):
+        self.name = name
+        self.parent = parent
+        self.calls = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.by_operation = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, status_code, elapsed):
+        failed = status_code is None or status_code >= 400
+        with self._lock:
+            self.calls += 1
+            self.elapsed += elapsed
+            entry = self.by_operation.get(operation)
+            if entry is None:
+                entry = self.by_operation[operation] = {'count': 0, 'errors': 0, 'time': 0.0}
+            entry['count'] += 1
+            entry['time'] += elapsed
+            if failed:
+                self.errors += 1
+                entry['errors'] += 1
+        if self.parent is not None:
+            self.parent.record(operation, status_code, elapsed)
+
+    def count(self, operation_prefix=None):
+        """Total de chamadas, opcionalmente só das operações que começam com o prefixo"""
+        if operation_prefix is None:
+            return self.calls
+        return sum(entry['count'] for operation, entry in self.by_operation.items()
+                   if operation.startswith(operation_prefix))
+
+    def summary(self):
+        with self._lock:
+            operations = sorted(self.by_operation.items(), key=lambda item: -item[1]['count'])
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'time_ms': round(self.elapsed * 1000, 1),
+                'by_operation': {
+                    operation: {
+                        'count': entry['count'],
+                        'errors': entry['errors'],
+                        'time_ms': round(entry['time'] * 1000, 1)
+                    } for operation, entry in operations
+                }
+            }
+
+    def header_value(self):
+        """Resumo curto para o header X-Azure-Calls"""
+        with self._lock:
+            top = max(self.by_operation.items(), key=lambda item: item[1]['count'], default=None)
+            value = f'count={self.calls}; errors={self.errors}; time_ms={self.elapsed * 1000:.1f}'
+            if top:
+                value += f'; top="{top[0]}" x{top[1]["count"]}'
+            return value
+
+    def log_line(self):
+        operations = ', '.join(
+            f"{operation} x{entry['count']}" for operation, entry in self.summary()['by_operation'].items()
+        )
+        return (f"Azure calls [{self.name or '-'}]: {self.calls} chamadas, {self.errors} erros, "
+                f"{self.elapsed * 1000:.0f} ms ({operations})")
+
+
+def current_ledger():
+    return _current_ledger.get()
+
+
+def start_tracking(name=None):
+    """Abre um escopo de contabilização; retorna (ledger, token) para stop_tracking"""
+    ledger = CallLedger(name, parent=_current_ledger.get())
+    return ledger, _current_ledger.set(ledger)
+
+
+def stop_tracking(token):
+    _current_ledger.reset(token)
+
+
+@contextmanager
+def track_calls(name=None):
+    """Contabiliza as chamadas ao Azure feitas dentro do bloco"""
+    ledger, token = start_tracking(name)
+    try:
+        yield ledger
+    finally:
+        stop_tracking(token)
+
+
+def log_ledger(ledger):
+    """Loga o resumo do escopo (aviso acima de CALL_WARN_THRESHOLD)"""
+    if not ledger.calls:
+        return
+    level = logging.WARNING if ledger.calls > CALL_WARN_THRESHOLD else logging.INFO
+    logger.log(level, ledger.log_line())
+
+
+class CallAccountingPolicy(HTTPPolicy):
+    """
+    Policy de pipeline que registra cada tentativa de chamada no escopo ativo
+    Instalada como per_retry_policy: novas tentativas após 429/5xx também contam
+    """
+
+    def send(self, request):
+        ledger = _current_ledger.get()
+        if ledger is None:
+            return self.next.send(request)
+
+        http_request = request.http_request
+        operation = operation_name(http_request.method, urlparse(http_request.url).path)
+        started = time.perf_counter()
+        status_code = None
+        try:
+            response = self.next.send(request)
+            status_code = response.http_response.status_code
+            return response
+        finally:
+            ledger.record(operation, status_code, time.perf_counter() - started)
@@ -0,0 +1,27 @@
+"""
+Contabilização das chamadas ao Azure por invocação das Functions
+Envolve o main/main_timer de cada Function em um escopo de track_calls()
+(shared_call_accounting, gerado a partir do backend)
+"""
+from functools import wraps
+
+from shared_call_accounting import track_calls, log_ledger
+
+
+def accounted_invocation(name):
+    """
+    Decorator para o main/main_timer de cada Function: loga o resumo das chamadas
+    e, em respostas HTTP, adiciona o header X-Azure-Calls
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with track_calls(name) as ledger:
+                result = function(*args, **kwargs)
+            log_ledger(ledger)
+            headers = getattr(result, 'headers', None)
+            if ledger.calls and headers is not None:
+                headers['X-Azure-Calls'] = ledger.header_value()
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,303 @@
+"""
+Fila de jobs assíncronos compartilhada pelas Azure Functions
+Permite que webhooks respondam imediatamente e deleguem o trabalho pesado
+para um worker acionado por fila, com deduplicação por chave de idempotência
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+# Nome da fila usada pelo webhook de budget (deve bater com o binding em function_app.py)
+BUDGET_UNLOCK_QUEUE = 'budget-unlock-jobs'
+
+# Tabela onde o estado de cada job é persistido para deduplicação
+JOB_STATE_TABLE = os.getenv('JOB_STATE_TABLE', 'BudgetUnlockJobs')
+
+# Tempo após o qual um job "running" é considerado abandonado (worker caiu)
+JOB_STALE_AFTER_MINUTES = int(os.getenv('JOB_STALE_AFTER_MINUTES', '30'))
+
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+
+
+def resolve_budget_period(alert_data):
+    """
+    Determina o período de cobrança avaliado pelo alerta (YYYY-MM)
+    Usa a data de disparo/avaliação do payload quando disponível, senão o mês corrente (UTC).
+    A data de início do budget é fixa e só entra para distinguir budgets recriados
+    """
+    evaluated = None
+    for key in ('firedDateTime', 'FiredDateTime', 'evaluationDate', 'EvaluationDate', 'alertDate'):
+        value = alert_data.get(key)
+        if value:
+            evaluated = str(value)[:7]
+            break
+    period = evaluated or datetime.utcnow().strftime('%Y-%m')
+
+    for key in ('budgetStartDate', 'BudgetStartDate'):
+        value = alert_data.get(key)
+        if value:
+            return f"{period}@{str(value)[:10]}"
+    return period
+
+
+def build_idempotency_key(budget_name, period):
+    """Gera chave de idempotência estável para (budget, período)"""
+    raw = f"{(budget_name or 'unknown').strip().lower()}|{period}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def build_unlock_job(alert_data):
+    """Monta a mensagem de job de remoção de locks a partir do alerta de budget"""
+    budget_name = alert_data.get('budgetName', 'Unknown')
+    threshold = float(alert_data.get('threshold', 0) or 0)
+    actual_spend = float(alert_data.get('actualSpend', 0) or 0)
+    period = resolve_budget_period(alert_data)
+
+    return {
+        'idempotency_key': build_idempotency_key(budget_name, period),
+        'budget_name': budget_name,
+        'period': period,
+        'threshold': threshold,
+        'params': {
+            'budget_limit': str(actual_spend / (threshold / 100)) if threshold else '0',
+            'current_cost': str(actual_spend),
+            'force_unlock': 'true'
+        },
+        'enqueued_at': datetime.utcnow().isoformat()
+    }
+
+
+class JobRequest:
+    """Requisição mínima compatível com func.HttpRequest para reutilizar os handlers HTTP"""
+
+    def __init__(self, params):
+        self.params = params
+
+
+class LocalJobQueue:
+    """
+    Substituto local da fila do Azure Storage para testes e desenvolvimento
+    Implementa a mesma interface de func.Out (set) usada pelo binding de saída
+    """
+
+    def __init__(self):
+        self._messages = deque()
+        self._lock = threading.Lock()
+
+    def set(self, message):
+        with self._lock:
+            self._messages.append(message)
+
+    def receive(self):
+        with self._lock:
+            return self._messages.popleft() if self._messages else None
+
+    def drain(self, handler):
+        """Processa todas as mensagens pendentes com o handler informado"""
+        processed = 0
+        while True:
+            message = self.receive()
+            if message is None:
+                return processed
+            handler(message)
+            processed += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._messages)
+
+
+class InMemoryJobStateStore:
+    """Estado de jobs em memória (testes e execução local sem storage)"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            job = self._jobs.get(key)
+            return dict(job) if job else None
+
+    def try_claim(self, key, job):
+        with self._lock:
+            current = self._jobs.get(key)
+            if current and not _is_reclaimable(current):
+                return False
+            self._jobs[key] = {
+                'status': STATUS_RUNNING,
+                'budget_name': job.get('budget_name'),
+                'period': job.get('period'),
+                'attempts': (current or {}).get('attempts', 0) + 1,
+                'updated_at': datetime.utcnow().isoformat()
+            }
+            return True
+
+    def mark_completed(self, key, summary=None):
+        self._update(key, STATUS_COMPLETED, summary=summary)
+
+    def mark_failed(self, key, error):
+        self._update(key, STATUS_FAILED, error=str(error))
+
+    def _update(self, key, status, **fields):
+        with self._lock:
+            job = self._jobs.setdefault(key, {})
+            job.update(fields)
+            job['status'] = status
+            job['updated_at'] = datetime.utcnow().isoformat()
+
+
+class TableJobStateStore:
+    """
+    Estado de jobs persistido no Azure Table Storage
+    A criação da entidade é atômica, garantindo que apenas um worker execute cada chave
+    """
+
+    def __init__(self, connection_string, table_name=JOB_STATE_TABLE):
+        from azure.data.tables import TableServiceClient
+
+        service = TableServiceClient.from_connection_string(connection_string)
+        self._table = service.create_table_if_not_exists(table_name)
+
+    def get(self, key):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            return dict(self._table.get_entity(partition_key='budget-unlock', row_key=key))
+        except ResourceNotFoundError:
+            return None
+
+    def try_claim(self, key, job):
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceExistsError, ResourceModifiedError
+
+        entity = {
+            'PartitionKey': 'budget-unlock',
+            'RowKey': key,
+            'status': STATUS_RUNNING,
+            'budget_name': job.get('budget_name'),
+            'period': job.get('period'),
+            'attempts': 1,
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        try:
+            self._table.create_entity(entity)
+            return True
+        except ResourceExistsError:
+            pass
+
+        current = self._table.get_entity(partition_key='budget-unlock', row_key=key)
+        if not _is_reclaimable(current):
+            return False
+
+        entity['attempts'] = int(current.get('attempts', 0)) + 1
+        try:
+            # Concorrência otimista: só assume o job se ninguém o alterou desde a leitura
+            self._table.update_entity(
+                entity,
+                etag=current.metadata['etag'],
+                match_condition=MatchConditions.IfNotModified
+            )
+            return True
+        except ResourceModifiedError:
+            return False
+
+    def mark_completed(self, key, summary=None):
+        self._update(key, STATUS_COMPLETED, summary=json.dumps(summary or {}, default=str))
+
+    def mark_failed(self, key, error):
+        self._update(key, STATUS_FAILED, error=str(error)[:1000])
+
+    def _update(self, key, status, **fields):
+        from azure.data.tables import UpdateMode
+
+        entity = {
+            'PartitionKey': 'budget-unlock',
+            'RowKey': key,
+            'status': status,
+            'updated_at': datetime.utcnow().isoformat(),
+            **fields
+        }
+        self._table.upsert_entity(entity, mode=UpdateMode.MERGE)
+
+
+def _is_reclaimable(job):
+    """Jobs com falha ou abandonados podem ser reexecutados; concluídos e em execução não"""
+    status = job.get('status')
+    if status == STATUS_FAILED:
+        return True
+    if status == STATUS_RUNNING:
+        try:
+            updated_at = datetime.fromisoformat(job.get('updated_at'))
+        except (TypeError, ValueError):
+            return True
+        return datetime.utcnow() - updated_at > timedelta(minutes=JOB_STALE_AFTER_MINUTES)
+    return False
+
+
+_state_store = None
+_state_store_lock = threading.Lock()
+
+
+def get_job_state_store():
+    """
+    Retorna o store de estado configurado
+    Usa Table Storage quando AzureWebJobsStorage está disponível, senão memória local
+    """
+    global _state_store
+    with _state_store_lock:
+        if _state_store is None:
+            connection_string = os.getenv('AzureWebJobsStorage')
+            if connection_string:
+                try:
+                    _state_store = TableJobStateStore(connection_string)
+                except Exception as e:
+                    logging.warning(f"Table Storage indisponível, usando estado em memória: {str(e)}")
+            if _state_store is None:
+                _state_store = InMemoryJobStateStore()
+        return _state_store
+
+
+def enqueue_budget_unlock(alert_data, queue):
+    """Enfileira job de remoção de locks e retorna a mensagem enviada"""
+    job = build_unlock_job(alert_data)
+    queue.set(json.dumps(job))
+    logging.info(f"Job de unlock enfileirado: {job['budget_name']} ({job['period']}) - chave {job['idempotency_key']}")
+    return job
+
+
+def process_budget_unlock_job(message_body, unlock_handler, state_store=None):
+    """
+    Executa um job de remoção de locks com deduplicação
+    unlock_handler é o main do BudgetExceededUnlock, importado por function_app.py
+    Retorna o status final; relança exceções para que a fila aplique retry/poison
+    """
+    job = json.loads(message_body) if isinstance(message_body, (str, bytes)) else message_body
+    key = job['idempotency_key']
+    store = state_store or get_job_state_store()
+
+    if not store.try_claim(key, job):
+        existing = store.get(key) or {}
+        logging.info(f"Job {key} ignorado (duplicado, status: {existing.get('status')})")
+        return {'status': 'duplicate', 'idempotency_key': key, 'existing_status': existing.get('status')}
+
+    try:
+        response = unlock_handler(JobRequest(job['params']))
+        status_code = getattr(response, 'status_code', 200)
+        if status_code >= 500:
+            raise RuntimeError(f"Remoção de locks falhou com status {status_code}")
+
+        store.mark_completed(key, {'status_code': status_code, 'finished_at': datetime.utcnow().isoformat()})
+        logging.info(f"Job {key} concluído (status {status_code})")
+        return {'status': STATUS_COMPLETED, 'idempotency_key': key, 'status_code': status_code}
+
+    except Exception as e:
+        store.mark_failed(key, e)
+        logging.error(f"Job {key} falhou: {str(e)}")
+        raise
@@ -0,0 +1,84 @@
+"""Webhook de budget enfileira o unlock; o worker da fila executa uma vez por budget/período"""
+
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from shared_jobs import (
+    LocalJobQueue, InMemoryJobStateStore, enqueue_budget_unlock, process_budget_unlock_job, resolve_budget_period,
+    STATUS_COMPLETED, STATUS_FAILED
+)
+
+ALERT = {'budgetName': 'Prod', 'threshold': 100, 'actualSpend': 1500, 'budgetStartDate': '2024-05-01T00:00:00Z',
+         'firedDateTime': '2024-05-20T10:00:00Z'}
+
+
+class RecordingUnlock:
+    """main do BudgetExceededUnlock substituído: registra os parâmetros recebidos"""
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.calls = []
+
+    def __call__(self, request):
+        self.calls.append(dict(request.params))
+        return SimpleNamespace(status_code=self.status_code)
+
+
+def test_duplicate_webhooks_unlock_once():
+    queue = LocalJobQueue()
+    store = InMemoryJobStateStore()
+    unlock = RecordingUnlock()
+
+    first = enqueue_budget_unlock(ALERT, queue)
+    second = enqueue_budget_unlock(dict(ALERT, actualSpend=1600), queue)
+    assert first['idempotency_key'] == second['idempotency_key']
+    assert len(queue) == 2
+
+    results = []
+    assert queue.drain(lambda message: results.append(process_budget_unlock_job(message, unlock, store))) == 2
+
+    assert [result['status'] for result in results] == [STATUS_COMPLETED, 'duplicate']
+    assert len(unlock.calls) == 1
+    assert unlock.calls[0]['force_unlock'] == 'true'
+    assert store.get(first['idempotency_key'])['status'] == STATUS_COMPLETED
+
+
+def test_new_month_is_a_new_job():
+    queue = LocalJobQueue()
+    store = InMemoryJobStateStore()
+    unlock = RecordingUnlock()
+
+    # Mesmo budget (mesma data de início) excedido em dois meses de cobrança
+    may = enqueue_budget_unlock(ALERT, queue)
+    june = enqueue_budget_unlock(dict(ALERT, firedDateTime='2024-06-03T08:00:00Z'), queue)
+    assert may['idempotency_key'] != june['idempotency_key']
+    queue.drain(lambda message: process_budget_unlock_job(message, unlock, store))
+
+    assert len(unlock.calls) == 2
+
+
+def test_period_defaults_to_current_month():
+    alert = {key: value for key, value in ALERT.items() if key != 'firedDateTime'}
+    period = resolve_budget_period(alert)
+    assert period == f"{datetime.utcnow().strftime('%Y-%m')}@2024-05-01"
+
+
+def test_failed_job_is_retried():
+    queue = LocalJobQueue()
+    store = InMemoryJobStateStore()
+    job = enqueue_budget_unlock(ALERT, queue)
+    message = queue.receive()
+
+    with pytest.raises(RuntimeError):
+        process_budget_unlock_job(message, RecordingUnlock(status_code=500), store)
+    assert store.get(job['idempotency_key'])['status'] == STATUS_FAILED
+
+    # A fila reentrega a mensagem: o job com falha pode ser assumido de novo
+    unlock = RecordingUnlock()
+    result = process_budget_unlock_job(json.loads(message), unlock, store)
+    assert result['status'] == STATUS_COMPLETED
+    assert len(unlock.calls) == 1
+    assert store.get(job['idempotency_key'])['attempts'] == 2
@@ -192,6 +192,9 @@ deploy_functions() {
         return
     fi
     
+    # Módulos shared_*.py gerados a partir do backend (fonte única)
+    python3 ../scripts/sync_shared_modules.py
+    
     # Deploy das functions
     FUNCTION_APP_NAME=$(terraform -chdir=../terraform output -raw function_app_name)
     func azure functionapp publish $FUNCTION_APP_NAME --python
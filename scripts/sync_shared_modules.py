@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Gera os módulos shared_*.py das Azure Functions a partir do backend
+Os utilitários de acesso ao ARM (governador, parser de ids, contabilização de
+chamadas e opções dos clientes) têm uma única fonte em azure-dashboard-backend/src/utils;
+as cópias das Functions só trocam os imports src.utils.X por shared_X.
+
+Uso:
+    python scripts/sync_shared_modules.py          # regrava as cópias
+    python scripts/sync_shared_modules.py --check  # falha (exit 1) se alguma cópia divergir
+"""
+
+import os
+import re
+import sys
+import difflib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(ROOT, 'azure-dashboard-backend', 'src', 'utils')
+TARGET_DIR = os.path.join(ROOT, 'azure-functions-project')
+
+SHARED_MODULES = ['arm_governor', 'arm_ids', 'call_accounting', 'azure_clients']
+
+HEADER = ('# Arquivo gerado a partir de azure-dashboard-backend/src/utils/{module}.py\n'
+          '# por scripts/sync_shared_modules.py: não edite aqui\n')
+
+_IMPORT = re.compile(r'^from src\.utils\.(' + '|'.join(SHARED_MODULES) + r') import', re.MULTILINE)
+
+
+def render(module):
+    """Conteúdo esperado de shared_<module>.py"""
+    with open(os.path.join(SOURCE_DIR, f'{module}.py'), encoding='utf-8') as source:
+        content = source.read()
+    return HEADER.format(module=module) + _IMPORT.sub(r'from shared_\1 import', content)
+
+
+def main(argv):
+    check = '--check' in argv
+    stale = []
+    for module in SHARED_MODULES:
+        target = os.path.join(TARGET_DIR, f'shared_{module}.py')
+        expected = render(module)
+        current = None
+        if os.path.exists(target):
+            with open(target, encoding='utf-8') as existing:
+                current = existing.read()
+        if current == expected:
+            continue
+        stale.append(target)
+        if check:
+            sys.stdout.writelines(difflib.unified_diff(
+                (current or '').splitlines(True), expected.splitlines(True),
+                fromfile=os.path.relpath(target, ROOT), tofile=f'src/utils/{module}.py (gerado)'))
+        else:
+            with open(target, 'w', encoding='utf-8') as output:
+                output.write(expected)
+            print(f'Atualizado: {os.path.relpath(target, ROOT)}')
+
+    if check and stale:
+        print(f'\n{len(stale)} módulo(s) das Functions divergem do backend; '
+              f'rode python scripts/sync_shared_modules.py', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))